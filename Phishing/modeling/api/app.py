@@ -3,14 +3,15 @@ Phishing Detection API - FastAPI Application
 Provides REST endpoints for real-time phishing email detection.
 """
 import os
+import asyncio
 import time
 import logging
 from contextlib import asynccontextmanager
 from typing import Dict
 
-from fastapi import FastAPI, HTTPException, status
+from fastapi import Depends, FastAPI, HTTPException, status
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 from dotenv import load_dotenv
 
 from models import (
@@ -26,7 +27,12 @@ from models import (
     ModelFeatures,
     TrainingData
 )
-from predictor import get_predictor
+from predictor import PhishingPredictor, get_predictor, swap_predictor
+from service_common.registry import ModelRegistry, ModelSwapper, admin_token_guard, create_admin_router
+from service_common.metrics import BATCH_SIZE_BUCKETS, Metrics, PROMETHEUS_CONTENT_TYPE, current_timings, lap, route_of
+from service_common.profiler import PROFILE_HEADER, SamplingProfiler, create_profiler_router
+from service_common.memory import MemoryTracker, create_memory_router, deep_size
+from service_common.tracing import TRACEPARENT_HEADER, Tracer, annotate
 
 # Configure logging
 logging.basicConfig(
@@ -43,19 +49,100 @@ API_VERSION = "1.0.0"
 MODEL_PATH = os.getenv("MODEL_PATH", "../outputs/models/best_model.pkl")
 VECTORIZER_PATH = os.getenv("VECTORIZER_PATH", "../outputs/features/tfidf_vectorizer.pkl")
 MODEL_INFO_PATH = os.getenv("MODEL_INFO_PATH", "../outputs/models/model_info.json")
+# Memory-mapped artifact bundle (see service_common/artifacts.py); unset = load the pickles directly
+ARTIFACT_DIR = os.getenv("ARTIFACT_DIR")
+# Versioned models for hot-swap (see service_common/registry.py); its active version wins over MODEL_PATH
+MODEL_REGISTRY_DIR = os.getenv("MODEL_REGISTRY_DIR", "../outputs/registry")
+REGISTRY_POLL_SECONDS = float(os.getenv("REGISTRY_POLL_SECONDS", "5"))
+# Synthetic requests predicted by a new model version before it serves traffic
+WARMUP_REQUESTS = int(os.getenv("WARMUP_REQUESTS", "20"))
+# On-demand sampling profiler (see service_common/profiler.py): output directory, sampling
+# interval, share of wall time the sampler may use, longest session
+PROFILER_DIR = os.getenv("PROFILER_DIR", "profiles")
+PROFILER_INTERVAL_MS = float(os.getenv("PROFILER_INTERVAL_MS", "10"))
+PROFILER_OVERHEAD_BUDGET = float(os.getenv("PROFILER_OVERHEAD_BUDGET", "0.02"))
+PROFILER_MAX_SECONDS = float(os.getenv("PROFILER_MAX_SECONDS", "300"))
+# Share of batch requests whose peak Python allocation is measured (see service_common/memory.py)
+MEMORY_PEAK_SAMPLE_RATE = float(os.getenv("MEMORY_PEAK_SAMPLE_RATE", "0.01"))
+# Request tracing (see service_common/tracing.py): span files directory, and share of requests
+# without a sampled traceparent header to trace anyway
+TRACE_DIR = os.getenv("TRACE_DIR", "traces")
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "0"))
+
+
+def build_predictor(files: Dict, artifact_dir: str = None) -> PhishingPredictor:
+    """Predictor for the files of a registry version"""
+    return PhishingPredictor(
+        model_path=files["model"],
+        vectorizer_path=files["vectorizer"],
+        model_info_path=files.get("model_info"),
+        artifact_dir=artifact_dir
+    )
 
 
-@asynccontextmanager
-async def lifespan(app: FastAPI):
+def warm_up_predictor(predictor: PhishingPredictor):
+    """Run synthetic emails through a new predictor so real requests are not served cold"""
+    example = EmailInput.model_config["json_schema_extra"]["example"]
+    emails = [
+        {**example, "subject": f"{example['subject']} {i}", "body": f"{example['body']} ref {i}", "urls": i % 3}
+        for i in range(WARMUP_REQUESTS)
+    ]
+    for email in emails[:5]:
+        predictor.predict_single(email)
+    predictor.predict_batch(emails)
+
+
+api_dir = os.path.dirname(os.path.abspath(__file__))
+swapper = ModelSwapper(
+    ModelRegistry(os.path.join(api_dir, MODEL_REGISTRY_DIR)),
+    build=build_predictor,
+    warm_up=warm_up_predictor,
+    get=get_predictor,
+    swap=swap_predictor,
+    mapped=bool(ARTIFACT_DIR)
+)
+
+
+# Request latency, per-stage latency and batch sizes (GET /metrics)
+service_metrics = Metrics(namespace="phishing")
+batch_sizes = service_metrics.histogram("batch_size", "Rows per batch request", buckets=BATCH_SIZE_BUCKETS)
+
+# Admin-triggered sampling profiler (POST /admin/profiler/start)
+profiler = SamplingProfiler(
+    os.path.join(api_dir, PROFILER_DIR),
+    service="phishing",
+    interval=PROFILER_INTERVAL_MS / 1000,
+    overhead_budget=PROFILER_OVERHEAD_BUDGET,
+    max_seconds=PROFILER_MAX_SECONDS
+)
+
+
+def artifact_size(predictor) -> dict:
+    """Deep size of a predictor's loaded artifacts (memory-mapped bundles as mapped_bytes)"""
+    return deep_size(predictor.model, predictor.vectorizer) if predictor is not None else {}
+
+
+# Memory diagnostics (GET /admin/memory; gauges and peak allocation histogram on /metrics)
+memory_tracker = MemoryTracker(service_metrics, peak_sample_rate=MEMORY_PEAK_SAMPLE_RATE)
+memory_tracker.register("artifacts", lambda: artifact_size(get_predictor()))
+memory_tracker.register("rollback_artifacts", lambda: artifact_size(swapper.previous[1] if swapper.previous else None))
+
+# Request tracing: requests the gateway traces (traceparent header) record their spans here
+tracer = Tracer("phishing", os.path.join(api_dir, TRACE_DIR), sample_rate=TRACE_SAMPLE_RATE)
+
+
+def load_predictor():
     """
-    Lifespan context manager for startup and shutdown events.
-    Loads model and vectorizer once at startup.
+    Load the predictor singleton: the registry's active version, else MODEL_PATH.
+    Called by the lifespan, and by the gunicorn master before forking
+    (gunicorn.conf.py) so workers share its memory.
     """
-    # Startup
-    logger.info("🚀 Starting Phishing Detection API...")
+    return swapper.load_initial(load_local_predictor)
 
+
+def load_local_predictor() -> PhishingPredictor:
+    """New predictor for the MODEL_PATH artifacts"""
     # Resolve paths (relative to api/ directory)
-    api_dir = os.path.dirname(os.path.abspath(__file__))
     model_path_abs = os.path.join(api_dir, MODEL_PATH)
     vectorizer_path_abs = os.path.join(api_dir, VECTORIZER_PATH)
     model_info_path_abs = os.path.join(api_dir, MODEL_INFO_PATH)
@@ -69,22 +156,41 @@ async def lifespan(app: FastAPI):
         logger.error(f"❌ Vectorizer not found at: {vectorizer_path_abs}")
         raise FileNotFoundError(f"Vectorizer file not found: {vectorizer_path_abs}")
 
-    # Initialize predictor (singleton)
+    # Initialize predictor (served through get_predictor once swapped in)
     try:
-        predictor = get_predictor(
+        predictor = PhishingPredictor(
             model_path=model_path_abs,
             vectorizer_path=vectorizer_path_abs,
-            model_info_path=model_info_path_abs if os.path.exists(model_info_path_abs) else None
+            model_info_path=model_info_path_abs if os.path.exists(model_info_path_abs) else None,
+            artifact_dir=os.path.join(api_dir, ARTIFACT_DIR) if ARTIFACT_DIR else None
         )
         logger.info(f"✅ Model loaded: {predictor.get_model_name()}")
         logger.info(f"✅ Features: {predictor.get_features_count()}")
-        logger.info("✅ API ready to accept requests")
     except Exception as e:
         logger.error(f"❌ Failed to load model: {str(e)}")
         raise
+    return predictor
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Lifespan context manager for startup and shutdown events.
+    Loads model and vectorizer once at startup (a no-op when the gunicorn
+    master preloaded them).
+    """
+    # Startup
+    logger.info("🚀 Starting Phishing Detection API...")
+    load_predictor()
+    follower = asyncio.create_task(swapper.follow_registry(REGISTRY_POLL_SECONDS))
+    logger.info("✅ API ready to accept requests")
 
     yield
 
+    follower.cancel()
+    # Write the profile of a session still running
+    profiler.stop()
+
     # Shutdown
     logger.info("🛑 Shutting down Phishing Detection API...")
 
@@ -104,8 +210,57 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Model-Version"],
 )
 
+# Model registry admin endpoints (hot-swap and rollback)
+app.include_router(create_admin_router(swapper))
+# Sampling profiler admin endpoints (same X-Admin-Token guard)
+app.include_router(create_profiler_router(profiler, [Depends(admin_token_guard())]))
+app.include_router(create_memory_router(memory_tracker, [Depends(admin_token_guard())]))
+
+
+@app.middleware("http")
+async def tag_model_version(request, call_next):
+    """Tag every response with the model version serving it (drained on swap)"""
+    with swapper.track() as version:
+        response = await call_next(request)
+    response.headers["X-Model-Version"] = version or ""
+    return response
+
+
+@app.middleware("http")
+async def record_metrics(request, call_next):
+    """Observe request latency and the request's stage timings"""
+    with service_metrics.timed_request() as timings:
+        response = await call_next(request)
+        # Prediction endpoints lap parsing and restart the clock before building the response
+        if timings.stages:
+            timings.lap("serialization")
+    elapsed = time.perf_counter() - timings.started
+    service_metrics.observe_request(request.method, route_of(request), response.status_code, elapsed)
+    return response
+
+
+@app.middleware("http")
+async def profile_flagged_requests(request, call_next):
+    """While a mode=header profiling session runs, sample requests carrying X-Debug-Profile"""
+    if profiler.watching_header and request.headers.get(PROFILE_HEADER):
+        with profiler.profile_request():
+            return await call_next(request)
+    return await call_next(request)
+
+
+@app.middleware("http")
+async def trace_requests(request, call_next):
+    """Record the request's spans when the caller traces it (traceparent) or TRACE_SAMPLE_RATE picks it"""
+    with tracer.start_trace(request.url.path, request.headers.get(TRACEPARENT_HEADER)) as root:
+        response = await call_next(request)
+        if root is not None:
+            root.name = f"{request.method} {route_of(request)}"
+            root.attributes.update(status=response.status_code, model_version=response.headers.get("X-Model-Version"))
+    return response
+
 
 # ============================================================================
 # EXCEPTION HANDLERS
@@ -145,13 +300,20 @@ async def health_check() -> HealthResponse:
     )
 
 
+@app.get("/metrics", tags=["Health"])
+async def get_metrics() -> Response:
+    """Prometheus metrics: request and per-stage latency histograms, batch sizes"""
+    return Response(service_metrics.render(), media_type=PROMETHEUS_CONTENT_TYPE)
+
+
 @app.post("/predict", response_model=PredictionResponse, tags=["Prediction"])
-async def predict_email(email: EmailInput) -> PredictionResponse:
+async def predict_email(email: EmailInput, timings: bool = False) -> PredictionResponse:
     """
     Predict if a single email is phishing or legitimate.
 
     Args:
         email: Email data (sender, subject, body, etc.)
+        timings: Include the per-stage timing breakdown in the metadata
 
     Returns:
         Prediction result with confidence scores and metadata
@@ -173,9 +335,13 @@ async def predict_email(email: EmailInput) -> PredictionResponse:
             'body': email.body,
             'urls': email.urls
         }
+        lap("parse")
 
         # Predict
         result = predictor.predict_single(email_data)
+        lap()
+        if timings:
+            result['metadata']['timings'] = current_timings().as_ms()
 
         logger.info(
             f"✅ Prediction: {result['prediction_label']} "
@@ -193,13 +359,14 @@ async def predict_email(email: EmailInput) -> PredictionResponse:
 
 
 @app.post("/predict/batch", response_model=BatchPredictionResponse, tags=["Prediction"])
-async def predict_batch(batch: BatchEmailInput) -> BatchPredictionResponse:
+async def predict_batch(batch: BatchEmailInput, timings: bool = False) -> BatchPredictionResponse:
     """
     Predict multiple emails in a single request.
     More efficient than calling /predict multiple times.
 
     Args:
         batch: List of emails to predict
+        timings: Include the per-stage timing breakdown in the metadata
 
     Returns:
         List of predictions with metadata
@@ -224,9 +391,14 @@ async def predict_batch(batch: BatchEmailInput) -> BatchPredictionResponse:
             }
             for email in batch.emails
         ]
+        lap("parse")
+        batch_sizes.observe(len(emails_data))
+        annotate(rows=len(emails_data))
 
         # Batch predict
-        predictions, processing_time_ms = predictor.predict_batch(emails_data)
+        with memory_tracker.sample_peak("predict_batch"):
+            predictions, processing_time_ms = predictor.predict_batch(emails_data)
+        lap()
 
         logger.info(
             f"✅ Batch prediction completed: {len(predictions)} emails "
@@ -238,7 +410,8 @@ async def predict_batch(batch: BatchEmailInput) -> BatchPredictionResponse:
             predictions=[SingleBatchPrediction(**pred) for pred in predictions],
             metadata=BatchMetadata(
                 total_emails=len(predictions),
-                processing_time_ms=round(processing_time_ms, 2)
+                processing_time_ms=round(processing_time_ms, 2),
+                timings=current_timings().as_ms() if timings else None
             )
         )
 
@@ -270,6 +443,7 @@ async def get_model_info() -> ModelInfoResponse:
         return ModelInfoResponse(
             model_name=predictor.get_model_name(),
             model_version=API_VERSION,
+            registry_version=swapper.version,
             training_date=training_info.get("training_date", "2026-01-10"),
             metrics=ModelMetrics(
                 f1_score=metrics.get("f1_score", 0.9909),
@@ -2,7 +2,7 @@
 Pydantic models for API request/response validation.
 """
 from pydantic import BaseModel, Field, field_validator
-from typing import Optional, List
+from typing import Dict, Optional, List
 from datetime import datetime
 
 
@@ -76,6 +76,7 @@ class PredictionMetadata(BaseModel):
     features_count: int = Field(..., description="Total number of features used")
     timestamp: str = Field(..., description="Prediction timestamp")
     processing_time_ms: float = Field(..., description="Processing time in milliseconds")
+    timings: Optional[Dict[str, float]] = Field(None, description="Milliseconds per processing stage (with ?timings=true)")
 
 
 class PredictionResponse(BaseModel):
@@ -150,6 +151,7 @@ class BatchMetadata(BaseModel):
     """Metadata for batch prediction response."""
     total_emails: int = Field(..., description="Total number of emails processed")
     processing_time_ms: float = Field(..., description="Total processing time in milliseconds")
+    timings: Optional[Dict[str, float]] = Field(None, description="Milliseconds per processing stage (with ?timings=true)")
 
 
 class BatchPredictionResponse(BaseModel):
@@ -227,6 +229,7 @@ class ModelInfoResponse(BaseModel):
     """Schema for model info response."""
     model_name: str = Field(..., description="Model name")
     model_version: str = Field(..., description="Model version")
+    registry_version: Optional[str] = Field(None, description="Model registry version served ('local' = MODEL_PATH)")
     training_date: str = Field(..., description="Training date")
     metrics: ModelMetrics = Field(..., description="Model performance metrics")
     features: ModelFeatures = Field(..., description="Features information")
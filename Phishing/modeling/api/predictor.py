@@ -5,7 +5,6 @@ Encapsulates model loading, feature engineering, and prediction.
 import sys
 import os
 import time
-import joblib
 import json
 import pandas as pd
 from datetime import datetime
@@ -14,13 +13,23 @@ import re
 
 # Add parent directory to path to import feature engineering
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+# Shared service modules (service_common/ at the repository root; /app in the Docker image)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', '..'))
 from src.features.feature_engineering import engineer_features
+from service_common.artifacts import load_artifacts
+from service_common.metrics import stage
 
 
 class PhishingPredictor:
     """Encapsulates phishing detection model and prediction logic."""
 
-    def __init__(self, model_path: str, vectorizer_path: str, model_info_path: str = None):
+    def __init__(
+        self,
+        model_path: str,
+        vectorizer_path: str,
+        model_info_path: str = None,
+        artifact_dir: str = None
+    ):
         """
         Initialize predictor by loading model and vectorizer.
 
@@ -28,16 +37,20 @@ class PhishingPredictor:
             model_path: Path to trained model (.pkl)
             vectorizer_path: Path to TF-IDF vectorizer (.pkl)
             model_info_path: Path to model info JSON (optional)
+            artifact_dir: Memory-mapped artifact bundle, built from the .pkl
+                files on first use (optional; None loads the pickles directly)
         """
         print(f"🔧 Initializing PhishingPredictor...")
 
-        # Load model
+        # Load model and TF-IDF vectorizer (tree and vocabulary arrays are
+        # memory-mapped and shared between workers when artifact_dir is set)
         print(f"📦 Loading model from: {model_path}")
-        self.model = joblib.load(model_path)
-
-        # Load TF-IDF vectorizer
         print(f"📦 Loading vectorizer from: {vectorizer_path}")
-        self.vectorizer = joblib.load(vectorizer_path)
+        if artifact_dir:
+            print(f"📦 Using artifact bundle: {artifact_dir}")
+        artifacts = load_artifacts({"model": model_path, "vectorizer": vectorizer_path}, artifact_dir)
+        self.model = artifacts["model"]
+        self.vectorizer = artifacts["vectorizer"]
 
         # Load model info (optional)
         self.model_info = {}
@@ -515,22 +528,24 @@ class PhishingPredictor:
         """
         start_time = time.time()
 
-        # Step 1: Convert to DataFrame
-        df = self._prepare_dataframe(email_data)
-
-        # Step 2: Feature engineering
-        X = self._engineer_features(df)
+        # Step 1-2: Convert to DataFrame, feature engineering (TF-IDF included)
+        with stage("feature_engineering"):
+            df = self._prepare_dataframe(email_data)
+            X = self._engineer_features(df)
 
         # Step 3: Predict
-        prediction = self.model.predict(X)[0]
-        probabilities = self.model.predict_proba(X)[0]
+        with stage("model"):
+            prediction = self.model.predict(X)[0]
+            probabilities = self.model.predict_proba(X)[0]
         confidence = float(max(probabilities))
 
         # Step 4: Generate explanation
-        explanation = self._generate_explanation(email_data, int(prediction), confidence)
+        with stage("explanation"):
+            explanation = self._generate_explanation(email_data, int(prediction), confidence)
 
         # Step 5: Generate metrics analysis
-        metrics_analysis = self._generate_metrics_analysis(email_data)
+        with stage("metrics_analysis"):
+            metrics_analysis = self._generate_metrics_analysis(email_data)
 
         # Step 6: Format response
         processing_time_ms = (time.time() - start_time) * 1000
@@ -572,23 +587,25 @@ class PhishingPredictor:
         """
         start_time = time.time()
 
-        # Step 1: Convert all emails to DataFrame
-        df_list = [self._prepare_dataframe(email) for email in emails]
-        df = pd.concat(df_list, ignore_index=True)
-
-        # Step 2: Feature engineering (once for all emails)
-        X = self._engineer_features(df)
+        # Step 1-2: Convert all emails to DataFrame, feature engineering (once for all emails)
+        with stage("feature_engineering"):
+            df_list = [self._prepare_dataframe(email) for email in emails]
+            df = pd.concat(df_list, ignore_index=True)
+            X = self._engineer_features(df)
 
         # Step 3: Batch prediction
-        predictions = self.model.predict(X)
-        probabilities = self.model.predict_proba(X)
+        with stage("model"):
+            predictions = self.model.predict(X)
+            probabilities = self.model.predict_proba(X)
 
         # Step 4: Format responses with explanations and metrics analysis
         results = []
         for idx, (pred, probs, email) in enumerate(zip(predictions, probabilities, emails)):
             confidence = float(max(probs))
-            explanation = self._generate_explanation(email, int(pred), confidence)
-            metrics_analysis = self._generate_metrics_analysis(email)
+            with stage("explanation"):
+                explanation = self._generate_explanation(email, int(pred), confidence)
+            with stage("metrics_analysis"):
+                metrics_analysis = self._generate_metrics_analysis(email)
             results.append({
                 'email_index': idx,
                 'prediction': int(pred),
@@ -622,7 +639,8 @@ predictor_instance = None
 def get_predictor(
     model_path: str = None,
     vectorizer_path: str = None,
-    model_info_path: str = None
+    model_info_path: str = None,
+    artifact_dir: str = None
 ) -> PhishingPredictor:
     """
     Get or create predictor instance (singleton pattern).
@@ -631,6 +649,7 @@ def get_predictor(
         model_path: Path to model (only needed for first call)
         vectorizer_path: Path to vectorizer (only needed for first call)
         model_info_path: Path to model info (optional)
+        artifact_dir: Memory-mapped artifact bundle (optional)
 
     Returns:
         PhishingPredictor instance
@@ -644,7 +663,26 @@ def get_predictor(
         predictor_instance = PhishingPredictor(
             model_path=model_path,
             vectorizer_path=vectorizer_path,
-            model_info_path=model_info_path
+            model_info_path=model_info_path,
+            artifact_dir=artifact_dir
         )
 
     return predictor_instance
+
+
+def swap_predictor(new_instance: PhishingPredictor) -> PhishingPredictor:
+    """
+    Replace the served predictor (model hot-swap, see service_common/registry.py).
+    Requests that already called get_predictor() finish on the instance they got.
+
+    Args:
+        new_instance: Loaded and warmed-up predictor
+
+    Returns:
+        The previously served predictor (None if there was none)
+    """
+    global predictor_instance
+
+    previous = predictor_instance
+    predictor_instance = new_instance
+    return previous
@@ -194,6 +194,17 @@ def main():
         json.dump(model_info, f, indent=2)
     print(f"   ✅ Metadata: {info_path}")
 
+    # 6. Publicar la version en el registro de modelos (hot-swap sin reiniciar la API)
+    sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+    from service_common.registry import ModelRegistry
+
+    registry = ModelRegistry(os.path.join('outputs', 'registry'))
+    version = registry.publish(
+        {'model': best_model_path, 'vectorizer': vectorizer_path, 'model_info': info_path},
+        notes=f"retrain_model.py: {best_model_name}"
+    )
+    print(f"   ✅ Version publicada en el registro: {version}")
+
     # Resumen final
     print("\n" + "=" * 70)
     print("🏆 RESUMEN FINAL")
@@ -205,7 +216,9 @@ def main():
     print(f"Recall: {results[best_model_name]['recall']:.4f}")
 
     print("\n✅ Re-entrenamiento completado exitosamente!")
-    print("   Ahora puedes reiniciar la API de Phishing.")
+    print(f"   Para servirlo sin reiniciar la API: POST /admin/models/{version}/load")
+    print(f"   (o, desde la raiz del repositorio: "
+          f"python -m service_common.registry Phishing/modeling/outputs/registry activate {version})")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,34 @@
+"""
+Gunicorn configuration for the Account Takeover Detection API.
+
+The master imports the app and loads the model before forking (preload_app),
+so every uvicorn worker starts with the model already in memory and shares
+its pages copy-on-write instead of unpickling a private copy. With
+ARTIFACT_DIR set, the tree and label encoder arrays are memory-mapped files,
+so the pages stay shared even if a worker touches them.
+
+WEB_CONCURRENCY defaults to 1: the per-user login history behind the
+behavioral features lives in each worker process, so with several workers a
+user's logins would be split between independent histories.
+
+Usage:
+    gunicorn -c gunicorn.conf.py app:app
+"""
+import gc
+import os
+
+bind = f"{os.getenv('HOST', '0.0.0.0')}:{os.getenv('PORT', '8001')}"
+workers = int(os.getenv("WEB_CONCURRENCY", "1"))
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+timeout = int(os.getenv("WORKER_TIMEOUT", "120"))
+
+
+def on_starting(server):
+    """Load the model in the master, then freeze it out of the cyclic GC"""
+    import app
+
+    app.load_predictor()
+    # Objects loaded so far are never collected; freezing them keeps the
+    # workers' garbage collector from writing to (and so copying) their pages
+    gc.freeze()
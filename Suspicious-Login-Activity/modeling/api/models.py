@@ -2,7 +2,7 @@
 Pydantic models for Account Takeover Detection API request/response validation.
 """
 from pydantic import BaseModel, Field, field_validator
-from typing import Optional, List
+from typing import Dict, Optional, List
 from datetime import datetime
 
 
@@ -121,6 +121,7 @@ class PredictionMetadata(BaseModel):
     threshold: float = Field(..., description="Classification threshold used")
     timestamp: str = Field(..., description="Prediction timestamp")
     processing_time_ms: float = Field(..., description="Processing time in milliseconds")
+    timings: Optional[Dict[str, float]] = Field(None, description="Milliseconds per processing stage (with ?timings=true)")
 
 
 class PredictionResponse(BaseModel):
@@ -230,6 +231,7 @@ class BatchMetadata(BaseModel):
     total_logins: int = Field(..., description="Total number of logins processed")
     processing_time_ms: float = Field(..., description="Total processing time in milliseconds")
     model: str = Field(..., description="Model name used")
+    timings: Optional[Dict[str, float]] = Field(None, description="Milliseconds per processing stage (with ?timings=true)")
 
 
 class BatchPredictionResponse(BaseModel):
@@ -367,6 +369,7 @@ class ModelInfoResponse(BaseModel):
 
     model_name: str = Field(..., description="Model name")
     model_version: str = Field(..., description="Model version")
+    registry_version: Optional[str] = Field(None, description="Model registry version served ('local' = MODEL_PATH)")
     training_date: str = Field(..., description="Training date")
     metrics: ModelMetrics = Field(..., description="Model performance metrics")
     features: ModelFeatures = Field(..., description="Features information")
@@ -5,13 +5,17 @@ Encapsulates model loading, feature engineering, and prediction with optimal thr
 import sys
 import os
 import time
-import joblib
 import json
 import pandas as pd
 import numpy as np
 from datetime import datetime
 from typing import Dict, List, Tuple
 
+# Shared service modules (service_common/ at the repository root; /app in the Docker image)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', '..'))
+from service_common.artifacts import load_artifacts
+from service_common.metrics import stage
+
 # =============================================================================
 # CONFIGURACIÓN GEOGRÁFICA PARA DETECCIÓN DE ATO - CONTEXTO BOLIVIA
 # =============================================================================
@@ -188,7 +192,8 @@ class AccountTakeoverPredictor:
         model_path: str,
         encoders_path: str,
         threshold_path: str = None,
-        model_info_path: str = None
+        model_info_path: str = None,
+        artifact_dir: str = None
     ):
         """
         Initialize predictor by loading model, encoders, and threshold.
@@ -198,23 +203,29 @@ class AccountTakeoverPredictor:
             encoders_path: Path to label encoders (.pkl)
             threshold_path: Path to optimal threshold info (.pkl, optional)
             model_info_path: Path to model info JSON (optional)
+            artifact_dir: Memory-mapped artifact bundle, built from the .pkl
+                files on first use (optional; None loads the pickles directly)
         """
         print(f"🔧 Initializing AccountTakeoverPredictor...")
 
-        # Load model
+        # Load model, label encoders and optimal threshold (if available);
+        # tree and encoder arrays are memory-mapped when artifact_dir is set
+        sources = {"model": model_path, "encoders": encoders_path}
         print(f"📦 Loading model from: {model_path}")
-        self.model = joblib.load(model_path)
-
-        # Load label encoders
         print(f"📦 Loading encoders from: {encoders_path}")
-        self.encoders = joblib.load(encoders_path)
+        if threshold_path and os.path.exists(threshold_path):
+            print(f"📦 Loading threshold info from: {threshold_path}")
+            sources["threshold"] = threshold_path
+        if artifact_dir:
+            print(f"📦 Using artifact bundle: {artifact_dir}")
+        artifacts = load_artifacts(sources, artifact_dir)
+        self.model = artifacts["model"]
+        self.encoders = artifacts["encoders"]
 
-        # Load optimal threshold (if available)
         self.threshold_info = None
         self.optimal_threshold = 0.5  # Default
-        if threshold_path and os.path.exists(threshold_path):
-            print(f"📦 Loading threshold info from: {threshold_path}")
-            self.threshold_info = joblib.load(threshold_path)
+        if "threshold" in artifacts:
+            self.threshold_info = artifacts["threshold"]
             self.optimal_threshold = self.threshold_info.get('optimal_threshold', 0.5)
             print(f"   ✅ Using optimal threshold: {self.optimal_threshold:.4f}")
         else:
@@ -828,19 +839,20 @@ class AccountTakeoverPredictor:
             'City'
         ]
 
-        for col in categorical_cols:
-            encoded_col_name = f"{col}_encoded"
-            if col in self.encoders:
-                encoder = self.encoders[col]
-                # Handle unseen categories (assign to -1)
-                try:
-                    result_df[encoded_col_name] = encoder.transform(result_df[col])
-                except ValueError:
-                    # Unseen category, use -1
+        with stage("encoding"):
+            for col in categorical_cols:
+                encoded_col_name = f"{col}_encoded"
+                if col in self.encoders:
+                    encoder = self.encoders[col]
+                    # Handle unseen categories (assign to -1)
+                    try:
+                        result_df[encoded_col_name] = encoder.transform(result_df[col])
+                    except ValueError:
+                        # Unseen category, use -1
+                        result_df[encoded_col_name] = -1
+                else:
+                    # Encoder not found, use -1
                     result_df[encoded_col_name] = -1
-            else:
-                # Encoder not found, use -1
-                result_df[encoded_col_name] = -1
 
         # === SELECT FINAL FEATURES (35 features, EXACT order from training) ===
         feature_cols = [
@@ -939,14 +951,14 @@ class AccountTakeoverPredictor:
         """
         start_time = time.time()
 
-        # Step 1: Convert to DataFrame
-        df = self._prepare_dataframe(login_data)
-
-        # Step 2: Feature engineering
-        X = self._engineer_features_simple(df)
+        # Step 1-2: Convert to DataFrame, feature engineering (encoding is its own stage)
+        with stage("feature_engineering"):
+            df = self._prepare_dataframe(login_data)
+            X = self._engineer_features_simple(df)
 
         # Step 3: Predict with model
-        probabilities = self.model.predict_proba(X)[0]
+        with stage("model"):
+            probabilities = self.model.predict_proba(X)[0]
         prob_normal = float(probabilities[0])
         prob_ato = float(probabilities[1])
 
@@ -958,10 +970,12 @@ class AccountTakeoverPredictor:
         risk_score = round(prob_ato * 100, 2)
 
         # Step 6: Generate explanation
-        explanation = self._generate_explanation(X, login_data, prediction, confidence)
+        with stage("explanation"):
+            explanation = self._generate_explanation(X, login_data, prediction, confidence)
 
         # Step 7: Generate metrics analysis
-        metrics_analysis = self._generate_metrics_analysis(X, login_data)
+        with stage("metrics_analysis"):
+            metrics_analysis = self._generate_metrics_analysis(X, login_data)
 
         # Step 8: Format response
         processing_time_ms = (time.time() - start_time) * 1000
@@ -1054,7 +1068,8 @@ def get_predictor(
     model_path: str = None,
     encoders_path: str = None,
     threshold_path: str = None,
-    model_info_path: str = None
+    model_info_path: str = None,
+    artifact_dir: str = None
 ) -> AccountTakeoverPredictor:
     """
     Get or create predictor instance (singleton pattern).
@@ -1064,6 +1079,7 @@ def get_predictor(
         encoders_path: Path to encoders (only needed for first call)
         threshold_path: Path to threshold (optional)
         model_info_path: Path to model info (optional)
+        artifact_dir: Memory-mapped artifact bundle (optional)
 
     Returns:
         AccountTakeoverPredictor instance
@@ -1080,7 +1096,30 @@ def get_predictor(
             model_path=model_path,
             encoders_path=encoders_path,
             threshold_path=threshold_path,
-            model_info_path=model_info_path
+            model_info_path=model_info_path,
+            artifact_dir=artifact_dir
         )
 
     return predictor_instance
+
+
+def swap_predictor(new_instance: AccountTakeoverPredictor) -> AccountTakeoverPredictor:
+    """
+    Replace the served predictor (model hot-swap, see service_common/registry.py).
+    The new predictor takes over the login history used for behavioral
+    features, so users keep their baseline across model versions. Requests
+    that already called get_predictor() finish on the instance they got.
+
+    Args:
+        new_instance: Loaded and warmed-up predictor
+
+    Returns:
+        The previously served predictor (None if there was none)
+    """
+    global predictor_instance
+
+    previous = predictor_instance
+    if previous is not None:
+        new_instance.user_history = previous.user_history
+    predictor_instance = new_instance
+    return previous
@@ -187,6 +187,23 @@ def main():
     output_dir = os.path.join(os.path.dirname(__file__), 'outputs')
     model_info = save_results(models_results, best_model_name, output_dir, X_train, y_test)
 
+    # Publicar la version en el registro de modelos (hot-swap sin reiniciar la API)
+    sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+    from service_common.registry import ModelRegistry
+
+    version_files = {
+        'model': os.path.join(output_dir, 'models', 'best_model.pkl'),
+        'encoders': os.path.join(output_dir, 'features', 'label_encoders.pkl'),
+        'model_info': os.path.join(output_dir, 'models', 'model_info.json'),
+    }
+    threshold_path = os.path.join(output_dir, 'models', 'optimal_threshold.pkl')
+    if os.path.exists(threshold_path):
+        version_files['threshold'] = threshold_path
+    version = ModelRegistry(os.path.join(output_dir, 'registry')).publish(
+        version_files, notes=f"main_pipeline.py: {best_model_name}"
+    )
+    print(f"✅ Version publicada en el registro: {version}")
+
     # ============================================================================
     # RESUMEN FINAL
     # ============================================================================
@@ -205,11 +222,12 @@ def main():
     print(f"   • Features: outputs/features/features.csv")
     print(f"   • Reportes: outputs/reports/")
     print(f"   • Metadata: outputs/models/model_info.json")
+    print(f"   • Registro: outputs/registry/{version}")
 
     print(f"\n📋 PRÓXIMOS PASOS:")
     print(f"   1. Revisar reportes en: outputs/reports/")
     print(f"   2. Analizar confusion matrices y curvas ROC/PR")
-    print(f"   3. Crear API REST usando el mejor modelo")
+    print(f"   3. Servir la version sin reiniciar la API: POST /admin/models/{version}/load")
     print(f"   4. Integrar con frontend React dashboard")
 
     print("\n" + "=" * 80)
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Shared service modules (service_common/ at the repository root; /app in the Docker image)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
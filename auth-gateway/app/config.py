@@ -11,10 +11,28 @@ class Settings(BaseSettings):
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 480
 
+    # Authenticated principal cache
+    PRINCIPAL_CACHE_TTL_SECONDS: float = 30.0
+    PRINCIPAL_CACHE_MAX_ENTRIES: int = 1024
+
+    # Single-use tickets authenticating the alert stream (EventSource cannot send headers)
+    STREAM_TICKET_TTL_SECONDS: float = 30.0
+
     # Database
     DATABASE_URL: str = "sqlite:///./auth_gateway.db"
 
-    # ML APIs
+    # SQLite tuning (applied on every connection)
+    SQLITE_JOURNAL_MODE: str = "WAL"
+    SQLITE_SYNCHRONOUS: str = "NORMAL"  # durable with WAL except on power loss
+    SQLITE_BUSY_TIMEOUT_MS: int = 15000
+    SQLITE_CACHE_SIZE_KB: int = 65536
+    SQLITE_READ_POOL_SIZE: int = 4
+    SQLITE_WRITER_POOL_TIMEOUT_SECONDS: float = 60.0
+
+    # Worker threads for synchronous work (file parsing, bulk writes, hashing)
+    BLOCKING_POOL_SIZE: int = 4
+
+    # ML APIs (with the unified inference server: http://host:8004/phishing, /ato, /brute-force)
     PHISHING_API_URL: str = "http://localhost:8000"
     ATO_API_URL: str = "http://localhost:8001"
     BRUTE_FORCE_API_URL: str = "http://localhost:8002"
@@ -23,6 +41,40 @@ class Settings(BaseSettings):
     MAX_FILE_SIZE_MB: int = 50
     UPLOAD_DIR: str = "./uploads"
 
+    # Per-row prediction cache shared across reports (own SQLite file, LRU by size)
+    PREDICTION_CACHE_ENABLED: bool = True
+    PREDICTION_CACHE_DIR: str = "./cache"
+    PREDICTION_CACHE_MAX_MB: int = 512
+    MODEL_VERSION_TTL_SECONDS: int = 60  # how long a /model/info answer is trusted
+
+    # Dashboard counters
+    COUNTERS_CACHE_TTL_SECONDS: float = 2.0
+    COUNTERS_RECONCILE_INTERVAL_SECONDS: int = 300
+
+    # Incidents: alerts with the same fingerprint within the window are grouped
+    INCIDENT_WINDOW_MINUTES: int = 60
+    INCIDENT_SAMPLE_SIZE: int = 10  # newest member summaries kept on the incident
+
+    # Alert generation lease per report; renewed with every committed chunk
+    ALERT_SYNC_LEASE_SECONDS: int = 300
+
+    # Monthly report cache (closed months are cached permanently)
+    MONTHLY_REPORT_CACHE_TTL_SECONDS: int = 60
+
+    # On-demand sampling profiler (admin only, POST /admin/profiler/start)
+    PROFILER_DIR: str = "./profiles"
+    PROFILER_INTERVAL_MS: float = 10.0
+    PROFILER_OVERHEAD_BUDGET: float = 0.02  # share of wall time the sampler may use
+    PROFILER_MAX_SECONDS: float = 300.0
+
+    # Memory diagnostics: share of report generations whose peak Python allocation is measured
+    MEMORY_PEAK_SAMPLE_RATE: float = 0.05
+
+    # Request tracing (spans appended to TRACE_DIR, read by trace_viewer.py); requests
+    # arriving with a sampled traceparent header are always traced
+    TRACE_DIR: str = "./traces"
+    TRACE_SAMPLE_RATE: float = 0.0
+
     class Config:
         env_file = ".env"
 
@@ -1,20 +1,87 @@
 """
 Database configuration and session management
 """
-import json
-from sqlalchemy import create_engine, text, inspect
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from .config import get_settings
 
 settings = get_settings()
 
+ASYNC_DATABASE_URL = settings.DATABASE_URL.replace("sqlite://", "sqlite+aiosqlite://", 1)
+
+
+def _configure_sqlite(target_engine, read_only: bool) -> None:
+    """
+    Apply connection pragmas on connect.
+    WAL lets readers and the writer work concurrently; busy_timeout makes
+    a second writer wait for the lock instead of failing with "database is locked".
+    """
+    @event.listens_for(target_engine, "connect")
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute(f"PRAGMA busy_timeout = {int(settings.SQLITE_BUSY_TIMEOUT_MS)}")
+        if read_only:
+            cursor.execute("PRAGMA query_only = ON")
+        else:
+            # Persistent in the database file; only writers may change it
+            cursor.execute(f"PRAGMA journal_mode = {settings.SQLITE_JOURNAL_MODE}")
+        cursor.execute(f"PRAGMA synchronous = {settings.SQLITE_SYNCHRONOUS}")
+        # Negative values are KiB instead of pages
+        cursor.execute(f"PRAGMA cache_size = -{int(settings.SQLITE_CACHE_SIZE_KB)}")
+        cursor.close()
+
+
+# The writer: one connection, so every write transaction in the process
+# (handlers via run_in_session, background jobs, scripts) queues in this pool
+# instead of contending for SQLite's lock with another writer connection.
 engine = create_engine(
     settings.DATABASE_URL,
-    connect_args={"check_same_thread": False}  # SQLite specific
+    connect_args={"check_same_thread": False},  # SQLite specific
+    pool_size=1,
+    max_overflow=0,
+    pool_timeout=settings.SQLITE_WRITER_POOL_TIMEOUT_SECONDS
+)
+
+# Readers: small pools of query_only connections. The async one serves request
+# handlers (queries run on aiosqlite's connection threads, so the event loop
+# keeps serving other requests meanwhile); the sync one streaming exports.
+read_engine = create_engine(
+    settings.DATABASE_URL,
+    connect_args={"check_same_thread": False},
+    pool_size=settings.SQLITE_READ_POOL_SIZE,
+    max_overflow=0
 )
 
+async_read_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    poolclass=AsyncAdaptedQueuePool,  # aiosqlite defaults to NullPool
+    pool_size=settings.SQLITE_READ_POOL_SIZE,
+    max_overflow=0
+)
+
+_configure_sqlite(engine, read_only=False)
+_configure_sqlite(read_engine, read_only=True)
+_configure_sqlite(async_read_engine.sync_engine, read_only=True)
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+
+AsyncReadSessionLocal = async_sessionmaker(
+    async_read_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+)
+
+# Dedicated pool for code that must stay synchronous (sync sessions, pandas,
+# bcrypt), kept apart from Starlette's threadpool used by sync endpoints
+blocking_executor = ThreadPoolExecutor(
+    max_workers=settings.BLOCKING_POOL_SIZE,
+    thread_name_prefix="gateway-blocking"
+)
 
 Base = declarative_base()
 
@@ -28,35 +95,56 @@ def get_db():
         db.close()
 
 
-def run_migrations():
-    """Run database migrations for schema changes"""
-    inspector = inspect(engine)
+async def get_read_db():
+    """Dependency for getting an async read-only database session"""
+    async with AsyncReadSessionLocal() as db:
+        yield db
+
+
+async def run_blocking(func, *args, **kwargs):
+    """Run a synchronous callable in the blocking pool without stalling the event loop"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(blocking_executor, partial(func, *args, **kwargs))
+
+
+async def iterate_blocking(iterator):
+    """Drive a synchronous iterator (e.g. a streaming export) from the blocking pool"""
+    sentinel = object()
+    try:
+        while True:
+            item = await run_blocking(next, iterator, sentinel)
+            if item is sentinel:
+                return
+            yield item
+    finally:
+        # Release the generator's session/file handles if the client went away
+        close = getattr(iterator, "close", None)
+        if close is not None:
+            await run_blocking(close)
+
+
+def _call_with_session(func, *args, **kwargs):
+    db = SessionLocal()
+    try:
+        return func(*args, db=db, **kwargs)
+    finally:
+        db.close()
 
-    # Check if users table exists
-    if 'users' in inspector.get_table_names():
-        columns = [col['name'] for col in inspector.get_columns('users')]
 
-        # Migration: Add permissions column if it doesn't exist
-        if 'permissions' not in columns:
-            print("Running migration: Adding 'permissions' column to users table...")
-            default_permissions = json.dumps({
-                "dashboard": True,
-                "predictions": False,
-                "reports": True,
-                "alerts": True
-            })
-            with engine.connect() as conn:
-                conn.execute(text(
-                    f"ALTER TABLE users ADD COLUMN permissions TEXT DEFAULT '{default_permissions}'"
-                ))
-                conn.commit()
-            print("Migration completed: 'permissions' column added.")
+async def run_in_session(func, *args, **kwargs):
+    """
+    Run func(*args, db=<sync Session>, **kwargs) in the blocking pool.
+    This is how request handlers write: the session is on the (single) writer
+    and is opened and closed on the worker thread; pass ids, not ORM objects.
+    """
+    return await run_blocking(_call_with_session, func, *args, **kwargs)
 
 
 def init_db():
     """Initialize database tables"""
-    from .models import user, file, report, alert, prediction  # noqa: F401
+    from .models import user, file, report, report_result, alert, prediction, stat_counter, daily_rollup, monthly_report_cache, incident, alert_sync_state  # noqa: F401
     Base.metadata.create_all(bind=engine)
 
-    # Run migrations for existing databases
-    run_migrations()
+    # Versioned migrations (schema changes for existing databases)
+    from .migrations import run_migrations
+    run_migrations(engine)
@@ -2,15 +2,59 @@
 Auth Gateway API - Main Application
 Central authentication and authorization gateway for the cybersecurity prediction system
 """
-from contextlib import asynccontextmanager
-from fastapi import FastAPI
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager, suppress
+from fastapi import Depends, FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 
-from .database import init_db, SessionLocal
-from .routers import auth_router, users_router, files_router, alerts_router, predictions_router, profile_router
+from service_common.memory import create_memory_router
+from service_common.metrics import PROMETHEUS_CONTENT_TYPE, route_of
+from service_common.profiler import PROFILE_HEADER, SamplingProfiler, create_profiler_router
+from service_common.tracing import TRACEPARENT_HEADER
+
+from .config import get_settings
+from .database import init_db, SessionLocal, engine, read_engine, async_read_engine, run_blocking
+from .routers import auth_router, users_router, files_router, alerts_router, predictions_router, profile_router, incidents_router
 from .routers.monthly_reports import router as monthly_reports_router
 from .routers.reports import router as reports_router
-from .services.auth_service import create_default_users
+from .services.auth_service import create_default_users, get_current_admin
+from .services.counter_service import CounterService
+from .services.metrics import gateway_memory, gateway_metrics, gateway_tracer, instrument_engine
+from .services.pagination import NEXT_CURSOR_HEADER
+from .services.rollup_service import RollupService
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# Admin-triggered sampling profiler (POST /admin/profiler/start)
+profiler = SamplingProfiler(
+    settings.PROFILER_DIR,
+    service="gateway",
+    interval=settings.PROFILER_INTERVAL_MS / 1000,
+    overhead_budget=settings.PROFILER_OVERHEAD_BUDGET,
+    max_seconds=settings.PROFILER_MAX_SECONDS
+)
+
+
+def reconcile_counters():
+    """Rebuild dashboard counters from the source tables"""
+    db = SessionLocal()
+    try:
+        CounterService.rebuild(db)
+    finally:
+        db.close()
+
+
+async def counters_reconciliation_loop():
+    """Periodically rebuild counters to correct any drift"""
+    while True:
+        await asyncio.sleep(settings.COUNTERS_RECONCILE_INTERVAL_SECONDS)
+        try:
+            await run_blocking(reconcile_counters)
+        except Exception:
+            logger.exception("Counter reconciliation failed")
 
 
 @asynccontextmanager
@@ -21,10 +65,23 @@ async def lifespan(app: FastAPI):
     db = SessionLocal()
     try:
         create_default_users(db)
+        # Databases created before daily_rollups existed get a one-off build
+        RollupService.ensure_built(db)
     finally:
         db.close()
+
+    # Counters may be missing or stale after an upgrade or an offline script
+    reconcile_counters()
+    reconcile_task = asyncio.create_task(counters_reconciliation_loop())
+
     yield
-    # Shutdown: cleanup if needed
+
+    # Shutdown: stop background jobs (a running profile is written)
+    reconcile_task.cancel()
+    profiler.stop()
+    with suppress(asyncio.CancelledError):
+        await reconcile_task
+    await async_read_engine.dispose()
 
 
 app = FastAPI(
@@ -48,8 +105,45 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER],
 )
 
+# SQL statement latency per engine (the async engine runs its statements on sync_engine)
+instrument_engine(engine, "writer")
+instrument_engine(read_engine, "reader")
+instrument_engine(async_read_engine.sync_engine, "async_reader")
+
+
+@app.middleware("http")
+async def record_metrics(request: Request, call_next):
+    """Observe request latency and the request's stage timings (report pipeline, ML API calls)"""
+    with gateway_metrics.timed_request() as timings:
+        response = await call_next(request)
+    elapsed = time.perf_counter() - timings.started
+    gateway_metrics.observe_request(request.method, route_of(request), response.status_code, elapsed)
+    return response
+
+
+@app.middleware("http")
+async def profile_flagged_requests(request: Request, call_next):
+    """While a mode=header profiling session runs, sample requests carrying X-Debug-Profile"""
+    if profiler.watching_header and request.headers.get(PROFILE_HEADER):
+        with profiler.profile_request():
+            return await call_next(request)
+    return await call_next(request)
+
+
+@app.middleware("http")
+async def trace_requests(request: Request, call_next):
+    """Record the request's spans when the client traces it (traceparent) or TRACE_SAMPLE_RATE picks it"""
+    with gateway_tracer.start_trace(request.url.path, request.headers.get(TRACEPARENT_HEADER)) as root:
+        response = await call_next(request)
+        if root is not None:
+            root.name = f"{request.method} {route_of(request)}"
+            root.attributes["status"] = response.status_code
+    return response
+
+
 # Include routers
 app.include_router(auth_router)
 app.include_router(users_router)
@@ -58,7 +152,10 @@ app.include_router(files_router)
 app.include_router(reports_router)
 app.include_router(monthly_reports_router)
 app.include_router(alerts_router)
+app.include_router(incidents_router)
 app.include_router(predictions_router)
+app.include_router(create_profiler_router(profiler, [Depends(get_current_admin)]))
+app.include_router(create_memory_router(gateway_memory, [Depends(get_current_admin)]))
 
 
 @app.get("/health", tags=["Health"])
@@ -67,6 +164,12 @@ async def health_check():
     return {"status": "healthy", "service": "auth-gateway"}
 
 
+@app.get("/metrics", tags=["Health"])
+async def get_metrics():
+    """Prometheus metrics: request, stage, SQL and ML API latency; prediction and principal cache counters"""
+    return Response(gateway_metrics.render(), media_type=PROMETHEUS_CONTENT_TYPE)
+
+
 @app.get("/", tags=["Root"])
 async def root():
     """Root endpoint with API information"""
@@ -75,6 +178,7 @@ async def root():
         "version": "1.0.0",
         "docs": "/docs",
         "health": "/health",
+        "metrics": "/metrics",
         "endpoints": {
             "auth": "/auth/login, /auth/me",
             "profile": "/profile (authenticated)",
@@ -82,6 +186,7 @@ async def root():
             "files": "/files (admin only)",
             "reports": "/reports",
             "monthly-reports": "/monthly-reports",
-            "alerts": "/alerts"
+            "alerts": "/alerts",
+            "incidents": "/incidents"
         }
     }
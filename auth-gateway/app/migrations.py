@@ -0,0 +1,148 @@
+"""
+Versioned schema migrations.
+
+The applied version is kept in SQLite's PRAGMA user_version. New databases get
+their tables (and indexes) from Base.metadata.create_all, then run every
+migration, so each one must be idempotent: check columns before adding them
+and use IF NOT EXISTS for indexes. Append new migrations; never edit applied ones.
+"""
+import json
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection
+
+
+def _add_user_permissions(conn: Connection) -> None:
+    """Add the permissions column to users"""
+    columns = [col["name"] for col in inspect(conn).get_columns("users")]
+    if "permissions" in columns:
+        return
+    default_permissions = json.dumps({
+        "dashboard": True,
+        "predictions": False,
+        "reports": True,
+        "alerts": True
+    })
+    conn.execute(text(
+        f"ALTER TABLE users ADD COLUMN permissions TEXT DEFAULT '{default_permissions}'"
+    ))
+
+
+def _add_listing_indexes(conn: Connection) -> None:
+    """Indexes for newest-first keyset listings and dashboard counts"""
+    statements = [
+        "CREATE INDEX IF NOT EXISTS ix_alerts_created_at ON alerts (created_at)",
+        "CREATE INDEX IF NOT EXISTS ix_alerts_status_created ON alerts (status, created_at)",
+        "CREATE INDEX IF NOT EXISTS ix_alerts_severity_created ON alerts (severity, created_at)",
+        "CREATE INDEX IF NOT EXISTS ix_alerts_model_created ON alerts (model_type, created_at)",
+        "CREATE INDEX IF NOT EXISTS ix_alerts_status_severity ON alerts (status, severity)",
+        "CREATE INDEX IF NOT EXISTS ix_alerts_report_id ON alerts (report_id)",
+        "CREATE INDEX IF NOT EXISTS ix_predictions_created_at ON predictions (created_at)",
+        "CREATE INDEX IF NOT EXISTS ix_predictions_model_created ON predictions (model_type, created_at)",
+        "CREATE INDEX IF NOT EXISTS ix_predictions_prediction_conf ON predictions (prediction, confidence)",
+        "CREATE INDEX IF NOT EXISTS ix_reports_created_at ON reports (created_at)",
+    ]
+    for statement in statements:
+        conn.execute(text(statement))
+    # Refresh planner statistics so the new indexes are chosen
+    conn.execute(text("ANALYZE"))
+
+
+# Searchable text from an alert's raw data: result label, attack type and
+# risk level plus the selected input fields the alert pipeline stores under "input"
+_ALERT_ENTITIES_SQL = """
+    CASE WHEN json_valid({raw}) THEN
+        coalesce(json_extract({raw}, '$.label'), '') || ' ' ||
+        coalesce(json_extract({raw}, '$.attack_type'), '') || ' ' ||
+        coalesce(json_extract({raw}, '$.risk_level'), '') || ' ' ||
+        coalesce((SELECT group_concat(value, ' ') FROM json_each({raw}, '$.input')), '')
+    ELSE '' END
+"""
+
+
+def _add_alerts_fts(conn: Connection) -> None:
+    """FTS5 index over alerts, kept in sync by triggers, and backfill"""
+    conn.execute(text(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS alerts_fts USING fts5("
+        "title, description, entities, tokenize = 'unicode61 remove_diacritics 2')"
+    ))
+    insert_new = (
+        "INSERT INTO alerts_fts (rowid, title, description, entities) "
+        f"VALUES (new.id, new.title, new.description, {_ALERT_ENTITIES_SQL.format(raw='new.raw_data_json')});"
+    )
+    conn.execute(text(
+        f"CREATE TRIGGER IF NOT EXISTS alerts_fts_insert AFTER INSERT ON alerts BEGIN {insert_new} END"
+    ))
+    conn.execute(text(
+        "CREATE TRIGGER IF NOT EXISTS alerts_fts_delete AFTER DELETE ON alerts BEGIN "
+        "DELETE FROM alerts_fts WHERE rowid = old.id; END"
+    ))
+    conn.execute(text(
+        "CREATE TRIGGER IF NOT EXISTS alerts_fts_update AFTER UPDATE OF title, description, raw_data_json "
+        f"ON alerts BEGIN DELETE FROM alerts_fts WHERE rowid = old.id; {insert_new} END"
+    ))
+    # Rebuild from scratch so a re-run never duplicates rows
+    conn.execute(text("DELETE FROM alerts_fts"))
+    conn.execute(text(
+        "INSERT INTO alerts_fts (rowid, title, description, entities) "
+        f"SELECT id, title, description, {_ALERT_ENTITIES_SQL.format(raw='raw_data_json')} FROM alerts"
+    ))
+
+
+def _add_alert_incidents(conn: Connection) -> None:
+    """Link alerts to incidents (the incidents table comes from create_all)"""
+    columns = [col["name"] for col in inspect(conn).get_columns("alerts")]
+    if "incident_id" not in columns:
+        conn.execute(text("ALTER TABLE alerts ADD COLUMN incident_id INTEGER REFERENCES incidents (id)"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_alerts_incident_id ON alerts (incident_id)"))
+
+
+def _add_file_content_hash(conn: Connection) -> None:
+    """Content hash of uploads (content-addressed storage); older files keep NULL"""
+    columns = [col["name"] for col in inspect(conn).get_columns("uploaded_files")]
+    if "content_sha256" not in columns:
+        conn.execute(text("ALTER TABLE uploaded_files ADD COLUMN content_sha256 VARCHAR(64)"))
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_uploaded_files_content_sha256 ON uploaded_files (content_sha256)"
+    ))
+
+
+def _add_alerts_status_severity_index(conn: Connection) -> None:
+    """Keyset listing filtered by status and severity without a per-row severity check"""
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_alerts_status_severity_created "
+        "ON alerts (status, severity, created_at, id)"
+    ))
+    # Its (status, severity) prefix serves the pending counts this index was for
+    conn.execute(text("DROP INDEX IF EXISTS ix_alerts_status_severity"))
+    conn.execute(text("ANALYZE alerts"))
+
+
+# (version, description, function); versions are consecutive starting at 1
+MIGRATIONS = [
+    (1, "add users.permissions", _add_user_permissions),
+    (2, "listing indexes for alerts, predictions and reports", _add_listing_indexes),
+    (3, "full-text search index over alerts", _add_alerts_fts),
+    (4, "alerts.incident_id", _add_alert_incidents),
+    (5, "uploaded_files.content_sha256", _add_file_content_hash),
+    (6, "alerts (status, severity, created_at, id) index", _add_alerts_status_severity_index),
+]
+
+
+def get_schema_version(conn: Connection) -> int:
+    return conn.execute(text("PRAGMA user_version")).scalar() or 0
+
+
+def run_migrations(engine) -> int:
+    """Apply pending migrations in order; returns the resulting schema version"""
+    with engine.connect() as conn:
+        current = get_schema_version(conn)
+        for version, description, migrate in MIGRATIONS:
+            if version <= current:
+                continue
+            print(f"Running migration {version}: {description}...")
+            migrate(conn)
+            # PRAGMA does not accept bound parameters
+            conn.execute(text(f"PRAGMA user_version = {int(version)}"))
+            conn.commit()
+            current = version
+    return current
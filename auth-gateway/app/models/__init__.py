@@ -1,7 +1,13 @@
 from .user import User
 from .file import UploadedFile
 from .report import Report
+from .report_result import ReportResult
 from .alert import Alert
 from .prediction import Prediction
+from .stat_counter import StatCounter
+from .daily_rollup import DailyRollup
+from .monthly_report_cache import MonthlyReportCache, MonthlyReportGeneration
+from .incident import Incident
+from .alert_sync_state import AlertSyncState
 
-__all__ = ["User", "UploadedFile", "Report", "Alert", "Prediction"]
+__all__ = ["User", "UploadedFile", "Report", "ReportResult", "Alert", "Prediction", "StatCounter", "DailyRollup", "MonthlyReportCache", "MonthlyReportGeneration", "Incident", "AlertSyncState"]
@@ -1,7 +1,7 @@
 """
 Alert model for storing prediction-based alerts
 """
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Float, Boolean
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Float, Boolean, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from ..database import Base
@@ -21,6 +21,7 @@ class Alert(Base):
     # Source information
     model_type = Column(String(50), nullable=False)  # 'phishing', 'ato', 'brute_force'
     report_id = Column(Integer, ForeignKey("reports.id"), nullable=True)
+    incident_id = Column(Integer, ForeignKey("incidents.id"), nullable=True)
     prediction_index = Column(Integer)  # Index in the results array
 
     # Prediction details
@@ -40,3 +41,19 @@ class Alert(Base):
     # Relationships
     report = relationship("Report", backref="alerts")
     acknowledger = relationship("User", foreign_keys=[acknowledged_by], backref="acknowledged_alerts")
+    incident = relationship("Incident", backref="alerts")
+
+    __table_args__ = (
+        # Newest-first listing (keyset on created_at, id) with each filter.
+        # SQLite ends every index entry with the rowid (id), so these are
+        # ordered by the full keyset key too.
+        Index("ix_alerts_created_at", "created_at"),
+        Index("ix_alerts_status_created", "status", "created_at"),
+        Index("ix_alerts_severity_created", "severity", "created_at"),
+        Index("ix_alerts_model_created", "model_type", "created_at"),
+        # Listing filtered by status and severity (the dashboard's "unread
+        # critical"), and pending/unread counts by severity through its prefix
+        Index("ix_alerts_status_severity_created", "status", "severity", "created_at", "id"),
+        Index("ix_alerts_report_id", "report_id"),
+        Index("ix_alerts_incident_id", "incident_id"),
+    )
@@ -0,0 +1,25 @@
+"""
+Alert sync state: per-report watermark of alert generation
+"""
+from sqlalchemy import Column, Integer, String, DateTime
+from ..database import Base
+
+
+class AlertSyncState(Base):
+    __tablename__ = "alert_sync_state"
+
+    # One row per report whose alerts have been (or are being) generated
+    report_id = Column(Integer, primary_key=True)
+
+    # Watermark: highest report_results.row_index already turned into alerts,
+    # committed in the same transaction as those alerts
+    last_row_index = Column(Integer, nullable=False, default=-1)
+    alert_count = Column(Integer, nullable=False, default=0)
+
+    status = Column(String(20), nullable=False, default="pending")  # 'pending', 'completed'
+    # Hash of the model's alert thresholds used; a different hash marks the report as changed
+    thresholds_hash = Column(String(16))
+
+    # UTC; whoever holds an unexpired lease is generating the report's alerts
+    lease_until = Column(DateTime, nullable=True)
+    completed_at = Column(DateTime, nullable=True)
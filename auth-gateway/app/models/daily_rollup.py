@@ -0,0 +1,38 @@
+"""
+Daily rollup model for pre-aggregated monthly report data
+"""
+from sqlalchemy import Column, Integer, String, Float, Index
+from ..database import Base
+
+
+class DailyRollup(Base):
+    __tablename__ = "daily_rollups"
+
+    # Local day in America/La_Paz
+    year = Column(Integer, primary_key=True)
+    month = Column(Integer, primary_key=True)
+    day = Column(Integer, primary_key=True)
+    model_type = Column(String(50), primary_key=True)
+
+    # Predictions
+    prediction_count = Column(Integer, nullable=False, default=0)
+    threat_count = Column(Integer, nullable=False, default=0)
+    confidence_sum = Column(Float, nullable=False, default=0)  # confidence 0-1
+    benign_confidence_sum = Column(Float, nullable=False, default=0)
+
+    # Confidence histogram (all predictions)
+    conf_50_60 = Column(Integer, nullable=False, default=0)
+    conf_60_70 = Column(Integer, nullable=False, default=0)
+    conf_70_80 = Column(Integer, nullable=False, default=0)
+    conf_80_90 = Column(Integer, nullable=False, default=0)
+    conf_90_100 = Column(Integer, nullable=False, default=0)
+
+    # Alerts (by creation day)
+    alert_count = Column(Integer, nullable=False, default=0)
+    alert_critical = Column(Integer, nullable=False, default=0)
+    alert_high = Column(Integer, nullable=False, default=0)
+    alert_medium = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        Index("ix_daily_rollups_year_month", "year", "month"),
+    )
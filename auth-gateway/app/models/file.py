@@ -1,7 +1,7 @@
 """
 Uploaded file model
 """
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from ..database import Base
@@ -19,5 +19,11 @@ class UploadedFile(Base):
     row_count = Column(Integer)
     columns_json = Column(Text)  # JSON string of column names
     detected_model = Column(String(50))  # 'phishing', 'ato', 'brute_force'
+    # Hex SHA-256 of the content; files are stored as <sha256><ext> and shared by identical uploads
+    content_sha256 = Column(String(64), nullable=True)
 
     uploader = relationship("User", backref="uploaded_files")
+
+    __table_args__ = (
+        Index("ix_uploaded_files_content_sha256", "content_sha256"),
+    )
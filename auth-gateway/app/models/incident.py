@@ -0,0 +1,48 @@
+"""
+Incident model grouping repeated alerts with the same fingerprint
+"""
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Float, Index
+from sqlalchemy.orm import relationship
+from ..database import Base
+
+
+class Incident(Base):
+    __tablename__ = "incidents"
+
+    id = Column(Integer, primary_key=True)
+    model_type = Column(String(50), nullable=False)  # 'phishing', 'ato', 'brute_force'
+
+    # SHA-1 of the grouping key; key is the readable form (e.g. 'evil.com | factura #')
+    fingerprint = Column(String(40), nullable=False)
+    key = Column(String(255))
+
+    title = Column(String(255), nullable=False)
+    status = Column(String(20), nullable=False, default="open")  # 'open', 'acknowledged'
+
+    # Aggregates over member alerts
+    alert_count = Column(Integer, nullable=False, default=0)
+    critical_count = Column(Integer, nullable=False, default=0)
+    high_count = Column(Integer, nullable=False, default=0)
+    medium_count = Column(Integer, nullable=False, default=0)
+    max_severity = Column(String(20), nullable=False)
+    max_confidence = Column(Float, nullable=False, default=0)  # 0-100
+
+    # UTC; a new alert joins the incident while it is within the window of last_seen
+    first_seen = Column(DateTime, nullable=False)
+    last_seen = Column(DateTime, nullable=False)
+
+    # Newest member summaries: [[alert_id, report_id, row_index, severity, confidence], ...]
+    sample_json = Column(Text)
+
+    acknowledged_at = Column(DateTime, nullable=True)
+    acknowledged_by = Column(Integer, ForeignKey("users.id"), nullable=True)
+
+    acknowledger = relationship("User", foreign_keys=[acknowledged_by])
+
+    __table_args__ = (
+        # Open incident lookup while grouping
+        Index("ix_incidents_lookup", "model_type", "fingerprint", "status", "last_seen"),
+        # Newest-first listing, optionally by status
+        Index("ix_incidents_last_seen", "last_seen"),
+        Index("ix_incidents_status_last_seen", "status", "last_seen"),
+    )
@@ -0,0 +1,28 @@
+"""
+Monthly report cache model for serialized monthly reports
+"""
+from sqlalchemy import Column, Integer, String, DateTime, Text
+from ..database import Base
+
+
+class MonthlyReportCache(Base):
+    __tablename__ = "monthly_report_cache"
+
+    year = Column(Integer, primary_key=True)
+    month = Column(Integer, primary_key=True)
+
+    payload = Column(Text, nullable=False)  # Serialized MonthlyReportResponse (JSON)
+    etag = Column(String(66), nullable=False)  # Quoted SHA-256 hex of payload
+    created_at = Column(DateTime, nullable=False)  # UTC
+    expires_at = Column(DateTime)  # UTC; NULL for closed months (never expire)
+
+
+class MonthlyReportGeneration(Base):
+    __tablename__ = "monthly_report_generations"
+
+    year = Column(Integer, primary_key=True)
+    month = Column(Integer, primary_key=True)
+
+    # Bumped by every invalidation of the month; a missing row is generation 0.
+    # A report computed at one generation is only stored while it is still current.
+    generation = Column(Integer, nullable=False, default=0)
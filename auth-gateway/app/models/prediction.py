@@ -1,7 +1,7 @@
 """
 Prediction model for storing manual predictions
 """
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Float
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Float, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from ..database import Base
@@ -28,3 +28,11 @@ class Prediction(Base):
 
     # Relationships
     creator = relationship("User", backref="predictions")
+
+    __table_args__ = (
+        # Newest-first listing, optionally filtered by model
+        Index("ix_predictions_created_at", "created_at"),
+        Index("ix_predictions_model_created", "model_type", "created_at"),
+        # Top threats by confidence (monthly report)
+        Index("ix_predictions_prediction_conf", "prediction", "confidence"),
+    )
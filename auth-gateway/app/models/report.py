@@ -1,7 +1,7 @@
 """
 Report model for storing prediction results
 """
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Float
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Float, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from ..database import Base
@@ -20,8 +20,12 @@ class Report(Base):
     threats_detected = Column(Integer)
     benign_count = Column(Integer)
     avg_confidence = Column(Float)
-    results_json = Column(Text)  # JSON string of full results
+    results_json = Column(Text)  # Legacy full results / error details (rows live in report_results)
     status = Column(String(20), default="completed")  # 'pending', 'processing', 'completed', 'failed'
 
     file = relationship("UploadedFile", backref="reports")
     creator = relationship("User", backref="reports")
+
+    __table_args__ = (
+        Index("ix_reports_created_at", "created_at"),
+    )
@@ -0,0 +1,50 @@
+"""
+Report result model for storing per-row prediction results
+"""
+import json
+from sqlalchemy import Column, Integer, String, ForeignKey, Text, Float, Boolean, Index
+from ..database import Base
+
+
+class ReportResult(Base):
+    __tablename__ = "report_results"
+
+    id = Column(Integer, primary_key=True)
+    report_id = Column(Integer, ForeignKey("reports.id"), nullable=False)
+    row_index = Column(Integer, nullable=False)  # Index of the row in the uploaded file
+
+    # Prediction details
+    is_threat = Column(Boolean, nullable=False, default=False)
+    label = Column(String(255))
+    confidence = Column(Float, nullable=False)  # 0-100
+    risk_level = Column(String(20))  # 'low', 'medium', 'high', 'critical' (phishing, ato)
+    risk_score = Column(Float)  # ato only
+    attack_type = Column(String(100))  # brute_force only
+
+    # Explanation (JSON string)
+    explanation_json = Column(Text)
+
+    __table_args__ = (
+        # Keyset pagination in file order
+        Index("ix_report_results_report_row", "report_id", "row_index", unique=True),
+        # Threat filtering and confidence sorting
+        Index("ix_report_results_report_threat_conf", "report_id", "is_threat", "confidence"),
+        Index("ix_report_results_report_conf", "report_id", "confidence"),
+        Index("ix_report_results_report_risk", "report_id", "risk_level"),
+    )
+
+    def to_dict(self, include_explanation: bool = True) -> dict:
+        """Rebuild the per-model result entry (same shape as the ML API results)"""
+        result = {
+            "row_index": self.row_index,
+            "is_threat": self.is_threat,
+            "label": self.label,
+            "confidence": self.confidence
+        }
+        for key in ("risk_level", "risk_score", "attack_type"):
+            value = getattr(self, key)
+            if value is not None:
+                result[key] = value
+        if include_explanation and self.explanation_json:
+            result["explanation"] = json.loads(self.explanation_json)
+        return result
@@ -0,0 +1,15 @@
+"""
+Stat counter model for materialized dashboard counters
+"""
+from sqlalchemy import Column, String, Float, DateTime
+from sqlalchemy.sql import func
+from ..database import Base
+
+
+class StatCounter(Base):
+    __tablename__ = "stat_counters"
+
+    # Dotted counter name, e.g. 'alerts.status.unread', 'predictions.model.ato.threats'
+    name = Column(String(100), primary_key=True)
+    value = Column(Float, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
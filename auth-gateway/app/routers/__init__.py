@@ -6,5 +6,6 @@ from .alerts import router as alerts_router
 from .predictions import router as predictions_router
 from .monthly_reports import router as monthly_reports_router
 from .profile import router as profile_router
+from .incidents import router as incidents_router
 
-__all__ = ["auth_router", "users_router", "files_router", "reports_router", "alerts_router", "predictions_router", "monthly_reports_router", "profile_router"]
+__all__ = ["auth_router", "users_router", "files_router", "reports_router", "alerts_router", "predictions_router", "monthly_reports_router", "profile_router", "incidents_router"]
@@ -1,57 +1,121 @@
 """
 Alert management endpoints
 """
+import asyncio
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, Response, status, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from ..database import get_db
+from ..database import get_read_db, run_in_session
 from ..schemas.alert import (
-    AlertResponse, AlertDetail, AlertStats,
+    AlertResponse, AlertDetail, AlertSearchResult, AlertStats,
     AlertAcknowledge, AlertThresholdsResponse, UnreadCountResponse
 )
-from ..services.auth_service import get_current_user
+from ..services.auth_service import get_current_user, get_current_user_for_stream
 from ..services.alert_service import AlertService
+from ..services.event_bus import event_bus
+from ..services.pagination import NEXT_CURSOR_HEADER
+from ..services.search_service import SearchService
+from ..services.stream_tickets import stream_tickets
 from ..models.user import User
 from ..config import ALERT_THRESHOLDS
 
 router = APIRouter(prefix="/alerts", tags=["Alerts"])
 
+# Seconds between keep-alive comments on idle streams
+STREAM_HEARTBEAT_SECONDS = 15
+
 
 @router.get("", response_model=List[AlertResponse])
 async def list_alerts(
+    response: Response,
     status: Optional[str] = Query(None, description="Filter by status: unread, read, acknowledged"),
     severity: Optional[str] = Query(None, description="Filter by severity: critical, high, medium"),
     model_type: Optional[str] = Query(None, description="Filter by model: phishing, ato, brute_force"),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from the X-Next-Cursor header"),
     skip: int = 0,
-    limit: int = 100,
-    db: Session = Depends(get_db),
+    limit: int = Query(100, ge=1, le=1000),
+    db: AsyncSession = Depends(get_read_db),
     current_user: User = Depends(get_current_user)
 ):
-    """List all alerts with optional filters"""
-    return AlertService.list_alerts(
-        db, status=status, severity=severity,
-        model_type=model_type, skip=skip, limit=limit
-    )
+    """
+    List alerts with optional filters, newest first.
+    The cursor for the next page is returned in the X-Next-Cursor header.
+    """
+    try:
+        page = await AlertService.list_alerts(
+            db, status=status, severity=severity, model_type=model_type,
+            cursor=cursor, skip=skip, limit=limit
+        )
+    except ValueError as e:
+        # The status filter shadows fastapi.status here
+        raise HTTPException(
+            status_code=400,
+            detail=str(e)
+        )
+    if page["next_cursor"]:
+        response.headers[NEXT_CURSOR_HEADER] = page["next_cursor"]
+    return page["items"]
+
+
+@router.get("/search", response_model=List[AlertSearchResult])
+async def search_alerts(
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=200, description="Keywords, sender, domain, IP or user"),
+    status: Optional[str] = Query(None, description="Filter by status: unread, read, acknowledged"),
+    severity: Optional[str] = Query(None, description="Filter by severity: critical, high, medium"),
+    model_type: Optional[str] = Query(None, description="Filter by model: phishing, ato, brute_force"),
+    sort: str = Query("relevance", description="relevance or recent"),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from the X-Next-Cursor header"),
+    limit: int = Query(50, ge=1, le=200),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Full-text search over alert titles, descriptions, results and input fields.
+    Every term must match; a trailing * matches prefixes.
+    """
+    try:
+        page = await SearchService.search_alerts(
+            db, q, status=status, severity=severity, model_type=model_type,
+            sort=sort, cursor=cursor, limit=limit
+        )
+    except ValueError as e:
+        # The status filter shadows fastapi.status here
+        raise HTTPException(
+            status_code=400,
+            detail=str(e)
+        )
+    if page["next_cursor"]:
+        response.headers[NEXT_CURSOR_HEADER] = page["next_cursor"]
+    return [
+        AlertSearchResult(
+            **AlertResponse.model_validate(item["alert"]).model_dump(),
+            rank=item["rank"],
+            snippet=item["snippet"]
+        )
+        for item in page["items"]
+    ]
 
 
 @router.get("/unread/count", response_model=UnreadCountResponse)
 async def get_unread_count(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     current_user: User = Depends(get_current_user)
 ):
     """Get count of unread alerts (for badge in TopBar)"""
-    count = AlertService.get_unread_count(db)
+    count = await AlertService.get_unread_count(db)
     return {"count": count}
 
 
 @router.get("/stats", response_model=AlertStats)
 async def get_alert_stats(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     current_user: User = Depends(get_current_user)
 ):
     """Get alert statistics for dashboard"""
-    return AlertService.get_alert_stats(db)
+    return await AlertService.get_alert_stats(db)
 
 
 @router.get("/thresholds", response_model=AlertThresholdsResponse)
@@ -62,14 +126,87 @@ async def get_thresholds(
     return ALERT_THRESHOLDS
 
 
+@router.post("/stream-ticket")
+async def create_stream_ticket(
+    current_user: User = Depends(get_current_user)
+):
+    """Single-use ticket for opening the alert stream (GET /alerts/stream?ticket=)"""
+    return {
+        "ticket": stream_tickets.issue(current_user.username),
+        "expires_in": stream_tickets.ttl_seconds
+    }
+
+
+@router.get("/stream")
+async def stream_alerts(
+    request: Request,
+    last_event_id: Optional[str] = Header(None),
+    resume_from: Optional[str] = Query(None, alias="last_event_id"),
+    current_user: User = Depends(get_current_user_for_stream)
+):
+    """
+    Server-Sent Events stream of alert updates.
+    Events: alert.created, alert.status, counters (deltas) and resync
+    (client must refetch, e.g. after a restart or when it fell too far behind).
+    Reconnecting clients send Last-Event-ID to receive the events they missed;
+    a browser reopening the stream with a new ticket passes it as ?last_event_id=.
+    """
+    last_event_id = last_event_id or resume_from
+
+    async def event_stream():
+        subscriber = event_bus.subscribe()
+        try:
+            yield "retry: 5000\n\n"
+
+            last_seq = 0
+            missed = event_bus.replay(last_event_id)
+            if not last_event_id:
+                # Fresh connection: start from the current position so a later
+                # reconnect can resume from here
+                cursor = event_bus.last_event_id
+                last_seq = int(cursor.rsplit("-", 1)[1])
+                yield f"id: {cursor}\n\n"
+            elif missed is None:
+                yield f"id: {event_bus.last_event_id}\nevent: resync\ndata: {{}}\n\n"
+            else:
+                for event in missed:
+                    last_seq = event.seq
+                    yield event.to_sse()
+
+            while not await request.is_disconnected():
+                if subscriber.overflowed:
+                    # Queued events are superseded by the refetch the client will do
+                    while not subscriber.queue.empty():
+                        subscriber.queue.get_nowait()
+                    subscriber.overflowed = False
+                    yield f"id: {event_bus.last_event_id}\nevent: resync\ndata: {{}}\n\n"
+                try:
+                    event = await asyncio.wait_for(subscriber.queue.get(), timeout=STREAM_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": heartbeat\n\n"
+                    continue
+                # Already sent during replay
+                if event.seq <= last_seq:
+                    continue
+                yield event.to_sse()
+        finally:
+            event_bus.unsubscribe(subscriber)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @router.get("/{alert_id}", response_model=AlertDetail)
 async def get_alert(
     alert_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     current_user: User = Depends(get_current_user)
 ):
     """Get alert details"""
-    alert_detail = AlertService.get_alert_detail(alert_id, db)
+    alert_detail = await AlertService.get_alert_detail(alert_id, db)
     if not alert_detail:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -77,9 +214,8 @@ async def get_alert(
         )
 
     # Mark as read when viewed
-    alert = AlertService.get_alert(alert_id, db)
-    if alert and alert.status == "unread":
-        AlertService.mark_as_read(alert_id, db)
+    if alert_detail["status"] == "unread":
+        await run_in_session(AlertService.mark_as_read, alert_id)
 
     return alert_detail
 
@@ -87,11 +223,10 @@ async def get_alert(
 @router.post("/{alert_id}/acknowledge", response_model=AlertResponse)
 async def acknowledge_alert(
     alert_id: int,
-    db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """Acknowledge a single alert"""
-    alert = AlertService.acknowledge_alert(alert_id, current_user.id, db)
+    alert = await run_in_session(AlertService.acknowledge_alert, alert_id, current_user.id)
     if not alert:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -103,19 +238,17 @@ async def acknowledge_alert(
 @router.post("/acknowledge/bulk")
 async def bulk_acknowledge(
     data: AlertAcknowledge,
-    db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """Acknowledge multiple alerts at once"""
-    count = AlertService.bulk_acknowledge(data.alert_ids, current_user.id, db)
+    count = await run_in_session(AlertService.bulk_acknowledge, data.alert_ids, current_user.id)
     return {"acknowledged": count}
 
 
 @router.post("/mark-all-read")
 async def mark_all_as_read(
-    db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """Mark all unread alerts as read"""
-    count = AlertService.mark_all_as_read(db)
+    count = await run_in_session(AlertService.mark_all_as_read)
     return {"marked_read": count}
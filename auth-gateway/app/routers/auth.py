@@ -4,13 +4,13 @@ Authentication endpoints
 from datetime import timedelta
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
 
-from ..database import get_db
+from ..database import run_in_session
 from ..config import get_settings
 from ..schemas.auth import Token, LoginRequest
 from ..schemas.user import UserResponse
-from ..services.auth_service import AuthService, get_current_user
+from ..services.auth_service import AuthService, get_current_user, get_current_admin
+from ..services.principal_cache import principal_cache
 from ..models.user import User
 
 router = APIRouter(prefix="/auth", tags=["Authentication"])
@@ -19,11 +19,13 @@ settings = get_settings()
 
 @router.post("/login", response_model=Token)
 async def login(
-    form_data: OAuth2PasswordRequestForm = Depends(),
-    db: Session = Depends(get_db)
+    form_data: OAuth2PasswordRequestForm = Depends()
 ):
     """Login with username and password, returns JWT token"""
-    user = AuthService.authenticate_user(db, form_data.username, form_data.password)
+    # bcrypt verification is CPU bound: keep it off the event loop
+    user = await run_in_session(
+        AuthService.authenticate_user, username=form_data.username, password=form_data.password
+    )
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -42,11 +44,12 @@ async def login(
 
 @router.post("/login/json", response_model=Token)
 async def login_json(
-    login_data: LoginRequest,
-    db: Session = Depends(get_db)
+    login_data: LoginRequest
 ):
     """Login with JSON body (alternative to form data)"""
-    user = AuthService.authenticate_user(db, login_data.username, login_data.password)
+    user = await run_in_session(
+        AuthService.authenticate_user, username=login_data.username, password=login_data.password
+    )
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -67,3 +70,9 @@ async def login_json(
 async def get_current_user_info(current_user: User = Depends(get_current_user)):
     """Get current logged-in user information"""
     return current_user
+
+
+@router.get("/principal-cache")
+async def get_principal_cache_stats(current_user: User = Depends(get_current_admin)):
+    """Principal cache size and hit rate (Admin only)"""
+    return principal_cache.stats()
@@ -4,14 +4,13 @@ File upload and management endpoints (Admin only)
 import json
 from typing import List
 from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from ..database import get_db
+from ..database import get_read_db
 from ..schemas.file import FileResponse, FilePreview
 from ..services.auth_service import get_current_admin
 from ..services.file_service import FileService
 from ..models.user import User
-from ..models.file import UploadedFile
 
 router = APIRouter(prefix="/files", tags=["Files"])
 
@@ -19,7 +18,7 @@ router = APIRouter(prefix="/files", tags=["Files"])
 @router.post("/upload", response_model=FileResponse, status_code=status.HTTP_201_CREATED)
 async def upload_file(
     file: UploadFile = File(...),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     current_user: User = Depends(get_current_admin)
 ):
     """Upload a CSV or Excel file for batch prediction (Admin only)"""
@@ -47,11 +46,11 @@ async def upload_file(
 async def list_files(
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     current_user: User = Depends(get_current_admin)
 ):
     """List all uploaded files (Admin only)"""
-    files = FileService.list_files(db, skip=skip, limit=limit)
+    files = await FileService.list_files(db, skip=skip, limit=limit)
 
     return [
         FileResponse(
@@ -71,11 +70,11 @@ async def list_files(
 @router.get("/{file_id}", response_model=FileResponse)
 async def get_file(
     file_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     current_user: User = Depends(get_current_admin)
 ):
     """Get file details (Admin only)"""
-    db_file = db.query(UploadedFile).filter(UploadedFile.id == file_id).first()
+    db_file = await FileService.get_file(file_id, db)
     if not db_file:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -98,12 +97,12 @@ async def get_file(
 async def get_file_preview(
     file_id: int,
     rows: int = 5,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     current_user: User = Depends(get_current_admin)
 ):
     """Get preview of file contents (Admin only)"""
     try:
-        preview = FileService.get_file_preview(file_id, db, num_rows=rows)
+        preview = await FileService.get_file_preview(file_id, db, num_rows=rows)
         return FilePreview(**preview)
     except ValueError as e:
         raise HTTPException(
@@ -115,11 +114,10 @@ async def get_file_preview(
 @router.delete("/{file_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_file(
     file_id: int,
-    db: Session = Depends(get_db),
     current_user: User = Depends(get_current_admin)
 ):
     """Delete uploaded file (Admin only)"""
-    if not FileService.delete_file(file_id, db):
+    if not await FileService.delete_file(file_id):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="File not found"
@@ -0,0 +1,109 @@
+"""
+Incident endpoints: repeated alerts grouped by fingerprint
+"""
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..database import get_read_db, run_in_session
+from ..schemas.alert import AlertResponse
+from ..schemas.incident import IncidentAcknowledge, IncidentDetail, IncidentResponse, IncidentStats
+from ..services.auth_service import get_current_user
+from ..services.incident_service import IncidentService
+from ..services.pagination import NEXT_CURSOR_HEADER
+from ..models.user import User
+
+router = APIRouter(prefix="/incidents", tags=["Incidents"])
+
+
+@router.get("", response_model=List[IncidentResponse])
+async def list_incidents(
+    response: Response,
+    status: Optional[str] = Query(None, description="Filter by status: open, acknowledged"),
+    model_type: Optional[str] = Query(None, description="Filter by model: phishing, ato, brute_force"),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from the X-Next-Cursor header"),
+    limit: int = Query(50, ge=1, le=500),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: User = Depends(get_current_user)
+):
+    """List incidents, most recently active first"""
+    try:
+        page = await IncidentService.list_incidents(
+            db, status=status, model_type=model_type, cursor=cursor, limit=limit
+        )
+    except ValueError as e:
+        # The status filter shadows fastapi.status here
+        raise HTTPException(
+            status_code=400,
+            detail=str(e)
+        )
+    if page["next_cursor"]:
+        response.headers[NEXT_CURSOR_HEADER] = page["next_cursor"]
+    return page["items"]
+
+
+@router.get("/stats", response_model=IncidentStats)
+async def get_incident_stats(
+    db: AsyncSession = Depends(get_read_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Open incidents by max severity"""
+    return await IncidentService.get_stats(db)
+
+
+@router.post("/acknowledge/bulk")
+async def bulk_acknowledge_incidents(
+    data: IncidentAcknowledge,
+    current_user: User = Depends(get_current_user)
+):
+    """Acknowledge whole incidents, including every member alert"""
+    result = await run_in_session(IncidentService.acknowledge, data.incident_ids, current_user.id)
+    return {"acknowledged_incidents": result["incidents"], "acknowledged_alerts": result["alerts"]}
+
+
+@router.get("/{incident_id}", response_model=IncidentDetail)
+async def get_incident(
+    incident_id: int,
+    db: AsyncSession = Depends(get_read_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Get incident details with its newest member alerts"""
+    incident = await IncidentService.get_incident(incident_id, db)
+    if not incident:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Incident not found"
+        )
+    return incident
+
+
+@router.get("/{incident_id}/alerts", response_model=List[AlertResponse])
+async def list_incident_alerts(
+    incident_id: int,
+    response: Response,
+    cursor: Optional[str] = Query(None, description="Opaque cursor from the X-Next-Cursor header"),
+    limit: int = Query(100, ge=1, le=1000),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Member alerts of an incident, newest first"""
+    try:
+        page = await IncidentService.list_members(incident_id, db, cursor=cursor, limit=limit)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    if page["next_cursor"]:
+        response.headers[NEXT_CURSOR_HEADER] = page["next_cursor"]
+    return page["items"]
+
+
+@router.post("/{incident_id}/acknowledge")
+async def acknowledge_incident(
+    incident_id: int,
+    current_user: User = Depends(get_current_user)
+):
+    """Acknowledge one incident and its member alerts"""
+    result = await run_in_session(IncidentService.acknowledge, [incident_id], current_user.id)
+    return {"acknowledged_incidents": result["incidents"], "acknowledged_alerts": result["alerts"]}
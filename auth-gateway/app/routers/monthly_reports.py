@@ -1,14 +1,15 @@
 """
 Monthly Reports router - aggregated monthly statistics
 """
-from datetime import datetime
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
+from typing import Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from ..database import get_db
+from ..database import get_read_db
 from ..schemas.monthly_report import MonthlyReportResponse, AvailableMonthsResponse
 from ..services.auth_service import get_current_user
 from ..services.monthly_report_service import MonthlyReportService
+from ..services.report_cache_service import ReportCacheService
 from ..models.user import User
 
 router = APIRouter(prefix="/monthly-reports", tags=["Monthly Reports"])
@@ -18,7 +19,8 @@ router = APIRouter(prefix="/monthly-reports", tags=["Monthly Reports"])
 async def get_monthly_report(
     year: int = Query(..., ge=2020, le=2100, description="Report year"),
     month: int = Query(..., ge=1, le=12, description="Report month (1-12)"),
-    db: Session = Depends(get_db),
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_read_db),
     current_user: User = Depends(get_current_user),
 ):
     """
@@ -34,10 +36,13 @@ async def get_monthly_report(
     - Benign traffic insights
 
     Timezone: America/La_Paz (UTC-4)
+
+    Responses carry a strong ETag; clients sending a matching
+    If-None-Match get 304 Not Modified.
     """
     try:
-        report = MonthlyReportService.get_monthly_report(year, month, db)
-        return report
+        payload, etag = await ReportCacheService.get_monthly_report(year, month, db)
+        return ReportCacheService.conditional_response(payload, etag, if_none_match)
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -47,7 +52,7 @@ async def get_monthly_report(
 
 @router.get("/available", response_model=AvailableMonthsResponse)
 async def get_available_months(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     current_user: User = Depends(get_current_user),
 ):
     """
@@ -57,7 +62,7 @@ async def get_available_months(
     sorted by date descending (most recent first).
     """
     try:
-        return MonthlyReportService.get_available_months(db)
+        return await MonthlyReportService.get_available_months(db)
     except Exception as e:
         raise HTTPException(
             status_code=500,
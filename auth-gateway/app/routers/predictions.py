@@ -2,16 +2,20 @@
 Predictions router - handles manual prediction storage and statistics
 """
 import json
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from sqlalchemy import func
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, contains_eager
 
-from ..database import get_db
+from ..database import get_read_db, run_in_session
 from ..models.prediction import Prediction
 from ..models.user import User
 from ..schemas.prediction import PredictionCreate, PredictionResponse, PredictionStats
 from ..services.auth_service import get_current_user
+from ..services.counter_service import CounterService
+from ..services.pagination import KeysetPagination, NEXT_CURSOR_HEADER
+from ..services.rollup_service import RollupService
 
 router = APIRouter(prefix="/predictions", tags=["Predictions"])
 
@@ -19,26 +23,36 @@ router = APIRouter(prefix="/predictions", tags=["Predictions"])
 @router.post("/", response_model=PredictionResponse, status_code=status.HTTP_201_CREATED)
 async def create_prediction(
     prediction_data: PredictionCreate,
-    db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """
     Store a manual prediction result.
     """
-    # Create prediction record
-    prediction = Prediction(
-        model_type=prediction_data.model_type.lower(),
-        created_by=current_user.id,
-        prediction=prediction_data.prediction,
-        prediction_label=prediction_data.prediction_label,
-        confidence=prediction_data.confidence,
-        input_data=json.dumps(prediction_data.input_data) if prediction_data.input_data else None,
-        explanation=json.dumps(prediction_data.explanation) if prediction_data.explanation else None
-    )
+    def store(db: Session) -> Prediction:
+        # Create prediction record
+        prediction = Prediction(
+            model_type=prediction_data.model_type.lower(),
+            created_by=current_user.id,
+            prediction=prediction_data.prediction,
+            prediction_label=prediction_data.prediction_label,
+            confidence=prediction_data.confidence,
+            input_data=json.dumps(prediction_data.input_data) if prediction_data.input_data else None,
+            explanation=json.dumps(prediction_data.explanation) if prediction_data.explanation else None
+        )
+        db.add(prediction)
 
-    db.add(prediction)
-    db.commit()
-    db.refresh(prediction)
+        # Counters and rollups in the same transaction
+        CounterService.prediction_created(
+            db, prediction.model_type, prediction.prediction, prediction.confidence
+        )
+        RollupService.record_prediction(
+            db, prediction.model_type, prediction.prediction, prediction.confidence
+        )
+        db.commit()
+        db.refresh(prediction)
+        return prediction
+
+    prediction = await run_in_session(store)
 
     return PredictionResponse(
         id=prediction.id,
@@ -53,21 +67,41 @@ async def create_prediction(
 
 @router.get("/", response_model=List[PredictionResponse])
 async def list_predictions(
+    response: Response,
+    cursor: Optional[str] = Query(None, description="Opaque cursor from the X-Next-Cursor header"),
     skip: int = 0,
-    limit: int = 100,
+    limit: int = Query(100, ge=1, le=1000),
     model_type: str = None,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     current_user: User = Depends(get_current_user)
 ):
     """
-    List manual predictions with optional filtering.
+    List manual predictions with optional filtering, newest first.
+    The cursor for the next page is returned in the X-Next-Cursor header.
     """
-    query = db.query(Prediction).join(User, Prediction.created_by == User.id)
+    # The joined creator populates p.creator (no lazy loads under asyncio)
+    query = select(Prediction).join(User, Prediction.created_by == User.id).options(
+        contains_eager(Prediction.creator)
+    )
 
     if model_type:
-        query = query.filter(Prediction.model_type == model_type.lower())
+        query = query.where(Prediction.model_type == model_type.lower())
+
+    try:
+        query = KeysetPagination.apply(query, Prediction.created_at, Prediction.id, cursor, limit)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    if cursor is None and skip:
+        query = query.offset(skip)
 
-    predictions = query.order_by(Prediction.created_at.desc()).offset(skip).limit(limit).all()
+    rows, next_cursor = KeysetPagination.split(
+        (await db.execute(query)).all(), limit, lambda row: row.Prediction.id
+    )
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
 
     return [
         PredictionResponse(
@@ -79,50 +113,17 @@ async def list_predictions(
             created_at=p.created_at,
             created_by_name=p.creator.username if p.creator else None
         )
-        for p in predictions
+        for p in (row.Prediction for row in rows)
     ]
 
 
 @router.get("/stats", response_model=PredictionStats)
 async def get_prediction_stats(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     current_user: User = Depends(get_current_user)
 ):
     """
     Get statistics for manual predictions.
-    Used by the dashboard to show real-time stats.
+    Used by the dashboard to show real-time stats (served from materialized counters).
     """
-    # Total counts
-    total = db.query(func.count(Prediction.id)).scalar() or 0
-    threats = db.query(func.count(Prediction.id)).filter(Prediction.prediction == 1).scalar() or 0
-    benign = total - threats
-
-    # Average confidence
-    avg_conf = db.query(func.avg(Prediction.confidence)).scalar() or 0
-
-    # By model type
-    by_model = {
-        "phishing": {"total": 0, "threats": 0},
-        "ato": {"total": 0, "threats": 0},
-        "brute_force": {"total": 0, "threats": 0}
-    }
-
-    model_stats = db.query(
-        Prediction.model_type,
-        func.count(Prediction.id).label("total"),
-        func.sum(Prediction.prediction).label("threats")
-    ).group_by(Prediction.model_type).all()
-
-    for stat in model_stats:
-        model = stat.model_type.lower()
-        if model in by_model:
-            by_model[model]["total"] = stat.total or 0
-            by_model[model]["threats"] = int(stat.threats or 0)
-
-    return PredictionStats(
-        total_predictions=total,
-        threats_detected=threats,
-        benign_count=benign,
-        avg_confidence=round(float(avg_conf) * 100, 1) if avg_conf else 0,
-        by_model=by_model
-    )
+    return await CounterService.get_prediction_stats(db)
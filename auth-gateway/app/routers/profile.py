@@ -2,11 +2,14 @@
 Profile management endpoints (Authenticated users)
 """
 from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from ..database import get_db
+from ..database import get_read_db, run_blocking, run_in_session
 from ..schemas.user import ProfileResponse, ProfileUpdate, PasswordChange, UserPermissions
 from ..services.auth_service import AuthService, get_current_user
+from ..services.principal_cache import principal_cache
 from ..models.user import User
 
 router = APIRouter(prefix="/profile", tags=["Profile"])
@@ -32,59 +35,73 @@ async def get_my_profile(
 @router.put("", response_model=ProfileResponse)
 async def update_my_profile(
     profile_data: ProfileUpdate,
-    db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """Update current user's profile (email and full_name only)"""
-    # Update email if provided
-    if profile_data.email is not None:
-        # Check if email is already taken by another user
-        existing = db.query(User).filter(
-            User.email == profile_data.email,
-            User.id != current_user.id
-        ).first()
-        if existing:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Email already in use"
-            )
-        current_user.email = profile_data.email
-
-    # Update full_name if provided
-    if profile_data.full_name is not None:
-        current_user.full_name = profile_data.full_name
-
-    db.commit()
-    db.refresh(current_user)
+    def update(db: Session) -> User:
+        # current_user comes from the read-only session; edit the writer's copy
+        user = db.get(User, current_user.id)
+
+        # Update email if provided
+        if profile_data.email is not None:
+            # Check if email is already taken by another user
+            existing = db.query(User).filter(
+                User.email == profile_data.email,
+                User.id != user.id
+            ).first()
+            if existing:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Email already in use"
+                )
+            user.email = profile_data.email
+
+        # Update full_name if provided
+        if profile_data.full_name is not None:
+            user.full_name = profile_data.full_name
+
+        db.commit()
+        db.refresh(user)
+        return user
+
+    user = await run_in_session(update)
+    principal_cache.invalidate(user.username)
 
     return ProfileResponse(
-        id=current_user.id,
-        username=current_user.username,
-        email=current_user.email,
-        full_name=current_user.full_name,
-        role=current_user.role,
-        permissions=UserPermissions(**current_user.get_permissions()),
-        is_active=current_user.is_active,
-        created_at=current_user.created_at
+        id=user.id,
+        username=user.username,
+        email=user.email,
+        full_name=user.full_name,
+        role=user.role,
+        permissions=UserPermissions(**user.get_permissions()),
+        is_active=user.is_active,
+        created_at=user.created_at
     )
 
 
 @router.put("/password")
 async def change_my_password(
     password_data: PasswordChange,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     current_user: User = Depends(get_current_user)
 ):
     """Change current user's password"""
-    # Verify current password
-    if not AuthService.verify_password(password_data.current_password, current_user.password_hash):
+    # Verify against the stored hash: the principal may come from the cache, which never holds it
+    stored_hash = await db.scalar(select(User.password_hash).where(User.id == current_user.id))
+    if not await run_blocking(AuthService.verify_password, password_data.current_password, stored_hash):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Current password is incorrect"
         )
 
     # Update password
-    current_user.password_hash = AuthService.get_password_hash(password_data.new_password)
-    db.commit()
+    password_hash = await run_blocking(AuthService.get_password_hash, password_data.new_password)
+
+    def update(db: Session) -> None:
+        db.get(User, current_user.id).password_hash = password_hash
+        db.commit()
+
+    await run_in_session(update)
+    principal_cache.invalidate(current_user.username)
 
     return {"message": "Password changed successfully"}
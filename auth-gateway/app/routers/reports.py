@@ -1,14 +1,21 @@
 """
 Report generation and viewing endpoints
 """
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from typing import List, Optional
+from fastapi import APIRouter, BackgroundTasks, Depends, Header, HTTPException, Query, Response, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from ..database import get_db
-from ..schemas.report import ReportCreate, ReportResponse, ReportSummary
+from service_common.tracing import current_traceparent
+
+from ..database import get_read_db, iterate_blocking, run_blocking, run_in_session
+from ..schemas.report import ReportCreate, ReportResponse, ReportSummary, ReportResultsPage
 from ..services.auth_service import get_current_user, get_current_admin
 from ..services.report_service import ReportService
+from ..services.export_service import ExportService
+from ..services.metrics import gateway_memory
+from ..services.report_cache_service import ReportCacheService
+from ..services.pagination import NEXT_CURSOR_HEADER
 from ..models.user import User
 
 router = APIRouter(prefix="/reports", tags=["Reports"])
@@ -17,19 +24,28 @@ router = APIRouter(prefix="/reports", tags=["Reports"])
 @router.post("/generate", response_model=ReportResponse, status_code=status.HTTP_201_CREATED)
 async def generate_report(
     report_data: ReportCreate,
-    db: Session = Depends(get_db),
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_read_db),
     current_user: User = Depends(get_current_admin)
 ):
     """Generate a new report by running predictions (Admin only)"""
     try:
-        report = await ReportService.generate_report(
-            title=report_data.title,
-            file_id=report_data.file_id,
-            user_id=current_user.id,
-            db=db
-        )
+        # Parsing big files is where the gateway's memory spikes
+        with gateway_memory.sample_peak("generate_report"):
+            report_id = await ReportService.generate_report(
+                title=report_data.title,
+                file_id=report_data.file_id,
+                user_id=current_user.id,
+                db=db
+            )
+
+        report = await ReportService.get_report(report_id, db)
 
-        return ReportService.get_report(report.id, db)
+        # Alerts are generated after the response is sent
+        if report["status"] == "completed":
+            background_tasks.add_task(run_blocking, ReportService.process_report_alerts, report_id, current_traceparent())
+
+        return report
     except ValueError as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -44,40 +60,130 @@ async def generate_report(
 
 @router.get("", response_model=List[ReportSummary])
 async def list_reports(
+    response: Response,
+    cursor: Optional[str] = Query(None, description="Opaque cursor from the X-Next-Cursor header"),
     skip: int = 0,
-    limit: int = 100,
-    db: Session = Depends(get_db),
+    limit: int = Query(100, ge=1, le=1000),
+    db: AsyncSession = Depends(get_read_db),
     current_user: User = Depends(get_current_user)
 ):
-    """List all reports (Both Admin and Analyst)"""
-    reports = ReportService.list_reports(db, skip=skip, limit=limit)
-    return reports
+    """
+    List all reports, newest first (Both Admin and Analyst).
+    The cursor for the next page is returned in the X-Next-Cursor header.
+    """
+    try:
+        page = await ReportService.list_reports(db, cursor=cursor, skip=skip, limit=limit)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    if page["next_cursor"]:
+        response.headers[NEXT_CURSOR_HEADER] = page["next_cursor"]
+    return page["items"]
 
 
 @router.get("/{report_id}", response_model=ReportResponse)
 async def get_report(
     report_id: int,
-    db: Session = Depends(get_db),
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_read_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Get report details (Both Admin and Analyst)"""
-    report = ReportService.get_report(report_id, db)
+    """
+    Get report details (Both Admin and Analyst).
+    Completed reports are immutable and support ETag / If-None-Match.
+    """
+    report = await ReportService.get_report(report_id, db)
     if not report:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Report not found"
         )
-    return report
+    if report["status"] != "completed":
+        return report
+
+    payload = ReportResponse.model_validate(report).model_dump_json()
+    etag = ReportCacheService.make_etag(payload)
+    return ReportCacheService.conditional_response(payload, etag, if_none_match)
+
+
+@router.get("/{report_id}/results", response_model=ReportResultsPage)
+async def get_report_results(
+    report_id: int,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    threats_only: bool = False,
+    min_confidence: Optional[float] = Query(None, ge=0, le=100),
+    risk_level: Optional[str] = None,
+    sort: str = "row_index",
+    include_explanations: bool = True,
+    db: AsyncSession = Depends(get_read_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Get paginated report results (Both Admin and Analyst)"""
+    try:
+        page = await ReportService.get_results_page(
+            report_id,
+            db,
+            cursor=cursor,
+            limit=limit,
+            threats_only=threats_only,
+            min_confidence=min_confidence,
+            risk_level=risk_level,
+            sort=sort,
+            include_explanations=include_explanations
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    if page is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Report not found"
+        )
+    return page
+
+
+@router.get("/{report_id}/export")
+async def export_report(
+    report_id: int,
+    export_format: str = Query("csv", alias="format"),
+    current_user: User = Depends(get_current_user)
+):
+    """Stream report results joined with the original input columns (Both Admin and Analyst)"""
+    try:
+        stream, media_type, filename = await run_in_session(
+            ExportService.prepare_export, report_id, export_format
+        )
+    except LookupError as e:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=str(e)
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+    # Chunks are produced in the blocking pool, off the event loop
+    return StreamingResponse(
+        iterate_blocking(stream),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
 
 
 @router.delete("/{report_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_report(
     report_id: int,
-    db: Session = Depends(get_db),
     current_user: User = Depends(get_current_admin)
 ):
     """Delete a report (Admin only)"""
-    if not ReportService.delete_report(report_id, db):
+    if not await ReportService.delete_report(report_id):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Report not found"
@@ -3,14 +3,17 @@ User management endpoints (Admin only)
 """
 from typing import List
 from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from ..database import get_db
+from ..database import get_read_db, run_blocking, run_in_session
 from ..schemas.user import (
     UserCreate, UserResponse, UserUpdate,
     PermissionsUpdate, RoleUpdate, AdminPasswordReset
 )
 from ..services.auth_service import AuthService, get_current_admin
+from ..services.principal_cache import principal_cache
 from ..models.user import User, DEFAULT_ANALYST_PERMISSIONS, DEFAULT_ADMIN_PERMISSIONS
 
 router = APIRouter(prefix="/users", tags=["Users"])
@@ -20,35 +23,20 @@ router = APIRouter(prefix="/users", tags=["Users"])
 async def list_users(
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     current_user: User = Depends(get_current_admin)
 ):
     """List all users (Admin only)"""
-    users = db.query(User).offset(skip).limit(limit).all()
+    users = (await db.scalars(select(User).offset(skip).limit(limit))).all()
     return [UserResponse.from_orm_with_permissions(u) for u in users]
 
 
 @router.post("", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
 async def create_user(
     user_data: UserCreate,
-    db: Session = Depends(get_db),
     current_user: User = Depends(get_current_admin)
 ):
     """Create a new user (Admin only)"""
-    # Check if username exists
-    if db.query(User).filter(User.username == user_data.username).first():
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Username already registered"
-        )
-
-    # Check if email exists
-    if db.query(User).filter(User.email == user_data.email).first():
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Email already registered"
-        )
-
     # Validate role
     if user_data.role not in ["admin", "analyst"]:
         raise HTTPException(
@@ -62,30 +50,48 @@ async def create_user(
     else:
         permissions = DEFAULT_ADMIN_PERMISSIONS if user_data.role == "admin" else DEFAULT_ANALYST_PERMISSIONS
 
-    new_user = User(
-        username=user_data.username,
-        email=user_data.email,
-        password_hash=AuthService.get_password_hash(user_data.password),
-        role=user_data.role,
-        full_name=user_data.full_name,
-        is_active=True
-    )
-    new_user.set_permissions(permissions)
-    db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    password_hash = await run_blocking(AuthService.get_password_hash, user_data.password)
 
-    return UserResponse.from_orm_with_permissions(new_user)
+    def create(db: Session) -> User:
+        # Check if username exists
+        if db.query(User).filter(User.username == user_data.username).first():
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Username already registered"
+            )
+
+        # Check if email exists
+        if db.query(User).filter(User.email == user_data.email).first():
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Email already registered"
+            )
+
+        new_user = User(
+            username=user_data.username,
+            email=user_data.email,
+            password_hash=password_hash,
+            role=user_data.role,
+            full_name=user_data.full_name,
+            is_active=True
+        )
+        new_user.set_permissions(permissions)
+        db.add(new_user)
+        db.commit()
+        db.refresh(new_user)
+        return new_user
+
+    return UserResponse.from_orm_with_permissions(await run_in_session(create))
 
 
 @router.get("/{user_id}", response_model=UserResponse)
 async def get_user(
     user_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     current_user: User = Depends(get_current_admin)
 ):
     """Get user by ID (Admin only)"""
-    user = db.query(User).filter(User.id == user_id).first()
+    user = (await db.scalars(select(User).where(User.id == user_id))).first()
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -98,42 +104,45 @@ async def get_user(
 async def update_user(
     user_id: int,
     user_data: UserUpdate,
-    db: Session = Depends(get_db),
     current_user: User = Depends(get_current_admin)
 ):
     """Update user (Admin only)"""
-    user = db.query(User).filter(User.id == user_id).first()
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="User not found"
-        )
+    password_hash = None
+    if user_data.password is not None:
+        password_hash = await run_blocking(AuthService.get_password_hash, user_data.password)
 
-    # Update fields if provided
-    if user_data.email is not None:
-        # Check if email is already taken by another user
-        existing = db.query(User).filter(
-            User.email == user_data.email,
-            User.id != user_id
-        ).first()
-        if existing:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Email already in use"
-            )
-        user.email = user_data.email
+    def update(db: Session) -> User:
+        user = _get_user_or_404(user_id, db)
 
-    if user_data.full_name is not None:
-        user.full_name = user_data.full_name
+        # Update fields if provided
+        if user_data.email is not None:
+            # Check if email is already taken by another user
+            existing = db.query(User).filter(
+                User.email == user_data.email,
+                User.id != user_id
+            ).first()
+            if existing:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Email already in use"
+                )
+            user.email = user_data.email
 
-    if user_data.password is not None:
-        user.password_hash = AuthService.get_password_hash(user_data.password)
+        if user_data.full_name is not None:
+            user.full_name = user_data.full_name
 
-    if user_data.is_active is not None:
-        user.is_active = user_data.is_active
+        if password_hash is not None:
+            user.password_hash = password_hash
 
-    db.commit()
-    db.refresh(user)
+        if user_data.is_active is not None:
+            user.is_active = user_data.is_active
+
+        db.commit()
+        db.refresh(user)
+        return user
+
+    user = await run_in_session(update)
+    principal_cache.invalidate(user.username)
 
     return UserResponse.from_orm_with_permissions(user)
 
@@ -141,7 +150,6 @@ async def update_user(
 @router.delete("/{user_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_user(
     user_id: int,
-    db: Session = Depends(get_db),
     current_user: User = Depends(get_current_admin)
 ):
     """Delete user (Admin only)"""
@@ -151,22 +159,20 @@ async def delete_user(
             detail="Cannot delete yourself"
         )
 
-    user = db.query(User).filter(User.id == user_id).first()
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="User not found"
-        )
+    def delete(db: Session) -> str:
+        user = _get_user_or_404(user_id, db)
+        username = user.username
+        db.delete(user)
+        db.commit()
+        return username
 
-    db.delete(user)
-    db.commit()
+    principal_cache.invalidate(await run_in_session(delete))
 
 
 @router.put("/{user_id}/role", response_model=UserResponse)
 async def update_user_role(
     user_id: int,
     role_data: RoleUpdate,
-    db: Session = Depends(get_db),
     current_user: User = Depends(get_current_admin)
 ):
     """Change user role (Admin only)"""
@@ -176,25 +182,24 @@ async def update_user_role(
             detail="Cannot change your own role"
         )
 
-    user = db.query(User).filter(User.id == user_id).first()
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="User not found"
-        )
+    def update(db: Session) -> User:
+        user = _get_user_or_404(user_id, db)
+        user.role = role_data.role
 
-    user.role = role_data.role
+        # Update permissions based on new role
+        if role_data.role == "admin":
+            user.set_permissions(DEFAULT_ADMIN_PERMISSIONS)
+        else:
+            # Keep current permissions or set defaults for analyst
+            current_perms = user.get_permissions()
+            user.set_permissions(current_perms)
 
-    # Update permissions based on new role
-    if role_data.role == "admin":
-        user.set_permissions(DEFAULT_ADMIN_PERMISSIONS)
-    else:
-        # Keep current permissions or set defaults for analyst
-        current_perms = user.get_permissions()
-        user.set_permissions(current_perms)
+        db.commit()
+        db.refresh(user)
+        return user
 
-    db.commit()
-    db.refresh(user)
+    user = await run_in_session(update)
+    principal_cache.invalidate(user.username)
 
     return UserResponse.from_orm_with_permissions(user)
 
@@ -203,26 +208,24 @@ async def update_user_role(
 async def update_user_permissions(
     user_id: int,
     permissions_data: PermissionsUpdate,
-    db: Session = Depends(get_db),
     current_user: User = Depends(get_current_admin)
 ):
     """Update user permissions (Admin only). Only applies to analysts."""
-    user = db.query(User).filter(User.id == user_id).first()
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="User not found"
-        )
+    def update(db: Session) -> User:
+        user = _get_user_or_404(user_id, db)
+        if user.role == "admin":
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Cannot modify permissions for admin users (they have full access)"
+            )
 
-    if user.role == "admin":
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Cannot modify permissions for admin users (they have full access)"
-        )
+        user.set_permissions(permissions_data.permissions.model_dump())
+        db.commit()
+        db.refresh(user)
+        return user
 
-    user.set_permissions(permissions_data.permissions.model_dump())
-    db.commit()
-    db.refresh(user)
+    user = await run_in_session(update)
+    principal_cache.invalidate(user.username)
 
     return UserResponse.from_orm_with_permissions(user)
 
@@ -231,19 +234,30 @@ async def update_user_permissions(
 async def reset_user_password(
     user_id: int,
     password_data: AdminPasswordReset,
-    db: Session = Depends(get_db),
     current_user: User = Depends(get_current_admin)
 ):
     """Reset user password (Admin only)"""
-    user = db.query(User).filter(User.id == user_id).first()
+    password_hash = await run_blocking(AuthService.get_password_hash, password_data.new_password)
+
+    def update(db: Session) -> User:
+        user = _get_user_or_404(user_id, db)
+        user.password_hash = password_hash
+        db.commit()
+        db.refresh(user)
+        return user
+
+    user = await run_in_session(update)
+    principal_cache.invalidate(user.username)
+
+    return UserResponse.from_orm_with_permissions(user)
+
+
+def _get_user_or_404(user_id: int, db: Session) -> User:
+    """The user to modify, on the writer session run_in_session provides"""
+    user = db.get(User, user_id)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User not found"
         )
-
-    user.password_hash = AuthService.get_password_hash(password_data.new_password)
-    db.commit()
-    db.refresh(user)
-
-    return UserResponse.from_orm_with_permissions(user)
+    return user
@@ -5,8 +5,9 @@ from .user import (
     PasswordChange, ProfileResponse, ProfileUpdate
 )
 from .file import FileResponse, FilePreview
-from .report import ReportCreate, ReportResponse, ReportSummary
+from .report import ReportCreate, ReportResponse, ReportSummary, ReportResultItem, ReportResultsPage
 from .prediction import PredictionCreate, PredictionResponse, PredictionStats
+from .incident import IncidentResponse, IncidentDetail, IncidentStats, IncidentAcknowledge
 
 __all__ = [
     "Token", "TokenData", "LoginRequest",
@@ -14,6 +15,7 @@ __all__ = [
     "PermissionsUpdate", "RoleUpdate", "AdminPasswordReset",
     "PasswordChange", "ProfileResponse", "ProfileUpdate",
     "FileResponse", "FilePreview",
-    "ReportCreate", "ReportResponse", "ReportSummary",
-    "PredictionCreate", "PredictionResponse", "PredictionStats"
+    "ReportCreate", "ReportResponse", "ReportSummary", "ReportResultItem", "ReportResultsPage",
+    "PredictionCreate", "PredictionResponse", "PredictionStats",
+    "IncidentResponse", "IncidentDetail", "IncidentStats", "IncidentAcknowledge"
 ]
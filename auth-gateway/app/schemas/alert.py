@@ -21,6 +21,7 @@ class AlertResponse(AlertBase):
     id: int
     status: str
     report_id: Optional[int] = None
+    incident_id: Optional[int] = None
     prediction_index: Optional[int] = None
     confidence: float
     prediction_label: Optional[str] = None
@@ -37,6 +38,11 @@ class AlertDetail(AlertResponse):
     report_title: Optional[str] = None
 
 
+class AlertSearchResult(AlertResponse):
+    rank: float  # bm25 score, lower is more relevant
+    snippet: Optional[str] = None  # matched text with [highlighted] terms
+
+
 class AlertStats(BaseModel):
     total: int
     unread: int
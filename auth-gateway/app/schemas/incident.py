@@ -0,0 +1,53 @@
+"""
+Incident schemas for API requests/responses
+"""
+from pydantic import BaseModel
+from typing import Optional, List
+from datetime import datetime
+
+
+class IncidentSeverityCounts(BaseModel):
+    critical: int
+    high: int
+    medium: int
+
+
+class IncidentResponse(BaseModel):
+    model_config = {"protected_namespaces": ()}
+
+    id: int
+    model_type: str
+    key: Optional[str] = None  # grouping key, e.g. 'evil.com | factura #'
+    title: str
+    status: str  # 'open', 'acknowledged'
+    alert_count: int
+    by_severity: IncidentSeverityCounts
+    max_severity: str
+    max_confidence: float
+    first_seen: datetime
+    last_seen: datetime
+    acknowledged_at: Optional[datetime] = None
+    acknowledged_by: Optional[int] = None
+
+
+class IncidentMemberSample(BaseModel):
+    alert_id: int
+    report_id: Optional[int] = None
+    prediction_index: Optional[int] = None
+    severity: str
+    confidence: float
+
+
+class IncidentDetail(IncidentResponse):
+    acknowledger_name: Optional[str] = None
+    sample: List[IncidentMemberSample] = []
+
+
+class IncidentStats(BaseModel):
+    open: int
+    by_severity: IncidentSeverityCounts
+    open_alerts: int
+
+
+class IncidentAcknowledge(BaseModel):
+    incident_ids: List[int]
@@ -30,4 +30,20 @@ class ReportResponse(ReportSummary):
     model_config = {"protected_namespaces": (), "from_attributes": True}
 
     file_name: Optional[str] = None
-    results: Optional[List[dict[str, Any]]] = None
+    error: Optional[str] = None
+
+
+class ReportResultItem(BaseModel):
+    row_index: int
+    is_threat: bool
+    label: Optional[str] = None
+    confidence: float
+    risk_level: Optional[str] = None
+    risk_score: Optional[float] = None
+    attack_type: Optional[str] = None
+    explanation: Optional[dict[str, Any]] = None
+
+
+class ReportResultsPage(BaseModel):
+    items: List[ReportResultItem]
+    next_cursor: Optional[str] = None
@@ -1,6 +1,7 @@
 from .auth_service import AuthService
 from .file_service import FileService
 from .report_service import ReportService
+from .export_service import ExportService
 from .column_detector import ColumnDetector
 from .prediction_client import PredictionClient
 
@@ -8,6 +9,7 @@ __all__ = [
     "AuthService",
     "FileService",
     "ReportService",
+    "ExportService",
     "ColumnDetector",
     "PredictionClient"
 ]
@@ -4,13 +4,30 @@ Alert generation and management service
 import json
 from typing import List, Optional, Dict, Any
 from datetime import datetime
-from sqlalchemy.orm import Session
-from sqlalchemy import desc, and_
+import numpy as np
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, defer
+from sqlalchemy import func, insert, select
+
+from service_common.metrics import stage
 
 from ..models.alert import Alert
 from ..models.user import User
 from ..models.report import Report
+from ..models.report_result import ReportResult
+from ..models.file import UploadedFile
 from ..config import ALERT_THRESHOLDS, DEFAULT_ALERT_THRESHOLDS
+from .counter_service import CounterService
+from .rollup_service import RollupService
+from .report_cache_service import ReportCacheService
+from .event_bus import event_bus
+from .pagination import KeysetPagination
+from .search_service import SearchService
+from .incident_service import IncidentService
+from .alert_sync_service import AlertSyncService
+
+# Alerts per INSERT statement / transaction in bulk generation
+ALERT_INSERT_CHUNK = 1000
 
 
 class AlertService:
@@ -37,58 +54,182 @@ class AlertService:
         return None  # No alert needed
 
     @classmethod
-    def generate_alerts_from_predictions(
+    def compute_severities(cls, model_type: str, confidences: np.ndarray) -> np.ndarray:
+        """
+        Vectorized version of determine_severity.
+        Returns an array of severity strings ("" where no alert is needed).
+        """
+        thresholds = cls.get_thresholds(model_type)
+        return np.select(
+            [
+                confidences >= thresholds["critical"],
+                confidences >= thresholds["high"],
+                confidences >= thresholds["medium"],
+            ],
+            ["critical", "high", "medium"],
+            default=""
+        )
+
+    @classmethod
+    def generate_alerts_bulk(
         cls,
         model_type: str,
         report_id: int,
         predictions: List[Dict[str, Any]],
-        db: Session
-    ) -> List[Alert]:
+        db: Session,
+        chunk_size: int = ALERT_INSERT_CHUNK
+    ) -> Dict[str, Any]:
         """
-        Generate alerts from a list of predictions.
-        Only creates alerts for threats that meet threshold criteria.
+        Generate alerts for threats that meet threshold criteria using set-based inserts.
+        Predictions may carry their own "row_index"; otherwise list position is used.
+        Each chunk is inserted with a single executemany and committed on its own.
+        Returns counts and the ids of the created alerts.
         """
-        alerts_created = []
-
-        for idx, pred in enumerate(predictions):
-            # Only create alerts for threats
-            if not pred.get("is_threat", False):
-                continue
-
-            confidence = pred.get("confidence", 0)
-            severity = cls.determine_severity(model_type, confidence)
-
-            # Skip if doesn't meet minimum threshold
-            if severity is None:
-                continue
-
-            # Build alert title based on model type
-            title = cls._build_alert_title(model_type, pred)
-            description = cls._build_alert_description(model_type, pred, idx)
-
-            alert = Alert(
-                title=title,
-                description=description,
-                severity=severity,
-                status="unread",
-                model_type=model_type,
-                report_id=report_id,
-                prediction_index=idx,
-                confidence=confidence,
-                prediction_label=pred.get("label", ""),
-                risk_level=pred.get("risk_level", "high"),
-                raw_data_json=json.dumps(pred)
-            )
+        summary = {"created": 0, "by_severity": {"critical": 0, "high": 0, "medium": 0}, "ids": []}
+        if not predictions:
+            return summary
+
+        is_threat = np.fromiter((bool(p.get("is_threat", False)) for p in predictions), dtype=bool, count=len(predictions))
+        confidences = np.fromiter((p.get("confidence", 0) or 0 for p in predictions), dtype=float, count=len(predictions))
+        severities = cls.compute_severities(model_type, confidences)
+
+        candidates = np.flatnonzero(is_threat & (severities != ""))
+
+        for start in range(0, len(candidates), chunk_size):
+            rows = []
+            chunk_predictions = []
+            # Titles and descriptions are only built for the rows being inserted
+            for position in candidates[start:start + chunk_size]:
+                pred = predictions[position]
+                chunk_predictions.append(pred)
+                idx = pred.get("row_index", int(position))
+                rows.append({
+                    "title": cls._build_alert_title(model_type, pred),
+                    "description": cls._build_alert_description(model_type, pred, idx),
+                    "severity": str(severities[position]),
+                    "status": "unread",
+                    "model_type": model_type,
+                    "report_id": report_id,
+                    "prediction_index": idx,
+                    "confidence": float(confidences[position]),
+                    "prediction_label": pred.get("label", ""),
+                    "risk_level": pred.get("risk_level", "high"),
+                    "raw_data_json": json.dumps(pred)
+                })
+
+            # Repeated threats (same sender domain and subject, user and IP...) share an incident
+            incidents = IncidentService.assign(model_type, rows, chunk_predictions, db)
+            ids = db.scalars(insert(Alert).returning(Alert.id, sort_by_parameter_order=True), rows).all()
+            IncidentService.record_samples(incidents, rows, ids)
+
+            chunk_by_severity = {"critical": 0, "high": 0, "medium": 0}
+            for row in rows:
+                chunk_by_severity[row["severity"]] += 1
+            CounterService.alerts_created(db, chunk_by_severity)
+            RollupService.record_alerts(db, model_type, chunk_by_severity)
+            db.commit()
 
-            db.add(alert)
-            alerts_created.append(alert)
+            event_bus.publish("alert.created", {
+                "report_id": report_id,
+                "model_type": model_type,
+                "ids": ids,
+                "incident_ids": sorted(incidents),
+                "by_severity": chunk_by_severity
+            })
 
-        if alerts_created:
-            db.commit()
-            for alert in alerts_created:
-                db.refresh(alert)
+            summary["ids"].extend(ids)
+            for severity, count in chunk_by_severity.items():
+                summary["by_severity"][severity] += count
+
+        summary["created"] = len(summary["ids"])
+        return summary
+
+    @classmethod
+    def generate_alerts_for_report(
+        cls,
+        report_id: int,
+        db: Session,
+        chunk_size: int = ALERT_INSERT_CHUNK,
+        regenerate: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Generate alerts from a report's stored results.
+        Only threats above the model's lowest threshold are read back from report_results,
+        starting after the report's sync watermark, which is committed with every chunk.
+        Reports already completed with the current thresholds are skipped; generated with
+        other thresholds (or with regenerate) their alerts are replaced.
+        summary["skipped"] is "locked" when another process holds the report's lease.
+        """
+        report = db.query(Report).options(defer(Report.results_json)).filter(Report.id == report_id).first()
+        if not report:
+            raise ValueError("Report not found")
 
-        return alerts_created
+        model_type = report.model_type
+        file_id = report.file_id
+        thresholds = cls.get_thresholds(model_type)
+        summary = {"created": 0, "removed": 0, "by_severity": {"critical": 0, "high": 0, "medium": 0}, "ids": []}
+
+        state = AlertSyncService.claim(report_id, db)
+        if state is None:
+            summary["skipped"] = "locked"
+            return summary
+
+        input_reader = None
+        try:
+            if regenerate or (state.status == "completed" and state.thresholds_hash
+                              and state.thresholds_hash != AlertSyncService.thresholds_hash(model_type)):
+                summary["removed"] = AlertSyncService.reset(state, db)
+            elif AlertSyncService.is_current(state.status, state.thresholds_hash, model_type):
+                AlertSyncService.release(report_id, db)
+                summary["skipped"] = "up_to_date"
+                return summary
+
+            # Selected input fields (sender, IP, user...) go into raw data for search
+            db_file = db.get(UploadedFile, file_id) if file_id else None
+            input_reader = SearchService.open_input_reader(model_type, db_file.file_path if db_file else None)
+
+            last_index = state.last_row_index
+            while True:
+                with stage("read_threats"):
+                    rows = db.query(ReportResult).filter(
+                        ReportResult.report_id == report_id,
+                        ReportResult.is_threat.is_(True),
+                        ReportResult.confidence >= thresholds["medium"],
+                        ReportResult.row_index > last_index
+                    ).order_by(ReportResult.row_index).limit(chunk_size).all()
+                if not rows:
+                    break
+                last_index = rows[-1].row_index
+
+                predictions = [row.to_dict() for row in rows]
+                for row in rows:
+                    db.expunge(row)
+                if input_reader is not None:
+                    for pred in predictions:
+                        pred["input"] = input_reader.get(pred["row_index"])
+
+                # Every row read is above threshold, so one alert each; the
+                # watermark is committed with this chunk's alerts
+                AlertSyncService.advance(state, last_index, len(predictions))
+                with stage("insert_alerts"):
+                    chunk_summary = cls.generate_alerts_bulk(
+                        model_type, report_id, predictions, db, chunk_size=chunk_size
+                    )
+                summary["ids"].extend(chunk_summary["ids"])
+                for severity, count in chunk_summary["by_severity"].items():
+                    summary["by_severity"][severity] += count
+
+            AlertSyncService.finish(state, model_type, db)
+        except Exception:
+            db.rollback()
+            AlertSyncService.release(report_id, db)
+            raise
+        finally:
+            if input_reader is not None:
+                input_reader.close()
+
+        summary["created"] = len(summary["ids"])
+        return summary
 
     @classmethod
     def _build_alert_title(cls, model_type: str, pred: Dict) -> str:
@@ -143,58 +284,45 @@ class AlertService:
         return base
 
     @classmethod
-    def list_alerts(
+    async def list_alerts(
         cls,
-        db: Session,
+        db: AsyncSession,
         status: Optional[str] = None,
         severity: Optional[str] = None,
         model_type: Optional[str] = None,
+        cursor: Optional[str] = None,
         skip: int = 0,
         limit: int = 100
-    ) -> List[Alert]:
-        """List alerts with optional filters"""
-        query = db.query(Alert)
+    ) -> Dict[str, Any]:
+        """
+        List alerts with optional filters, newest first, using keyset pagination.
+        skip is kept for older clients and only applies to the first page.
+        """
+        query = select(Alert)
 
         if status:
-            query = query.filter(Alert.status == status)
+            query = query.where(Alert.status == status)
         if severity:
-            query = query.filter(Alert.severity == severity)
+            query = query.where(Alert.severity == severity)
         if model_type:
-            query = query.filter(Alert.model_type == model_type)
+            query = query.where(Alert.model_type == model_type)
 
-        return query.order_by(desc(Alert.created_at)).offset(skip).limit(limit).all()
+        query = KeysetPagination.apply(query, Alert.created_at, Alert.id, cursor, limit)
+        if cursor is None and skip:
+            query = query.offset(skip)
 
-    @classmethod
-    def get_unread_count(cls, db: Session) -> int:
-        """Get count of unread alerts"""
-        return db.query(Alert).filter(Alert.status == "unread").count()
+        rows, next_cursor = KeysetPagination.split((await db.execute(query)).all(), limit, lambda row: row.Alert.id)
+        return {"items": [row.Alert for row in rows], "next_cursor": next_cursor}
 
     @classmethod
-    def get_alert_stats(cls, db: Session) -> Dict[str, Any]:
-        """Get alert statistics for dashboard"""
-        total = db.query(Alert).count()
-        unread = db.query(Alert).filter(Alert.status == "unread").count()
-
-        # Count by severity (only active alerts)
-        critical = db.query(Alert).filter(
-            and_(Alert.severity == "critical", Alert.status.in_(["unread", "read"]))
-        ).count()
-        high = db.query(Alert).filter(
-            and_(Alert.severity == "high", Alert.status.in_(["unread", "read"]))
-        ).count()
-        medium = db.query(Alert).filter(
-            and_(Alert.severity == "medium", Alert.status.in_(["unread", "read"]))
-        ).count()
+    async def get_unread_count(cls, db: AsyncSession) -> int:
+        """Get count of unread alerts (materialized counter)"""
+        return int(await CounterService.get(db, "alerts.status.unread"))
 
-        return {
-            "total": total,
-            "unread": unread,
-            "by_severity": {
-                "critical": critical,
-                "high": high,
-                "medium": medium
-            }
-        }
+    @classmethod
+    async def get_alert_stats(cls, db: AsyncSession) -> Dict[str, Any]:
+        """Get alert statistics for dashboard (materialized counters)"""
+        return await CounterService.get_alert_stats(db)
 
     @classmethod
     def get_alert(cls, alert_id: int, db: Session) -> Optional[Alert]:
@@ -202,13 +330,15 @@ class AlertService:
         return db.query(Alert).filter(Alert.id == alert_id).first()
 
     @classmethod
-    def get_alert_detail(cls, alert_id: int, db: Session) -> Optional[Dict]:
+    async def get_alert_detail(cls, alert_id: int, db: AsyncSession) -> Optional[Dict]:
         """Get alert with related information"""
-        result = db.query(Alert, User.full_name, Report.title).outerjoin(
-            User, Alert.acknowledged_by == User.id
-        ).outerjoin(
-            Report, Alert.report_id == Report.id
-        ).filter(Alert.id == alert_id).first()
+        result = (await db.execute(
+            select(Alert, User.full_name, Report.title).outerjoin(
+                User, Alert.acknowledged_by == User.id
+            ).outerjoin(
+                Report, Alert.report_id == Report.id
+            ).where(Alert.id == alert_id)
+        )).first()
 
         if not result:
             return None
@@ -223,6 +353,7 @@ class AlertService:
             "status": alert.status,
             "model_type": alert.model_type,
             "report_id": alert.report_id,
+            "incident_id": alert.incident_id,
             "prediction_index": alert.prediction_index,
             "confidence": alert.confidence,
             "prediction_label": alert.prediction_label,
@@ -243,8 +374,11 @@ class AlertService:
         if alert and alert.status == "unread":
             alert.status = "read"
             alert.read_at = datetime.utcnow()
+            CounterService.alerts_status_changed(db, "unread", "read", alert.severity)
+            ReportCacheService.invalidate_for_datetime(db, alert.created_at)
             db.commit()
             db.refresh(alert)
+            event_bus.publish("alert.status", {"ids": [alert.id], "status": "read"})
         return alert
 
     @classmethod
@@ -254,14 +388,17 @@ class AlertService:
         user_id: int,
         db: Session
     ) -> Optional[Alert]:
-        """Acknowledge an alert"""
+        """Acknowledge an alert (one acknowledged earlier keeps its acknowledged_at/by)"""
         alert = cls.get_alert(alert_id, db)
-        if alert:
+        if alert and alert.status != "acknowledged":
+            CounterService.alerts_status_changed(db, alert.status, "acknowledged", alert.severity)
+            ReportCacheService.invalidate_for_datetime(db, alert.created_at)
             alert.status = "acknowledged"
             alert.acknowledged_at = datetime.utcnow()
             alert.acknowledged_by = user_id
             db.commit()
             db.refresh(alert)
+            event_bus.publish("alert.status", {"ids": [alert.id], "status": "acknowledged"})
         return alert
 
     @classmethod
@@ -272,7 +409,27 @@ class AlertService:
         db: Session
     ) -> int:
         """Acknowledge multiple alerts at once"""
-        count = db.query(Alert).filter(Alert.id.in_(alert_ids)).update(
+        return cls.acknowledge_where(db, user_id, Alert.id.in_(alert_ids), event={"ids": list(alert_ids)})
+
+    @classmethod
+    def acknowledge_where(cls, db: Session, user_id: int, condition, event: Dict[str, Any]) -> int:
+        """
+        Acknowledge every alert matching condition with set-based updates, keeping
+        counters and cached months in step. event identifies them in the SSE payload.
+        """
+        pending = db.query(Alert.status, Alert.severity, func.count(Alert.id)).filter(
+            condition,
+            Alert.status != "acknowledged"
+        ).group_by(Alert.status, Alert.severity).all()
+        for old_status, severity, group_count in pending:
+            CounterService.alerts_status_changed(db, old_status, "acknowledged", severity, group_count)
+        if pending:
+            ReportCacheService.invalidate_for_alerts(
+                db, condition, Alert.status != "acknowledged"
+            )
+
+        # Alerts acknowledged earlier keep their acknowledged_at/by
+        count = db.query(Alert).filter(condition, Alert.status != "acknowledged").update(
             {
                 "status": "acknowledged",
                 "acknowledged_at": datetime.utcnow(),
@@ -281,14 +438,25 @@ class AlertService:
             synchronize_session=False
         )
         db.commit()
+        event_bus.publish("alert.status", {**event, "status": "acknowledged"})
         return count
 
     @classmethod
     def mark_all_as_read(cls, db: Session) -> int:
         """Mark all unread alerts as read"""
+        unread = db.query(Alert.severity, func.count(Alert.id)).filter(
+            Alert.status == "unread"
+        ).group_by(Alert.severity).all()
+        for severity, group_count in unread:
+            CounterService.alerts_status_changed(db, "unread", "read", severity, group_count)
+        if unread:
+            ReportCacheService.invalidate_for_alerts(db, Alert.status == "unread")
+
         count = db.query(Alert).filter(Alert.status == "unread").update(
             {"status": "read", "read_at": datetime.utcnow()},
             synchronize_session=False
         )
         db.commit()
+        if count:
+            event_bus.publish("alert.status", {"all": True, "status": "read", "count": count})
         return count
@@ -0,0 +1,148 @@
+"""
+Alert sync state: per-report watermarks and leases for incremental alert generation
+"""
+import hashlib
+import json
+from datetime import datetime, timedelta
+from typing import List, Optional
+from sqlalchemy import delete, func, or_, select, update
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session
+
+from ..config import ALERT_THRESHOLDS, DEFAULT_ALERT_THRESHOLDS, get_settings
+from ..models.alert import Alert
+from ..models.alert_sync_state import AlertSyncState
+from ..models.report import Report
+from .counter_service import CounterService
+from .incident_service import IncidentService
+from .rollup_service import RollupService
+
+settings = get_settings()
+
+# Alerts deleted per transaction when a changed report is regenerated
+ALERT_DELETE_CHUNK = 1000
+
+
+class AlertSyncService:
+    """
+    Alert generation for a report runs under a lease (gateway background task
+    or sync_alerts.py workers, never both) and commits its watermark together
+    with every chunk of alerts, so an interrupted run resumes where it stopped.
+    """
+
+    @classmethod
+    def thresholds_hash(cls, model_type: str) -> str:
+        thresholds = ALERT_THRESHOLDS.get(model_type, DEFAULT_ALERT_THRESHOLDS)
+        return hashlib.sha1(json.dumps(thresholds, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+    @classmethod
+    def is_current(cls, status: Optional[str], thresholds_hash: Optional[str], model_type: str) -> bool:
+        """Completed with the model's current thresholds: nothing to do"""
+        return status == "completed" and thresholds_hash == cls.thresholds_hash(model_type)
+
+    @classmethod
+    def pending_reports(cls, db: Session, full: bool = False) -> List[int]:
+        """Completed reports that are new (no state), interrupted or generated with other thresholds"""
+        rows = db.query(
+            Report.id, Report.model_type, AlertSyncState.status, AlertSyncState.thresholds_hash
+        ).outerjoin(
+            AlertSyncState, AlertSyncState.report_id == Report.id
+        ).filter(Report.status == "completed").order_by(Report.id).all()
+        return [
+            report_id for report_id, model_type, status, thresholds_hash in rows
+            if full or not cls.is_current(status, thresholds_hash, model_type)
+        ]
+
+    @classmethod
+    def claim(cls, report_id: int, db: Session) -> Optional[AlertSyncState]:
+        """
+        Take the report's lease; None while someone else holds an unexpired one.
+        Reports with alerts from before sync state existed resume after their last alert.
+        """
+        now = datetime.utcnow()
+        existing = select(Alert.prediction_index).where(Alert.report_id == report_id)
+        db.execute(insert(AlertSyncState).values(
+            report_id=report_id,
+            last_row_index=select(func.coalesce(func.max(Alert.prediction_index), -1)).where(
+                Alert.report_id == report_id
+            ).scalar_subquery(),
+            alert_count=select(func.count()).select_from(existing.subquery()).scalar_subquery(),
+            status="pending"
+        ).on_conflict_do_nothing(index_elements=[AlertSyncState.report_id]))
+
+        claimed = db.execute(
+            update(AlertSyncState).where(
+                AlertSyncState.report_id == report_id,
+                or_(AlertSyncState.lease_until.is_(None), AlertSyncState.lease_until < now)
+            ).values(lease_until=cls._lease_deadline(now))
+        ).rowcount
+        db.commit()
+        return db.get(AlertSyncState, report_id) if claimed else None
+
+    @classmethod
+    def advance(cls, state: AlertSyncState, last_row_index: int, alerts: int) -> None:
+        """Move the watermark and renew the lease; committed with the chunk's alerts"""
+        state.last_row_index = last_row_index
+        state.alert_count += alerts
+        state.lease_until = cls._lease_deadline()
+
+    @classmethod
+    def finish(cls, state: AlertSyncState, model_type: str, db: Session) -> None:
+        state.status = "completed"
+        state.thresholds_hash = cls.thresholds_hash(model_type)
+        state.completed_at = datetime.utcnow()
+        state.lease_until = None
+        db.commit()
+
+    @classmethod
+    def release(cls, report_id: int, db: Session) -> None:
+        """Drop the lease after a failure; the next run resumes from the watermark"""
+        db.execute(
+            update(AlertSyncState).where(AlertSyncState.report_id == report_id).values(lease_until=None)
+        )
+        db.commit()
+
+    @classmethod
+    def reset(cls, state: AlertSyncState, db: Session, chunk_size: int = ALERT_DELETE_CHUNK) -> int:
+        """
+        Delete a report's alerts in chunked transactions, keeping counters, rollups
+        and incidents in step, and rewind its watermark. Returns the alerts removed.
+        """
+        removed = 0
+        while True:
+            ids = db.scalars(
+                select(Alert.id).where(Alert.report_id == state.report_id).order_by(Alert.id).limit(chunk_size)
+            ).all()
+            if not ids:
+                break
+            condition = Alert.id.in_(ids)
+            CounterService.alerts_deleted(db, db.query(
+                Alert.status, Alert.severity, func.count(Alert.id)
+            ).filter(condition).group_by(Alert.status, Alert.severity).all())
+            RollupService.remove_alerts(db, condition)
+            incident_ids = db.scalars(
+                select(Alert.incident_id).where(condition, Alert.incident_id.isnot(None)).distinct()
+            ).all()
+            db.execute(delete(Alert).where(condition), execution_options={"synchronize_session": False})
+            IncidentService.refresh_aggregates(incident_ids, ids, db)
+
+            state.lease_until = cls._lease_deadline()
+            db.commit()
+            removed += len(ids)
+
+        state.last_row_index = -1
+        state.alert_count = 0
+        state.status = "pending"
+        state.thresholds_hash = None
+        state.completed_at = None
+        db.commit()
+        return removed
+
+    @classmethod
+    def forget(cls, report_id: int):
+        """Statement removing a deleted report's state (caller executes and commits)"""
+        return delete(AlertSyncState).where(AlertSyncState.report_id == report_id)
+
+    @classmethod
+    def _lease_deadline(cls, now: Optional[datetime] = None) -> datetime:
+        return (now or datetime.utcnow()) + timedelta(seconds=settings.ALERT_SYNC_LEASE_SECONDS)
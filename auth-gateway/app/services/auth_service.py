@@ -5,18 +5,23 @@ from datetime import datetime, timedelta, timezone
 from typing import Optional
 from jose import JWTError, jwt
 from passlib.context import CryptContext
-from sqlalchemy.orm import Session
-from fastapi import Depends, HTTPException, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, make_transient_to_detached
+from fastapi import Depends, HTTPException, Query, status
 from fastapi.security import OAuth2PasswordBearer
 
 from ..config import get_settings
-from ..database import get_db
+from ..database import get_read_db
 from ..models.user import User, DEFAULT_ADMIN_PERMISSIONS, DEFAULT_ANALYST_PERMISSIONS
 from ..schemas.auth import TokenData
+from .principal_cache import principal_cache
+from .stream_tickets import stream_tickets
 
 settings = get_settings()
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
+oauth2_scheme_optional = OAuth2PasswordBearer(tokenUrl="auth/login", auto_error=False)
 
 
 class AuthService:
@@ -69,12 +74,31 @@ class AuthService:
             )
 
 
-async def get_current_user(
-    token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db)
-) -> User:
-    token_data = AuthService.decode_token(token)
-    user = db.query(User).filter(User.username == token_data.username).first()
+# Columns kept in the principal cache: what authorization and /me need.
+# password_hash stays out; password checks load the user in the writer session.
+PRINCIPAL_FIELDS = ("id", "username", "role", "is_active", "permissions", "full_name", "email", "created_at")
+
+
+async def _load_principal(username: str, db: AsyncSession) -> Optional[User]:
+    """
+    Resolve the token subject, serving cached column values when possible.
+    The principal comes from the read-only session (or the cache, detached);
+    routers that modify the user load it again in their writer session.
+    """
+    values = principal_cache.get(username)
+    if values is not None:
+        user = User(**values)
+        make_transient_to_detached(user)
+        return user
+
+    user = (await db.execute(select(User).where(User.username == username))).scalar_one_or_none()
+    if user is not None:
+        principal_cache.put(username, {field: getattr(user, field) for field in PRINCIPAL_FIELDS})
+    return user
+
+
+async def _active_principal(username: str, db: AsyncSession) -> User:
+    user = await _load_principal(username, db)
     if user is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -89,6 +113,35 @@ async def get_current_user(
     return user
 
 
+async def get_current_user(
+    token: str = Depends(oauth2_scheme),
+    db: AsyncSession = Depends(get_read_db)
+) -> User:
+    token_data = AuthService.decode_token(token)
+    return await _active_principal(token_data.username, db)
+
+
+async def get_current_user_for_stream(
+    header_token: Optional[str] = Depends(oauth2_scheme_optional),
+    ticket: Optional[str] = Query(None),
+    db: AsyncSession = Depends(get_read_db)
+) -> User:
+    """
+    Browser EventSource cannot send headers: it authenticates with a single-use
+    ?ticket= from POST /alerts/stream-ticket. Other clients may send the bearer token.
+    """
+    if header_token:
+        return await get_current_user(token=header_token, db=db)
+    username = stream_tickets.redeem(ticket) if ticket else None
+    if username is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or expired stream ticket" if ticket else "Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return await _active_principal(username, db)
+
+
 async def get_current_admin(current_user: User = Depends(get_current_user)) -> User:
     if current_user.role != "admin":
         raise HTTPException(
@@ -39,15 +39,13 @@ class ColumnDetector:
     @classmethod
     def normalize_columns(cls, columns: List[str]) -> Set[str]:
         """Normalize column names to lowercase and apply aliases"""
-        normalized = set()
-        for col in columns:
-            col_lower = col.lower().strip().replace(" ", "_")
-            # Check if it's an alias
-            if col_lower in cls.COLUMN_ALIASES:
-                normalized.add(cls.COLUMN_ALIASES[col_lower])
-            else:
-                normalized.add(col_lower)
-        return normalized
+        return {cls.canonical_name(col) for col in columns}
+
+    @classmethod
+    def canonical_name(cls, column: str) -> str:
+        """Lowercase, underscore-separated name with aliases resolved"""
+        col_lower = str(column).lower().strip().replace(" ", "_")
+        return cls.COLUMN_ALIASES.get(col_lower, col_lower)
 
     @classmethod
     def detect_model(cls, columns: List[str]) -> Optional[str]:
@@ -0,0 +1,272 @@
+"""
+Materialized counters for dashboard statistics
+"""
+import time
+import logging
+import threading
+from typing import Dict, Optional
+from sqlalchemy import delete, event, func, select
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from ..config import get_settings
+from ..models.alert import Alert
+from ..models.prediction import Prediction
+from ..models.stat_counter import StatCounter
+from .event_bus import event_bus
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+ALERT_STATUSES = ("unread", "read", "acknowledged")
+ALERT_SEVERITIES = ("critical", "high", "medium")
+ACTIVE_ALERT_STATUSES = ("unread", "read")
+PREDICTION_MODELS = ("phishing", "ato", "brute_force")
+
+
+class CounterService:
+    """
+    Counters live in the stat_counters table and are updated in the same
+    transaction as the rows they count. Reads go through a short TTL
+    snapshot cache that is dropped whenever a session commits counter changes;
+    the committed deltas are also pushed on the event bus.
+    """
+
+    _snapshot: Optional[Dict[str, float]] = None
+    _snapshot_at: float = 0.0
+    _lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # Writes (caller commits)
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def increment(cls, db: Session, deltas: Dict[str, float]) -> None:
+        """Apply counter deltas inside the caller's transaction"""
+        rows = [{"name": name, "value": delta} for name, delta in deltas.items() if delta]
+        if not rows:
+            return
+
+        stmt = insert(StatCounter)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[StatCounter.name],
+            set_={"value": StatCounter.value + stmt.excluded.value, "updated_at": func.now()}
+        )
+        db.execute(stmt, rows)
+
+        # Published to stream subscribers once the transaction commits
+        pending = db.info.setdefault("counter_deltas", {})
+        for name, delta in deltas.items():
+            if delta:
+                pending[name] = pending.get(name, 0) + delta
+
+    @classmethod
+    def alerts_created(cls, db: Session, by_severity: Dict[str, int]) -> None:
+        """New alerts are always unread"""
+        total = sum(by_severity.values())
+        deltas = {"alerts.total": total, "alerts.status.unread": total}
+        for severity, count in by_severity.items():
+            deltas[f"alerts.active.{severity}"] = count
+        cls.increment(db, deltas)
+
+    @classmethod
+    def alerts_status_changed(
+        cls,
+        db: Session,
+        old_status: str,
+        new_status: str,
+        severity: str,
+        count: int = 1
+    ) -> None:
+        """Move alerts between statuses, keeping active-by-severity counts in step"""
+        if old_status == new_status or not count:
+            return
+        deltas = {
+            f"alerts.status.{old_status}": -count,
+            f"alerts.status.{new_status}": count
+        }
+        was_active = old_status in ACTIVE_ALERT_STATUSES
+        is_active = new_status in ACTIVE_ALERT_STATUSES
+        if was_active != is_active:
+            deltas[f"alerts.active.{severity}"] = count if is_active else -count
+        cls.increment(db, deltas)
+
+    @classmethod
+    def alerts_deleted(cls, db: Session, groups) -> None:
+        """Remove deleted alerts, given as (status, severity, count) groups"""
+        deltas: Dict[str, float] = {}
+        for status, severity, count in groups:
+            deltas["alerts.total"] = deltas.get("alerts.total", 0) - count
+            name = f"alerts.status.{status}"
+            deltas[name] = deltas.get(name, 0) - count
+            if status in ACTIVE_ALERT_STATUSES:
+                name = f"alerts.active.{severity}"
+                deltas[name] = deltas.get(name, 0) - count
+        cls.increment(db, deltas)
+
+    @classmethod
+    def prediction_created(cls, db: Session, model_type: str, prediction: int, confidence: float) -> None:
+        is_threat = 1 if prediction == 1 else 0
+        cls.increment(db, {
+            "predictions.total": 1,
+            "predictions.threats": is_threat,
+            "predictions.confidence_sum": confidence,
+            f"predictions.model.{model_type}.total": 1,
+            f"predictions.model.{model_type}.threats": is_threat
+        })
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+
+    @classmethod
+    async def get_snapshot(cls, db: AsyncSession) -> Dict[str, float]:
+        """All counters, served from the in-process cache while fresh"""
+        snapshot = cls._snapshot
+        if snapshot is not None and time.monotonic() - cls._snapshot_at < settings.COUNTERS_CACHE_TTL_SECONDS:
+            return snapshot
+
+        loaded_at = time.monotonic()
+        snapshot = dict((await db.execute(select(StatCounter.name, StatCounter.value))).all())
+        with cls._lock:
+            cls._snapshot = snapshot
+            cls._snapshot_at = loaded_at
+        return snapshot
+
+    @classmethod
+    async def get(cls, db: AsyncSession, name: str) -> float:
+        return (await cls.get_snapshot(db)).get(name, 0)
+
+    @classmethod
+    def invalidate(cls) -> None:
+        cls._snapshot = None
+
+    @classmethod
+    async def get_alert_stats(cls, db: AsyncSession) -> Dict:
+        return cls.alert_stats_from(await cls.get_snapshot(db))
+
+    @classmethod
+    async def get_prediction_stats(cls, db: AsyncSession) -> Dict:
+        return cls.prediction_stats_from(await cls.get_snapshot(db))
+
+    @staticmethod
+    def alert_stats_from(counters: Dict[str, float]) -> Dict:
+        return {
+            "total": int(counters.get("alerts.total", 0)),
+            "unread": int(counters.get("alerts.status.unread", 0)),
+            "by_severity": {
+                severity: int(counters.get(f"alerts.active.{severity}", 0))
+                for severity in ALERT_SEVERITIES
+            }
+        }
+
+    @staticmethod
+    def prediction_stats_from(counters: Dict[str, float]) -> Dict:
+        total = int(counters.get("predictions.total", 0))
+        threats = int(counters.get("predictions.threats", 0))
+        avg_conf = counters.get("predictions.confidence_sum", 0) / total if total else 0
+
+        return {
+            "total_predictions": total,
+            "threats_detected": threats,
+            "benign_count": total - threats,
+            "avg_confidence": round(float(avg_conf) * 100, 1) if avg_conf else 0,
+            "by_model": {
+                model: {
+                    "total": int(counters.get(f"predictions.model.{model}.total", 0)),
+                    "threats": int(counters.get(f"predictions.model.{model}.threats", 0))
+                }
+                for model in PREDICTION_MODELS
+            }
+        }
+
+    # ------------------------------------------------------------------
+    # Reconciliation
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def compute_from_tables(cls, db: Session) -> Dict[str, float]:
+        """Compute every counter from scratch with grouped queries"""
+        counters: Dict[str, float] = {"alerts.total": 0}
+        for status in ALERT_STATUSES:
+            counters[f"alerts.status.{status}"] = 0
+        for severity in ALERT_SEVERITIES:
+            counters[f"alerts.active.{severity}"] = 0
+
+        alert_groups = db.query(
+            Alert.status, Alert.severity, func.count(Alert.id)
+        ).group_by(Alert.status, Alert.severity).all()
+
+        for status, severity, count in alert_groups:
+            counters["alerts.total"] += count
+            counters[f"alerts.status.{status}"] = counters.get(f"alerts.status.{status}", 0) + count
+            if status in ACTIVE_ALERT_STATUSES:
+                key = f"alerts.active.{severity}"
+                counters[key] = counters.get(key, 0) + count
+
+        counters.update({"predictions.total": 0, "predictions.threats": 0, "predictions.confidence_sum": 0})
+        for model in PREDICTION_MODELS:
+            counters[f"predictions.model.{model}.total"] = 0
+            counters[f"predictions.model.{model}.threats"] = 0
+
+        prediction_groups = db.query(
+            Prediction.model_type,
+            func.count(Prediction.id),
+            func.sum(Prediction.prediction),
+            func.sum(Prediction.confidence)
+        ).group_by(Prediction.model_type).all()
+
+        for model_type, total, threats, confidence_sum in prediction_groups:
+            model = model_type.lower()
+            counters["predictions.total"] += total
+            counters["predictions.threats"] += int(threats or 0)
+            counters["predictions.confidence_sum"] += float(confidence_sum or 0)
+            counters[f"predictions.model.{model}.total"] = counters.get(f"predictions.model.{model}.total", 0) + total
+            counters[f"predictions.model.{model}.threats"] = (
+                counters.get(f"predictions.model.{model}.threats", 0) + int(threats or 0)
+            )
+
+        return counters
+
+    @classmethod
+    def rebuild(cls, db: Session) -> Dict[str, float]:
+        """
+        Rebuild all counters from the source tables.
+        The DELETE runs first and returns the old values, so SQLite holds the
+        write lock before anything is read: neither the counts nor the drift can
+        miss a concurrent increment, and no read snapshot is ever upgraded to a
+        write (SQLITE_BUSY_SNAPSHOT).
+        Returns the drift (new - old) of counters that changed.
+        """
+        old = dict(db.execute(delete(StatCounter).returning(StatCounter.name, StatCounter.value)).all())
+
+        counters = cls.compute_from_tables(db)
+        db.execute(insert(StatCounter), [{"name": k, "value": v} for k, v in counters.items()])
+        db.commit()
+        cls.invalidate()
+
+        drift = {
+            name: value - old.get(name, 0)
+            for name, value in counters.items()
+            if abs(value - old.get(name, 0)) > 1e-6
+        }
+        if drift and old:
+            logger.warning("Counter drift corrected: %s", drift)
+        if drift:
+            event_bus.publish("counters", {"deltas": drift, "reconciled": True})
+        return drift
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_counters_after_commit(session: Session) -> None:
+    """Drop the cached snapshot and push deltas once changes are visible to other sessions"""
+    deltas = session.info.pop("counter_deltas", None)
+    if deltas:
+        CounterService.invalidate()
+        event_bus.publish("counters", {"deltas": deltas})
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_counters_after_rollback(session: Session) -> None:
+    session.info.pop("counter_deltas", None)
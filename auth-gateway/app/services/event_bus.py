@@ -0,0 +1,138 @@
+"""
+In-process pub/sub bus for pushing alert events to connected clients
+"""
+import json
+import time
+import asyncio
+import threading
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Deque, Dict, List, Optional, Set
+
+# Events kept for clients resuming with Last-Event-ID
+EVENT_BUFFER_SIZE = 1000
+
+# Pending events per subscriber before it is told to resync
+SUBSCRIBER_QUEUE_SIZE = 500
+
+
+@dataclass(frozen=True)
+class Event:
+    id: str
+    seq: int
+    type: str
+    data: str  # JSON encoded
+
+    def to_sse(self) -> str:
+        return f"id: {self.id}\nevent: {self.type}\ndata: {self.data}\n\n"
+
+
+class Subscriber:
+    def __init__(self):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self.overflowed = False
+
+    def offer(self, event: Event) -> None:
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Slow client: drop events and ask it to refetch state
+            self.overflowed = True
+
+
+class EventBus:
+    """
+    Publishers may run on the event loop or in worker threads (background
+    tasks, threadpool endpoints); delivery always happens on the loop.
+    Event ids are "<epoch>-<seq>" so ids from a previous process are
+    recognised as stale after a restart.
+    """
+
+    def __init__(self, buffer_size: int = EVENT_BUFFER_SIZE):
+        self._epoch = format(int(time.time()), "x")
+        self._seq = 0
+        self._buffer: Deque[Event] = deque(maxlen=buffer_size)
+        self._subscribers: Set[Subscriber] = set()
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def publish(self, event_type: str, data: Dict[str, Any]) -> Event:
+        with self._lock:
+            self._seq += 1
+            event = Event(f"{self._epoch}-{self._seq}", self._seq, event_type, json.dumps(data, default=str))
+            self._buffer.append(event)
+            subscribers = list(self._subscribers)
+
+        loop = self._loop
+        if not subscribers or loop is None or loop.is_closed():
+            return event
+
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+
+        if running is loop:
+            self._deliver(event, subscribers)
+        else:
+            loop.call_soon_threadsafe(self._deliver, event, subscribers)
+        return event
+
+    @staticmethod
+    def _deliver(event: Event, subscribers: List[Subscriber]) -> None:
+        for subscriber in subscribers:
+            subscriber.offer(event)
+
+    def subscribe(self) -> Subscriber:
+        """Register a subscriber (must be called from the event loop)"""
+        subscriber = Subscriber()
+        with self._lock:
+            self._loop = asyncio.get_running_loop()
+            self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def replay(self, last_event_id: Optional[str]) -> Optional[List[Event]]:
+        """
+        Events published after last_event_id.
+        Returns None when the id is unknown or already evicted from the buffer,
+        meaning the client has to resync its state.
+        """
+        if not last_event_id:
+            return []
+
+        try:
+            epoch, seq = last_event_id.rsplit("-", 1)
+            seq = int(seq)
+        except ValueError:
+            return None
+
+        with self._lock:
+            if epoch != self._epoch or seq > self._seq:
+                return None
+            if seq == self._seq:
+                return []
+            events = list(self._buffer)
+
+        if not events or events[0].seq > seq + 1:
+            return None
+        return [event for event in events if event.seq > seq]
+
+    def buffered_events(self) -> List[Event]:
+        """Events kept for replay (memory diagnostics)"""
+        with self._lock:
+            return list(self._buffer)
+
+    @property
+    def last_event_id(self) -> str:
+        return f"{self._epoch}-{self._seq}"
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+
+event_bus = EventBus()
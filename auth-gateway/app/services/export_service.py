@@ -0,0 +1,252 @@
+"""
+Streaming export of report results (CSV, Parquet, JSON Lines)
+"""
+import io
+import os
+from typing import Iterator, Optional, Tuple
+import pandas as pd
+from sqlalchemy import select
+from sqlalchemy.orm import Session, defer
+
+from ..database import ReadSessionLocal
+from ..models.report import Report
+from ..models.report_result import ReportResult
+from ..models.file import UploadedFile
+from .file_service import FileService
+from .report_service import ReportService
+
+# Rows read from the input file and the results table per step
+EXPORT_CHUNK_SIZE = 10000
+
+# Result columns appended after the original input columns
+RESULT_COLUMNS = [
+    ("is_threat", "prediction_is_threat"),
+    ("label", "prediction_label"),
+    ("confidence", "prediction_confidence"),
+    ("risk_level", "prediction_risk_level"),
+    ("risk_score", "prediction_risk_score"),
+    ("attack_type", "prediction_attack_type"),
+]
+
+EXPORT_FORMATS = {
+    "csv": ("text/csv", "csv"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+    "jsonl": ("application/x-ndjson", "jsonl"),
+}
+
+
+class ExportService:
+
+    @classmethod
+    def prepare_export(cls, report_id: int, export_format: str, db: Session) -> Tuple[Iterator[bytes], str, str]:
+        """
+        Validate the export request and build the byte stream.
+        Returns (stream, media_type, filename).
+        """
+        if export_format not in EXPORT_FORMATS:
+            raise ValueError(f"Invalid format. Allowed: {sorted(EXPORT_FORMATS)}")
+
+        if export_format == "parquet":
+            try:
+                import pyarrow  # noqa: F401
+            except ImportError:
+                raise ValueError("Parquet export requires pyarrow")
+
+        report = db.query(Report).options(defer(Report.results_json)).filter(Report.id == report_id).first()
+        if not report:
+            raise LookupError("Report not found")
+        if report.status != "completed":
+            raise ValueError("Only completed reports can be exported")
+
+        # Legacy reports keep their rows in results_json until first access
+        ReportService.ensure_results_table(report, db)
+
+        file_path = None
+        if report.file_id:
+            db_file = db.query(UploadedFile).filter(UploadedFile.id == report.file_id).first()
+            if db_file and os.path.exists(db_file.file_path):
+                file_path = db_file.file_path
+
+        media_type, extension = EXPORT_FORMATS[export_format]
+        writers = {
+            "csv": cls._stream_csv,
+            "parquet": cls._stream_parquet,
+            "jsonl": cls._stream_jsonl,
+        }
+        stream = writers[export_format](report.id, file_path)
+        return stream, media_type, f"report_{report.id}.{extension}"
+
+    @classmethod
+    def _iter_chunks(cls, report_id: int, file_path: Optional[str]) -> Iterator[pd.DataFrame]:
+        """
+        Yield DataFrames of original input columns joined with stored results.
+        Uses its own read-only session: the stream outlives the request-scoped one.
+        """
+        db = ReadSessionLocal()
+        try:
+            if file_path:
+                input_chunks = FileService.read_chunks(file_path, EXPORT_CHUNK_SIZE)
+            else:
+                input_chunks = None
+
+            start = 0
+            while True:
+                if input_chunks is not None:
+                    inputs = next(input_chunks, None)
+                    if inputs is None:
+                        return
+                    end = start + len(inputs)
+                else:
+                    inputs = None
+                    end = start + EXPORT_CHUNK_SIZE
+
+                results = cls._load_results(report_id, start, end, db)
+                if inputs is None and results.empty:
+                    return
+
+                index = pd.RangeIndex(start, end if inputs is not None else start + len(results))
+                results = results.reindex(index)
+                if inputs is not None:
+                    inputs.index = index
+                    chunk = pd.concat([inputs, results], axis=1)
+                else:
+                    chunk = results
+                chunk.insert(0, "row_index", index)
+
+                yield chunk
+                start = end
+        finally:
+            db.close()
+
+    @classmethod
+    def _load_results(cls, report_id: int, start: int, end: int, db: Session) -> pd.DataFrame:
+        """Load result rows [start, end) indexed by row_index"""
+        columns = [getattr(ReportResult, name) for name, _ in RESULT_COLUMNS]
+        rows = db.execute(
+            select(ReportResult.row_index, *columns)
+            .where(
+                ReportResult.report_id == report_id,
+                ReportResult.row_index >= start,
+                ReportResult.row_index < end
+            )
+            .order_by(ReportResult.row_index)
+        ).all()
+        df = pd.DataFrame(rows, columns=["row_index"] + [alias for _, alias in RESULT_COLUMNS])
+        return df.set_index("row_index")
+
+    @classmethod
+    def _stream_csv(cls, report_id: int, file_path: Optional[str]) -> Iterator[bytes]:
+        header = True
+        for chunk in cls._iter_chunks(report_id, file_path):
+            yield chunk.to_csv(index=False, header=header).encode("utf-8")
+            header = False
+
+    @classmethod
+    def _stream_jsonl(cls, report_id: int, file_path: Optional[str]) -> Iterator[bytes]:
+        for chunk in cls._iter_chunks(report_id, file_path):
+            yield chunk.to_json(orient="records", lines=True, date_format="iso").encode("utf-8")
+
+    @classmethod
+    def _stream_parquet(cls, report_id: int, file_path: Optional[str]) -> Iterator[bytes]:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        result_types = {
+            "prediction_is_threat": pa.bool_(),
+            "prediction_label": pa.string(),
+            "prediction_confidence": pa.float64(),
+            "prediction_risk_level": pa.string(),
+            "prediction_risk_score": pa.float64(),
+            "prediction_attack_type": pa.string(),
+        }
+        # Settled before the first byte goes out: a type change in a later
+        # chunk would otherwise fail mid-stream and truncate the file
+        input_types = cls._input_types(file_path) if file_path else {}
+
+        sink = io.BytesIO()
+        writer = None
+        try:
+            for chunk in cls._iter_chunks(report_id, file_path):
+                for column, arrow_type in input_types.items():
+                    chunk[column] = cls._cast_column(chunk[column], arrow_type)
+
+                if writer is None:
+                    inferred = pa.Schema.from_pandas(chunk, preserve_index=False)
+                    fields = []
+                    for field in inferred:
+                        if field.name in result_types:
+                            fields.append(pa.field(field.name, result_types[field.name]))
+                        elif field.name in input_types:
+                            fields.append(pa.field(field.name, input_types[field.name]))
+                        else:
+                            fields.append(field)
+                    schema = pa.schema(fields)
+                    writer = pq.ParquetWriter(sink, schema)
+
+                # One row group per chunk, flushed to the client right away
+                writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+                yield cls._drain(sink)
+
+            if writer is not None:
+                writer.close()
+                writer = None
+                yield cls._drain(sink)
+        finally:
+            if writer is not None:
+                writer.close()
+
+    @classmethod
+    def _input_types(cls, file_path: str) -> dict:
+        """
+        Arrow type of each input column agreed over every chunk of the file.
+        Readers infer dtypes per chunk, so a column can be int64 in one chunk
+        and float64, object or all-null in another. Integers mixed with floats
+        or nulls widen to float64, anything else mixed (or all-null) to string.
+        """
+        import pyarrow as pa
+
+        kinds = {}
+        for chunk in FileService.read_chunks(file_path, EXPORT_CHUNK_SIZE):
+            for column, series in chunk.items():
+                kinds.setdefault(column, set()).add(cls._kind(series))
+
+        types = {}
+        for column, seen in kinds.items():
+            if seen == {"int"}:
+                types[column] = pa.int64()
+            elif seen == {"bool"}:
+                types[column] = pa.bool_()
+            elif seen & {"int", "float"} and seen <= {"int", "float", "null"}:
+                types[column] = pa.float64()
+            else:
+                types[column] = pa.string()
+        return types
+
+    @staticmethod
+    def _kind(series: pd.Series) -> str:
+        if series.isna().all():
+            return "null"
+        if pd.api.types.is_bool_dtype(series):
+            return "bool"
+        if pd.api.types.is_integer_dtype(series):
+            return "int"
+        if pd.api.types.is_float_dtype(series):
+            return "float"
+        return "string"
+
+    @staticmethod
+    def _cast_column(series: pd.Series, arrow_type) -> pd.Series:
+        import pyarrow as pa
+
+        if pa.types.is_floating(arrow_type):
+            return series.astype("float64")
+        if pa.types.is_string(arrow_type):
+            return series.map(str, na_action="ignore").astype(object)
+        return series
+
+    @staticmethod
+    def _drain(sink: io.BytesIO) -> bytes:
+        data = sink.getvalue()
+        sink.seek(0)
+        sink.truncate(0)
+        return data
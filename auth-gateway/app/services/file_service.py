@@ -3,13 +3,17 @@ File upload and management service
 """
 import os
 import json
-import uuid
-from typing import List, Optional
+import hashlib
+import tempfile
+from typing import Callable, Iterator, List, Optional, Tuple
 import pandas as pd
 from fastapi import UploadFile
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from ..config import get_settings
+from ..database import run_blocking, run_in_session
 from ..models.file import UploadedFile
 from .column_detector import ColumnDetector
 
@@ -30,20 +34,14 @@ class FileService:
         cls,
         file: UploadFile,
         user_id: int,
-        db: Session
+        db: AsyncSession
     ) -> UploadedFile:
-        """Save uploaded file and create database record"""
+        """Save uploaded file and create its database record (db: read session; the writer stores it)"""
         # Validate extension
         if not cls.validate_file(file.filename):
             raise ValueError(f"Invalid file type. Allowed: {cls.ALLOWED_EXTENSIONS}")
 
-        # Generate unique filename
         ext = os.path.splitext(file.filename)[1].lower()
-        unique_filename = f"{uuid.uuid4()}{ext}"
-
-        # Ensure upload directory exists
-        os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
-        file_path = os.path.join(settings.UPLOAD_DIR, unique_filename)
 
         # Save file
         content = await file.read()
@@ -53,36 +51,88 @@ class FileService:
         if len(content) > max_size:
             raise ValueError(f"File too large. Max size: {settings.MAX_FILE_SIZE_MB}MB")
 
-        with open(file_path, "wb") as f:
-            f.write(content)
+        # Content-addressed: identical uploads share one stored file (and so hit
+        # the same prediction cache entries when reports are generated again)
+        digest = await run_blocking(cls._content_digest, content)
+        stored_filename = f"{digest}{ext}"
+        file_path = os.path.join(settings.UPLOAD_DIR, stored_filename)
 
-        # Read file to get metadata
-        try:
-            df = cls.read_file(file_path)
-            columns = df.columns.tolist()
-            row_count = len(df)
-            detected_model = ColumnDetector.detect_model(columns)
-        except Exception as e:
-            # Clean up file if reading fails
-            os.remove(file_path)
-            raise ValueError(f"Error reading file: {str(e)}")
+        previous = await db.scalar(
+            select(UploadedFile).where(
+                UploadedFile.content_sha256 == digest,
+                UploadedFile.file_path == file_path
+            ).order_by(UploadedFile.id.desc()).limit(1)
+        )
+        if previous is not None and os.path.exists(file_path):
+            # Same bytes were parsed before: reuse their metadata instead of parsing again
+            columns = json.loads(previous.columns_json) if previous.columns_json else []
+            row_count = previous.row_count
+            detected_model = previous.detected_model
+        else:
+            # Writing and parsing run in the blocking pool (pandas holds the GIL for seconds on large files)
+            await run_blocking(cls._write_file, file_path, content)
+
+            # Read file to get metadata
+            try:
+                columns, row_count = await run_blocking(cls._inspect_file, file_path)
+                detected_model = ColumnDetector.detect_model(columns)
+            except Exception as e:
+                # Clean up file if reading fails
+                if not await cls._is_referenced(file_path, db):
+                    os.remove(file_path)
+                raise ValueError(f"Error reading file: {str(e)}")
 
         # Create database record
-        db_file = UploadedFile(
-            filename=unique_filename,
-            original_filename=file.filename,
-            file_path=file_path,
-            uploaded_by=user_id,
-            row_count=row_count,
-            columns_json=json.dumps(columns),
-            detected_model=detected_model
-        )
+        return await run_in_session(cls._insert_file, {
+            "filename": stored_filename,
+            "original_filename": file.filename,
+            "file_path": file_path,
+            "uploaded_by": user_id,
+            "row_count": row_count,
+            "columns_json": json.dumps(columns),
+            "detected_model": detected_model,
+            "content_sha256": digest
+        })
+
+    @classmethod
+    def _insert_file(cls, values: dict, db: Session) -> UploadedFile:
+        db_file = UploadedFile(**values)
         db.add(db_file)
         db.commit()
         db.refresh(db_file)
-
         return db_file
 
+    @classmethod
+    def _content_digest(cls, content: bytes) -> str:
+        return hashlib.sha256(content).hexdigest()
+
+    @classmethod
+    def _write_file(cls, file_path: str, content: bytes) -> None:
+        """Write through a temporary file so a concurrent identical upload never sees a partial file"""
+        directory = os.path.dirname(file_path) or "."
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".part")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(content)
+            os.replace(tmp_path, file_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    @classmethod
+    async def _is_referenced(cls, file_path: str, db: AsyncSession) -> bool:
+        """Whether an upload record points at the stored file"""
+        query = select(func.count(UploadedFile.id)).where(UploadedFile.file_path == file_path)
+        return bool(await db.scalar(query))
+
+    @classmethod
+    def _inspect_file(cls, file_path: str) -> Tuple[List[str], int]:
+        """Column names and row count of an uploaded file"""
+        df = cls.read_file(file_path)
+        return df.columns.tolist(), len(df)
+
     @classmethod
     def read_file(cls, file_path: str) -> pd.DataFrame:
         """Read CSV or Excel file into DataFrame"""
@@ -95,17 +145,65 @@ class FileService:
             raise ValueError(f"Unsupported file type: {ext}")
 
     @classmethod
-    def get_file_preview(cls, file_id: int, db: Session, num_rows: int = 5) -> dict:
+    def read_chunks(
+        cls,
+        file_path: str,
+        chunk_size: int,
+        usecols: Optional[Callable[[str], bool]] = None
+    ) -> Iterator[pd.DataFrame]:
+        """
+        Read the uploaded file in chunks without loading it whole.
+        usecols, if given, selects columns by name (applied while parsing CSVs).
+        """
+        ext = os.path.splitext(file_path)[1].lower()
+        if ext == ".csv":
+            yield from pd.read_csv(file_path, chunksize=chunk_size, usecols=usecols)
+            return
+
+        if ext == ".xlsx":
+            chunks = cls._read_xlsx_chunks(file_path, chunk_size)
+        else:
+            # Legacy .xls has no streaming reader
+            df = cls.read_file(file_path)
+            chunks = (df.iloc[start:start + chunk_size] for start in range(0, len(df), chunk_size))
+
+        for chunk in chunks:
+            if usecols is not None:
+                chunk = chunk[[c for c in chunk.columns if usecols(c)]]
+            yield chunk
+
+    @classmethod
+    def _read_xlsx_chunks(cls, file_path: str, chunk_size: int) -> Iterator[pd.DataFrame]:
+        from openpyxl import load_workbook
+
+        workbook = load_workbook(file_path, read_only=True, data_only=True)
+        try:
+            rows = workbook.active.iter_rows(values_only=True)
+            header = [str(c) for c in next(rows, ())]
+            buffer = []
+            for row in rows:
+                buffer.append(row)
+                if len(buffer) >= chunk_size:
+                    yield pd.DataFrame(buffer, columns=header)
+                    buffer = []
+            if buffer:
+                yield pd.DataFrame(buffer, columns=header)
+        finally:
+            workbook.close()
+
+    @classmethod
+    async def get_file(cls, file_id: int, db: AsyncSession) -> Optional[UploadedFile]:
+        """Get uploaded file record by ID"""
+        return await db.get(UploadedFile, file_id)
+
+    @classmethod
+    async def get_file_preview(cls, file_id: int, db: AsyncSession, num_rows: int = 5) -> dict:
         """Get preview of file contents"""
-        db_file = db.query(UploadedFile).filter(UploadedFile.id == file_id).first()
+        db_file = await cls.get_file(file_id, db)
         if not db_file:
             raise ValueError("File not found")
 
-        df = cls.read_file(db_file.file_path)
-        preview_df = df.head(num_rows)
-
-        # Convert to list of dicts, handling NaN values
-        preview_rows = preview_df.fillna("").to_dict(orient="records")
+        preview_rows = await run_blocking(cls._read_preview_rows, db_file.file_path, num_rows)
 
         return {
             "id": db_file.id,
@@ -117,42 +215,54 @@ class FileService:
         }
 
     @classmethod
-    def get_file_data(cls, file_id: int, db: Session) -> List[dict]:
-        """Get all data from file as list of dicts"""
-        db_file = db.query(UploadedFile).filter(UploadedFile.id == file_id).first()
-        if not db_file:
-            raise ValueError("File not found")
+    def _read_preview_rows(cls, file_path: str, num_rows: int) -> List[dict]:
+        df = cls.read_file(file_path)
+        # Convert to list of dicts, handling NaN values
+        return df.head(num_rows).fillna("").to_dict(orient="records")
 
-        df = cls.read_file(db_file.file_path)
+    @classmethod
+    def read_records(cls, file_path: str) -> List[dict]:
+        """Get all data from a file as list of dicts (blocking: run it in the blocking pool)"""
+        df = cls.read_file(file_path)
         # Convert to list of dicts, handling NaN values
         return df.fillna("").to_dict(orient="records")
 
     @classmethod
-    def list_files(
+    async def list_files(
         cls,
-        db: Session,
+        db: AsyncSession,
         user_id: Optional[int] = None,
         skip: int = 0,
         limit: int = 100
     ) -> List[UploadedFile]:
         """List uploaded files"""
-        query = db.query(UploadedFile)
+        query = select(UploadedFile)
         if user_id:
-            query = query.filter(UploadedFile.uploaded_by == user_id)
-        return query.order_by(UploadedFile.uploaded_at.desc()).offset(skip).limit(limit).all()
+            query = query.where(UploadedFile.uploaded_by == user_id)
+        query = query.order_by(UploadedFile.uploaded_at.desc()).offset(skip).limit(limit)
+        return (await db.scalars(query)).all()
 
     @classmethod
-    def delete_file(cls, file_id: int, db: Session) -> bool:
+    async def delete_file(cls, file_id: int) -> bool:
         """Delete file and its database record"""
-        db_file = db.query(UploadedFile).filter(UploadedFile.id == file_id).first()
+        return await run_in_session(cls._delete_file, file_id)
+
+    @classmethod
+    def _delete_file(cls, file_id: int, db: Session) -> bool:
+        db_file = db.get(UploadedFile, file_id)
         if not db_file:
             return False
 
-        # Delete physical file
-        if os.path.exists(db_file.file_path):
-            os.remove(db_file.file_path)
-
-        # Delete database record
+        # Delete the record first: the write lock is then held while checking
+        # whether an identical upload still uses the physical file
+        file_path = db_file.file_path
         db.delete(db_file)
+        db.flush()
+        referenced = db.scalar(
+            select(func.count(UploadedFile.id)).where(UploadedFile.file_path == file_path)
+        )
         db.commit()
+
+        if os.path.exists(file_path) and not referenced:
+            os.remove(file_path)
         return True
@@ -0,0 +1,323 @@
+"""
+Incident aggregation: groups repeated alerts by a per-model fingerprint
+"""
+import hashlib
+import json
+import re
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from ..config import get_settings
+from ..models.alert import Alert
+from ..models.incident import Incident
+from ..models.user import User
+from .pagination import KeysetPagination
+
+settings = get_settings()
+
+SEVERITY_RANK = {"medium": 1, "high": 2, "critical": 3}
+
+INCIDENT_TITLES = {
+    "phishing": "Campana de Phishing",
+    "ato": "Account Takeover",
+    "brute_force": "Ataque Brute Force",
+}
+
+# Subject prefixes added by replies and forwards
+_SUBJECT_PREFIX = re.compile(r"^\s*((re|fw|fwd|rv|reenviar)\s*:\s*)+", re.IGNORECASE)
+_DIGITS = re.compile(r"\d+")
+_SPACES = re.compile(r"\s+")
+
+
+class IncidentService:
+
+    @classmethod
+    def fingerprint_key(cls, model_type: str, pred: Dict[str, Any]) -> str:
+        """
+        Readable grouping key for a threat, built from the input fields the
+        alert pipeline stores under pred["input"]:
+        phishing: sender domain + subject template; ato: user + source IP;
+        brute_force: destination port + source.
+        """
+        fields = pred.get("input") or {}
+        if model_type == "phishing":
+            parts = [cls._sender_domain(fields.get("sender", "")), cls._subject_template(fields.get("subject", ""))]
+        elif model_type == "ato":
+            parts = [fields.get("user_id", ""), fields.get("ip_address", "")]
+        elif model_type == "brute_force":
+            source = fields.get("src_ip") or fields.get("source_ip") or ""
+            parts = [cls._number_text(fields.get("dst_port", "")), source]
+        else:
+            parts = []
+
+        if not any(parts):
+            # No input fields (e.g. the uploaded file is gone): group by what the model reported
+            parts = [pred.get("attack_type") or pred.get("label") or ""]
+        return " | ".join(str(part).strip().lower() for part in parts)[:255]
+
+    @classmethod
+    def fingerprint(cls, model_type: str, key: str) -> str:
+        return hashlib.sha1(f"{model_type}\x1f{key}".encode("utf-8")).hexdigest()
+
+    @classmethod
+    def _sender_domain(cls, sender: str) -> str:
+        sender = str(sender).strip().strip("<>").lower()
+        if "<" in sender:
+            sender = sender.rsplit("<", 1)[1].strip(">")
+        return sender.rsplit("@", 1)[1] if "@" in sender else sender
+
+    @classmethod
+    def _subject_template(cls, subject: str) -> str:
+        """Campaign subjects differ in numbers (invoice ids, amounts): keep the template"""
+        template = _SUBJECT_PREFIX.sub("", str(subject))
+        template = _DIGITS.sub("#", template)
+        return _SPACES.sub(" ", template).strip().lower()[:120]
+
+    @classmethod
+    def _number_text(cls, value: Any) -> str:
+        """'443.0' (pandas floats) -> '443'"""
+        try:
+            number = float(value)
+        except (TypeError, ValueError):
+            return str(value)
+        return str(int(number)) if number.is_integer() else str(number)
+
+    @classmethod
+    def assign(
+        cls,
+        model_type: str,
+        rows: List[Dict[str, Any]],
+        predictions: List[Dict[str, Any]],
+        db: Session,
+        now: Optional[datetime] = None
+    ) -> Dict[int, Incident]:
+        """
+        Attach a chunk of alert rows (not yet inserted) to incidents.
+        Joins the newest open incident with the same fingerprint whose last_seen
+        is inside the window, otherwise opens a new one; updates aggregates and
+        sets row["incident_id"]. Returns the touched incidents by id.
+        """
+        now = now or datetime.utcnow()
+        window_start = now - timedelta(minutes=settings.INCIDENT_WINDOW_MINUTES)
+
+        keys = [cls.fingerprint_key(model_type, pred) for pred in predictions]
+        fingerprints = [cls.fingerprint(model_type, key) for key in keys]
+
+        open_incidents: Dict[str, Incident] = {}
+        unique = list(dict.fromkeys(fingerprints))
+        for start in range(0, len(unique), 500):
+            for incident in db.scalars(select(Incident).where(
+                Incident.model_type == model_type,
+                Incident.fingerprint.in_(unique[start:start + 500]),
+                Incident.status == "open",
+                Incident.last_seen >= window_start
+            ).order_by(Incident.last_seen)):
+                # Ascending order: the newest one wins
+                open_incidents[incident.fingerprint] = incident
+
+        created = []
+        for fingerprint, key in dict(zip(fingerprints, keys)).items():
+            if fingerprint not in open_incidents:
+                incident = Incident(
+                    model_type=model_type,
+                    fingerprint=fingerprint,
+                    key=key,
+                    title=f"{INCIDENT_TITLES.get(model_type, 'Amenaza')}: {key}"[:255],
+                    status="open",
+                    alert_count=0,
+                    critical_count=0,
+                    high_count=0,
+                    medium_count=0,
+                    max_severity="medium",
+                    max_confidence=0.0,
+                    first_seen=now,
+                    last_seen=now
+                )
+                open_incidents[fingerprint] = incident
+                created.append(incident)
+        if created:
+            db.add_all(created)
+            db.flush()
+
+        touched: Dict[int, Incident] = {}
+        for row, fingerprint in zip(rows, fingerprints):
+            incident = open_incidents[fingerprint]
+            severity = row["severity"]
+            incident.alert_count += 1
+            setattr(incident, f"{severity}_count", getattr(incident, f"{severity}_count") + 1)
+            if SEVERITY_RANK[severity] > SEVERITY_RANK.get(incident.max_severity, 0):
+                incident.max_severity = severity
+            incident.max_confidence = max(incident.max_confidence, row["confidence"])
+            incident.last_seen = now
+            row["incident_id"] = incident.id
+            touched[incident.id] = incident
+        return touched
+
+    @classmethod
+    def record_samples(cls, incidents: Dict[int, Incident], rows: List[Dict[str, Any]], ids: List[int]) -> None:
+        """Keep the newest member summaries on each incident (compact, bounded)"""
+        new_members: Dict[int, list] = {}
+        for row, alert_id in zip(rows, ids):
+            new_members.setdefault(row["incident_id"], []).append([
+                alert_id, row["report_id"], row["prediction_index"], row["severity"], round(row["confidence"], 2)
+            ])
+        for incident_id, members in new_members.items():
+            incident = incidents[incident_id]
+            sample = json.loads(incident.sample_json) if incident.sample_json else []
+            incident.sample_json = json.dumps((members[::-1] + sample)[:settings.INCIDENT_SAMPLE_SIZE])
+
+    @classmethod
+    def refresh_aggregates(cls, incident_ids: List[int], removed_alert_ids: List[int], db: Session) -> None:
+        """
+        Recompute incidents after member alerts were deleted (caller commits).
+        Incidents left without members are removed.
+        """
+        if not incident_ids:
+            return
+        removed = set(removed_alert_ids)
+        groups: Dict[int, Dict[str, Any]] = {}
+        for incident_id, severity, count, max_confidence in db.execute(
+            select(Alert.incident_id, Alert.severity, func.count(Alert.id), func.max(Alert.confidence))
+            .where(Alert.incident_id.in_(incident_ids))
+            .group_by(Alert.incident_id, Alert.severity)
+        ):
+            group = groups.setdefault(incident_id, {"counts": {}, "max_confidence": 0.0})
+            group["counts"][severity] = count
+            group["max_confidence"] = max(group["max_confidence"], max_confidence or 0.0)
+
+        for incident in db.scalars(select(Incident).where(Incident.id.in_(incident_ids))):
+            group = groups.get(incident.id)
+            if group is None:
+                db.delete(incident)
+                continue
+            counts = group["counts"]
+            incident.alert_count = sum(counts.values())
+            incident.critical_count = counts.get("critical", 0)
+            incident.high_count = counts.get("high", 0)
+            incident.medium_count = counts.get("medium", 0)
+            incident.max_severity = max(counts, key=lambda severity: SEVERITY_RANK.get(severity, 0))
+            incident.max_confidence = group["max_confidence"]
+            if incident.sample_json:
+                sample = json.loads(incident.sample_json)
+                incident.sample_json = json.dumps([member for member in sample if member[0] not in removed])
+
+    @classmethod
+    async def list_incidents(
+        cls,
+        db: AsyncSession,
+        status: Optional[str] = None,
+        model_type: Optional[str] = None,
+        cursor: Optional[str] = None,
+        limit: int = 50
+    ) -> Dict[str, Any]:
+        """List incidents, most recently active first, using keyset pagination"""
+        query = select(Incident)
+        if status:
+            query = query.where(Incident.status == status)
+        if model_type:
+            query = query.where(Incident.model_type == model_type)
+
+        query = KeysetPagination.apply(query, Incident.last_seen, Incident.id, cursor, limit)
+        rows, next_cursor = KeysetPagination.split(
+            (await db.execute(query)).all(), limit, lambda row: row.Incident.id
+        )
+        return {"items": [cls.to_dict(row.Incident) for row in rows], "next_cursor": next_cursor}
+
+    @classmethod
+    async def get_incident(cls, incident_id: int, db: AsyncSession) -> Optional[Dict[str, Any]]:
+        """Get an incident with its newest member summaries"""
+        result = (await db.execute(
+            select(Incident, User.full_name).outerjoin(
+                User, Incident.acknowledged_by == User.id
+            ).where(Incident.id == incident_id)
+        )).first()
+        if not result:
+            return None
+        incident, acknowledger_name = result
+        detail = cls.to_dict(incident)
+        detail["acknowledger_name"] = acknowledger_name
+        detail["sample"] = [
+            {"alert_id": a, "report_id": r, "prediction_index": i, "severity": s, "confidence": c}
+            for a, r, i, s, c in (json.loads(incident.sample_json) if incident.sample_json else [])
+        ]
+        return detail
+
+    @classmethod
+    async def list_members(
+        cls,
+        incident_id: int,
+        db: AsyncSession,
+        cursor: Optional[str] = None,
+        limit: int = 100
+    ) -> Dict[str, Any]:
+        """Member alerts of an incident, newest first"""
+        query = KeysetPagination.apply(
+            select(Alert).where(Alert.incident_id == incident_id), Alert.created_at, Alert.id, cursor, limit
+        )
+        rows, next_cursor = KeysetPagination.split(
+            (await db.execute(query)).all(), limit, lambda row: row.Alert.id
+        )
+        return {"items": [row.Alert for row in rows], "next_cursor": next_cursor}
+
+    @classmethod
+    async def get_stats(cls, db: AsyncSession) -> Dict[str, Any]:
+        """Open incidents by max severity and alerts they group"""
+        rows = (await db.execute(
+            select(Incident.max_severity, func.count(Incident.id), func.sum(Incident.alert_count))
+            .where(Incident.status == "open")
+            .group_by(Incident.max_severity)
+        )).all()
+        by_severity = {"critical": 0, "high": 0, "medium": 0}
+        grouped_alerts = 0
+        for severity, count, alerts in rows:
+            by_severity[severity] = count
+            grouped_alerts += alerts or 0
+        return {"open": sum(by_severity.values()), "by_severity": by_severity, "open_alerts": grouped_alerts}
+
+    @classmethod
+    def acknowledge(cls, incident_ids: List[int], user_id: int, db: Session) -> Dict[str, int]:
+        """Acknowledge whole incidents: the incidents and every member alert"""
+        from .alert_service import AlertService
+
+        incidents = db.scalars(select(Incident).where(
+            Incident.id.in_(incident_ids), Incident.status != "acknowledged"
+        )).all()
+        if not incidents:
+            return {"incidents": 0, "alerts": 0}
+
+        now = datetime.utcnow()
+        for incident in incidents:
+            incident.status = "acknowledged"
+            incident.acknowledged_at = now
+            incident.acknowledged_by = user_id
+
+        ids = [incident.id for incident in incidents]
+        alerts = AlertService.acknowledge_where(
+            db, user_id, Alert.incident_id.in_(ids), event={"incident_ids": ids}
+        )
+        return {"incidents": len(ids), "alerts": alerts}
+
+    @classmethod
+    def to_dict(cls, incident: Incident) -> Dict[str, Any]:
+        return {
+            "id": incident.id,
+            "model_type": incident.model_type,
+            "key": incident.key,
+            "title": incident.title,
+            "status": incident.status,
+            "alert_count": incident.alert_count,
+            "by_severity": {
+                "critical": incident.critical_count,
+                "high": incident.high_count,
+                "medium": incident.medium_count,
+            },
+            "max_severity": incident.max_severity,
+            "max_confidence": incident.max_confidence,
+            "first_seen": incident.first_seen,
+            "last_seen": incident.last_seen,
+            "acknowledged_at": incident.acknowledged_at,
+            "acknowledged_by": incident.acknowledged_by,
+        }
@@ -0,0 +1,83 @@
+"""
+The gateway's metrics, on the shared in-process metrics (service_common/metrics.py):
+SQL statements by engine and statement type, ML API calls, prediction cache
+rows, principal cache lookups and memory diagnostics (service_common/memory.py)
+of the gateway's in-process structures, plus the gateway's request tracer.
+"""
+import time
+from typing import Dict
+
+from sqlalchemy import event
+
+from service_common.memory import MemoryTracker, container_size
+from service_common.metrics import BATCH_SIZE_BUCKETS, Metrics
+from service_common.tracing import Tracer
+
+from ..config import get_settings
+from .event_bus import event_bus
+from .prediction_cache import PredictionCache
+from .principal_cache import principal_cache
+
+settings = get_settings()
+
+gateway_metrics = Metrics(namespace="gateway")
+
+db_query_seconds = gateway_metrics.histogram(
+    "db_query_duration_seconds", "SQL statement latency by engine and statement type", ("engine", "operation")
+)
+ml_api_seconds = gateway_metrics.histogram(
+    "ml_api_request_duration_seconds", "Latency of calls to the ML APIs", ("model_type", "endpoint", "outcome")
+)
+ml_api_rows = gateway_metrics.histogram(
+    "ml_api_batch_rows", "Rows sent per ML API batch call", ("model_type",), buckets=BATCH_SIZE_BUCKETS
+)
+prediction_cache_rows = gateway_metrics.counter(
+    "prediction_cache_rows_total", "Report rows found (hit) or not (miss) in the prediction cache",
+    ("model_type", "result")
+)
+gateway_metrics.callback(
+    "principal_cache_lookups_total", "Authenticated principal lookups by result", "counter",
+    lambda: {("hit",): principal_cache.hits, ("miss",): principal_cache.misses}, ("result",)
+)
+gateway_metrics.callback(
+    "principal_cache_entries", "Principals currently cached", "gauge",
+    lambda: {(): principal_cache.stats()["size"]}
+)
+
+
+# Memory diagnostics (GET /admin/memory; gauges and peak allocation histogram on /metrics)
+gateway_memory = MemoryTracker(gateway_metrics, peak_sample_rate=settings.MEMORY_PEAK_SAMPLE_RATE)
+gateway_memory.register("principal_cache", lambda: container_size(principal_cache.snapshot()))
+gateway_memory.register("event_buffer", lambda: container_size(event_bus.buffered_events()))
+
+
+# Request tracing: sampled requests and report jobs, propagated to the ML APIs by PredictionClient
+gateway_tracer = Tracer("gateway", settings.TRACE_DIR, sample_rate=settings.TRACE_SAMPLE_RATE)
+
+
+def _prediction_cache_size() -> Dict[str, int]:
+    stats = PredictionCache.stats()
+    return {"entries": stats["entries"], "disk_bytes": stats["bytes"]}
+
+
+if settings.PREDICTION_CACHE_ENABLED:
+    gateway_memory.register("prediction_cache", _prediction_cache_size)
+
+
+def instrument_engine(engine, name: str) -> None:
+    """Observe every SQL statement run on the (sync) engine in db_query_seconds"""
+    @event.listens_for(engine, "before_cursor_execute")
+    def _query_started(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _query_finished(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_started"].pop()
+        operation = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "OTHER"
+        db_query_seconds.observe(elapsed, engine=name, operation=operation)
+
+    @event.listens_for(engine, "handle_error")
+    def _query_failed(context):
+        started = context.connection.info.get("query_started") if context.connection is not None else None
+        if started:
+            started.pop()
@@ -4,15 +4,17 @@ Aggregates predictions and alerts by month for reporting
 Timezone: America/La_Paz (UTC-4)
 """
 import json
+from calendar import monthrange
 from datetime import datetime, timedelta
 from zoneinfo import ZoneInfo
-from typing import List, Dict, Optional
-from collections import defaultdict
-from sqlalchemy.orm import Session
-from sqlalchemy import func, extract
+from typing import List, Dict
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, select
 
 from ..models.prediction import Prediction
 from ..models.alert import Alert
+from ..models.daily_rollup import DailyRollup
+from .rollup_service import LA_PAZ_TZ, CONFIDENCE_BUCKETS
 from ..schemas.monthly_report import (
     MonthlyReportResponse,
     Summary,
@@ -30,8 +32,6 @@ from ..schemas.monthly_report import (
     AvailableMonthsResponse,
 )
 
-LA_PAZ_TZ = ZoneInfo("America/La_Paz")
-
 MONTH_NAMES = {
     1: "Enero",
     2: "Febrero",
@@ -75,10 +75,14 @@ BENIGN_PATTERNS = {
 
 class MonthlyReportService:
     @classmethod
-    def get_monthly_report(
-        cls, year: int, month: int, db: Session
+    async def get_monthly_report(
+        cls, year: int, month: int, db: AsyncSession
     ) -> MonthlyReportResponse:
-        """Generate a complete monthly report for the specified month"""
+        """
+        Generate a complete monthly report for the specified month.
+        Counts come from daily_rollups; only alert statuses and top threats
+        are read from the source tables, with bounded grouped/limited queries.
+        """
         # Calculate period bounds in La Paz timezone
         start_date = datetime(year, month, 1, 0, 0, 0, tzinfo=LA_PAZ_TZ)
 
@@ -93,17 +97,24 @@ class MonthlyReportService:
         start_utc = start_date.astimezone(ZoneInfo("UTC"))
         end_utc = end_date.astimezone(ZoneInfo("UTC"))
 
-        # Query predictions for the month
-        predictions = db.query(Prediction).filter(
-            Prediction.created_at >= start_utc,
-            Prediction.created_at <= end_utc
-        ).all()
+        rollups = (await db.scalars(select(DailyRollup).where(
+            DailyRollup.year == year,
+            DailyRollup.month == month
+        ))).all()
 
-        # Query alerts for the month
-        alerts = db.query(Alert).filter(
-            Alert.created_at >= start_utc,
-            Alert.created_at <= end_utc
-        ).all()
+        # Alert status changes after creation, so it is grouped from the alerts table
+        alert_status_counts = dict((await db.execute(
+            select(func.lower(Alert.status), func.count(Alert.id)).where(
+                Alert.created_at >= start_utc,
+                Alert.created_at <= end_utc
+            ).group_by(func.lower(Alert.status))
+        )).all())
+
+        top_threats = (await db.scalars(select(Prediction).where(
+            Prediction.created_at >= start_utc,
+            Prediction.created_at <= end_utc,
+            Prediction.prediction == 1
+        ).order_by(Prediction.confidence.desc()).limit(10))).all()
 
         # Build report
         return cls._build_report(
@@ -111,8 +122,9 @@ class MonthlyReportService:
             month=month,
             start_date=start_date,
             end_date=end_date,
-            predictions=predictions,
-            alerts=alerts,
+            rollups=rollups,
+            alert_status_counts=alert_status_counts,
+            top_threats=top_threats,
         )
 
     @classmethod
@@ -122,20 +134,20 @@ class MonthlyReportService:
         month: int,
         start_date: datetime,
         end_date: datetime,
-        predictions: List[Prediction],
-        alerts: List[Alert],
+        rollups: List[DailyRollup],
+        alert_status_counts: Dict[str, int],
+        top_threats: List[Prediction],
     ) -> MonthlyReportResponse:
-        """Build the complete monthly report from raw data"""
+        """Build the complete monthly report from daily rollups"""
         # Summary
-        total_predictions = len(predictions)
-        threats = [p for p in predictions if p.prediction == 1]
-        benign = [p for p in predictions if p.prediction == 0]
-        threats_detected = len(threats)
-        benign_count = len(benign)
+        total_predictions = sum(r.prediction_count for r in rollups)
+        threats_detected = sum(r.threat_count for r in rollups)
+        benign_count = total_predictions - threats_detected
+        confidence_sum = sum(r.confidence_sum for r in rollups)
 
         threat_rate = (threats_detected / total_predictions * 100) if total_predictions > 0 else 0
         avg_confidence = (
-            sum(p.confidence for p in predictions) / total_predictions * 100
+            confidence_sum / total_predictions * 100
             if total_predictions > 0
             else 0
         )
@@ -148,24 +160,6 @@ class MonthlyReportService:
             avg_confidence=round(avg_confidence, 1),
         )
 
-        # By model
-        by_model = cls._aggregate_by_model(predictions)
-
-        # Alerts
-        alerts_stats = cls._aggregate_alerts(alerts)
-
-        # Daily trend
-        daily_trend = cls._build_daily_trend(year, month, predictions)
-
-        # Confidence distribution
-        confidence_distribution = cls._build_confidence_distribution(predictions)
-
-        # Top threats
-        top_threats = cls._get_top_threats(threats)
-
-        # Benign insights
-        benign_insights = cls._build_benign_insights(benign)
-
         return MonthlyReportResponse(
             year=year,
             month=month,
@@ -176,82 +170,67 @@ class MonthlyReportService:
                 end=end_date.isoformat(),
             ),
             summary=summary,
-            by_model=by_model,
-            alerts=alerts_stats,
-            daily_trend=daily_trend,
-            confidence_distribution=confidence_distribution,
-            top_threats=top_threats,
-            benign_insights=benign_insights,
+            by_model=cls._aggregate_by_model(rollups),
+            alerts=cls._aggregate_alerts(rollups, alert_status_counts),
+            daily_trend=cls._build_daily_trend(year, month, rollups),
+            confidence_distribution=cls._build_confidence_distribution(rollups),
+            top_threats=cls._get_top_threats(top_threats),
+            benign_insights=cls._build_benign_insights(rollups),
         )
 
     @classmethod
-    def _aggregate_by_model(cls, predictions: List[Prediction]) -> Dict[str, ModelStats]:
+    def _aggregate_by_model(cls, rollups: List[DailyRollup]) -> Dict[str, ModelStats]:
         """Aggregate predictions by model type"""
-        models = {"phishing": [], "ato": [], "brute_force": []}
+        totals = {
+            model_type: {"total": 0, "threats": 0, "confidence_sum": 0.0}
+            for model_type in ["phishing", "ato", "brute_force"]
+        }
 
-        for p in predictions:
-            model_type = p.model_type.lower()
-            if model_type in models:
-                models[model_type].append(p)
+        for r in rollups:
+            if r.model_type in totals:
+                totals[r.model_type]["total"] += r.prediction_count
+                totals[r.model_type]["threats"] += r.threat_count
+                totals[r.model_type]["confidence_sum"] += r.confidence_sum
 
         result = {}
-        for model_type, preds in models.items():
-            total = len(preds)
-            threats = len([p for p in preds if p.prediction == 1])
-            benign = total - threats
-            avg_conf = (
-                sum(p.confidence for p in preds) / total * 100 if total > 0 else 0
-            )
+        for model_type, data in totals.items():
+            total = data["total"]
+            avg_conf = data["confidence_sum"] / total * 100 if total > 0 else 0
 
             result[model_type] = ModelStats(
                 total=total,
-                threats=threats,
-                benign=benign,
+                threats=data["threats"],
+                benign=total - data["threats"],
                 avg_confidence=round(avg_conf, 1),
             )
 
         return result
 
     @classmethod
-    def _aggregate_alerts(cls, alerts: List[Alert]) -> AlertsStats:
+    def _aggregate_alerts(
+        cls, rollups: List[DailyRollup], status_counts: Dict[str, int]
+    ) -> AlertsStats:
         """Aggregate alert statistics"""
-        total = len(alerts)
-
-        by_severity = defaultdict(int)
-        by_status = defaultdict(int)
-
-        for alert in alerts:
-            severity = alert.severity.lower() if alert.severity else "medium"
-            status = alert.status.lower() if alert.status else "unread"
-
-            by_severity[severity] += 1
-            by_status[status] += 1
-
         return AlertsStats(
-            total=total,
+            total=sum(r.alert_count for r in rollups),
             by_severity=AlertsBySeverity(
-                critical=by_severity.get("critical", 0),
-                high=by_severity.get("high", 0),
-                medium=by_severity.get("medium", 0),
+                critical=sum(r.alert_critical for r in rollups),
+                high=sum(r.alert_high for r in rollups),
+                medium=sum(r.alert_medium for r in rollups),
             ),
             by_status=AlertsByStatus(
-                unread=by_status.get("unread", 0),
-                read=by_status.get("read", 0),
-                acknowledged=by_status.get("acknowledged", 0),
+                unread=status_counts.get("unread", 0),
+                read=status_counts.get("read", 0),
+                acknowledged=status_counts.get("acknowledged", 0),
             ),
         )
 
     @classmethod
     def _build_daily_trend(
-        cls, year: int, month: int, predictions: List[Prediction]
+        cls, year: int, month: int, rollups: List[DailyRollup]
     ) -> List[DailyTrend]:
         """Build daily trend data for the month"""
-        # Get number of days in month
-        if month == 12:
-            next_month = datetime(year + 1, 1, 1)
-        else:
-            next_month = datetime(year, month + 1, 1)
-        days_in_month = (next_month - datetime(year, month, 1)).days
+        days_in_month = monthrange(year, month)[1]
 
         # Initialize daily counts
         daily_data = {
@@ -259,20 +238,10 @@ class MonthlyReportService:
             for day in range(1, days_in_month + 1)
         }
 
-        # Aggregate by day
-        for p in predictions:
-            # Convert to La Paz timezone for correct day
-            created_at = p.created_at
-            if created_at.tzinfo is None:
-                created_at = created_at.replace(tzinfo=ZoneInfo("UTC"))
-            local_time = created_at.astimezone(LA_PAZ_TZ)
-
-            day = local_time.day
-            if day in daily_data:
-                if p.prediction == 1:
-                    daily_data[day]["threats"] += 1
-                else:
-                    daily_data[day]["benign"] += 1
+        for r in rollups:
+            if r.day in daily_data:
+                daily_data[r.day]["threats"] += r.threat_count
+                daily_data[r.day]["benign"] += r.prediction_count - r.threat_count
 
         # Build trend list
         trend = []
@@ -294,43 +263,24 @@ class MonthlyReportService:
 
     @classmethod
     def _build_confidence_distribution(
-        cls, predictions: List[Prediction]
+        cls, rollups: List[DailyRollup]
     ) -> List[ConfidenceDistribution]:
         """Build confidence distribution histogram buckets"""
-        buckets = {
-            "50-60%": 0,
-            "60-70%": 0,
-            "70-80%": 0,
-            "80-90%": 0,
-            "90-100%": 0,
-        }
-
-        for p in predictions:
-            conf_pct = p.confidence * 100
-            if conf_pct >= 90:
-                buckets["90-100%"] += 1
-            elif conf_pct >= 80:
-                buckets["80-90%"] += 1
-            elif conf_pct >= 70:
-                buckets["70-80%"] += 1
-            elif conf_pct >= 60:
-                buckets["60-70%"] += 1
-            elif conf_pct >= 50:
-                buckets["50-60%"] += 1
-
-        return [
-            ConfidenceDistribution(range=range_str, count=count)
-            for range_str, count in buckets.items()
-        ]
+        distribution = []
+        for lower_bound, column in reversed(CONFIDENCE_BUCKETS):
+            distribution.append(
+                ConfidenceDistribution(
+                    range=f"{lower_bound}-{lower_bound + 10}%",
+                    count=sum(getattr(r, column) for r in rollups),
+                )
+            )
+        return distribution
 
     @classmethod
-    def _get_top_threats(cls, threats: List[Prediction], limit: int = 10) -> List[TopThreat]:
-        """Get top N threats by confidence"""
-        # Sort by confidence descending
-        sorted_threats = sorted(threats, key=lambda p: p.confidence, reverse=True)[:limit]
-
+    def _get_top_threats(cls, threats: List[Prediction]) -> List[TopThreat]:
+        """Format the top threats (already sorted by confidence and limited in SQL)"""
         result = []
-        for p in sorted_threats:
+        for p in threats:
             # Extract explanation summary
             explanation_summary = None
             if p.explanation:
@@ -361,21 +311,16 @@ class MonthlyReportService:
         return result
 
     @classmethod
-    def _build_benign_insights(cls, benign: List[Prediction]) -> BenignInsights:
+    def _build_benign_insights(cls, rollups: List[DailyRollup]) -> BenignInsights:
         """Build insights about benign/legitimate traffic"""
-        by_model = defaultdict(list)
-
-        for p in benign:
-            model_type = p.model_type.lower()
-            by_model[model_type].append(p)
-
         model_insights = {}
+        total_benign = 0
         for model_type in ["phishing", "ato", "brute_force"]:
-            preds = by_model.get(model_type, [])
-            count = len(preds)
-            avg_conf = (
-                sum(p.confidence for p in preds) / count * 100 if count > 0 else 0
-            )
+            model_rollups = [r for r in rollups if r.model_type == model_type]
+            count = sum(r.prediction_count - r.threat_count for r in model_rollups)
+            confidence_sum = sum(r.benign_confidence_sum for r in model_rollups)
+            avg_conf = confidence_sum / count * 100 if count > 0 else 0
+            total_benign += count
 
             # Get patterns for this model
             patterns = BENIGN_PATTERNS.get(model_type, [])[:3]
@@ -387,59 +332,39 @@ class MonthlyReportService:
             )
 
         return BenignInsights(
-            total_benign=len(benign),
+            total_benign=total_benign,
             by_model=model_insights,
         )
 
     @classmethod
-    def get_available_months(cls, db: Session) -> AvailableMonthsResponse:
-        """Get list of months that have data available"""
-        # Get distinct year-month combinations from predictions
-        pred_months = db.query(
-            extract("year", Prediction.created_at).label("year"),
-            extract("month", Prediction.created_at).label("month"),
-            func.count(Prediction.id).label("count"),
-        ).group_by(
-            extract("year", Prediction.created_at),
-            extract("month", Prediction.created_at),
-        ).all()
-
-        # Get distinct year-month combinations from alerts
-        alert_months = db.query(
-            extract("year", Alert.created_at).label("year"),
-            extract("month", Alert.created_at).label("month"),
-            func.count(Alert.id).label("count"),
-        ).group_by(
-            extract("year", Alert.created_at),
-            extract("month", Alert.created_at),
-        ).all()
-
-        # Combine and deduplicate
-        months_data = {}
-        for year, month, count in pred_months:
-            if year and month:
-                key = (int(year), int(month))
-                if key not in months_data:
-                    months_data[key] = {"prediction_count": 0, "alert_count": 0}
-                months_data[key]["prediction_count"] = count
-
-        for year, month, count in alert_months:
-            if year and month:
-                key = (int(year), int(month))
-                if key not in months_data:
-                    months_data[key] = {"prediction_count": 0, "alert_count": 0}
-                months_data[key]["alert_count"] = count
-
-        # Build response
+    async def get_available_months(cls, db: AsyncSession) -> AvailableMonthsResponse:
+        """Get list of months that have data available (from daily rollups)"""
+        rows = (await db.execute(
+            select(
+                DailyRollup.year,
+                DailyRollup.month,
+                func.sum(DailyRollup.prediction_count),
+                func.sum(DailyRollup.alert_count),
+            ).group_by(
+                DailyRollup.year,
+                DailyRollup.month,
+            ).order_by(
+                DailyRollup.year.desc(),
+                DailyRollup.month.desc(),
+            )
+        )).all()
+
         months = []
-        for (year, month), data in sorted(months_data.items(), reverse=True):
+        for year, month, prediction_count, alert_count in rows:
+            if not prediction_count and not alert_count:
+                continue
             months.append(
                 AvailableMonth(
                     year=year,
                     month=month,
                     month_name=MONTH_NAMES.get(month, str(month)),
-                    prediction_count=data["prediction_count"],
-                    alert_count=data["alert_count"],
+                    prediction_count=prediction_count or 0,
+                    alert_count=alert_count or 0,
                 )
             )
 
@@ -0,0 +1,56 @@
+"""
+Keyset (cursor) pagination for newest-first listings
+"""
+from typing import Any, List, Optional, Tuple
+from sqlalchemy import String, tuple_, type_coerce
+
+# Response header carrying the cursor of the next page
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+class KeysetPagination:
+    """
+    Pages ordered by (created_at DESC, id DESC).
+
+    SQLite stores DateTime columns as text and rows may mix formats
+    ("... 12:00:00" from server defaults, "... 12:00:00.123456" from the ORM),
+    so the cursor keeps the raw stored value and is compared as text, exactly
+    like ORDER BY does. The comparison is a row value, which SQLite resolves
+    with a range scan on the (filter, created_at) indexes instead of OFFSET.
+    The cursor is opaque to clients: "<created_at>:<id>".
+    """
+
+    KEY_LABEL = "_cursor_created_at"
+
+    @classmethod
+    def apply(cls, query, created_column, id_column, cursor: Optional[str], limit: int):
+        """Add the keyset predicate, ordering and limit (+1 row to detect a next page)"""
+        raw_created = type_coerce(created_column, String)
+        if cursor is not None:
+            last_created, last_id = cls.parse_cursor(cursor)
+            query = query.where(tuple_(raw_created, id_column) < tuple_(last_created, last_id))
+        return query.add_columns(raw_created.label(cls.KEY_LABEL)).order_by(
+            created_column.desc(), id_column.desc()
+        ).limit(limit + 1)
+
+    @classmethod
+    def split(cls, rows: List[Any], limit: int, id_of) -> Tuple[List[Any], Optional[str]]:
+        """
+        Trim the extra row and build the next cursor.
+        rows are the Row objects of a query built with apply(); id_of(row) returns its id.
+        """
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        next_cursor = None
+        if has_more and rows:
+            last = rows[-1]
+            next_cursor = f"{getattr(last, cls.KEY_LABEL)}:{id_of(last)}"
+        return rows, next_cursor
+
+    @classmethod
+    def parse_cursor(cls, cursor: str) -> Tuple[str, int]:
+        try:
+            created_at, last_id = cursor.rsplit(":", 1)
+            return created_at, int(last_id)
+        except ValueError:
+            raise ValueError("Invalid cursor")
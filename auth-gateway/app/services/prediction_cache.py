@@ -0,0 +1,162 @@
+"""
+On-disk cache of per-row ML predictions shared across reports
+"""
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List
+
+from ..config import get_settings
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# Models whose prediction is a pure function of the row. The ATO API keeps
+# per-user login history between calls, so the same row can score differently.
+CACHEABLE_MODELS = {"phishing", "brute_force"}
+
+# Keys per IN (...) lookup; SQLite's default variable limit is 32766
+LOOKUP_CHUNK = 500
+
+# Entries deleted per statement while evicting
+EVICT_CHUNK = 1000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key BLOB PRIMARY KEY,
+    value BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    accessed_at REAL NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS ix_entries_accessed_at ON entries (accessed_at);
+CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value INTEGER NOT NULL);
+INSERT OR IGNORE INTO meta (name, value) VALUES ('total_bytes', 0);
+CREATE TRIGGER IF NOT EXISTS entries_size_insert AFTER INSERT ON entries BEGIN
+    UPDATE meta SET value = value + new.size WHERE name = 'total_bytes';
+END;
+CREATE TRIGGER IF NOT EXISTS entries_size_update AFTER UPDATE OF size ON entries BEGIN
+    UPDATE meta SET value = value + new.size - old.size WHERE name = 'total_bytes';
+END;
+CREATE TRIGGER IF NOT EXISTS entries_size_delete AFTER DELETE ON entries BEGIN
+    UPDATE meta SET value = value - old.size WHERE name = 'total_bytes';
+END;
+"""
+
+
+class PredictionCache:
+    """
+    Key-value store in its own SQLite file (not the application database):
+    key = SHA-256 of (model type, model version, normalized record), value =
+    the API's prediction entry, zlib-compressed JSON. When the stored size
+    exceeds PREDICTION_CACHE_MAX_MB, least recently used entries are evicted
+    down to 90% of the limit. Blocking: call it through run_blocking.
+    """
+
+    _initialized_path = None
+    _lock = threading.Lock()
+
+    @classmethod
+    def enabled_for(cls, model_type: str) -> bool:
+        return settings.PREDICTION_CACHE_ENABLED and model_type in CACHEABLE_MODELS
+
+    @classmethod
+    def path(cls) -> str:
+        return os.path.join(settings.PREDICTION_CACHE_DIR, "predictions.db")
+
+    @classmethod
+    @contextmanager
+    def _connect(cls) -> Iterator[sqlite3.Connection]:
+        path = cls.path()
+        if cls._initialized_path != path:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        conn = sqlite3.connect(path, timeout=settings.SQLITE_BUSY_TIMEOUT_MS / 1000)
+        try:
+            if cls._initialized_path != path:
+                with cls._lock:
+                    conn.execute("PRAGMA journal_mode = WAL")
+                    conn.executescript(_SCHEMA)
+                    cls._initialized_path = path
+            conn.execute("PRAGMA synchronous = NORMAL")
+            yield conn
+        finally:
+            conn.close()
+
+    @classmethod
+    def get_many(cls, keys: List[bytes]) -> Dict[bytes, Dict[str, Any]]:
+        """Cached entries for the given keys (misses are absent); hits are marked as recently used"""
+        found: Dict[bytes, Dict[str, Any]] = {}
+        unique = list(dict.fromkeys(keys))
+        with cls._connect() as conn:
+            for start in range(0, len(unique), LOOKUP_CHUNK):
+                chunk = unique[start:start + LOOKUP_CHUNK]
+                placeholders = ",".join("?" * len(chunk))
+                for key, value in conn.execute(
+                    f"SELECT key, value FROM entries WHERE key IN ({placeholders})", chunk
+                ):
+                    found[key] = json.loads(zlib.decompress(value))
+            if found:
+                now = time.time()
+                conn.executemany(
+                    "UPDATE entries SET accessed_at = ? WHERE key = ?", [(now, key) for key in found]
+                )
+                conn.commit()
+        return found
+
+    @classmethod
+    def put_many(cls, entries: Dict[bytes, Dict[str, Any]]) -> None:
+        """Store entries, then evict least recently used ones if over the size limit"""
+        if not entries:
+            return
+        now = time.time()
+        rows = []
+        for key, value in entries.items():
+            blob = zlib.compress(json.dumps(value, separators=(",", ":")).encode("utf-8"), 1)
+            rows.append((key, blob, len(key) + len(blob), now))
+
+        with cls._connect() as conn:
+            conn.executemany(
+                "INSERT INTO entries (key, value, size, accessed_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (key) DO UPDATE SET value = excluded.value, size = excluded.size, "
+                "accessed_at = excluded.accessed_at",
+                rows
+            )
+            conn.commit()
+            cls._evict(conn)
+
+    @classmethod
+    def _evict(cls, conn: sqlite3.Connection) -> None:
+        limit = settings.PREDICTION_CACHE_MAX_MB * 1024 * 1024
+        total = cls._total_bytes(conn)
+        if total <= limit:
+            return
+        target = int(limit * 0.9)
+        evicted = 0
+        while total > target:
+            deleted = conn.execute(
+                "DELETE FROM entries WHERE key IN "
+                "(SELECT key FROM entries ORDER BY accessed_at LIMIT ?)", (EVICT_CHUNK,)
+            ).rowcount
+            conn.commit()
+            if not deleted:
+                break
+            evicted += deleted
+            total = cls._total_bytes(conn)
+        logger.info("Prediction cache: evicted %d entries (%d bytes left)", evicted, total)
+
+    @classmethod
+    def _total_bytes(cls, conn: sqlite3.Connection) -> int:
+        return conn.execute("SELECT value FROM meta WHERE name = 'total_bytes'").fetchone()[0]
+
+    @classmethod
+    def stats(cls) -> Dict[str, int]:
+        with cls._connect() as conn:
+            return {
+                "entries": conn.execute("SELECT count(*) FROM entries").fetchone()[0],
+                "bytes": cls._total_bytes(conn),
+                "max_bytes": settings.PREDICTION_CACHE_MAX_MB * 1024 * 1024,
+            }
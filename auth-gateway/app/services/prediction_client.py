@@ -1,11 +1,23 @@
 """
 Client for calling ML prediction APIs
 """
+import hashlib
+import json
+import logging
+import time
 import httpx
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
+
+from service_common.metrics import stage
+from service_common.tracing import TRACEPARENT_HEADER, current_traceparent, span
+
 from ..config import get_settings
+from ..database import run_blocking
+from .metrics import ml_api_rows, ml_api_seconds, prediction_cache_rows
+from .prediction_cache import PredictionCache
 
 settings = get_settings()
+logger = logging.getLogger(__name__)
 
 
 class PredictionClient:
@@ -15,6 +27,9 @@ class PredictionClient:
         "brute_force": settings.BRUTE_FORCE_API_URL,
     }
 
+    # model_type -> (version, monotonic time it was fetched)
+    _model_versions: Dict[str, Tuple[str, float]] = {}
+
     @classmethod
     async def predict_batch(
         cls,
@@ -30,18 +45,130 @@ class PredictionClient:
             raise ValueError(f"Unknown model type: {model_type}")
 
         endpoint = f"{base_url}/predict/batch"
+        ml_api_rows.observe(len(records), model_type=model_type)
+
+        started = time.perf_counter()
+        outcome = "error"
+        try:
+            with stage("ml_api"):
+                async with httpx.AsyncClient(timeout=timeout) as client:
+                    # Format payload according to each API's expected format
+                    with span("format_payload"):
+                        payload = cls._format_payload(model_type, records)
+                    # The ML API's request span is a child of this one (traceparent)
+                    with span("http", model_type=model_type, rows=len(records)):
+                        traceparent = current_traceparent()
+                        headers = {TRACEPARENT_HEADER: traceparent} if traceparent else None
+                        response = await client.post(endpoint, json=payload, headers=headers)
+                    response.raise_for_status()
+                    with span("decode_response"):
+                        result = response.json()
+            outcome = "ok"
+            return result
+        except httpx.HTTPStatusError as e:
+            raise Exception(f"API error: {e.response.status_code} - {e.response.text}")
+        except httpx.RequestError as e:
+            raise Exception(f"Connection error to {model_type} API: {str(e)}")
+        finally:
+            ml_api_seconds.observe(
+                time.perf_counter() - started, model_type=model_type, endpoint="predict_batch", outcome=outcome
+            )
+
+    @classmethod
+    async def predict_batch_cached(
+        cls,
+        model_type: str,
+        records: List[Dict[str, Any]],
+        timeout: float = 120.0
+    ) -> Optional[Dict[str, Any]]:
+        """
+        predict_batch through the prediction cache: rows already predicted by the
+        same model version (same normalized record) are served from the cache and
+        only the remaining unique rows are sent to the ML API. Predictions come
+        back merged in input order; "cache" reports hits and misses.
+        Falls back to a plain predict_batch when caching does not apply.
+        """
+        if not records or not PredictionCache.enabled_for(model_type):
+            return await cls.predict_batch(model_type, records, timeout)
+        version = await cls.get_model_version(model_type)
+        if version is None:
+            return await cls.predict_batch(model_type, records, timeout)
 
-        async with httpx.AsyncClient(timeout=timeout) as client:
+        with stage("prediction_cache"):
+            keys = await run_blocking(cls._record_keys, model_type, version, records)
+            cached = await run_blocking(PredictionCache.get_many, keys)
+
+        # Rows repeated within the file are sent once
+        missing: Dict[bytes, int] = {}
+        for position, key in enumerate(keys):
+            if key not in cached and key not in missing:
+                missing[key] = position
+
+        response: Dict[str, Any] = {}
+        if missing:
+            response = await cls.predict_batch(model_type, [records[i] for i in missing.values()], timeout)
+            fresh = response.get("predictions", [])
+            if len(fresh) != len(missing):
+                raise Exception(
+                    f"API error: expected {len(missing)} predictions from {model_type} API, got {len(fresh)}"
+                )
+            fresh_by_key = dict(zip(missing, fresh))
+            with stage("prediction_cache"):
+                await run_blocking(PredictionCache.put_many, fresh_by_key)
+            cached.update(fresh_by_key)
+
+        hits = sum(1 for key in keys if key not in missing)
+        prediction_cache_rows.inc(hits, model_type=model_type, result="hit")
+        prediction_cache_rows.inc(len(keys) - hits, model_type=model_type, result="miss")
+        logger.info("Prediction cache %s: %d hits, %d rows sent", model_type, hits, len(missing))
+        return {
+            **response,
+            "predictions": [cached[key] for key in keys],
+            "cache": {"model_version": version, "hits": hits, "misses": len(missing)}
+        }
+
+    @classmethod
+    async def get_model_version(cls, model_type: str) -> Optional[str]:
+        """
+        Version of the model currently served, from /model/info (name, version,
+        training date and registry version, which changes on hot-swap), remembered
+        for MODEL_VERSION_TTL_SECONDS. None if unavailable.
+        """
+        cached = cls._model_versions.get(model_type)
+        if cached and time.monotonic() - cached[1] < settings.MODEL_VERSION_TTL_SECONDS:
+            return cached[0]
+
+        base_url = cls.API_URLS.get(model_type)
+        if not base_url:
+            return None
+        started = time.perf_counter()
+        async with httpx.AsyncClient(timeout=5.0) as client:
             try:
-                # Format payload according to each API's expected format
-                payload = cls._format_payload(model_type, records)
-                response = await client.post(endpoint, json=payload)
+                response = await client.get(f"{base_url}/model/info")
                 response.raise_for_status()
-                return response.json()
-            except httpx.HTTPStatusError as e:
-                raise Exception(f"API error: {e.response.status_code} - {e.response.text}")
-            except httpx.RequestError as e:
-                raise Exception(f"Connection error to {model_type} API: {str(e)}")
+                info = response.json()
+            except (httpx.HTTPError, ValueError):
+                ml_api_seconds.observe(
+                    time.perf_counter() - started, model_type=model_type, endpoint="model_info", outcome="error"
+                )
+                return None
+        ml_api_seconds.observe(time.perf_counter() - started, model_type=model_type, endpoint="model_info", outcome="ok")
+        version = ":".join(str(info.get(field, "")) for field in ("model_name", "model_version", "training_date", "registry_version"))
+        cls._model_versions[model_type] = (version, time.monotonic())
+        return version
+
+    @classmethod
+    def _record_keys(cls, model_type: str, version: str, records: List[Dict[str, Any]]) -> List[bytes]:
+        """Cache keys: SHA-256 of model type, version and the record as sent to the API"""
+        payload = cls._format_payload(model_type, records)
+        normalized = next(iter(payload.values()))
+        prefix = f"{model_type}\x1f{version}\x1f".encode("utf-8")
+        return [
+            hashlib.sha256(
+                prefix + json.dumps(entry, sort_keys=True, separators=(",", ":"), default=str).encode("utf-8")
+            ).digest()
+            for entry in normalized
+        ]
 
     @classmethod
     def _format_payload(cls, model_type: str, records: List[Dict[str, Any]]) -> Dict[str, Any]:
@@ -0,0 +1,156 @@
+"""
+Persistent cache of serialized monthly reports and conditional GET helpers
+"""
+import hashlib
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, Optional, Tuple
+from fastapi import Response
+from sqlalchemy import func, literal, select, tuple_
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from ..config import get_settings
+from ..database import run_in_session
+from ..models.alert import Alert
+from ..models.monthly_report_cache import MonthlyReportCache, MonthlyReportGeneration
+from .monthly_report_service import MonthlyReportService
+from .rollup_service import RollupService, LA_PAZ_TZ
+
+settings = get_settings()
+
+
+class ReportCacheService:
+    """
+    Closed months are cached permanently. The current month expires after
+    MONTHLY_REPORT_CACHE_TTL_SECONDS and is also dropped whenever a prediction
+    or alert lands in it (RollupService) or an alert created in it changes status.
+
+    Every invalidation also bumps the month's generation in the same transaction
+    as the change it reflects. A miss reads the generation before computing and
+    only stores the report if it is unchanged, so a report computed from data an
+    invalidation has since replaced is never stored (closed months would keep it).
+    """
+
+    @classmethod
+    async def get_monthly_report(cls, year: int, month: int, db: AsyncSession) -> Tuple[str, str]:
+        """Return (serialized report, etag), computing and storing it on a miss"""
+        now = datetime.utcnow()
+        entry = await db.get(MonthlyReportCache, (year, month))
+        if entry and (entry.expires_at is None or entry.expires_at > now):
+            return entry.payload, entry.etag
+
+        # Read before the report's queries: a later invalidation changes it
+        generation = await db.scalar(cls._generation_of(year, month))
+        payload = (await MonthlyReportService.get_monthly_report(year, month, db)).model_dump_json()
+        etag = cls.make_etag(payload)
+        expires_at = None if cls._is_closed(year, month) else now + timedelta(
+            seconds=settings.MONTHLY_REPORT_CACHE_TTL_SECONDS
+        )
+
+        # Computed on the (read-only) request session, stored by the writer
+        await run_in_session(cls._store, year, month, generation, {
+            "payload": payload, "etag": etag, "created_at": now, "expires_at": expires_at
+        })
+        return payload, etag
+
+    @classmethod
+    def _generation_of(cls, year: int, month: int):
+        """Scalar select of the month's generation (0 until first invalidated)"""
+        current = select(MonthlyReportGeneration.generation).where(
+            MonthlyReportGeneration.year == year,
+            MonthlyReportGeneration.month == month
+        ).scalar_subquery()
+        return select(func.coalesce(current, 0))
+
+    @classmethod
+    def _store(cls, year: int, month: int, generation: int, values: dict, db: Session) -> bool:
+        """
+        Upsert the report if the month is still at generation, in one statement
+        so no invalidation can commit between the check and the write.
+        Concurrent misses for the same month may race to store it; either wins.
+        Returns whether it was stored.
+        """
+        columns = ["year", "month", *values]
+        row = select(
+            literal(year), literal(month), *(literal(value) for value in values.values())
+        ).where(cls._generation_of(year, month).scalar_subquery() == generation)
+        stmt = insert(MonthlyReportCache).from_select(columns, row)
+        result = db.execute(stmt.on_conflict_do_update(index_elements=["year", "month"], set_=values))
+        db.commit()
+        return result.rowcount > 0
+
+    @classmethod
+    def _is_closed(cls, year: int, month: int) -> bool:
+        """A month is closed once the first local day of the next month has started"""
+        local_now = datetime.now(LA_PAZ_TZ)
+        return (year, month) < (local_now.year, local_now.month)
+
+    @classmethod
+    def invalidate_months(cls, db: Session, months: Iterable[Tuple[int, int]]) -> None:
+        """Drop the cached (year, month)s and bump their generations (caller commits)"""
+        months = sorted(set(months))
+        if not months:
+            return
+        stmt = insert(MonthlyReportGeneration)
+        db.execute(
+            stmt.on_conflict_do_update(
+                index_elements=["year", "month"],
+                set_={"generation": MonthlyReportGeneration.generation + 1}
+            ),
+            [{"year": year, "month": month, "generation": 1} for year, month in months]
+        )
+        db.query(MonthlyReportCache).filter(
+            tuple_(MonthlyReportCache.year, MonthlyReportCache.month).in_(months)
+        ).delete(synchronize_session=False)
+
+    @classmethod
+    def invalidate_all(cls, db: Session) -> None:
+        """Drop every cached month, bumping the generation of each one ever invalidated (caller commits)"""
+        db.query(MonthlyReportGeneration).update(
+            {"generation": MonthlyReportGeneration.generation + 1}, synchronize_session=False
+        )
+        db.query(MonthlyReportCache).delete(synchronize_session=False)
+
+    @classmethod
+    def invalidate_for_alerts(cls, db: Session, *criteria) -> None:
+        """Drop cached months containing alerts matching criteria (caller commits)"""
+        year = RollupService.local_date_part(Alert.created_at, "%Y")
+        month = RollupService.local_date_part(Alert.created_at, "%m")
+        months = db.query(year, month).filter(*criteria).distinct().all()
+        cls.invalidate_months(db, [tuple(row) for row in months])
+
+    @classmethod
+    def invalidate_for_datetime(cls, db: Session, created_at: Optional[datetime]) -> None:
+        """Drop the cached month containing a stored (UTC) timestamp (caller commits)"""
+        if created_at is None:
+            return
+        if created_at.tzinfo is None:
+            created_at = created_at.replace(tzinfo=timezone.utc)
+        local = created_at.astimezone(LA_PAZ_TZ)
+        cls.invalidate_months(db, [(local.year, local.month)])
+
+    # ------------------------------------------------------------------
+    # Conditional GET
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def make_etag(payload: str) -> str:
+        """Strong ETag: SHA-256 of the exact response body"""
+        return '"' + hashlib.sha256(payload.encode("utf-8")).hexdigest() + '"'
+
+    @staticmethod
+    def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+        if not if_none_match:
+            return False
+        if if_none_match.strip() == "*":
+            return True
+        return etag in {tag.strip() for tag in if_none_match.split(",")}
+
+    @classmethod
+    def conditional_response(cls, payload: str, etag: str, if_none_match: Optional[str]) -> Response:
+        """200 with the JSON body, or 304 when the client already has this version"""
+        headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+        if cls.etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers=headers)
+        return Response(content=payload, media_type="application/json", headers=headers)
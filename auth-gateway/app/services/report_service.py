@@ -1,16 +1,42 @@
 """
 Report generation and management service
 """
+import codecs
 import json
-from typing import List, Optional
-from sqlalchemy.orm import Session
+import logging
+from typing import List, Optional, Dict, Any, Iterator
+from sqlalchemy import delete, func, insert, or_, and_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, defer
 
+from service_common.metrics import stage
+from service_common.tracing import annotate
+
+from ..database import SessionLocal, read_engine, run_blocking, run_in_session
 from ..models.report import Report
+from ..models.report_result import ReportResult
 from ..models.file import UploadedFile
 from ..models.user import User
 from .file_service import FileService
+from .metrics import gateway_tracer
 from .prediction_client import PredictionClient
 from .alert_service import AlertService
+from .alert_sync_service import AlertSyncService
+from .pagination import KeysetPagination
+
+logger = logging.getLogger(__name__)
+
+# Rows per INSERT statement when storing report results
+RESULTS_INSERT_CHUNK = 1000
+
+# Rows per transaction in the report pipeline; the writer is released between batches
+RESULTS_COMMIT_BATCH = 10000
+
+# Bytes of a legacy results_json blob read at a time while migrating it
+LEGACY_READ_BYTES = 1 << 20
+
+# Supported orderings for the paginated results endpoint
+RESULT_SORTS = {"row_index", "confidence_desc", "confidence_asc"}
 
 
 class ReportService:
@@ -20,11 +46,16 @@ class ReportService:
         title: str,
         file_id: int,
         user_id: int,
-        db: Session
-    ) -> Report:
-        """Generate a report by running predictions on file data"""
+        db: AsyncSession
+    ) -> int:
+        """
+        Generate a report by running predictions on file data; returns its id.
+        File parsing, result processing and the bulk insert run in the
+        blocking pool; only the ML API call is awaited on the event loop.
+        db is a read session: the writer is only held by run_in_session steps.
+        """
         # Get file info
-        db_file = db.query(UploadedFile).filter(UploadedFile.id == file_id).first()
+        db_file = await FileService.get_file(file_id, db)
         if not db_file:
             raise ValueError("File not found")
 
@@ -32,55 +63,94 @@ class ReportService:
             raise ValueError("Could not detect model type for this file")
 
         # Create report record with pending status
-        report = Report(
-            title=title,
-            model_type=db_file.detected_model,
-            file_id=file_id,
-            created_by=user_id,
-            status="processing",
-            total_records=db_file.row_count,
-            threats_detected=0,
-            benign_count=0
-        )
-        db.add(report)
-        db.commit()
-        db.refresh(report)
+        report_id = await run_in_session(cls._create_report, {
+            "title": title,
+            "model_type": db_file.detected_model,
+            "file_id": file_id,
+            "created_by": user_id,
+            "status": "processing",
+            "total_records": db_file.row_count,
+            "threats_detected": 0,
+            "benign_count": 0
+        })
+        annotate(report_id=report_id, model_type=db_file.detected_model, rows=db_file.row_count)
 
         try:
             # Get file data
-            records = FileService.get_file_data(file_id, db)
+            with stage("read_records"):
+                records = await run_blocking(FileService.read_records, db_file.file_path)
 
-            # Call prediction API
-            result = await PredictionClient.predict_batch(
+            # Call prediction API; rows seen before by the same model version come from the cache
+            result = await PredictionClient.predict_batch_cached(
                 db_file.detected_model,
                 records
             )
 
-            # Process results
-            processed = cls._process_results(db_file.detected_model, result)
+            with stage("store_results"):
+                await run_in_session(cls._complete_report, report_id, db_file.detected_model, result)
+
+        except Exception as e:
+            await run_in_session(cls._fail_report, report_id, str(e))
 
-            # Update report with results
+        return report_id
+
+    @classmethod
+    def _create_report(cls, values: dict, db: Session) -> int:
+        report = Report(**values)
+        db.add(report)
+        db.commit()
+        return report.id
+
+    @classmethod
+    def _fail_report(cls, report_id: int, error: str, db: Session) -> None:
+        db.query(Report).filter(Report.id == report_id).update(
+            {"status": "failed", "results_json": json.dumps({"error": error})},
+            synchronize_session=False
+        )
+        db.commit()
+
+    @classmethod
+    def _complete_report(cls, report_id: int, model_type: str, api_response: dict, db: Session) -> None:
+        """
+        Process the API response and store the rows in batched transactions,
+        releasing the write lock between batches. The report only becomes
+        "completed" with the last commit; partial rows are removed on failure.
+        """
+        processed = cls._process_results(model_type, api_response)
+
+        try:
+            cls._store_results(report_id, processed["results"], db, commit_every=RESULTS_COMMIT_BATCH)
+
+            report = db.get(Report, report_id)
             report.threats_detected = processed["threats_detected"]
             report.benign_count = processed["benign_count"]
             report.avg_confidence = processed["avg_confidence"]
-            report.results_json = json.dumps(processed["results"])
             report.status = "completed"
-
-            # Generate alerts for threats that exceed thresholds
-            AlertService.generate_alerts_from_predictions(
-                model_type=db_file.detected_model,
-                report_id=report.id,
-                predictions=processed["results"],
-                db=db
+            db.commit()
+        except Exception:
+            db.rollback()
+            db.query(ReportResult).filter(ReportResult.report_id == report_id).delete(
+                synchronize_session=False
             )
+            db.commit()
+            raise
 
-        except Exception as e:
-            report.status = "failed"
-            report.results_json = json.dumps({"error": str(e)})
-
-        db.commit()
-        db.refresh(report)
-        return report
+    @classmethod
+    def process_report_alerts(cls, report_id: int, traceparent: Optional[str] = None) -> None:
+        """
+        Background step of the report pipeline: generate alerts for a completed report.
+        Runs after the response is sent, so it opens its own session; traceparent
+        continues the trace of the request that generated the report.
+        """
+        db = SessionLocal()
+        try:
+            with gateway_tracer.start_trace("report_alerts", traceparent, report_id=report_id):
+                AlertService.generate_alerts_for_report(report_id, db)
+        except Exception:
+            db.rollback()
+            logger.exception("Alert generation failed for report %s", report_id)
+        finally:
+            db.close()
 
     @classmethod
     def _process_results(cls, model_type: str, api_response: dict) -> dict:
@@ -160,22 +230,300 @@ class ReportService:
         }
 
     @classmethod
-    def list_reports(
+    def _store_results(
+        cls,
+        report_id: int,
+        results: List[Dict[str, Any]],
+        db: Session,
+        commit_every: Optional[int] = None,
+        first_index: int = 0
+    ):
+        """
+        Insert per-row results in chunks (executemany, no ORM objects).
+        With commit_every, a commit follows every that many rows; otherwise the caller commits.
+        first_index is the row_index of results[0].
+        """
+        uncommitted = 0
+        for start in range(0, len(results), RESULTS_INSERT_CHUNK):
+            chunk = results[start:start + RESULTS_INSERT_CHUNK]
+            db.execute(
+                insert(ReportResult),
+                [cls._result_to_row(report_id, first_index + start + offset, r) for offset, r in enumerate(chunk)]
+            )
+            uncommitted += len(chunk)
+            if commit_every and uncommitted >= commit_every:
+                db.commit()
+                uncommitted = 0
+        if commit_every and uncommitted:
+            db.commit()
+
+    @classmethod
+    def _result_to_row(cls, report_id: int, row_index: int, result: Dict[str, Any]) -> dict:
+        """Map a processed result entry to a report_results row"""
+        explanation = result.get("explanation")
+        return {
+            "report_id": report_id,
+            "row_index": row_index,
+            "is_threat": bool(result.get("is_threat", False)),
+            "label": result.get("label"),
+            "confidence": float(result.get("confidence", 0) or 0),
+            "risk_level": result.get("risk_level"),
+            "risk_score": result.get("risk_score"),
+            "attack_type": result.get("attack_type"),
+            "explanation_json": json.dumps(explanation) if explanation else None
+        }
+
+    @classmethod
+    def ensure_results_table(cls, report: Report, db: Session) -> None:
+        """
+        Move legacy results_json blobs into report_results.
+        Reports generated before the results table existed are migrated on first access.
+        The blob is decoded as a stream and stored in batched transactions; partial
+        rows are removed if it turns out not to be a valid results list.
+        """
+        if report.status != "completed":
+            return
+        has_legacy = db.query(Report.id).filter(
+            Report.id == report.id, Report.results_json.isnot(None)
+        ).first()
+        if not has_legacy:
+            return
+
+        already_stored = db.query(ReportResult.id).filter(
+            ReportResult.report_id == report.id
+        ).first()
+        if not already_stored:
+            batch: List[Dict[str, Any]] = []
+            stored = 0
+            try:
+                for result in cls._iter_legacy_results(report.id):
+                    batch.append(result)
+                    if len(batch) >= RESULTS_COMMIT_BATCH:
+                        cls._store_results(report.id, batch, db, commit_every=RESULTS_COMMIT_BATCH, first_index=stored)
+                        stored += len(batch)
+                        batch = []
+                cls._store_results(report.id, batch, db, first_index=stored)
+            except ValueError:
+                db.rollback()
+                db.query(ReportResult).filter(ReportResult.report_id == report.id).delete(
+                    synchronize_session=False
+                )
+                db.commit()
+                return
+        report.results_json = None
+        db.commit()
+
+    @classmethod
+    def _iter_legacy_results(cls, report_id: int) -> Iterator[Any]:
+        """
+        Yield the entries of a report's legacy results_json array.
+        The value is opened once with SQLite's incremental blob I/O, on a read
+        connection so the writer's batch commits do not touch it, and decoded
+        LEGACY_READ_BYTES at a time: it is never fully loaded and every byte
+        is read once. Raises ValueError if it is not a JSON array.
+        """
+        decoder = json.JSONDecoder()
+        utf8 = codecs.getincrementaldecoder("utf-8")()
+        connection = read_engine.raw_connection()
+        blob = connection.driver_connection.blobopen("reports", "results_json", report_id, readonly=True)
+        buffer = ""
+        pos = 0
+        exhausted = False
+
+        def fill() -> bool:
+            nonlocal buffer, pos, exhausted
+            if exhausted:
+                return False
+            data = blob.read(LEGACY_READ_BYTES)
+            exhausted = blob.tell() >= len(blob)
+            # A character split across reads is completed by the next one
+            buffer = buffer[pos:] + utf8.decode(data, final=exhausted)
+            pos = 0
+            return True
+
+        def next_char() -> str:
+            nonlocal pos
+            while True:
+                while pos < len(buffer) and buffer[pos].isspace():
+                    pos += 1
+                if pos < len(buffer):
+                    return buffer[pos]
+                if not fill():
+                    raise ValueError("results_json ended before the closing bracket")
+
+        try:
+            if next_char() != "[":
+                raise ValueError("results_json is not a list")
+            pos += 1
+            while True:
+                char = next_char()
+                if char == "]":
+                    return
+                if char == ",":
+                    pos += 1
+                    continue
+                try:
+                    item, end = decoder.raw_decode(buffer, pos)
+                except json.JSONDecodeError:
+                    # Most likely an entry cut at the read boundary
+                    if not fill():
+                        raise
+                    continue
+                if end == len(buffer) and not exhausted:
+                    # A number at the very end may continue in the next read
+                    fill()
+                    continue
+                pos = end
+                yield item
+        finally:
+            blob.close()
+            connection.close()
+
+    @classmethod
+    def _migrate_legacy_results(cls, report_id: int, db: Session) -> None:
+        report = db.query(Report).options(defer(Report.results_json)).filter(Report.id == report_id).first()
+        if report:
+            cls.ensure_results_table(report, db)
+
+    @classmethod
+    async def get_results_page(
+        cls,
+        report_id: int,
+        db: AsyncSession,
+        cursor: Optional[str] = None,
+        limit: int = 100,
+        threats_only: bool = False,
+        min_confidence: Optional[float] = None,
+        risk_level: Optional[str] = None,
+        sort: str = "row_index",
+        include_explanations: bool = True
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Get one page of report results using keyset pagination.
+        The cursor is opaque to clients: "<row_index>" for file order,
+        "<confidence>:<row_index>" for confidence orderings.
+        """
+        # Only whether a legacy blob is left, never the blob itself
+        report = (await db.execute(
+            select(Report.status, Report.results_json.isnot(None).label("has_legacy")).where(Report.id == report_id)
+        )).first()
+        if not report:
+            return None
+
+        if sort not in RESULT_SORTS:
+            raise ValueError(f"Invalid sort. Allowed: {sorted(RESULT_SORTS)}")
+
+        if report.status == "completed" and report.has_legacy:
+            await run_in_session(cls._migrate_legacy_results, report_id)
+
+        query = select(ReportResult).where(ReportResult.report_id == report_id)
+
+        if threats_only:
+            query = query.where(ReportResult.is_threat.is_(True))
+        if min_confidence is not None:
+            query = query.where(ReportResult.confidence >= min_confidence)
+        if risk_level:
+            query = query.where(ReportResult.risk_level == risk_level)
+
+        if sort == "row_index":
+            if cursor is not None:
+                query = query.where(ReportResult.row_index > cls._parse_index_cursor(cursor))
+            query = query.order_by(ReportResult.row_index)
+        else:
+            descending = sort == "confidence_desc"
+            if cursor is not None:
+                last_confidence, last_index = cls._parse_confidence_cursor(cursor)
+                beyond = (
+                    ReportResult.confidence < last_confidence if descending
+                    else ReportResult.confidence > last_confidence
+                )
+                query = query.where(or_(
+                    beyond,
+                    and_(ReportResult.confidence == last_confidence, ReportResult.row_index > last_index)
+                ))
+            confidence_order = ReportResult.confidence.desc() if descending else ReportResult.confidence
+            query = query.order_by(confidence_order, ReportResult.row_index)
+
+        # Fetch one extra row to know whether there is a next page
+        rows = (await db.scalars(query.limit(limit + 1))).all()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+
+        next_cursor = None
+        if has_more and rows:
+            last = rows[-1]
+            next_cursor = (
+                str(last.row_index) if sort == "row_index"
+                else f"{last.confidence!r}:{last.row_index}"
+            )
+
+        return {
+            "items": [r.to_dict(include_explanations) for r in rows],
+            "next_cursor": next_cursor
+        }
+
+    @classmethod
+    def _parse_index_cursor(cls, cursor: str) -> int:
+        try:
+            return int(cursor)
+        except ValueError:
+            raise ValueError("Invalid cursor")
+
+    @classmethod
+    def _parse_confidence_cursor(cls, cursor: str) -> tuple:
+        try:
+            confidence, row_index = cursor.rsplit(":", 1)
+            return float(confidence), int(row_index)
+        except ValueError:
+            raise ValueError("Invalid cursor")
+
+    @classmethod
+    def iter_results(
         cls,
+        report_id: int,
         db: Session,
+        chunk_size: int = 1000,
+        include_explanations: bool = True
+    ) -> Iterator[Dict[str, Any]]:
+        """Iterate over all results of a report in file order, one chunk at a time"""
+        last_index = -1
+        while True:
+            rows = db.query(ReportResult).filter(
+                ReportResult.report_id == report_id,
+                ReportResult.row_index > last_index
+            ).order_by(ReportResult.row_index).limit(chunk_size).all()
+            if not rows:
+                return
+            for row in rows:
+                yield row.to_dict(include_explanations)
+            last_index = rows[-1].row_index
+            for row in rows:
+                db.expunge(row)
+
+    @classmethod
+    async def list_reports(
+        cls,
+        db: AsyncSession,
         user_id: Optional[int] = None,
+        cursor: Optional[str] = None,
         skip: int = 0,
         limit: int = 100
-    ) -> List[dict]:
-        """List reports with creator info"""
-        query = db.query(Report, User.full_name).join(
+    ) -> Dict[str, Any]:
+        """List reports with creator info, newest first, using keyset pagination"""
+        query = select(Report, User.full_name).join(
             User, Report.created_by == User.id
         )
+        query = KeysetPagination.apply(query, Report.created_at, Report.id, cursor, limit)
+        if cursor is None and skip:
+            query = query.offset(skip)
 
-        reports = query.order_by(Report.created_at.desc()).offset(skip).limit(limit).all()
+        rows, next_cursor = KeysetPagination.split(
+            (await db.execute(query)).all(), limit, lambda row: row.Report.id
+        )
 
         result = []
-        for report, creator_name in reports:
+        for row in rows:
+            report = row.Report
             result.append({
                 "id": report.id,
                 "title": report.title,
@@ -186,25 +534,36 @@ class ReportService:
                 "benign_count": report.benign_count,
                 "avg_confidence": report.avg_confidence,
                 "status": report.status,
-                "created_by_name": creator_name
+                "created_by_name": row.full_name
             })
 
-        return result
+        return {"items": result, "next_cursor": next_cursor}
 
     @classmethod
-    def get_report(cls, report_id: int, db: Session) -> Optional[dict]:
-        """Get report details with full results"""
-        result = db.query(Report, User.full_name, UploadedFile.original_filename).join(
-            User, Report.created_by == User.id
-        ).outerjoin(
-            UploadedFile, Report.file_id == UploadedFile.id
-        ).filter(Report.id == report_id).first()
+    async def get_report(cls, report_id: int, db: AsyncSession) -> Optional[dict]:
+        """Get report summary (results are served paginated by get_results_page)"""
+        result = (await db.execute(
+            select(Report, User.full_name, UploadedFile.original_filename).join(
+                User, Report.created_by == User.id
+            ).outerjoin(
+                UploadedFile, Report.file_id == UploadedFile.id
+            ).where(Report.id == report_id).options(defer(Report.results_json))
+        )).first()
 
         if not result:
             return None
 
         report, creator_name, file_name = result
 
+        error = None
+        if report.status == "failed":
+            # Failed reports keep only {"error": ...} in results_json
+            failure = await db.scalar(select(Report.results_json).where(Report.id == report_id))
+            try:
+                error = json.loads(failure).get("error") if failure else None
+            except (json.JSONDecodeError, AttributeError):
+                pass
+
         return {
             "id": report.id,
             "title": report.title,
@@ -217,16 +576,25 @@ class ReportService:
             "status": report.status,
             "created_by_name": creator_name,
             "file_name": file_name,
-            "results": json.loads(report.results_json) if report.results_json else None
+            "error": error
         }
 
     @classmethod
-    def delete_report(cls, report_id: int, db: Session) -> bool:
+    async def delete_report(cls, report_id: int) -> bool:
         """Delete a report"""
-        report = db.query(Report).filter(Report.id == report_id).first()
+        return await run_in_session(cls._delete_report, report_id)
+
+    @classmethod
+    def _delete_report(cls, report_id: int, db: Session) -> bool:
+        report = db.get(Report, report_id, options=[defer(Report.results_json)])
         if not report:
             return False
 
+        db.execute(
+            delete(ReportResult).where(ReportResult.report_id == report_id),
+            execution_options={"synchronize_session": False}
+        )
+        db.execute(AlertSyncService.forget(report_id))
         db.delete(report)
         db.commit()
         return True
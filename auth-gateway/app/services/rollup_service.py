@@ -0,0 +1,244 @@
+"""
+Daily rollups of predictions and alerts for monthly reports
+Timezone: America/La_Paz (UTC-4, no DST)
+"""
+from datetime import datetime
+from zoneinfo import ZoneInfo
+from typing import Dict, Optional
+from sqlalchemy import case, cast, func, Integer
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session
+
+from ..models.alert import Alert
+from ..models.daily_rollup import DailyRollup
+from ..models.prediction import Prediction
+
+LA_PAZ_TZ = ZoneInfo("America/La_Paz")
+
+# Confidence histogram columns, lower bound in percent
+CONFIDENCE_BUCKETS = [
+    (90, "conf_90_100"),
+    (80, "conf_80_90"),
+    (70, "conf_70_80"),
+    (60, "conf_60_70"),
+    (50, "conf_50_60"),
+]
+
+COUNTER_COLUMNS = [
+    "prediction_count", "threat_count", "confidence_sum", "benign_confidence_sum",
+    "conf_50_60", "conf_60_70", "conf_70_80", "conf_80_90", "conf_90_100",
+    "alert_count", "alert_critical", "alert_high", "alert_medium",
+]
+
+
+class RollupService:
+
+    @classmethod
+    def _local_day(cls, at: Optional[datetime] = None) -> Dict[str, int]:
+        local = (at or datetime.now(LA_PAZ_TZ)).astimezone(LA_PAZ_TZ)
+        return {"year": local.year, "month": local.month, "day": local.day}
+
+    @classmethod
+    def _sqlite_offset(cls) -> str:
+        """strftime modifier converting stored UTC timestamps to La Paz local time"""
+        offset = datetime.now(LA_PAZ_TZ).utcoffset()
+        hours = int(offset.total_seconds() // 3600)
+        return f"{hours:+d} hours"
+
+    @classmethod
+    def local_date_part(cls, column, fmt: str):
+        """SQL expression for a La Paz local date part ('%Y', '%m', '%d') of a UTC timestamp column"""
+        return cast(func.strftime(fmt, column, cls._sqlite_offset()), Integer)
+
+    @classmethod
+    def _confidence_bucket(cls, confidence: float) -> Optional[str]:
+        confidence_pct = confidence * 100
+        for lower_bound, column in CONFIDENCE_BUCKETS:
+            if confidence_pct >= lower_bound:
+                return column
+        return None
+
+    @classmethod
+    def _upsert(cls, db: Session, rows: list) -> None:
+        """Add counter values to existing rollup rows (caller commits)"""
+        if not rows:
+            return
+        stmt = insert(DailyRollup)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["year", "month", "day", "model_type"],
+            set_={
+                column: getattr(DailyRollup, column) + getattr(stmt.excluded, column)
+                for column in COUNTER_COLUMNS
+            }
+        )
+        # Every row needs every column for executemany
+        full_rows = [{column: 0 for column in COUNTER_COLUMNS} | row for row in rows]
+        db.execute(stmt, full_rows)
+
+        # Cached monthly reports for the touched months are now stale
+        from .report_cache_service import ReportCacheService
+        ReportCacheService.invalidate_months(db, [(row["year"], row["month"]) for row in rows])
+
+    @classmethod
+    def record_prediction(
+        cls,
+        db: Session,
+        model_type: str,
+        prediction: int,
+        confidence: float,
+        at: Optional[datetime] = None
+    ) -> None:
+        """Add one prediction to its local day's rollup"""
+        is_threat = prediction == 1
+        row = {
+            **cls._local_day(at),
+            "model_type": model_type.lower(),
+            "prediction_count": 1,
+            "threat_count": 1 if is_threat else 0,
+            "confidence_sum": confidence,
+            "benign_confidence_sum": 0 if is_threat else confidence,
+        }
+        bucket = cls._confidence_bucket(confidence)
+        if bucket:
+            row[bucket] = 1
+        cls._upsert(db, [row])
+
+    @classmethod
+    def record_alerts(
+        cls,
+        db: Session,
+        model_type: str,
+        by_severity: Dict[str, int],
+        at: Optional[datetime] = None
+    ) -> None:
+        """Add newly created alerts to their local day's rollup"""
+        total = sum(by_severity.values())
+        if not total:
+            return
+        cls._upsert(db, [{
+            **cls._local_day(at),
+            "model_type": model_type.lower(),
+            "alert_count": total,
+            "alert_critical": by_severity.get("critical", 0),
+            "alert_high": by_severity.get("high", 0),
+            "alert_medium": by_severity.get("medium", 0),
+        }])
+
+    @classmethod
+    def remove_alerts(cls, db: Session, *criteria) -> None:
+        """Subtract alerts matching criteria from the days they were created on (before deleting them)"""
+        local_part = cls.local_date_part
+        a_year = local_part(Alert.created_at, "%Y")
+        a_month = local_part(Alert.created_at, "%m")
+        a_day = local_part(Alert.created_at, "%d")
+        a_model = func.lower(Alert.model_type)
+
+        def severity_count(severity):
+            return func.sum(case((func.lower(Alert.severity) == severity, 1), else_=0))
+
+        groups = db.query(
+            a_year, a_month, a_day, a_model,
+            func.count(Alert.id),
+            severity_count("critical"), severity_count("high"), severity_count("medium"),
+        ).filter(*criteria).group_by(a_year, a_month, a_day, a_model).all()
+
+        cls._upsert(db, [
+            {
+                "year": year, "month": month, "day": day, "model_type": model_type,
+                "alert_count": -count,
+                "alert_critical": -(critical or 0),
+                "alert_high": -(high or 0),
+                "alert_medium": -(medium or 0),
+            }
+            for year, month, day, model_type, count, critical, high, medium in groups
+        ])
+
+    @classmethod
+    def is_built(cls, db: Session) -> bool:
+        return db.query(DailyRollup.year).first() is not None
+
+    @classmethod
+    def ensure_built(cls, db: Session) -> None:
+        """Build rollups for databases that predate the rollup table"""
+        if cls.is_built(db):
+            return
+        has_data = (
+            db.query(Prediction.id).first() is not None
+            or db.query(Alert.id).first() is not None
+        )
+        if has_data:
+            cls.rebuild(db)
+
+    @classmethod
+    def rebuild(cls, db: Session) -> None:
+        """Recompute all rollups from the source tables with grouped SQL"""
+        local_part = cls.local_date_part
+
+        db.query(DailyRollup).delete(synchronize_session=False)
+        from .report_cache_service import ReportCacheService
+        ReportCacheService.invalidate_all(db)
+
+        p_year = local_part(Prediction.created_at, "%Y")
+        p_month = local_part(Prediction.created_at, "%m")
+        p_day = local_part(Prediction.created_at, "%d")
+        p_model = func.lower(Prediction.model_type)
+        is_threat = Prediction.prediction == 1
+        confidence_pct = Prediction.confidence * 100
+
+        def bucket_count(lower_bound):
+            return func.sum(case(
+                ((confidence_pct >= lower_bound) & (confidence_pct < lower_bound + 10), 1),
+                else_=0
+            ))
+
+        prediction_groups = db.query(
+            p_year, p_month, p_day, p_model,
+            func.count(Prediction.id),
+            func.sum(case((is_threat, 1), else_=0)),
+            func.sum(Prediction.confidence),
+            func.sum(case((is_threat, 0), else_=Prediction.confidence)),
+            bucket_count(50), bucket_count(60), bucket_count(70), bucket_count(80),
+            func.sum(case((confidence_pct >= 90, 1), else_=0)),
+        ).group_by(p_year, p_month, p_day, p_model).all()
+
+        rows = [
+            {
+                "year": year, "month": month, "day": day, "model_type": model_type,
+                "prediction_count": count,
+                "threat_count": threats or 0,
+                "confidence_sum": confidence_sum or 0,
+                "benign_confidence_sum": benign_confidence_sum or 0,
+                "conf_50_60": c50 or 0, "conf_60_70": c60 or 0, "conf_70_80": c70 or 0,
+                "conf_80_90": c80 or 0, "conf_90_100": c90 or 0,
+            }
+            for (year, month, day, model_type, count, threats, confidence_sum,
+                 benign_confidence_sum, c50, c60, c70, c80, c90) in prediction_groups
+        ]
+        cls._upsert(db, rows)
+
+        a_year = local_part(Alert.created_at, "%Y")
+        a_month = local_part(Alert.created_at, "%m")
+        a_day = local_part(Alert.created_at, "%d")
+        a_model = func.lower(Alert.model_type)
+
+        def severity_count(severity):
+            return func.sum(case((func.lower(Alert.severity) == severity, 1), else_=0))
+
+        alert_groups = db.query(
+            a_year, a_month, a_day, a_model,
+            func.count(Alert.id),
+            severity_count("critical"), severity_count("high"), severity_count("medium"),
+        ).group_by(a_year, a_month, a_day, a_model).all()
+
+        cls._upsert(db, [
+            {
+                "year": year, "month": month, "day": day, "model_type": model_type,
+                "alert_count": count,
+                "alert_critical": critical or 0,
+                "alert_high": high or 0,
+                "alert_medium": medium or 0,
+            }
+            for year, month, day, model_type, count, critical, high, medium in alert_groups
+        ])
+
+        db.commit()
@@ -0,0 +1,181 @@
+"""
+Full-text alert search (SQLite FTS5 index alerts_fts, see migration 3)
+"""
+import os
+from typing import Any, Dict, Iterator, Optional
+import pandas as pd
+from sqlalchemy import Float, Integer, column, func, literal_column, select, table, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..models.alert import Alert
+from .column_detector import ColumnDetector
+from .file_service import FileService
+
+# Input columns (canonical names) copied into an alert's raw data and indexed
+SEARCH_INPUT_FIELDS = {
+    "phishing": ["sender", "subject"],
+    "ato": ["user_id", "ip_address", "country", "region", "city"],
+    "brute_force": ["src_ip", "source_ip", "dst_ip", "destination_ip", "dst_port", "protocol"],
+}
+
+SEARCH_SORTS = {"relevance", "recent"}
+
+# Column weights for bm25: title, description, entities (sender, IP, user...)
+BM25_WEIGHTS = (2.0, 1.0, 4.0)
+
+# Relevance ranks only the newest matches; bm25 over every match of a very
+# common term (a third of the table) would take hundreds of milliseconds
+SEARCH_RANK_WINDOW = 10000
+
+# Rows read per step when looking up input fields
+INPUT_CHUNK_SIZE = 10000
+
+alerts_fts = table("alerts_fts", column("rowid", Integer))
+
+
+class InputFieldReader:
+    """
+    Forward-only lookup of the searchable input fields of an uploaded file.
+    Row indexes must be requested in ascending order (as alerts are generated);
+    only the selected columns are parsed.
+    """
+
+    def __init__(self, model_type: str, file_path: str):
+        wanted = set(SEARCH_INPUT_FIELDS.get(model_type, []))
+        self._chunks: Iterator[pd.DataFrame] = FileService.read_chunks(
+            file_path, INPUT_CHUNK_SIZE,
+            usecols=lambda name: ColumnDetector.canonical_name(name) in wanted
+        )
+        self._chunk: Optional[pd.DataFrame] = None
+        self._start = 0
+
+    def get(self, row_index: int) -> Dict[str, Any]:
+        while self._chunk is None or row_index >= self._start + len(self._chunk):
+            if self._chunk is not None:
+                self._start += len(self._chunk)
+            self._chunk = next(self._chunks, None)
+            if self._chunk is None:
+                return {}
+        if row_index < self._start:
+            return {}
+        row = self._chunk.iloc[row_index - self._start]
+        return {
+            ColumnDetector.canonical_name(name): str(value)
+            for name, value in row.items()
+            if pd.notna(value) and str(value) != ""
+        }
+
+    def close(self) -> None:
+        close = getattr(self._chunks, "close", None)
+        if close is not None:
+            close()
+
+
+class SearchService:
+
+    @classmethod
+    def open_input_reader(cls, model_type: str, file_path: Optional[str]) -> Optional[InputFieldReader]:
+        """Reader for a report's input file, or None when there is nothing to index"""
+        if not file_path or not os.path.exists(file_path) or model_type not in SEARCH_INPUT_FIELDS:
+            return None
+        return InputFieldReader(model_type, file_path)
+
+    @classmethod
+    def build_match_query(cls, q: str) -> str:
+        """
+        Turn user input into an FTS5 query: every term must match, each as a
+        phrase so "example.com" or "10.0.0.1" match their tokens in order.
+        A trailing * keeps prefix matching ("adm*").
+        """
+        terms = []
+        for term in q.split():
+            prefix = term.endswith("*")
+            term = term.rstrip("*").replace('"', '""')
+            if term:
+                terms.append(f'"{term}"*' if prefix else f'"{term}"')
+        if not terms:
+            raise ValueError("Search query is empty")
+        return " ".join(terms)
+
+    @classmethod
+    async def search_alerts(
+        cls,
+        db: AsyncSession,
+        q: str,
+        status: Optional[str] = None,
+        severity: Optional[str] = None,
+        model_type: Optional[str] = None,
+        sort: str = "relevance",
+        cursor: Optional[str] = None,
+        limit: int = 50
+    ) -> Dict[str, Any]:
+        """
+        Search alerts by keyword, sender, domain, IP or user.
+        relevance: bm25 order over the newest SEARCH_RANK_WINDOW matches, cursor "<rank>:<id>";
+        recent: newest first over all matches, cursor "<id>".
+        """
+        if sort not in SEARCH_SORTS:
+            raise ValueError(f"Invalid sort. Allowed: {sorted(SEARCH_SORTS)}")
+
+        fts = literal_column("alerts_fts")
+        rank = func.bm25(fts, *BM25_WEIGHTS, type_=Float)
+        snippet = func.snippet(fts, -1, "[", "]", "...", 12)
+
+        conditions = [fts.op("MATCH")(cls.build_match_query(q))]
+        if status:
+            conditions.append(Alert.status == status)
+        if severity:
+            conditions.append(Alert.severity == severity)
+        if model_type:
+            conditions.append(Alert.model_type == model_type)
+
+        query = select(Alert, rank.label("rank"), snippet.label("snippet")).select_from(
+            alerts_fts
+        ).join(Alert, Alert.id == alerts_fts.c.rowid).where(*conditions)
+
+        if sort == "relevance":
+            # Oldest rowid inside the ranking window (0 when there are fewer matches)
+            window_start = select(alerts_fts.c.rowid).select_from(alerts_fts).join(
+                Alert, Alert.id == alerts_fts.c.rowid
+            ).where(*conditions).order_by(alerts_fts.c.rowid.desc()).offset(
+                SEARCH_RANK_WINDOW - 1
+            ).limit(1).scalar_subquery()
+            query = query.where(alerts_fts.c.rowid >= func.coalesce(window_start, 0))
+            if cursor is not None:
+                last_rank, last_id = cls._parse_rank_cursor(cursor)
+                query = query.where(tuple_(rank, Alert.id) > tuple_(last_rank, last_id))
+            query = query.order_by(rank, Alert.id)
+        else:
+            if cursor is not None:
+                query = query.where(alerts_fts.c.rowid < cls._parse_id_cursor(cursor))
+            # Walks the FTS index backwards by rowid and stops at the limit
+            query = query.order_by(alerts_fts.c.rowid.desc())
+
+        rows = (await db.execute(query.limit(limit + 1))).all()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+
+        next_cursor = None
+        if has_more and rows:
+            last = rows[-1]
+            next_cursor = f"{last.rank!r}:{last.Alert.id}" if sort == "relevance" else str(last.Alert.id)
+
+        return {
+            "items": [{"alert": row.Alert, "rank": row.rank, "snippet": row.snippet} for row in rows],
+            "next_cursor": next_cursor
+        }
+
+    @classmethod
+    def _parse_rank_cursor(cls, cursor: str) -> tuple:
+        try:
+            rank, last_id = cursor.rsplit(":", 1)
+            return float(rank), int(last_id)
+        except ValueError:
+            raise ValueError("Invalid cursor")
+
+    @classmethod
+    def _parse_id_cursor(cls, cursor: str) -> int:
+        try:
+            return int(cursor)
+        except ValueError:
+            raise ValueError("Invalid cursor")
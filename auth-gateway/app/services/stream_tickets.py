@@ -0,0 +1,46 @@
+"""
+Short-lived single-use tickets for opening the alert event stream
+"""
+import secrets
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from ..config import get_settings
+
+settings = get_settings()
+
+
+class StreamTickets:
+    """
+    Browsers cannot set headers on an EventSource, so the stream URL carries a
+    ticket instead of the long-lived JWT (URLs end up in access logs, history
+    and proxies). A ticket names its user, expires after ttl_seconds and is
+    gone once redeemed. Tickets are per process, like the event bus they open.
+    """
+
+    def __init__(self, ttl_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self._tickets: Dict[str, Tuple[float, str]] = {}
+        self._lock = threading.Lock()
+
+    def issue(self, username: str) -> str:
+        ticket = secrets.token_urlsafe(32)
+        now = time.monotonic()
+        with self._lock:
+            # Unredeemed tickets are dropped here, so the dict stays small
+            for key in [key for key, (expires, _) in self._tickets.items() if expires <= now]:
+                del self._tickets[key]
+            self._tickets[ticket] = (now + self.ttl_seconds, username)
+        return ticket
+
+    def redeem(self, ticket: str) -> Optional[str]:
+        """The ticket's username, or None if it is unknown, expired or already used"""
+        with self._lock:
+            entry = self._tickets.pop(ticket, None)
+        if entry is None or entry[0] <= time.monotonic():
+            return None
+        return entry[1]
+
+
+stream_tickets = StreamTickets(ttl_seconds=settings.STREAM_TICKET_TTL_SECONDS)
@@ -0,0 +1,65 @@
+"""
+Shared fixtures for the gateway tests.
+
+Usage:
+    cd auth-gateway && python -m pytest tests
+"""
+import asyncio
+import os
+import sys
+import tempfile
+
+import pytest
+
+# The app reads its settings at import time: point it at a throwaway database first
+_db_dir = tempfile.mkdtemp(prefix="gateway-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_db_dir, 'test.db')}"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import models  # noqa: E402,F401  (registers every table)
+from app.database import AsyncReadSessionLocal, Base, SessionLocal, async_read_engine, engine  # noqa: E402
+
+
+@pytest.fixture
+def db():
+    """Writer session on freshly created tables"""
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+def run_read(func, *args, **kwargs):
+    """Run the coroutine func(*args, <async read session>, **kwargs) to completion"""
+    async def main():
+        try:
+            async with AsyncReadSessionLocal() as session:
+                return await func(*args, session, **kwargs)
+        finally:
+            # Pooled aiosqlite connections belong to this event loop
+            await async_read_engine.dispose()
+    return asyncio.run(main())
+
+
+@pytest.fixture
+def make_alert(db):
+    """Factory inserting a committed alert; fields override the defaults"""
+    from app.models.alert import Alert
+
+    def make(**fields) -> Alert:
+        values = {
+            "title": "Phishing detected",
+            "severity": "high",
+            "status": "unread",
+            "model_type": "phishing",
+            "confidence": 90.0,
+        }
+        alert = Alert(**(values | fields))
+        db.add(alert)
+        db.commit()
+        return alert
+
+    return make
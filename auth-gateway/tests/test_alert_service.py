@@ -0,0 +1,39 @@
+"""
+Alert status changes keep the acknowledgement, counters and cached months consistent.
+"""
+from datetime import datetime
+
+from app.models.monthly_report_cache import MonthlyReportGeneration
+from app.models.stat_counter import StatCounter
+from app.services.alert_service import AlertService
+from app.services.counter_service import CounterService
+
+
+def counters(db):
+    db.expire_all()
+    return {row.name: row.value for row in db.query(StatCounter)}
+
+
+def test_acknowledging_again_keeps_the_first_acknowledgement(db, make_alert):
+    created_at = datetime(2025, 1, 15, 12)
+    alert = make_alert(created_at=created_at)
+    CounterService.rebuild(db)
+
+    first = AlertService.acknowledge_alert(alert.id, user_id=1, db=db)
+    acknowledged_at = first.acknowledged_at
+    after_first = counters(db)
+    generation = db.get(MonthlyReportGeneration, (2025, 1)).generation
+
+    again = AlertService.acknowledge_alert(alert.id, user_id=2, db=db)
+
+    assert again.status == "acknowledged"
+    assert again.acknowledged_by == 1
+    assert again.acknowledged_at == acknowledged_at
+    # No second status change: counters and the cached month are left alone
+    assert counters(db) == after_first
+    assert after_first["alerts.status.acknowledged"] == 1
+    assert db.get(MonthlyReportGeneration, (2025, 1)).generation == generation
+
+
+def test_acknowledging_a_missing_alert_returns_none(db):
+    assert AlertService.acknowledge_alert(12345, user_id=1, db=db) is None
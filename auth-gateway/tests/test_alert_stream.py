@@ -0,0 +1,154 @@
+"""
+Alert stream: single-use ticket authentication, Last-Event-ID replay and resync.
+"""
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from app.models.user import User
+from app.routers import alerts
+from app.services import event_bus as event_bus_module
+from app.services.auth_service import AuthService, create_default_users, get_current_user_for_stream
+from app.services.event_bus import EventBus
+from app.services.principal_cache import principal_cache
+from app.services.stream_tickets import StreamTickets, stream_tickets
+from conftest import run_read
+
+
+def authenticate(header_token=None, ticket=None):
+    return run_read(lambda db: get_current_user_for_stream(header_token=header_token, ticket=ticket, db=db))
+
+
+def test_ticket_is_single_use(db):
+    create_default_users(db)
+    ticket = stream_tickets.issue("analyst")
+
+    assert authenticate(ticket=ticket).username == "analyst"
+    with pytest.raises(HTTPException) as reused:
+        authenticate(ticket=ticket)
+    assert reused.value.status_code == 401
+
+
+def test_ticket_expires(monkeypatch):
+    tickets = StreamTickets(ttl_seconds=30)
+    now = [1000.0]
+    monkeypatch.setattr("app.services.stream_tickets.time.monotonic", lambda: now[0])
+
+    ticket = tickets.issue("analyst")
+    now[0] += 31
+    assert tickets.redeem(ticket) is None
+
+    # Expired tickets are dropped when the next one is issued
+    tickets.issue("admin")
+    tickets.issue("admin")
+    assert len(tickets._tickets) == 2
+
+
+def test_unknown_ticket_and_missing_credentials_are_rejected(db):
+    create_default_users(db)
+    for credentials in ({"ticket": "forged"}, {}):
+        with pytest.raises(HTTPException) as rejected:
+            authenticate(**credentials)
+        assert rejected.value.status_code == 401
+
+
+def test_inactive_user_cannot_redeem_a_ticket(db):
+    create_default_users(db)
+    ticket = stream_tickets.issue("analyst")
+    # Deactivated after the ticket was issued (the users router drops the cached principal)
+    db.query(User).filter(User.username == "analyst").update({"is_active": False})
+    db.commit()
+    principal_cache.invalidate("analyst")
+
+    with pytest.raises(HTTPException) as rejected:
+        authenticate(ticket=ticket)
+    assert rejected.value.status_code == 403
+
+
+def test_bearer_header_still_works_for_non_browser_clients(db):
+    create_default_users(db)
+    token = AuthService.create_access_token({"sub": "admin", "role": "admin"})
+    assert authenticate(header_token=token).username == "admin"
+
+
+class ConnectedRequest:
+    async def is_disconnected(self) -> bool:
+        return False
+
+
+def stream(bus, monkeypatch, last_event_id=None, resume_from=None):
+    """
+    Open the alert stream on bus and return run(body): body(next_chunk) is awaited
+    once the retry hint has been sent, and the connection is closed afterwards.
+    """
+    monkeypatch.setattr(alerts, "event_bus", bus)
+
+    def run(body):
+        async def main():
+            response = await alerts.stream_alerts(
+                ConnectedRequest(), last_event_id=last_event_id, resume_from=resume_from, current_user=None
+            )
+            chunks = response.body_iterator
+
+            async def next_chunk():
+                return await asyncio.wait_for(chunks.__anext__(), timeout=5)
+
+            try:
+                assert await next_chunk() == "retry: 5000\n\n"
+                await body(next_chunk)
+            finally:
+                await chunks.aclose()
+        asyncio.run(main())
+    return run
+
+
+async def expect(next_chunk, chunks):
+    assert [await next_chunk() for _ in chunks] == chunks
+
+
+def test_reconnecting_client_receives_the_events_it_missed(monkeypatch):
+    bus = EventBus()
+    seen = bus.publish("alert.created", {"ids": [1]})
+    missed = [bus.publish("alert.created", {"ids": [2]}), bus.publish("alert.status", {"ids": [1]})]
+
+    async def body(next_chunk):
+        assert [await next_chunk(), await next_chunk()] == [event.to_sse() for event in missed]
+        # Then live events, without repeating the replayed ones
+        live = bus.publish("counters", {"deltas": {"alerts.total": 1}})
+        assert await next_chunk() == live.to_sse()
+
+    stream(bus, monkeypatch, last_event_id=seen.id)(body)
+    # A browser reopening the stream with a new ticket passes the id as a query parameter
+    stream(bus, monkeypatch, resume_from=seen.id)(
+        lambda next_chunk: expect(next_chunk, [event.to_sse() for event in missed])
+    )
+
+
+def test_evicted_or_foreign_event_ids_get_a_resync(monkeypatch):
+    bus = EventBus(buffer_size=2)
+    evicted = bus.publish("alert.created", {"ids": [1]})
+    for i in range(3):
+        bus.publish("alert.created", {"ids": [i + 2]})
+    resync = f"id: {bus.last_event_id}\nevent: resync\ndata: {{}}\n\n"
+
+    # Evicted from the buffer, or from before a restart (another epoch)
+    for last_event_id in (evicted.id, "0-1"):
+        stream(bus, monkeypatch, last_event_id=last_event_id)(lambda next_chunk: expect(next_chunk, [resync]))
+
+
+def test_overflowing_subscriber_is_told_to_resync(monkeypatch):
+    monkeypatch.setattr(event_bus_module, "SUBSCRIBER_QUEUE_SIZE", 3)
+    bus = EventBus()
+
+    async def body(next_chunk):
+        assert await next_chunk() == f"id: {bus.last_event_id}\n\n"
+        # A slow client: more events than its queue holds arrive before it reads
+        for i in range(5):
+            bus.publish("alert.created", {"ids": [i]})
+        assert await next_chunk() == f"id: {bus.last_event_id}\nevent: resync\ndata: {{}}\n\n"
+        # The dropped backlog is superseded by the refetch; live events follow
+        live = bus.publish("alert.status", {"ids": [1]})
+        assert await next_chunk() == live.to_sse()
+
+    stream(bus, monkeypatch)(body)
@@ -0,0 +1,95 @@
+"""
+Alert sync: an interrupted run keeps its committed chunks and resumes from the watermark.
+"""
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.models.alert import Alert
+from app.models.alert_sync_state import AlertSyncState
+from app.models.report import Report
+from app.services.alert_service import AlertService
+from app.services.report_service import ReportService
+
+
+class Crash(BaseException):
+    """The process dies: no except Exception handler runs, the lease is not released"""
+
+
+def phishing_report(db, threats: int) -> int:
+    report = Report(title="Batch", model_type="phishing", status="completed")
+    db.add(report)
+    db.commit()
+    ReportService._store_results(report.id, [
+        {"is_threat": True, "label": "phishing", "confidence": 99.0, "risk_level": "high"}
+        for _ in range(threats)
+    ], db)
+    db.commit()
+    return report.id
+
+
+def fail_on_chunk(monkeypatch, chunk: int, error: BaseException) -> None:
+    original = AlertService.generate_alerts_bulk
+    calls = []
+
+    def generate(*args, **kwargs):
+        calls.append(1)
+        if len(calls) == chunk:
+            raise error
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(AlertService, "generate_alerts_bulk", generate)
+
+
+def sync_state(db, report_id: int) -> AlertSyncState:
+    db.expire_all()
+    return db.get(AlertSyncState, report_id)
+
+
+def alert_rows(db, report_id: int):
+    return [index for (index,) in db.query(Alert.prediction_index).filter(
+        Alert.report_id == report_id
+    ).order_by(Alert.prediction_index)]
+
+
+def test_crashed_run_resumes_from_the_watermark_once_its_lease_expires(db, monkeypatch):
+    report_id = phishing_report(db, threats=5)
+    fail_on_chunk(monkeypatch, chunk=2, error=Crash())
+
+    with pytest.raises(Crash):
+        AlertService.generate_alerts_for_report(report_id, db, chunk_size=2)
+    db.rollback()
+
+    # The first chunk and its watermark were committed together
+    state = sync_state(db, report_id)
+    assert (state.last_row_index, state.alert_count, state.status) == (1, 2, "pending")
+    assert state.lease_until > datetime.utcnow()
+    assert alert_rows(db, report_id) == [0, 1]
+
+    # Nobody else takes over while the crashed run's lease is valid
+    monkeypatch.undo()
+    assert AlertService.generate_alerts_for_report(report_id, db, chunk_size=2)["skipped"] == "locked"
+
+    state.lease_until = datetime.utcnow() - timedelta(seconds=1)
+    db.commit()
+    summary = AlertService.generate_alerts_for_report(report_id, db, chunk_size=2)
+
+    assert summary["created"] == 3
+    assert alert_rows(db, report_id) == [0, 1, 2, 3, 4]
+    state = sync_state(db, report_id)
+    assert (state.last_row_index, state.alert_count, state.status, state.lease_until) == (4, 5, "completed", None)
+    assert AlertService.generate_alerts_for_report(report_id, db)["skipped"] == "up_to_date"
+
+
+def test_failed_run_releases_its_lease_and_the_next_run_resumes(db, monkeypatch):
+    report_id = phishing_report(db, threats=5)
+    fail_on_chunk(monkeypatch, chunk=3, error=RuntimeError("disk full"))
+    with pytest.raises(RuntimeError):
+        AlertService.generate_alerts_for_report(report_id, db, chunk_size=2)
+    monkeypatch.undo()
+
+    state = sync_state(db, report_id)
+    assert (state.last_row_index, state.lease_until) == (3, None)
+
+    assert AlertService.generate_alerts_for_report(report_id, db, chunk_size=2)["created"] == 1
+    assert alert_rows(db, report_id) == [0, 1, 2, 3, 4]
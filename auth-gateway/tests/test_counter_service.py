@@ -0,0 +1,84 @@
+"""
+Materialized counters: incremental updates agree with a rebuild from the tables.
+"""
+from sqlalchemy import event
+
+from app.database import engine
+from app.models.alert import Alert
+from app.models.report import Report
+from app.models.stat_counter import StatCounter
+from app.services.alert_service import AlertService
+from app.services.counter_service import CounterService
+from app.services.report_service import ReportService
+
+
+def counters(db):
+    db.expire_all()
+    values = {row.name: row.value for row in db.query(StatCounter)}
+    db.rollback()
+    return values
+
+
+def rebuilt(db):
+    values = CounterService.compute_from_tables(db)
+    db.rollback()
+    return values
+
+
+def phishing_report(db, confidences) -> int:
+    report = Report(title="Batch", model_type="phishing", status="completed")
+    db.add(report)
+    db.commit()
+    ReportService._store_results(report.id, [
+        {"is_threat": True, "label": "phishing", "confidence": confidence, "risk_level": "high"}
+        for confidence in confidences
+    ], db)
+    db.commit()
+    return report.id
+
+
+def test_counters_match_a_rebuild_after_every_change(db):
+    CounterService.rebuild(db)
+    # Two critical, two high and one medium alert
+    report_id = phishing_report(db, [99.0, 96.0, 90.0, 86.0, 80.0])
+
+    AlertService.generate_alerts_for_report(report_id, db)
+    assert counters(db) == rebuilt(db)
+    assert counters(db)["alerts.active.critical"] == 2
+
+    first = db.query(Alert.id).order_by(Alert.id).first()[0]
+    AlertService.acknowledge_alert(first, user_id=1, db=db)
+    assert counters(db) == rebuilt(db)
+
+    AlertService.mark_all_as_read(db)
+    assert counters(db) == rebuilt(db)
+    assert counters(db)["alerts.status.unread"] == 0
+
+    # Regenerating deletes the report's alerts in chunks before recreating them
+    AlertService.generate_alerts_for_report(report_id, db, chunk_size=2, regenerate=True)
+    assert counters(db) == rebuilt(db)
+    assert counters(db)["alerts.status.unread"] == 5
+
+
+def test_rebuild_deletes_before_reading_and_reports_the_drift(db, make_alert):
+    make_alert(severity="critical")
+    make_alert(severity="medium", status="acknowledged")
+    CounterService.rebuild(db)
+    db.query(StatCounter).filter(StatCounter.name == "alerts.status.unread").update({"value": 7})
+    db.commit()
+
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        drift = CounterService.rebuild(db)
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+    # The write lock is taken before anything is counted
+    assert statements[0].startswith("DELETE FROM stat_counters")
+    assert drift == {"alerts.status.unread": -6}
+    assert counters(db) == rebuilt(db)
@@ -0,0 +1,41 @@
+"""
+Writes from handlers (run_in_session) and from background jobs share the one writer connection.
+"""
+import asyncio
+import threading
+
+from app.database import SessionLocal, engine, run_in_session
+from app.models.stat_counter import StatCounter
+from app.services.counter_service import CounterService
+
+HANDLER_WRITES = 50
+JOB_WRITES = 50
+
+
+def add_prediction(db):
+    CounterService.prediction_created(db, "phishing", 1, 0.5)
+    db.commit()
+
+
+def test_handler_and_background_writes_queue_on_one_connection(db):
+    db.close()
+    assert engine.pool.size() == 1
+
+    def background_job():
+        for _ in range(JOB_WRITES):
+            with SessionLocal() as session:
+                add_prediction(session)
+
+    async def handlers():
+        await asyncio.gather(*(run_in_session(add_prediction) for _ in range(HANDLER_WRITES)))
+
+    job = threading.Thread(target=background_job)
+    job.start()
+    asyncio.run(handlers())
+    job.join()
+
+    # Every write committed: none was lost or failed with "database is locked"
+    with SessionLocal() as session:
+        total = session.get(StatCounter, "predictions.total").value
+    assert total == HANDLER_WRITES + JOB_WRITES
+    assert engine.pool.checkedout() == 0
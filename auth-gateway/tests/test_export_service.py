@@ -0,0 +1,43 @@
+"""
+Streaming export: Parquet schema stays valid when column types change across chunks.
+"""
+import io
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from app.services.export_service import EXPORT_CHUNK_SIZE, ExportService
+
+
+def test_parquet_export_survives_types_changing_across_chunks(db, tmp_path):
+    first, rest = EXPORT_CHUNK_SIZE, 5000
+    rows = first + rest
+    df = pd.DataFrame({
+        "src_port": range(rows),
+        # int64 in the first chunk, float64 afterwards
+        "dst_port": [str(i) for i in range(first)] + [f"{first + i}.5" for i in range(rest)],
+        # all-null in the first chunk, text afterwards
+        "comment": [""] * first + ["note"] * rest,
+        # int64 in the first chunk, text afterwards
+        "protocol": ["6"] * first + ["tcp"] * rest,
+    })
+    path = tmp_path / "traffic.csv"
+    df.to_csv(path, index=False)
+
+    data = b"".join(ExportService._stream_parquet(report_id=1, file_path=str(path)))
+    table = pq.read_table(io.BytesIO(data))
+
+    assert table.num_rows == rows
+    assert table.schema.field("src_port").type == pa.int64()
+    assert table.schema.field("dst_port").type == pa.float64()
+    assert table.schema.field("comment").type == pa.string()
+    assert table.schema.field("protocol").type == pa.string()
+
+    exported = table.to_pandas()
+    assert exported["dst_port"].iloc[first - 1] == first - 1
+    assert exported["dst_port"].iloc[first] == first + 0.5
+    assert exported["comment"].iloc[0] is None
+    assert exported["comment"].iloc[-1] == "note"
+    assert exported["protocol"].iloc[0] == "6"
+    assert exported["protocol"].iloc[-1] == "tcp"
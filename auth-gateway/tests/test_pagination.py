@@ -0,0 +1,91 @@
+"""
+Keyset pagination: ties on the sort key, and the listing index migration.
+"""
+from datetime import datetime
+
+from sqlalchemy import create_engine, inspect, text
+
+from app.database import Base
+from app.migrations import MIGRATIONS, run_migrations
+from app.models.report import Report
+from app.models.report_result import ReportResult
+from app.services.alert_service import AlertService
+from app.services.report_service import ReportService
+from conftest import run_read
+
+
+def pages(fetch, limit):
+    """Every item of a cursor listing, following next_cursor to the last page"""
+    items, cursor = [], None
+    while True:
+        page = fetch(cursor, limit)
+        items.extend(page["items"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return items
+
+
+def test_alert_pages_break_created_at_ties_by_id(db, make_alert):
+    same_time = datetime(2025, 3, 1, 12)
+    ids = [make_alert(created_at=same_time, severity="critical").id for _ in range(23)]
+    make_alert(created_at=same_time, severity="high")
+
+    listed = pages(
+        lambda cursor, limit: run_read(
+            AlertService.list_alerts, status="unread", severity="critical", cursor=cursor, limit=limit
+        ),
+        limit=5,
+    )
+
+    assert [alert.id for alert in listed] == sorted(ids, reverse=True)
+
+
+def test_result_pages_break_confidence_ties_by_row_index(db):
+    report = Report(title="r", model_type="phishing", status="completed")
+    db.add(report)
+    db.commit()
+    confidences = [90.0, 75.5, 90.0, 60.0, 75.5, 90.0, 75.5, 60.0, 90.0, 99.9, 75.5]
+    db.add_all([
+        ReportResult(report_id=report.id, row_index=i, confidence=c, is_threat=c >= 75)
+        for i, c in enumerate(confidences)
+    ])
+    db.commit()
+
+    for sort, descending in (("confidence_desc", True), ("confidence_asc", False)):
+        listed = pages(
+            lambda cursor, limit: run_read(
+                ReportService.get_results_page, report.id, cursor=cursor, limit=limit, sort=sort
+            ),
+            limit=2,
+        )
+        expected = sorted(
+            range(len(confidences)),
+            key=lambda i: (-confidences[i] if descending else confidences[i], i)
+        )
+        assert [row["row_index"] for row in listed] == expected
+
+
+def test_status_severity_index_migration(tmp_path):
+    """A database at version 5 gets the composite index and loses the one it replaces"""
+    old = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    Base.metadata.create_all(bind=old)
+    with old.connect() as conn:
+        conn.execute(text("DROP INDEX ix_alerts_status_severity_created"))
+        conn.execute(text("CREATE INDEX ix_alerts_status_severity ON alerts (status, severity)"))
+        conn.execute(text("PRAGMA user_version = 5"))
+        conn.commit()
+
+    assert run_migrations(old) == MIGRATIONS[-1][0]
+
+    with old.connect() as conn:
+        indexes = {index["name"]: index["column_names"] for index in inspect(conn).get_indexes("alerts")}
+        plan = conn.execute(text(
+            "EXPLAIN QUERY PLAN SELECT id FROM alerts WHERE status = 'unread' AND severity = 'critical' "
+            "AND (created_at, id) < ('2025-01-01', 10) ORDER BY created_at DESC, id DESC LIMIT 10"
+        )).all()
+    assert indexes["ix_alerts_status_severity_created"] == ["status", "severity", "created_at", "id"]
+    assert "ix_alerts_status_severity" not in indexes
+    details = " ".join(row[-1] for row in plan)
+    assert "ix_alerts_status_severity_created" in details
+    assert "TEMP B-TREE" not in details
+    old.dispose()
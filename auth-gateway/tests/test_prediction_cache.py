@@ -0,0 +1,90 @@
+"""
+Prediction cache: LRU eviction by size, and keys that change with the served model version.
+"""
+import asyncio
+
+import pytest
+
+from app.services import prediction_cache
+from app.services.prediction_cache import PredictionCache
+from app.services.prediction_client import PredictionClient
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(prediction_cache.settings, "PREDICTION_CACHE_DIR", str(tmp_path))
+    return tmp_path
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """time.time() for the cache, advancing one second per call"""
+    now = [1000.0]
+
+    def tick() -> float:
+        now[0] += 1
+        return now[0]
+
+    monkeypatch.setattr(prediction_cache.time, "time", tick)
+
+
+def entry(i: int) -> dict:
+    return {"label": "phishing", "confidence": 0.9, "explanation": f"{i:04d}" * 50}
+
+
+def test_least_recently_used_entries_are_evicted_over_the_size_limit(cache_dir, clock, monkeypatch):
+    a, b, c, d = (bytes([i]) * 32 for i in range(4))
+    PredictionCache.put_many({a: entry(0)})
+    PredictionCache.put_many({b: entry(1)})
+    PredictionCache.put_many({c: entry(2)})
+    per_entry = PredictionCache.stats()["bytes"] / 3
+
+    # Room for three and a half entries; a is used again, so b is now the oldest
+    monkeypatch.setattr(prediction_cache.settings, "PREDICTION_CACHE_MAX_MB", per_entry * 3.5 / (1024 * 1024))
+    monkeypatch.setattr(prediction_cache, "EVICT_CHUNK", 1)
+    assert PredictionCache.get_many([a]) == {a: entry(0)}
+    PredictionCache.put_many({d: entry(3)})
+
+    assert set(PredictionCache.get_many([a, b, c, d])) == {a, c, d}
+    stats = PredictionCache.stats()
+    assert stats["entries"] == 3
+    assert stats["bytes"] <= stats["max_bytes"]
+
+
+def test_keys_change_with_the_model_version():
+    records = [{"sender": "billing@example.com", "subject": "Invoice"}]
+    v1 = PredictionClient._record_keys("phishing", "phishing:1.0:2025-01-01:3", records)
+
+    assert PredictionClient._record_keys("phishing", "phishing:1.0:2025-01-01:3", records) == v1
+    assert PredictionClient._record_keys("phishing", "phishing:1.0:2025-01-01:4", records) != v1
+    # Fields the API does not receive are not part of the key
+    assert PredictionClient._record_keys("phishing", "phishing:1.0:2025-01-01:3", [{**records[0], "id": 7}]) == v1
+
+
+def test_hot_swapped_model_does_not_serve_the_previous_predictions(cache_dir, monkeypatch):
+    version = ["phishing:1.0:2025-01-01:3"]
+    sent = []
+
+    async def get_model_version(model_type):
+        return version[0]
+
+    async def predict_batch(model_type, records, timeout=120.0):
+        sent.append(len(records))
+        return {"predictions": [{"label": version[0], "is_threat": True} for _ in records]}
+
+    monkeypatch.setattr(PredictionClient, "get_model_version", get_model_version)
+    monkeypatch.setattr(PredictionClient, "predict_batch", predict_batch)
+    records = [{"sender": "billing@example.com"}, {"sender": "it@corp.test"}, {"sender": "billing@example.com"}]
+
+    def predict():
+        return asyncio.run(PredictionClient.predict_batch_cached("phishing", records))
+
+    assert predict()["cache"]["misses"] == 2
+    assert predict()["cache"] == {"model_version": version[0], "hits": 3, "misses": 0}
+
+    # The registry activates a new version: every row goes back to the API
+    version[0] = "phishing:1.0:2025-01-01:4"
+    result = predict()
+    assert result["cache"]["misses"] == 2
+    assert {p["label"] for p in result["predictions"]} == {version[0]}
+    assert sent == [2, 2]
@@ -0,0 +1,84 @@
+"""
+Principal cache: user changes made through the users router take effect on the next request.
+"""
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from app.models.user import User
+from app.routers import users
+from app.schemas.user import RoleUpdate, UserUpdate
+from app.services.auth_service import AuthService, create_default_users, get_current_user
+from app.services.principal_cache import PrincipalCache, principal_cache
+from conftest import run_read
+
+
+@pytest.fixture
+def accounts(db):
+    """(admin, analyst) ids, with an empty principal cache"""
+    create_default_users(db)
+    ids = tuple(db.query(User.id).filter(User.username == name).scalar() for name in ("admin", "analyst"))
+    db.rollback()
+    principal_cache.invalidate()
+    return ids
+
+
+def principal(username: str) -> User:
+    token = AuthService.create_access_token({"sub": username})
+    return run_read(lambda db: get_current_user(token=token, db=db))
+
+
+def as_admin(handler, *args):
+    return asyncio.run(handler(*args, current_user=principal("admin")))
+
+
+def test_role_change_replaces_the_cached_principal(accounts):
+    _, analyst_id = accounts
+    assert principal("analyst").role == "analyst"
+    hits = principal_cache.hits
+    assert principal("analyst").role == "analyst"
+    assert principal_cache.hits == hits + 1
+
+    as_admin(users.update_user_role, analyst_id, RoleUpdate(role="admin"))
+
+    assert principal("analyst").role == "admin"
+
+
+def test_deactivated_user_is_rejected_on_the_next_request(accounts):
+    _, analyst_id = accounts
+    assert principal("analyst").is_active
+
+    as_admin(users.update_user, analyst_id, UserUpdate(is_active=False))
+
+    with pytest.raises(HTTPException) as rejected:
+        principal("analyst")
+    assert rejected.value.status_code == 403
+
+
+def test_deleted_user_is_rejected_on_the_next_request(accounts):
+    _, analyst_id = accounts
+    principal("analyst")
+
+    as_admin(users.delete_user, analyst_id)
+
+    with pytest.raises(HTTPException) as rejected:
+        principal("analyst")
+    assert rejected.value.status_code == 401
+
+
+def test_entries_expire_and_the_least_recently_used_is_evicted(monkeypatch):
+    cache = PrincipalCache(max_entries=2, ttl_seconds=60)
+    now = [1000.0]
+    monkeypatch.setattr("app.services.principal_cache.time.monotonic", lambda: now[0])
+
+    cache.put("admin", {"role": "admin"})
+    cache.put("analyst", {"role": "analyst"})
+    cache.get("admin")
+    cache.put("auditor", {"role": "analyst"})
+    assert cache.get("analyst") is None
+    assert cache.evictions == 1
+
+    # Another worker's change is picked up once the TTL runs out
+    now[0] += 61
+    assert cache.get("admin") is None
@@ -0,0 +1,98 @@
+"""
+Monthly report cache: a report computed before an invalidation is never stored.
+"""
+from datetime import datetime
+
+from app.database import SessionLocal
+from app.models.monthly_report_cache import MonthlyReportCache, MonthlyReportGeneration
+from app.services.monthly_report_service import MonthlyReportService
+from app.services.report_cache_service import ReportCacheService
+from conftest import run_read
+
+# A closed month: once stored it never expires
+YEAR, MONTH = 2025, 1
+
+
+def get_report():
+    return run_read(ReportCacheService.get_monthly_report, YEAR, MONTH)
+
+
+def invalidate():
+    """An alert created in the month changes status, committed by another writer"""
+    with SessionLocal() as session:
+        ReportCacheService.invalidate_for_datetime(session, datetime(YEAR, MONTH, 15, 12))
+        session.commit()
+
+
+def cached(db, model=MonthlyReportCache):
+    """The month's row, releasing the fixture's (only) writer connection afterwards"""
+    row = db.get(model, (YEAR, MONTH))
+    db.expunge_all()
+    db.rollback()
+    return row
+
+
+def test_miss_stores_the_report_and_hits_serve_it(db, monkeypatch):
+    computed = []
+    original = MonthlyReportService.get_monthly_report
+
+    async def counting(year, month, session):
+        computed.append((year, month))
+        return await original(year, month, session)
+
+    monkeypatch.setattr(MonthlyReportService, "get_monthly_report", counting)
+
+    first = get_report()
+    second = get_report()
+
+    assert second == first
+    assert computed == [(YEAR, MONTH)]
+    assert cached(db).expires_at is None
+
+
+def test_invalidation_during_compute_keeps_the_stale_report_out(db, monkeypatch):
+    original = MonthlyReportService.get_monthly_report
+    interleave = [True]
+
+    async def invalidated_meanwhile(year, month, session):
+        report = await original(year, month, session)
+        if interleave:
+            interleave.pop()
+            invalidate()
+        return report
+
+    monkeypatch.setattr(MonthlyReportService, "get_monthly_report", invalidated_meanwhile)
+
+    get_report()
+    assert cached(db) is None
+    assert cached(db, MonthlyReportGeneration).generation == 1
+
+    # The next miss computes at the new generation and is stored
+    get_report()
+    assert cached(db) is not None
+
+
+def test_store_is_conditional_on_the_generation(db):
+    values = {"payload": "{}", "etag": '"x"', "created_at": datetime.utcnow(), "expires_at": None}
+
+    assert ReportCacheService._store(YEAR, MONTH, 0, values, db=db)
+    invalidate()
+    db.expire_all()
+    assert db.get(MonthlyReportCache, (YEAR, MONTH)) is None
+
+    # Computed before the invalidation (generation 0): refused
+    assert not ReportCacheService._store(YEAR, MONTH, 0, values, db=db)
+    assert db.get(MonthlyReportCache, (YEAR, MONTH)) is None
+
+    assert ReportCacheService._store(YEAR, MONTH, 1, values, db=db)
+    assert db.get(MonthlyReportCache, (YEAR, MONTH)).payload == "{}"
+
+
+def test_invalidations_bump_every_touched_month(db):
+    ReportCacheService.invalidate_months(db, [(2025, 1), (2025, 2), (2025, 1)])
+    ReportCacheService.invalidate_months(db, [(2025, 2)])
+    ReportCacheService.invalidate_all(db)
+    db.commit()
+
+    generations = {(row.year, row.month): row.generation for row in db.query(MonthlyReportGeneration)}
+    assert generations == {(2025, 1): 2, (2025, 2): 3}
@@ -0,0 +1,62 @@
+"""
+Legacy results_json blobs: migrated into report_results in one streaming pass.
+"""
+import json
+
+import pytest
+
+from app.database import read_engine
+from app.models.report import Report
+from app.models.report_result import ReportResult
+from app.services import report_service
+from app.services.report_service import ReportService
+
+
+@pytest.fixture
+def small_reads(monkeypatch):
+    # Reads of a few bytes split numbers, strings and multibyte characters across reads
+    monkeypatch.setattr(report_service, "LEGACY_READ_BYTES", 7)
+    monkeypatch.setattr(report_service, "RESULTS_COMMIT_BATCH", 4)
+
+
+def legacy_report(db, results_json: str) -> Report:
+    report = Report(title="Legacy", model_type="phishing", status="completed", results_json=results_json)
+    db.add(report)
+    db.commit()
+    return report
+
+
+def stored_rows(db, report_id: int):
+    rows = db.query(ReportResult).filter(ReportResult.report_id == report_id).order_by(ReportResult.row_index).all()
+    return [(row.row_index, row.label, row.confidence, row.is_threat) for row in rows]
+
+
+def test_legacy_blob_is_migrated_and_cleared(db, small_reads):
+    results = [
+        {"is_threat": i % 2 == 0, "label": f"correo señalado ✉ {i}", "confidence": 12345.678 + i}
+        for i in range(10)
+    ]
+    report = legacy_report(db, " [ " + ",\n ".join(json.dumps(r, ensure_ascii=False) for r in results) + " ] ")
+
+    ReportService.ensure_results_table(report, db)
+
+    assert stored_rows(db, report.id) == [
+        (i, r["label"], r["confidence"], r["is_threat"]) for i, r in enumerate(results)
+    ]
+    assert db.get(Report, report.id).results_json is None
+    assert read_engine.pool.checkedout() == 0
+
+
+@pytest.mark.parametrize("results_json", [
+    '{"error": "the ML API timed out"}',
+    '[{"label": "a", "confidence": 1}, {"label": "b", "confidence": 2}, {"label": "c", "confidence": 3},'
+    ' {"label": "d", "confidence": 4}, {"label": "e", "confidence": 5}, {"label": "f"',
+])
+def test_invalid_blob_leaves_no_rows(db, small_reads, results_json):
+    report = legacy_report(db, results_json)
+
+    ReportService.ensure_results_table(report, db)
+
+    assert stored_rows(db, report.id) == []
+    assert db.get(Report, report.id).results_json == results_json
+    assert read_engine.pool.checkedout() == 0
@@ -0,0 +1,70 @@
+"""
+Alert search: the FTS index follows inserts, updates and deletes of alerts.
+"""
+import json
+
+import pytest
+from sqlalchemy import text
+
+from app.database import engine
+from app.migrations import _add_alerts_fts
+from app.models.alert import Alert
+from app.services.search_service import SearchService
+from conftest import run_read
+
+
+@pytest.fixture
+def fts(db):
+    """Index and triggers as migration 3 creates them, on the fresh alerts table"""
+    with engine.begin() as conn:
+        _add_alerts_fts(conn)
+
+
+def search(q: str):
+    result = run_read(lambda db: SearchService.search_alerts(db, q, sort="recent"))
+    return [item["alert"].id for item in result["items"]]
+
+
+def indexed_rows(db) -> int:
+    count = db.execute(text("SELECT count(*) FROM alerts_fts")).scalar()
+    db.rollback()
+    return count
+
+
+def raw_data(sender: str) -> str:
+    return json.dumps({"label": "phishing", "input": {"sender": sender}})
+
+
+def test_updates_reindex_the_changed_columns(db, fts, make_alert):
+    alert = make_alert(title="Invoice overdue", raw_data_json=raw_data("billing@example.com"))
+    other = make_alert(title="Password reset", raw_data_json=raw_data("it@corp.test"))
+    assert search("invoice") == [alert.id]
+    assert search("billing@example.com") == [alert.id]
+
+    alert.title = "Wire transfer request"
+    alert.raw_data_json = raw_data("ceo@lookalike.test")
+    db.commit()
+
+    assert search("invoice") == []
+    assert search("billing@example.com") == []
+    assert search("wire transfer") == [alert.id]
+    assert search("lookalike") == [alert.id]
+    assert search("password") == [other.id]
+
+    # Columns outside the index leave it alone, still one row per alert
+    alert.status = "acknowledged"
+    db.commit()
+    assert search("wire") == [alert.id]
+    assert indexed_rows(db) == 2
+
+
+def test_deleted_alerts_leave_the_index(db, fts, make_alert):
+    alert = make_alert(title="Invoice overdue", raw_data_json=raw_data("billing@example.com"))
+    kept = make_alert(title="Invoice reminder")
+
+    db.query(Alert).filter(Alert.id == alert.id).delete(synchronize_session=False)
+    db.commit()
+
+    assert search("invoice") == [kept.id]
+    assert search("billing") == []
+    assert indexed_rows(db) == 1
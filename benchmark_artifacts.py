@@ -0,0 +1,352 @@
+#!/usr/bin/env python3
+"""
+Benchmark de memoria y arranque de las APIs ML con varios workers.
+Para cada servicio compara tres formas de levantar N workers:
+
+  joblib    cada worker importa la app y deserializa sus .pkl
+            (uvicorn --workers / gunicorn sin preload, comportamiento anterior)
+  mmap      cada worker importa la app y abre el bundle mapeado (artifacts.py)
+  preload   el proceso maestro importa la app, abre el bundle, congela el GC
+            y hace fork de los workers (gunicorn.conf.py)
+
+Por worker mide RSS, PSS y USS (/proc/<pid>/smaps_rollup) despues de un
+calentamiento, y el tiempo desde el arranque hasta que todos estan listos.
+PSS reparte las paginas compartidas entre los procesos que las usan; USS es
+la memoria propia de cada worker. Solo Linux.
+
+Si los .pkl del repositorio son punteros de Git LFS (o con --synthetic) se
+generan artefactos sinteticos de tamano similar a los reales.
+
+Uso:
+  python benchmark_artifacts.py
+  python benchmark_artifacts.py --workers 4 --service phishing ato
+  python benchmark_artifacts.py --synthetic --output resultados.json
+"""
+
+import argparse
+import gc
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+SERVICES = {
+    "phishing": {
+        "api_dir": os.path.join(ROOT, "Phishing", "modeling", "api"),
+        "sources": {
+            "model": os.path.join(ROOT, "Phishing", "modeling", "outputs", "models", "best_model.pkl"),
+            "vectorizer": os.path.join(ROOT, "Phishing", "modeling", "outputs", "features", "tfidf_vectorizer.pkl"),
+        },
+        "env": {"model": "MODEL_PATH", "vectorizer": "VECTORIZER_PATH"},
+    },
+    "ato": {
+        "api_dir": os.path.join(ROOT, "Suspicious-Login-Activity", "modeling", "api"),
+        "sources": {
+            "model": os.path.join(ROOT, "Suspicious-Login-Activity", "modeling", "outputs", "models", "best_model.pkl"),
+            "encoders": os.path.join(ROOT, "Suspicious-Login-Activity", "modeling", "outputs", "features", "label_encoders.pkl"),
+        },
+        "env": {"model": "MODEL_PATH", "encoders": "ENCODERS_PATH"},
+    },
+    "brute_force": {
+        "api_dir": os.path.join(ROOT, "fuerza-bruta", "api"),
+        "sources": {
+            "model": os.path.join(ROOT, "fuerza-bruta", "modeling", "outputs", "models", "random_forest_20260117_021309.pkl"),
+        },
+        "env": {"model": "MODEL_PATH"},
+    },
+}
+
+MODES = ["joblib", "mmap", "preload"]
+
+
+# ============================================================================
+# ARTEFACTOS SINTETICOS
+# ============================================================================
+
+def is_lfs_pointer(path):
+    with open(path, "rb") as f:
+        return f.read(40).startswith(b"version https://git-lfs")
+
+
+def build_synthetic(service, workdir):
+    """Modelos entrenados con datos aleatorios, con el tamano aproximado de los reales"""
+    import joblib
+    import numpy as np
+    from sklearn.ensemble import GradientBoostingClassifier, RandomForestClassifier
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.preprocessing import LabelEncoder
+
+    rng = np.random.default_rng(42)
+    sources = {}
+
+    def dump(name, obj):
+        path = os.path.join(workdir, f"{service}_{name}.pkl")
+        joblib.dump(obj, path)
+        sources[name] = path
+
+    if service == "phishing":
+        # Phishing: GradientBoosting sobre 16 features + 1000 TF-IDF (~0.5 MB), vectorizador (~40 KB)
+        words = [f"palabra{i}" for i in range(5000)]
+        texts = [" ".join(rng.choice(words, 60)) for _ in range(2000)]
+        vectorizer = TfidfVectorizer(max_features=1000, ngram_range=(1, 2)).fit(texts)
+        X = rng.random((1500, 1016))
+        y = (X[:, :20].sum(axis=1) + rng.normal(size=1500) > 10).astype(int)
+        model = GradientBoostingClassifier(n_estimators=100, max_depth=5, max_features=0.05).fit(X, y)
+        dump("model", model)
+        dump("vectorizer", vectorizer)
+    elif service == "ato":
+        # ATO: GradientBoosting sobre 35 features (~1.5 MB), 6 LabelEncoders (~120 KB)
+        X = rng.random((4000, 35))
+        y = (X[:, :5].sum(axis=1) + rng.normal(size=4000) > 2.5).astype(int)
+        model = GradientBoostingClassifier(n_estimators=300, max_depth=5).fit(X, y)
+        sizes = {
+            "Browser Name and Version": 800, "OS Name and Version": 300, "Device Type": 5,
+            "Country": 200, "Region": 1500, "City": 4000,
+        }
+        encoders = {
+            column: LabelEncoder().fit([f"{column} {i}" for i in range(size)])
+            for column, size in sizes.items()
+        }
+        dump("model", model)
+        dump("encoders", encoders)
+    else:
+        # Fuerza bruta: RandomForest sobre 60 features (~1.5 MB)
+        X = rng.random((6000, 60))
+        y = (X[:, :6].sum(axis=1) + rng.normal(size=6000) > 3).astype(int)
+        model = RandomForestClassifier(n_estimators=100, max_leaf_nodes=100, random_state=0).fit(X, y)
+        dump("model", model)
+    return sources
+
+
+# ============================================================================
+# PROCESO MAESTRO (se ejecuta en un subproceso por servicio y modo)
+# ============================================================================
+
+def memory_of(pid):
+    """RSS, PSS y USS en MB desde /proc/<pid>/smaps_rollup"""
+    fields = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 3 and parts[2] == "kB":
+                fields[parts[0].rstrip(":")] = int(parts[1])
+    return {
+        "rss_mb": fields.get("Rss", 0) / 1024,
+        "pss_mb": fields.get("Pss", 0) / 1024,
+        "uss_mb": (fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0)) / 1024,
+    }
+
+
+def warm_up(predictor):
+    """Predicciones sobre un lote aleatorio: recorre la mayor parte de los nodos de los arboles"""
+    import numpy as np
+
+    rng = np.random.default_rng(0)
+    model = predictor.model
+    n_features = getattr(model, "n_features_in_", None)
+    if n_features:
+        model.predict_proba(rng.random((200, n_features)))
+    vectorizer = getattr(predictor, "vectorizer", None)
+    if vectorizer is not None:
+        vectorizer.transform(["mensaje de prueba con un enlace http://example.com"] * 50)
+    for encoder in getattr(predictor, "encoders", {}).values():
+        encoder.transform(encoder.classes_[:50])
+
+
+def load_app(api_dir):
+    sys.path.insert(0, api_dir)
+    os.chdir(api_dir)
+    import app
+
+    return app
+
+
+def run_master(service, mode, workers, result_path):
+    """Levanta los workers como lo haria gunicorn y mide su memoria una vez listos"""
+    api_dir = SERVICES[service]["api_dir"]
+    started = time.perf_counter()
+
+    predictor = None
+    master_load_seconds = 0.0
+    if mode == "preload":
+        app = load_app(api_dir)
+        predictor = app.load_predictor()
+        warm_up(predictor)
+        master_load_seconds = time.perf_counter() - started
+        gc.freeze()
+
+    ready_read, ready_write = os.pipe()
+    stop_read, stop_write = os.pipe()
+    children = []
+    for _ in range(workers):
+        pid = os.fork()
+        if pid == 0:
+            os.close(ready_read)
+            os.close(stop_write)
+            devnull = os.open(os.devnull, os.O_WRONLY)
+            os.dup2(devnull, 1)
+            os.dup2(devnull, 2)
+            worker_predictor = predictor
+            if worker_predictor is None:
+                worker_predictor = load_app(api_dir).load_predictor()
+            warm_up(worker_predictor)
+            os.write(ready_write, b"1")
+            os.read(stop_read, 1)
+            os._exit(0)
+        children.append(pid)
+    os.close(ready_write)
+    os.close(stop_read)
+
+    ready = 0
+    while ready < workers:
+        chunk = os.read(ready_read, workers)
+        if not chunk:
+            break
+        ready += len(chunk)
+    startup_seconds = time.perf_counter() - started
+
+    per_worker = [memory_of(pid) for pid in children]
+    master = memory_of(os.getpid())
+    os.close(stop_write)
+    for pid in children:
+        os.waitpid(pid, 0)
+
+    with open(result_path, "w") as f:
+        json.dump({
+            "service": service,
+            "mode": mode,
+            "workers": workers,
+            "ready_workers": ready,
+            "startup_seconds": startup_seconds,
+            "master_load_seconds": master_load_seconds,
+            "master": master,
+            "per_worker": per_worker,
+        }, f)
+
+
+# ============================================================================
+# ORQUESTACION
+# ============================================================================
+
+def mean(values):
+    return sum(values) / len(values) if values else 0.0
+
+
+def measure(service, mode, workers, sources, artifact_dir, repeat):
+    """Ejecuta el maestro en un proceso nuevo (importaciones y cache de modulos limpias)"""
+    env = dict(os.environ)
+    for name, variable in SERVICES[service]["env"].items():
+        env[variable] = sources[name]
+    env.pop("ARTIFACT_DIR", None)
+    if mode != "joblib":
+        env["ARTIFACT_DIR"] = artifact_dir
+
+    runs = []
+    for _ in range(repeat):
+        with tempfile.NamedTemporaryFile(suffix=".json", delete=False) as f:
+            result_path = f.name
+        try:
+            completed = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--master", service, mode, str(workers), result_path],
+                env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True
+            )
+            if completed.returncode != 0:
+                raise RuntimeError(f"{service}/{mode} fallo:\n{completed.stderr[-2000:]}")
+            with open(result_path) as f:
+                runs.append(json.load(f))
+        finally:
+            os.remove(result_path)
+
+    best = min(runs, key=lambda run: run["startup_seconds"])
+    return {
+        "service": service,
+        "mode": mode,
+        "workers": workers,
+        "startup_seconds": best["startup_seconds"],
+        "master_load_seconds": best["master_load_seconds"],
+        "rss_mb": mean([w["rss_mb"] for w in best["per_worker"]]),
+        "pss_mb": mean([w["pss_mb"] for w in best["per_worker"]]),
+        "uss_mb": mean([w["uss_mb"] for w in best["per_worker"]]),
+        "total_pss_mb": sum(w["pss_mb"] for w in best["per_worker"]) + best["master"]["pss_mb"],
+    }
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "--master":
+        _, _, service, mode, workers, result_path = sys.argv
+        run_master(service, mode, int(workers), result_path)
+        return
+
+    parser = argparse.ArgumentParser(description="Memoria por worker y arranque: joblib vs bundle mapeado con preload")
+    parser.add_argument("--service", nargs="+", choices=list(SERVICES), default=list(SERVICES))
+    parser.add_argument("--workers", type=int, default=4, help="Workers por servicio")
+    parser.add_argument("--repeat", type=int, default=3, help="Repeticiones por modo (se toma el arranque mas rapido)")
+    parser.add_argument("--synthetic", action="store_true", help="Usar siempre artefactos sinteticos")
+    parser.add_argument("--output", help="Guardar los resultados en un archivo JSON")
+    args = parser.parse_args()
+
+    if not os.path.exists("/proc/self/smaps_rollup"):
+        sys.exit("Se necesita Linux (/proc/<pid>/smaps_rollup)")
+
+    from service_common.artifacts import load_artifacts
+
+    workdir = tempfile.mkdtemp(prefix="artifacts-bench-")
+    results = []
+    try:
+        print("=" * 78)
+        print(f"BENCHMARK ARTEFACTOS - {args.workers} workers por servicio")
+        print("=" * 78)
+        for service in args.service:
+            sources = SERVICES[service]["sources"]
+            synthetic = args.synthetic or any(
+                not os.path.exists(path) or is_lfs_pointer(path) for path in sources.values()
+            )
+            if synthetic:
+                print(f"\n[{service}] Generando artefactos sinteticos (los .pkl reales no estan disponibles)...")
+                sources = build_synthetic(service, workdir)
+            sizes = ", ".join(f"{name} {os.path.getsize(path) / 1024:.0f} KB" for name, path in sources.items())
+            print(f"\n[{service}] {sizes}")
+
+            artifact_dir = os.path.join(workdir, f"{service}_bundle")
+            started = time.perf_counter()
+            load_artifacts(sources, artifact_dir)
+            export_seconds = time.perf_counter() - started
+            manifest = json.load(open(os.path.join(artifact_dir, "manifest.json")))
+            kinds = ", ".join(f"{name}: {entry['kind']}" for name, entry in manifest["artifacts"].items())
+            print(f"  Bundle generado en {export_seconds:.2f}s ({kinds})")
+
+            print(f"  {'modo':<9} {'arranque':>9} {'RSS/worker':>11} {'PSS/worker':>11} "
+                  f"{'USS/worker':>11} {'PSS total':>10}")
+            for mode in MODES:
+                row = measure(service, mode, args.workers, sources, artifact_dir, args.repeat)
+                row["synthetic"] = synthetic
+                row["export_seconds"] = export_seconds
+                results.append(row)
+                print(f"  {mode:<9} {row['startup_seconds']:>8.2f}s {row['rss_mb']:>9.1f}MB "
+                      f"{row['pss_mb']:>9.1f}MB {row['uss_mb']:>9.1f}MB {row['total_pss_mb']:>8.1f}MB")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print("\n" + "=" * 78)
+    print("RESUMEN (preload vs joblib)")
+    print("=" * 78)
+    for service in args.service:
+        rows = {row["mode"]: row for row in results if row["service"] == service}
+        before, after = rows["joblib"], rows["preload"]
+        print(f"  {service:<12} USS/worker {before['uss_mb']:.1f} -> {after['uss_mb']:.1f} MB, "
+              f"PSS total {before['total_pss_mb']:.1f} -> {after['total_pss_mb']:.1f} MB, "
+              f"arranque {before['startup_seconds']:.2f} -> {after['startup_seconds']:.2f}s")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResultados guardados en {args.output}")
+
+
+if __name__ == "__main__":
+    main()
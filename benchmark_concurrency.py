@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Benchmark de concurrencia del Auth Gateway.
+Mide la latencia (p50/p95/p99) de GET /alerts/unread/count en reposo y
+mientras se genera un reporte grande, para comprobar que la generacion
+no bloquea el event loop.
+
+Modos:
+  --url http://localhost:8003   Gateway ya levantado (requiere las APIs ML)
+  --in-process                  Levanta el gateway en este proceso con una
+                                base de datos temporal y una API ML sintetica
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+import httpx
+
+BASE_URL = "http://localhost:8003"
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(label, latencies):
+    ms = [value * 1000 for value in latencies]
+    print(f"  {label:<22} n={len(ms):<6} "
+          f"p50={percentile(ms, 50):7.1f}ms  p95={percentile(ms, 95):7.1f}ms  "
+          f"p99={percentile(ms, 99):7.1f}ms  max={max(ms, default=0):7.1f}ms  "
+          f"media={statistics.fmean(ms) if ms else 0:7.1f}ms")
+
+
+def build_phishing_csv(rows):
+    lines = ["sender,subject,body"]
+    lines.extend(f"user{i}@example.com,Asunto {i},Cuerpo del mensaje {i}" for i in range(rows))
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def start_in_process_gateway(port, ml_delay):
+    """Gateway en un hilo con BD temporal; la API ML se reemplaza por respuestas sinteticas"""
+    workdir = tempfile.mkdtemp(prefix="gateway-bench-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{workdir}/bench.db"
+    os.environ["UPLOAD_DIR"] = workdir
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "auth-gateway"))
+
+    import uvicorn
+    from app.main import app
+    from app.services.prediction_client import PredictionClient
+
+    async def synthetic_predict_batch(cls, model_type, records, timeout=120.0):
+        await asyncio.sleep(ml_delay)
+        return {"predictions": [
+            {
+                "prediction": 1 if i % 4 == 0 else 0,
+                "confidence": 0.55 + (i % 45) / 100,
+                "prediction_label": "Phishing" if i % 4 == 0 else "Legitimo",
+                "explanation": {"summary": f"Registro sintetico {i}"},
+            }
+            for i in range(len(records))
+        ]}
+
+    PredictionClient.predict_batch = classmethod(synthetic_predict_batch)
+
+    config = uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning")
+    server = uvicorn.Server(config)
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, thread
+
+
+async def poll_unread_count(client, headers, stop, latencies, interval):
+    while not stop.is_set():
+        started = time.perf_counter()
+        response = await client.get("/alerts/unread/count", headers=headers)
+        response.raise_for_status()
+        latencies.append(time.perf_counter() - started)
+        await asyncio.sleep(interval)
+
+
+async def run_benchmark(base_url, rows, pollers, interval, baseline_seconds):
+    async with httpx.AsyncClient(base_url=base_url, timeout=600) as client:
+        response = await client.post("/auth/login", data={"username": "admin", "password": "admin123"})
+        response.raise_for_status()
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+        print(f"\n[1/3] Linea base: {pollers} clientes durante {baseline_seconds}s...")
+        baseline = []
+        stop = asyncio.Event()
+        tasks = [asyncio.create_task(poll_unread_count(client, headers, stop, baseline, interval))
+                 for _ in range(pollers)]
+        await asyncio.sleep(baseline_seconds)
+        stop.set()
+        await asyncio.gather(*tasks)
+
+        print(f"[2/3] Subiendo archivo de {rows} filas...")
+        upload = await client.post(
+            "/files/upload",
+            files={"file": ("benchmark.csv", build_phishing_csv(rows), "text/csv")},
+            headers=headers
+        )
+        upload.raise_for_status()
+        file_id = upload.json()["id"]
+
+        print("[3/3] Generando reporte mientras se consulta el contador...")
+        during = []
+        stop = asyncio.Event()
+        tasks = [asyncio.create_task(poll_unread_count(client, headers, stop, during, interval))
+                 for _ in range(pollers)]
+        started = time.perf_counter()
+        report = await client.post(
+            "/reports/generate",
+            json={"title": f"Benchmark {rows} filas", "file_id": file_id},
+            headers=headers
+        )
+        generation_seconds = time.perf_counter() - started
+        stop.set()
+        await asyncio.gather(*tasks)
+        report.raise_for_status()
+
+    print("\n" + "=" * 60)
+    print("RESULTADOS /alerts/unread/count")
+    print("=" * 60)
+    summarize("En reposo", baseline)
+    summarize("Durante el reporte", during)
+    print(f"\n  Reporte: {report.json()['status']} en {generation_seconds:.2f}s ({rows} filas)")
+    print("=" * 60)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latencia de /alerts/unread/count durante un reporte grande")
+    parser.add_argument("--url", default=BASE_URL, help="URL del gateway (ignorado con --in-process)")
+    parser.add_argument("--in-process", action="store_true", help="Levantar el gateway localmente con API ML sintetica")
+    parser.add_argument("--port", type=int, default=8013, help="Puerto para --in-process")
+    parser.add_argument("--rows", type=int, default=100000, help="Filas del archivo del reporte")
+    parser.add_argument("--pollers", type=int, default=8, help="Clientes concurrentes consultando el contador")
+    parser.add_argument("--interval", type=float, default=0.01, help="Pausa entre consultas por cliente (s)")
+    parser.add_argument("--baseline-seconds", type=float, default=5.0, help="Duracion de la linea base (s)")
+    parser.add_argument("--ml-delay", type=float, default=1.0, help="Latencia simulada de la API ML (s)")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("BENCHMARK DE CONCURRENCIA - Auth Gateway")
+    print("=" * 60)
+
+    server = None
+    base_url = args.url
+    if args.in_process:
+        server, thread = start_in_process_gateway(args.port, args.ml_delay)
+        base_url = f"http://127.0.0.1:{args.port}"
+        print(f"Gateway local en {base_url} (API ML sintetica)")
+
+    try:
+        asyncio.run(run_benchmark(base_url, args.rows, args.pollers, args.interval, args.baseline_seconds))
+    finally:
+        if server is not None:
+            server.should_exit = True
+            thread.join(timeout=10)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+Benchmark de paginacion y busqueda de alertas.
+Crea una base de datos temporal con N alertas (1 millon por defecto) y mide
+la latencia de GET /alerts (AlertService.list_alerts) a distintas
+profundidades de pagina, comparando OFFSET (skip) con cursor (keyset).
+Con cursor la latencia debe mantenerse plana aunque la pagina sea profunda.
+
+Tambien muestra el plan de consulta (EXPLAIN QUERY PLAN) de cada listado y
+mide GET /alerts/search (indice FTS5) con terminos raros, medios y comunes.
+
+Uso:
+  python benchmark_pagination.py
+  python benchmark_pagination.py --alerts 200000 --depths 1 10 100 1000
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+
+def setup_database():
+    """BD temporal; debe configurarse antes de importar la app"""
+    workdir = tempfile.mkdtemp(prefix="gateway-pagination-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{workdir}/pagination.db"
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "auth-gateway"))
+    return workdir
+
+
+def seed_alerts(total, chunk=50000):
+    """Inserta alertas sinteticas de los ultimos 180 dias directamente con executemany"""
+    from app.database import engine
+
+    rng = random.Random(42)
+    severities = ("critical", "high", "medium")
+    statuses = ("unread", "read", "acknowledged")
+    models = ("phishing", "ato", "brute_force")
+    start = datetime.now(timezone.utc) - timedelta(days=180)
+    step = 180 * 86400 / max(total, 1)
+
+    raw = engine.raw_connection()
+    try:
+        cursor = raw.cursor()
+        for offset in range(0, total, chunk):
+            rows = []
+            for i in range(offset, min(offset + chunk, total)):
+                created = start + timedelta(seconds=i * step)
+                # Mezcla los dos formatos que produce la app (server_default y ORM)
+                created_text = (
+                    created.strftime("%Y-%m-%d %H:%M:%S") if i % 2
+                    else created.strftime("%Y-%m-%d %H:%M:%S.%f")
+                )
+                model = models[i % 3]
+                # Campos de entrada como los que guarda el pipeline para la busqueda
+                raw_data = {"label": "Amenaza", "risk_level": "high", "input": {
+                    "sender": f"usuario{i % 50000}@dominio{i % 2000}.com",
+                    "ip_address": f"10.{i % 256}.{(i // 256) % 256}.{i % 97}",
+                }}
+                rows.append((
+                    f"Alerta {model} #{i}", f"Registro #{i + 1}: actividad sospechosa",
+                    severities[rng.randrange(3)], statuses[rng.randrange(3)], model, i,
+                    round(rng.uniform(70, 100), 2), "Amenaza", "high", created_text,
+                    json.dumps(raw_data)
+                ))
+            cursor.executemany(
+                "INSERT INTO alerts (title, description, severity, status, model_type, prediction_index, "
+                "confidence, prediction_label, risk_level, created_at, raw_data_json) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows
+            )
+            raw.commit()
+            print(f"  {min(offset + chunk, total):>9} alertas", end="\r")
+        cursor.execute("ANALYZE")
+        raw.commit()
+    finally:
+        raw.close()
+    print()
+
+
+def cursor_at(filters, position):
+    """Cursor que apunta a la fila anterior a 'position' en el orden del listado"""
+    from sqlalchemy import String, select, type_coerce
+    from app.database import SessionLocal
+    from app.models.alert import Alert
+
+    db = SessionLocal()
+    try:
+        query = select(type_coerce(Alert.created_at, String), Alert.id)
+        for column, value in filters.items():
+            query = query.where(getattr(Alert, column) == value)
+        row = db.execute(
+            query.order_by(Alert.created_at.desc(), Alert.id.desc()).offset(position - 1).limit(1)
+        ).first()
+    finally:
+        db.close()
+    return f"{row[0]}:{row[1]}" if row else None
+
+
+def print_plans(filters):
+    from sqlalchemy import select, text
+    from sqlalchemy.dialects import sqlite
+    from app.database import SessionLocal
+    from app.models.alert import Alert
+    from app.services.pagination import KeysetPagination
+
+    query = select(Alert)
+    for column, value in filters.items():
+        query = query.where(getattr(Alert, column) == value)
+    query = KeysetPagination.apply(query, Alert.created_at, Alert.id, "2030-01-01 00:00:00:1", 100)
+    compiled = query.compile(dialect=sqlite.dialect(), compile_kwargs={"literal_binds": True})
+
+    db = SessionLocal()
+    try:
+        plan = db.execute(text(f"EXPLAIN QUERY PLAN {compiled}")).all()
+    finally:
+        db.close()
+    print(f"  Plan {filters or '(sin filtros)'}:")
+    for row in plan:
+        print(f"    {row[-1]}")
+
+
+async def time_page(filters, limit, repeats, cursor=None, skip=0):
+    from app.database import AsyncReadSessionLocal
+    from app.services.alert_service import AlertService
+
+    latencies = []
+    for _ in range(repeats):
+        async with AsyncReadSessionLocal() as db:
+            started = time.perf_counter()
+            page = await AlertService.list_alerts(db, cursor=cursor, skip=skip, limit=limit, **filters)
+            latencies.append(time.perf_counter() - started)
+        assert len(page["items"]) == limit, "pagina incompleta"
+    return statistics.median(latencies) * 1000
+
+
+async def run_benchmark(depths, limit, repeats, scenarios):
+    for filters in scenarios:
+        print(f"\n  Filtros: {filters or '(sin filtros)'}")
+        print(f"  {'pagina':>8} {'OFFSET (ms)':>12} {'cursor (ms)':>12}")
+        for depth in depths:
+            position = (depth - 1) * limit
+            offset_ms = await time_page(filters, limit, repeats, skip=position)
+            cursor = cursor_at(filters, position) if position else None
+            cursor_ms = await time_page(filters, limit, repeats, cursor=cursor)
+            print(f"  {depth:>8} {offset_ms:>12.2f} {cursor_ms:>12.2f}")
+
+
+async def run_search_benchmark(repeats):
+    from app.database import AsyncReadSessionLocal
+    from app.services.search_service import SearchService
+
+    searches = [
+        ("usuario123@dominio123.com", {}),      # raro: ~20 alertas
+        ("dominio7.com", {}),                   # medio: ~500 alertas
+        ("dominio7.com", {"status": "unread"}),
+        ("10.5", {}),                           # comun
+        ("phishing", {}),                       # muy comun: 1/3 de las alertas
+        ("phishing", {"severity": "critical"}),
+    ]
+    print(f"\n  {'consulta':<38} {'orden':<10} {'filas':>6} {'mediana (ms)':>13}")
+    for q, filters in searches:
+        for sort in ("relevance", "recent"):
+            latencies = []
+            for _ in range(repeats):
+                async with AsyncReadSessionLocal() as db:
+                    started = time.perf_counter()
+                    page = await SearchService.search_alerts(db, q, sort=sort, limit=50, **filters)
+                    latencies.append(time.perf_counter() - started)
+            label = q + (f" {filters}" if filters else "")
+            print(f"  {label:<38} {sort:<10} {len(page['items']):>6} "
+                  f"{statistics.median(latencies) * 1000:>13.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latencia del listado y la busqueda de alertas")
+    parser.add_argument("--alerts", type=int, default=1_000_000, help="Alertas a generar")
+    parser.add_argument("--limit", type=int, default=100, help="Tamano de pagina")
+    parser.add_argument("--depths", type=int, nargs="+", default=[1, 10, 100, 1000, 3000],
+                        help="Numeros de pagina a medir")
+    parser.add_argument("--repeats", type=int, default=5, help="Repeticiones por medicion (se reporta la mediana)")
+    args = parser.parse_args()
+
+    workdir = setup_database()
+
+    from app.database import async_read_engine, init_db
+
+    print("=" * 60)
+    print("BENCHMARK DE PAGINACION Y BUSQUEDA - Auth Gateway")
+    print("=" * 60)
+    print(f"BD temporal: {workdir}")
+
+    init_db()
+    started = time.perf_counter()
+    seed_alerts(args.alerts)
+    print(f"Generadas {args.alerts} alertas en {time.perf_counter() - started:.1f}s")
+
+    # Las profundidades se limitan a las paginas que existen con el filtro mas selectivo
+    max_depth = args.alerts // 9 // args.limit
+    depths = [depth for depth in args.depths if depth <= max_depth] or [1]
+    scenarios = [{}, {"status": "unread"}, {"status": "unread", "severity": "critical"}]
+
+    print("\nPlanes de consulta:")
+    for filters in scenarios:
+        print_plans(filters)
+
+    print("\n" + "=" * 60)
+    print(f"RESULTADOS (mediana de {args.repeats}, {args.limit} filas por pagina)")
+    print("=" * 60)
+
+    async def run():
+        try:
+            await run_benchmark(depths, args.limit, args.repeats, scenarios)
+            print("\n" + "=" * 60)
+            print("BUSQUEDA /alerts/search (FTS5)")
+            print("=" * 60)
+            await run_search_benchmark(args.repeats)
+        finally:
+            await async_read_engine.dispose()
+
+    asyncio.run(run())
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,470 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark de los predictores (PhishingPredictor,
+AccountTakeoverPredictor, BruteForcePredictor) con puerta de regresion.
+
+Para cada servicio y tamano de lote (1, 10, 100, 1000 y 10000 por defecto)
+mide dos operaciones sobre entradas sinteticas con el mismo formato que las
+muestras de seed_data.py (mezcla de ataques y trafico normal):
+
+  single    el lote fila a fila con predict_single: latencia por llamada
+  batch     el lote completo con predict_batch: latencia por llamada al lote
+
+y reporta filas/s, latencia p50/p99 y el pico de memoria asignada durante
+una llamada (tracemalloc, en una pasada aparte para no inflar los tiempos).
+Cada servicio corre en su propio proceso (los modulos de las tres APIs se
+llaman igual). En ATO el historial de usuarios se vacia antes de cada
+ronda, para que todas las rondas midan lo mismo.
+
+Con --save-baseline los resultados se guardan como linea base; con
+--baseline se comparan contra una linea base y el script termina con error
+si alguna medicion empeora mas que la tolerancia (filas/s y p50 con
+--tolerance, p99 con --p99-tolerance, memoria con --memory-tolerance). Las
+lineas base dependen de la maquina: generarlas y compararlas en el mismo
+host. Funciona sin red; si los .pkl del repositorio son punteros de Git LFS
+(o con --synthetic) se usan los artefactos sinteticos de
+benchmark_artifacts.py.
+
+Uso:
+  python benchmark_predictors.py --save-baseline benchmark_baselines/predictores.json
+  python benchmark_predictors.py --baseline benchmark_baselines/predictores.json
+  python benchmark_predictors.py --service ato --sizes 1 10 100 --tolerance 0.1
+"""
+
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+from benchmark_artifacts import SERVICES, build_synthetic, is_lfs_pointer, load_app
+
+DEFAULT_SIZES = [1, 10, 100, 1000, 10000]
+OPERATIONS = ["single", "batch"]
+
+# Cambios de pico de memoria por debajo de esto se ignoran (ruido de asignaciones pequenas)
+MEMORY_NOISE_MB = 0.25
+
+
+# ============================================================================
+# ENTRADAS SINTETICAS (mismas columnas que las muestras de seed_data.py)
+# ============================================================================
+
+PHISHING_SUBJECTS = [
+    "Urgent: verify your account now", "Your password expires today", "Action required: suspended account",
+    "Invoice #{n} overdue", "You have won a gift card", "Security alert for your bank account",
+]
+LEGIT_SUBJECTS = [
+    "Meeting notes", "Weekly report", "Lunch on friday?", "Project update #{n}",
+    "Re: budget review", "Agenda for tomorrow",
+]
+PHISHING_WORDS = (
+    "urgent verify account password click here login suspended bank confirm immediately security "
+    "update billing winner free prize limited offer credentials unusual activity restore access"
+).split()
+COMMON_WORDS = (
+    "the team meeting report project please find attached schedule review thanks regards next week "
+    "document budget client update notes call office plan results data question time"
+).split()
+
+
+def phishing_email(rng, index, attack):
+    words = PHISHING_WORDS + COMMON_WORDS if attack else COMMON_WORDS
+    body = " ".join(rng.choice(words) for _ in range(rng.randint(30, 300)))
+    if attack:
+        domain = rng.choice(["paypa1-secure.com", "bank-verify.net", "microsoft-support.info", "amazon.co-login.ru"])
+        body += f" http://{domain}/login?id={index}"
+        subject = rng.choice(PHISHING_SUBJECTS)
+        sender = f"security@{domain}"
+    else:
+        subject = rng.choice(LEGIT_SUBJECTS)
+        sender = f"user{rng.randint(1, 500)}@company.com"
+    return {
+        "sender": sender,
+        "receiver": f"employee{rng.randint(1, 2000)}@company.com",
+        "subject": subject.format(n=index),
+        "body": body,
+        "urls": int(attack or rng.random() < 0.2),
+    }
+
+
+LOCATIONS = [
+    ("BO", "La Paz", "La Paz"), ("BO", "Santa Cruz", "Santa Cruz de la Sierra"), ("US", "California", "Los Angeles"),
+    ("NO", "Oslo County", "Oslo"), ("BR", "Sao Paulo", "Sao Paulo"), ("DE", "Berlin", "Berlin"),
+]
+ATTACK_LOCATIONS = [("RU", "Moscow", "Moscow"), ("CN", "Beijing", "Beijing"), ("RO", "Bucharest", "Bucharest")]
+BROWSERS = ["Chrome 120.0", "Firefox 121.0", "Safari 17.2", "Edge 120.0", "Chrome Mobile 119.0"]
+SYSTEMS = ["Windows 10", "Mac OS X 14.2", "iOS 17.1", "Android 13", "Linux"]
+DEVICES = ["desktop", "mobile", "tablet"]
+
+
+def ato_login(rng, index, attack, users, started):
+    user = rng.randrange(users)
+    country, region, city = rng.choice(ATTACK_LOCATIONS if attack else LOCATIONS[:2] if user % 3 else LOCATIONS)
+    return {
+        "user_id": str(1000 + user),
+        "ip_address": f"{rng.randint(1, 223)}.{rng.randint(0, 255)}.{rng.randint(0, 255)}.{rng.randint(1, 254)}",
+        "country": country,
+        "region": region,
+        "city": city,
+        "browser": rng.choice(BROWSERS),
+        "os": rng.choice(SYSTEMS),
+        "device": rng.choice(DEVICES),
+        "login_successful": int(rng.random() < (0.4 if attack else 0.95)),
+        "is_attack_ip": int(attack),
+        "asn": rng.choice([6568, 27882, 15169, 8075, 12389]),
+        "rtt": round(rng.uniform(300, 1200) if attack else rng.uniform(20, 150), 1),
+        "login_timestamp": (started + timedelta(seconds=37 * index)).isoformat() + "Z",
+    }
+
+
+def brute_force_flow(rng, attack):
+    """Flujo de red con las columnas (en minusculas) de las muestras de seed_data.py"""
+    fwd_pkts = rng.randint(2, 12) if attack else rng.randint(1, 200)
+    bwd_pkts = rng.randint(1, 10) if attack else rng.randint(0, 200)
+    duration = rng.uniform(1e3, 5e5) if attack else rng.uniform(1e2, 1e8)
+    fwd_len = [rng.uniform(0, 120 if attack else 1460) for _ in range(min(fwd_pkts, 20))]
+    bwd_len = [rng.uniform(0, 120 if attack else 1460) for _ in range(max(min(bwd_pkts, 20), 1))]
+    all_len = fwd_len + bwd_len
+    mean_len = sum(all_len) / len(all_len)
+    std_len = (sum((x - mean_len) ** 2 for x in all_len) / len(all_len)) ** 0.5
+    iat = duration / max(fwd_pkts + bwd_pkts - 1, 1)
+    seconds = duration / 1e6
+    flow = {
+        "dst_port": rng.choice([21, 22]) if attack else rng.choice([80, 443, 53, 3389, 8080]),
+        "protocol": 6 if attack else rng.choice([6, 6, 17]),
+        "flow_duration": duration,
+        "tot_fwd_pkts": fwd_pkts,
+        "tot_bwd_pkts": bwd_pkts,
+        "totlen_fwd_pkts": sum(fwd_len),
+        "fwd_pkt_len_max": max(fwd_len),
+        "fwd_pkt_len_min": min(fwd_len),
+        "fwd_pkt_len_mean": sum(fwd_len) / len(fwd_len),
+        "fwd_pkt_len_std": std_len,
+        "bwd_pkt_len_max": max(bwd_len),
+        "bwd_pkt_len_min": min(bwd_len),
+        "bwd_pkt_len_mean": sum(bwd_len) / len(bwd_len),
+        "bwd_pkt_len_std": std_len,
+        "flow_byts_s": sum(all_len) / seconds,
+        "flow_pkts_s": (fwd_pkts + bwd_pkts) / seconds,
+        "flow_iat_mean": iat,
+        "flow_iat_std": iat * rng.uniform(0.1, 2),
+        "flow_iat_max": iat * rng.uniform(1, 5),
+        "fwd_iat_std": iat * rng.uniform(0.1, 2),
+        "bwd_iat_tot": duration * rng.uniform(0.3, 1),
+        "bwd_iat_mean": iat,
+        "bwd_iat_std": iat * rng.uniform(0.1, 2),
+        "bwd_iat_max": iat * rng.uniform(1, 5),
+        "bwd_iat_min": iat * rng.uniform(0, 1),
+        "fwd_pkts_s": fwd_pkts / seconds,
+        "bwd_pkts_s": bwd_pkts / seconds,
+        "pkt_len_min": min(all_len),
+        "pkt_len_max": max(all_len),
+        "pkt_len_mean": mean_len,
+        "pkt_len_std": std_len,
+        "pkt_len_var": std_len ** 2,
+        "fin_flag_cnt": int(rng.random() < 0.3),
+        "rst_flag_cnt": int(attack and rng.random() < 0.5),
+        "psh_flag_cnt": int(rng.random() < 0.5),
+        "ack_flag_cnt": int(rng.random() < 0.7),
+        "urg_flag_cnt": 0,
+        "cwe_flag_count": 0,
+        "down_up_ratio": round(bwd_pkts / fwd_pkts),
+        "init_fwd_win_byts": rng.choice([26883, 29200, 64240, 8192, -1]),
+        "init_bwd_win_byts": rng.choice([227, 26847, 28960, -1]),
+        "fwd_act_data_pkts": rng.randint(0, fwd_pkts),
+        "fwd_seg_size_min": rng.choice([20, 32]),
+        "active_mean": 0.0 if attack else rng.uniform(0, 1e5),
+        "idle_mean": 0.0 if attack else rng.uniform(0, 1e7),
+    }
+    for name in ("fwd_psh_flags", "bwd_psh_flags", "fwd_urg_flags", "bwd_urg_flags", "fwd_byts_b_avg",
+                 "fwd_pkts_b_avg", "fwd_blk_rate_avg", "bwd_byts_b_avg", "bwd_pkts_b_avg", "bwd_blk_rate_avg"):
+        flow[name] = 0
+    flow["active_std"], flow["active_max"], flow["active_min"] = 0.0, flow["active_mean"], flow["active_mean"]
+    flow["idle_std"] = 0.0
+    return flow
+
+
+def build_inputs(service, size, seed=42):
+    """Lote determinista: ~50% ataques en phishing y fuerza bruta, ~16% en ATO (como las muestras)"""
+    rng = random.Random(seed + size)
+    if service == "phishing":
+        return [phishing_email(rng, index, rng.random() < 0.5) for index in range(size)]
+    if service == "ato":
+        started = datetime(2026, 1, 15, 8, 0, 0)
+        users = max(size // 5, 1)
+        return [ato_login(rng, index, rng.random() < 0.16, users, started) for index in range(size)]
+    return [brute_force_flow(rng, rng.random() < 0.5) for _ in range(size)]
+
+
+# ============================================================================
+# MEDICION (se ejecuta en un subproceso por servicio)
+# ============================================================================
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(int(round(pct / 100 * (len(ordered) - 1))), len(ordered) - 1)
+    return ordered[index]
+
+
+def reset_state(predictor):
+    """Vaciar el estado entre rondas (historial de usuarios de ATO)"""
+    if hasattr(predictor, "user_history"):
+        predictor.user_history = {}
+
+
+def run_rounds(call, predictor, min_rounds, min_time, max_time):
+    """Repite `call` (una ronda) al menos min_rounds veces y min_time segundos, sin pasar de max_time"""
+    latencies = []
+    rounds = 0
+    busy = 0.0
+    deadline = time.perf_counter() + max_time
+    while rounds < min_rounds or busy < min_time:
+        reset_state(predictor)
+        busy += call(latencies)
+        rounds += 1
+        if time.perf_counter() >= deadline:
+            break
+    return latencies, rounds, busy
+
+
+def measure_cell(predictor, operation, records, min_rounds, min_time, max_time):
+    if operation == "single":
+        def call(latencies):
+            total = 0.0
+            for record in records:
+                started = time.perf_counter()
+                predictor.predict_single(record)
+                elapsed = time.perf_counter() - started
+                latencies.append(elapsed)
+                total += elapsed
+            return total
+    else:
+        def call(latencies):
+            started = time.perf_counter()
+            predictor.predict_batch(records)
+            elapsed = time.perf_counter() - started
+            latencies.append(elapsed)
+            return elapsed
+
+    # Calentamiento (caches de pandas/sklearn) y luego las rondas medidas
+    call([])
+    gc.collect()
+    latencies, rounds, busy = run_rounds(call, predictor, min_rounds, min_time, max_time)
+
+    # Pico de memoria en una ronda aparte: tracemalloc hace mas lenta la ejecucion
+    reset_state(predictor)
+    gc.collect()
+    tracemalloc.start()
+    try:
+        call([])
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "rounds": rounds,
+        "rows_per_second": len(records) * rounds / busy if busy else 0.0,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "peak_memory_mb": peak / (1024 * 1024),
+    }
+
+
+def run_worker(service, config_path, result_path):
+    """Carga el predictor de un servicio y mide todas sus combinaciones de operacion y tamano"""
+    with open(config_path) as f:
+        config = json.load(f)
+    # Los predictores imprimen al cargar y durante la prediccion (feature
+    # engineering de phishing): la tabla se escribe en el stdout original
+    table = os.fdopen(os.dup(1), "w")
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    os.dup2(devnull, 1)
+    sys.stdout = open(os.devnull, "w")
+    predictor = load_app(SERVICES[service]["api_dir"]).load_predictor()
+
+    results = []
+    for size in config["sizes"]:
+        records = build_inputs(service, size)
+        for operation in config["operations"]:
+            row = measure_cell(predictor, operation, records, config["min_rounds"], config["min_time"],
+                               config["max_time"])
+            row.update({"service": service, "operation": operation, "size": size})
+            results.append(row)
+            print(f"  {service:<12} {operation:<7} {size:>6} {row['rows_per_second']:>11.1f} "
+                  f"{row['p50_ms']:>10.3f} {row['p99_ms']:>10.3f} {row['peak_memory_mb']:>9.2f} "
+                  f"{row['rounds']:>6}", file=table, flush=True)
+    with open(result_path, "w") as f:
+        json.dump(results, f)
+
+
+def measure_service(service, sources, config):
+    """Ejecuta las mediciones de un servicio en un proceso nuevo"""
+    env = dict(os.environ)
+    for name, variable in SERVICES[service]["env"].items():
+        env[variable] = sources[name]
+    env.pop("ARTIFACT_DIR", None)
+    env["PYTHONWARNINGS"] = "ignore"
+
+    with tempfile.TemporaryDirectory(prefix="predictor-bench-") as workdir:
+        config_path = os.path.join(workdir, "config.json")
+        result_path = os.path.join(workdir, "result.json")
+        with open(config_path, "w") as f:
+            json.dump(config, f)
+        completed = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--worker", service, config_path, result_path],
+            env=env, stderr=subprocess.PIPE, text=True
+        )
+        if completed.returncode != 0:
+            raise RuntimeError(f"{service} fallo:\n{completed.stderr[-2000:]}")
+        with open(result_path) as f:
+            return json.load(f)
+
+
+# ============================================================================
+# LINEA BASE Y REGRESIONES
+# ============================================================================
+
+def environment():
+    import numpy
+    import sklearn
+
+    return {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "processor": platform.processor() or platform.machine(),
+        "cpus": os.cpu_count(),
+        "numpy": numpy.__version__,
+        "sklearn": sklearn.__version__,
+    }
+
+
+def key_of(row):
+    return f"{row['service']}/{row['operation']}/{row['size']}"
+
+
+def find_regressions(results, baseline, tolerance, p99_tolerance, memory_tolerance):
+    """Mediciones que empeoraron mas que la tolerancia respecto a la linea base"""
+    previous = {key_of(row): row for row in baseline["results"]}
+    checks = [
+        ("rows_per_second", tolerance, -1),
+        ("p50_ms", tolerance, 1),
+        ("p99_ms", p99_tolerance, 1),
+        ("peak_memory_mb", memory_tolerance, 1),
+    ]
+    regressions = []
+    for row in results:
+        before = previous.get(key_of(row))
+        if before is None:
+            continue
+        for metric, allowed, direction in checks:
+            old, new = before[metric], row[metric]
+            if old <= 0:
+                continue
+            if metric == "peak_memory_mb" and new - old < MEMORY_NOISE_MB:
+                continue
+            if (new - old) / old * direction > allowed:
+                regressions.append((key_of(row), metric, old, new, allowed))
+    return regressions
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "--worker":
+        _, _, service, config_path, result_path = sys.argv
+        run_worker(service, config_path, result_path)
+        return
+
+    parser = argparse.ArgumentParser(description="Micro-benchmark de los predictores con puerta de regresion")
+    parser.add_argument("--service", nargs="+", choices=list(SERVICES), default=list(SERVICES))
+    parser.add_argument("--operation", nargs="+", choices=OPERATIONS, default=OPERATIONS)
+    parser.add_argument("--sizes", nargs="+", type=int, default=DEFAULT_SIZES, help="Tamanos de lote")
+    parser.add_argument("--min-rounds", type=int, default=3, help="Rondas minimas por medicion")
+    parser.add_argument("--min-time", type=float, default=1.0, help="Segundos minimos medidos por medicion")
+    parser.add_argument("--max-time", type=float, default=30.0,
+                        help="Sin nuevas rondas pasados estos segundos (los lotes grandes hacen menos rondas)")
+    parser.add_argument("--synthetic", action="store_true", help="Usar siempre artefactos sinteticos")
+    parser.add_argument("--output", help="Guardar los resultados en un archivo JSON")
+    parser.add_argument("--save-baseline", help="Guardar los resultados como linea base en este archivo")
+    parser.add_argument("--baseline", help="Comparar contra esta linea base y fallar si hay regresiones")
+    parser.add_argument("--tolerance", type=float, default=0.20,
+                        help="Empeoramiento permitido en filas/s y p50 (0.20 = 20%%)")
+    parser.add_argument("--p99-tolerance", type=float, default=0.50, help="Empeoramiento permitido en p99")
+    parser.add_argument("--memory-tolerance", type=float, default=0.20,
+                        help="Aumento permitido del pico de memoria")
+    args = parser.parse_args()
+
+    config = {
+        "sizes": sorted(set(args.sizes)),
+        "operations": args.operation,
+        "min_rounds": args.min_rounds,
+        "min_time": args.min_time,
+        "max_time": args.max_time,
+    }
+
+    workdir = tempfile.mkdtemp(prefix="predictor-bench-artifacts-")
+    results = []
+    synthetic_services = []
+    try:
+        print("=" * 78)
+        print(f"BENCHMARK PREDICTORES - lotes {', '.join(str(size) for size in config['sizes'])}")
+        print("=" * 78)
+        print(f"  {'servicio':<12} {'op':<7} {'lote':>6} {'filas/s':>11} {'p50 ms':>10} {'p99 ms':>10} "
+              f"{'pico MB':>9} {'rondas':>6}")
+        for service in args.service:
+            sources = SERVICES[service]["sources"]
+            if args.synthetic or any(not os.path.exists(path) or is_lfs_pointer(path) for path in sources.values()):
+                sources = build_synthetic(service, workdir)
+                synthetic_services.append(service)
+            results.extend(measure_service(service, sources, config))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if synthetic_services:
+        print(f"\nArtefactos sinteticos (los .pkl reales no estan disponibles): {', '.join(synthetic_services)}")
+
+    report = {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "environment": environment(),
+        "config": config,
+        "synthetic": synthetic_services,
+        "results": results,
+    }
+    for path in (args.output, args.save_baseline):
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            with open(path, "w") as f:
+                json.dump(report, f, indent=2)
+            print(f"Resultados guardados en {path}")
+
+    if not args.baseline:
+        return
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    print("\n" + "=" * 78)
+    print(f"COMPARACION CON {args.baseline} ({baseline.get('created_at', '?')})")
+    print("=" * 78)
+    if baseline.get("environment") != report["environment"]:
+        print(f"  Aviso: entorno distinto al de la linea base\n    base:   {baseline.get('environment')}\n"
+              f"    actual: {report['environment']}")
+    if sorted(set(baseline.get("synthetic", [])) & set(args.service)) != sorted(synthetic_services):
+        print("  Aviso: la linea base uso otros artefactos (reales vs sinteticos)")
+    compared = {key_of(row) for row in baseline["results"]} & {key_of(row) for row in results}
+    regressions = find_regressions(results, baseline, args.tolerance, args.p99_tolerance, args.memory_tolerance)
+    for key, metric, old, new, allowed in regressions:
+        print(f"  REGRESION {key:<24} {metric:<16} {old:>10.3f} -> {new:>10.3f} "
+              f"({(new - old) / old:+.0%}, tolerancia {allowed:.0%})")
+    if regressions:
+        sys.exit(f"{len(regressions)} regresiones en {len(compared)} mediciones comparadas")
+    print(f"  Sin regresiones en {len(compared)} mediciones")
+
+
+if __name__ == "__main__":
+    main()
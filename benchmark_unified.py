@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Benchmark de memoria: las tres APIs ML por separado vs el servidor unificado
+(inference-server/server.py).
+
+  separado    un maestro por servicio (preload del modelo) con N workers cada uno
+  unificado   un maestro que carga los tres modelos con N workers en total
+
+En ambos casos los modelos se cargan en el maestro antes del fork, como en
+gunicorn.conf.py. Mide PSS total (maestros + workers) y USS por worker
+despues de un calentamiento, usando /proc/<pid>/smaps_rollup. Solo Linux.
+
+Si los .pkl del repositorio son punteros de Git LFS (o con --synthetic) se
+generan artefactos sinteticos (ver benchmark_artifacts.py).
+
+Uso:
+  python benchmark_unified.py
+  python benchmark_unified.py --workers 2 --mmap
+"""
+
+import argparse
+import gc
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+from benchmark_artifacts import ROOT, SERVICES, build_synthetic, is_lfs_pointer, load_app, memory_of, warm_up
+
+SERVER_DIR = os.path.join(ROOT, "inference-server")
+
+# Prefijo de variables de cada servicio en el servidor unificado
+ENV_PREFIXES = {"phishing": "PHISHING_", "ato": "ATO_", "brute_force": "BRUTE_FORCE_"}
+
+
+# ============================================================================
+# PROCESO MAESTRO (se ejecuta en un subproceso por configuracion)
+# ============================================================================
+
+def load_predictors(target):
+    """Predictores cargados por el maestro: los de un servicio o los tres del servidor unificado"""
+    if target == "unified":
+        sys.path.insert(0, SERVER_DIR)
+        os.chdir(SERVER_DIR)
+        import server
+
+        server.load_predictors()
+        return [module.get_predictor() for module in server.services.values()]
+    app = load_app(SERVICES[target]["api_dir"])
+    return [app.load_predictor()]
+
+
+def run_master(target, workers, result_path):
+    """Carga los modelos, hace fork de los workers y mide la memoria de todos"""
+    predictors = load_predictors(target)
+    for predictor in predictors:
+        warm_up(predictor)
+    gc.freeze()
+
+    ready_read, ready_write = os.pipe()
+    stop_read, stop_write = os.pipe()
+    children = []
+    for _ in range(workers):
+        pid = os.fork()
+        if pid == 0:
+            os.close(ready_read)
+            os.close(stop_write)
+            devnull = os.open(os.devnull, os.O_WRONLY)
+            os.dup2(devnull, 1)
+            os.dup2(devnull, 2)
+            for predictor in predictors:
+                warm_up(predictor)
+            os.write(ready_write, b"1")
+            os.read(stop_read, 1)
+            os._exit(0)
+        children.append(pid)
+    os.close(ready_write)
+    os.close(stop_read)
+
+    ready = 0
+    while ready < workers:
+        chunk = os.read(ready_read, workers)
+        if not chunk:
+            break
+        ready += len(chunk)
+
+    per_worker = [memory_of(pid) for pid in children]
+    master = memory_of(os.getpid())
+    os.close(stop_write)
+    for pid in children:
+        os.waitpid(pid, 0)
+
+    with open(result_path, "w") as f:
+        json.dump({"target": target, "ready_workers": ready, "master": master, "per_worker": per_worker}, f)
+
+
+# ============================================================================
+# ORQUESTACION
+# ============================================================================
+
+def measure(target, workers, env):
+    """Ejecuta el maestro en un proceso nuevo (importaciones y cache de modulos limpias)"""
+    with tempfile.NamedTemporaryFile(suffix=".json", delete=False) as f:
+        result_path = f.name
+    try:
+        completed = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--master", target, str(workers), result_path],
+            env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True
+        )
+        if completed.returncode != 0:
+            raise RuntimeError(f"{target} fallo:\n{completed.stderr[-2000:]}")
+        with open(result_path) as f:
+            return json.load(f)
+    finally:
+        os.remove(result_path)
+
+
+def summarize(runs):
+    workers = [w for run in runs for w in run["per_worker"]]
+    return {
+        "processes": len(runs) + len(workers),
+        "total_pss_mb": sum(w["pss_mb"] for w in workers) + sum(run["master"]["pss_mb"] for run in runs),
+        "uss_per_worker_mb": sum(w["uss_mb"] for w in workers) / len(workers) if workers else 0.0,
+    }
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "--master":
+        _, _, target, workers, result_path = sys.argv
+        run_master(target, int(workers), result_path)
+        return
+
+    parser = argparse.ArgumentParser(description="Memoria: tres APIs ML por separado vs servidor unificado")
+    parser.add_argument("--workers", type=int, default=1, help="Workers por servicio (separado) y en total (unificado)")
+    parser.add_argument("--mmap", action="store_true", help="Cargar los modelos desde bundles mapeados (ARTIFACT_DIR)")
+    parser.add_argument("--synthetic", action="store_true", help="Usar siempre artefactos sinteticos")
+    parser.add_argument("--output", help="Guardar los resultados en un archivo JSON")
+    args = parser.parse_args()
+
+    if not os.path.exists("/proc/self/smaps_rollup"):
+        sys.exit("Se necesita Linux (/proc/<pid>/smaps_rollup)")
+
+    workdir = tempfile.mkdtemp(prefix="unified-bench-")
+    try:
+        separate_env = {}
+        unified_env = dict(os.environ)
+        for service, spec in SERVICES.items():
+            sources = spec["sources"]
+            if args.synthetic or any(not os.path.exists(path) or is_lfs_pointer(path) for path in sources.values()):
+                print(f"[{service}] Generando artefactos sinteticos (los .pkl reales no estan disponibles)...")
+                sources = build_synthetic(service, workdir)
+            env = dict(os.environ)
+            env.pop("ARTIFACT_DIR", None)
+            for name, variable in spec["env"].items():
+                env[variable] = sources[name]
+                unified_env[ENV_PREFIXES[service] + variable] = sources[name]
+            if args.mmap:
+                env["ARTIFACT_DIR"] = os.path.join(workdir, f"{service}_bundle")
+                unified_env[ENV_PREFIXES[service] + "ARTIFACT_DIR"] = env["ARTIFACT_DIR"]
+            separate_env[service] = env
+
+        separate = summarize([measure(service, args.workers, separate_env[service]) for service in SERVICES])
+        unified = summarize([measure("unified", args.workers, unified_env)])
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print("\n" + "=" * 78)
+    print(f"BENCHMARK SERVIDOR UNIFICADO - {args.workers} worker(s), {'bundle mapeado' if args.mmap else 'joblib'}")
+    print("=" * 78)
+    print(f"  {'configuracion':<14} {'procesos':>9} {'PSS total':>11} {'USS/worker':>11}")
+    for label, row in (("separado", separate), ("unificado", unified)):
+        print(f"  {label:<14} {row['processes']:>9} {row['total_pss_mb']:>9.1f}MB {row['uss_per_worker_mb']:>9.1f}MB")
+    print(f"\n  PSS total: {separate['total_pss_mb']:.1f} -> {unified['total_pss_mb']:.1f} MB "
+          f"({100 * (1 - unified['total_pss_mb'] / separate['total_pss_mb']):.0f}% menos)")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"workers": args.workers, "mmap": args.mmap, "separate": separate, "unified": unified}, f, indent=2)
+        print(f"\nResultados guardados en {args.output}")
+
+
+if __name__ == "__main__":
+    main()
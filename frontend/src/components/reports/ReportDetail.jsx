@@ -2,14 +2,46 @@
  * ReportDetail Component
  * Detailed view of a report with results
  */
-import React, { useState } from 'react';
-import { Modal, Table, Badge, ProgressBar, Row, Col, Card, Spinner, Button } from 'react-bootstrap';
+import React, { useState, useEffect, useCallback } from 'react';
+import { Modal, Table, Badge, ProgressBar, Row, Col, Card, Spinner, Button, Form, Dropdown } from 'react-bootstrap';
 import { FaShieldAlt, FaCheckCircle, FaExclamationTriangle, FaQuestionCircle } from 'react-icons/fa';
 import ExplainabilitySection from '../results/ExplainabilitySection';
+import reportService from '../../services/reportService';
+
+const RESULTS_PAGE_SIZE = 100;
 
 function ReportDetail({ show, onHide, report, loading }) {
   const [selectedExplanation, setSelectedExplanation] = useState(null);
   const [showExplanationModal, setShowExplanationModal] = useState(false);
+  const [results, setResults] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [resultsLoading, setResultsLoading] = useState(false);
+  const [threatsOnly, setThreatsOnly] = useState(false);
+
+  const loadResults = useCallback(async (cursor = null) => {
+    if (!report?.id || report.status !== 'completed') return;
+    setResultsLoading(true);
+    try {
+      const response = await reportService.getReportResults(report.id, {
+        cursor,
+        limit: RESULTS_PAGE_SIZE,
+        threatsOnly
+      });
+      setResults(prev => (cursor ? [...prev, ...response.data.items] : response.data.items));
+      setNextCursor(response.data.next_cursor);
+    } catch (err) {
+      console.error('Error loading report results:', err);
+    } finally {
+      setResultsLoading(false);
+    }
+  }, [report?.id, report?.status, threatsOnly]);
+
+  useEffect(() => {
+    setResults([]);
+    setNextCursor(null);
+    if (show) loadResults();
+  }, [show, loadResults]);
+
   const getModelBadge = (modelType) => {
     const badges = {
       phishing: <Badge bg="info" className="fs-6">Deteccion de Phishing</Badge>,
@@ -45,7 +77,7 @@ function ReportDetail({ show, onHide, report, loading }) {
   };
 
   // Check if any result has explanation
-  const hasExplanations = report?.results?.some(r => r.explanation);
+  const hasExplanations = results.some(r => r.explanation);
 
   return (
     <Modal show={show} onHide={onHide} size="xl" centered>
@@ -146,13 +178,34 @@ function ReportDetail({ show, onHide, report, loading }) {
             </Card>
 
             {/* Results Table */}
-            {report.results && Array.isArray(report.results) && report.results.length > 0 && (
+            {report.status === 'completed' && (
               <Card className="border-0 shadow-sm">
-                <Card.Header className="bg-white">
-                  <strong>Resultados Detallados</strong>
-                  <small className="text-muted ms-2">
-                    (Mostrando {Math.min(report.results.length, 100)} de {report.results.length})
-                  </small>
+                <Card.Header className="bg-white d-flex justify-content-between align-items-center">
+                  <div>
+                    <strong>Resultados Detallados</strong>
+                    <small className="text-muted ms-2">
+                      (Mostrando {results.length} de {threatsOnly ? report.threats_detected : report.total_records})
+                    </small>
+                  </div>
+                  <div className="d-flex align-items-center gap-3">
+                    <Form.Check
+                      type="switch"
+                      id="report-threats-only"
+                      label="Solo amenazas"
+                      checked={threatsOnly}
+                      onChange={(e) => setThreatsOnly(e.target.checked)}
+                    />
+                    <Dropdown onSelect={(format) => reportService.exportReport(report.id, format)}>
+                      <Dropdown.Toggle variant="outline-secondary" size="sm">
+                        Exportar
+                      </Dropdown.Toggle>
+                      <Dropdown.Menu>
+                        <Dropdown.Item eventKey="csv">CSV</Dropdown.Item>
+                        <Dropdown.Item eventKey="parquet">Parquet</Dropdown.Item>
+                        <Dropdown.Item eventKey="jsonl">JSON Lines</Dropdown.Item>
+                      </Dropdown.Menu>
+                    </Dropdown>
+                  </div>
                 </Card.Header>
                 <Card.Body className="p-0">
                   <div style={{ maxHeight: '400px', overflow: 'auto' }}>
@@ -169,9 +222,9 @@ function ReportDetail({ show, onHide, report, loading }) {
                         </tr>
                       </thead>
                       <tbody>
-                        {report.results.slice(0, 100).map((result, idx) => (
-                          <tr key={idx}>
-                            <td>{idx + 1}</td>
+                        {results.map((result) => (
+                          <tr key={result.row_index}>
+                            <td>{result.row_index + 1}</td>
                             <td>
                               {result.is_threat ? (
                                 <Badge bg="danger">Amenaza</Badge>
@@ -210,7 +263,7 @@ function ReportDetail({ show, onHide, report, loading }) {
                                     variant="link"
                                     size="sm"
                                     className="p-0 text-primary"
-                                    onClick={() => handleShowExplanation(result, idx)}
+                                    onClick={() => handleShowExplanation(result, result.row_index)}
                                     title="Ver explicacion"
                                   >
                                     <FaQuestionCircle />
@@ -225,6 +278,17 @@ function ReportDetail({ show, onHide, report, loading }) {
                       </tbody>
                     </Table>
                   </div>
+                  {(resultsLoading || nextCursor) && (
+                    <div className="text-center py-2">
+                      {resultsLoading ? (
+                        <Spinner animation="border" size="sm" variant="primary" />
+                      ) : (
+                        <Button variant="outline-primary" size="sm" onClick={() => loadResults(nextCursor)}>
+                          Cargar mas
+                        </Button>
+                      )}
+                    </div>
+                  )}
                 </Card.Body>
               </Card>
             )}
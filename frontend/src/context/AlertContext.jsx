@@ -111,15 +111,103 @@ export function AlertProvider({ children }) {
     }
   };
 
-  // Poll for updates every 30 seconds
+  // Server-pushed updates; falls back to polling every 30 seconds
   useEffect(() => {
-    if (!authLoading && isAuthenticated()) {
-      fetchUnreadCount();
+    if (authLoading || !isAuthenticated()) return;
 
+    fetchUnreadCount();
+
+    if (typeof EventSource === 'undefined') {
       const interval = setInterval(fetchUnreadCount, 30000);
       return () => clearInterval(interval);
     }
-  }, [authLoading, isAuthenticated, fetchUnreadCount]);
+
+    let source = null;
+    let retryTimer = null;
+    let lastEventId = null;
+    let stopped = false;
+
+    const connect = async (reconnecting) => {
+      if (stopped) return;
+      try {
+        source = await alertService.openStream(lastEventId);
+      } catch (err) {
+        console.error('Error opening alert stream:', err);
+        retryTimer = setTimeout(() => connect(reconnecting), 5000);
+        return;
+      }
+      if (stopped) {
+        source.close();
+        return;
+      }
+      if (reconnecting && !lastEventId) {
+        // Nothing to resume from: refetch what may have changed meanwhile
+        fetchUnreadCount();
+        fetchStats();
+      }
+
+      const track = (e) => {
+        if (e.lastEventId) lastEventId = e.lastEventId;
+      };
+
+      source.addEventListener('counters', (e) => {
+        track(e);
+        const { deltas } = JSON.parse(e.data);
+        const unreadDelta = deltas['alerts.status.unread'];
+        if (unreadDelta) {
+          setUnreadCount(prev => Math.max(0, prev + unreadDelta));
+        }
+        if (Object.keys(deltas).some(key => key.startsWith('alerts.'))) {
+          setStats(prev => {
+            if (!prev) return prev;
+            const bySeverity = { ...prev.by_severity };
+            Object.keys(bySeverity).forEach(severity => {
+              bySeverity[severity] += deltas[`alerts.active.${severity}`] || 0;
+            });
+            return {
+              ...prev,
+              total: prev.total + (deltas['alerts.total'] || 0),
+              unread: prev.unread + (unreadDelta || 0),
+              by_severity: bySeverity
+            };
+          });
+        }
+      });
+
+      source.addEventListener('alert.status', (e) => {
+        track(e);
+        const { ids = [], incident_ids: incidentIds = [], all, status } = JSON.parse(e.data);
+        setAlerts(prev => prev.map(a => {
+          if (all ? a.status === 'unread' : ids.includes(a.id) || incidentIds.includes(a.incident_id)) {
+            return { ...a, status };
+          }
+          return a;
+        }));
+      });
+
+      // State is unknown (gateway restarted or we fell behind): refetch
+      source.addEventListener('resync', (e) => {
+        track(e);
+        fetchUnreadCount();
+        fetchStats();
+      });
+
+      // The ticket was used up: reopen with a new one instead of letting the
+      // browser retry the same URL
+      source.onerror = () => {
+        source.close();
+        retryTimer = setTimeout(() => connect(true), 5000);
+      };
+    };
+
+    connect(false);
+
+    return () => {
+      stopped = true;
+      clearTimeout(retryTimer);
+      if (source) source.close();
+    };
+  }, [authLoading, isAuthenticated, fetchUnreadCount, fetchStats]);
 
   const value = {
     unreadCount,
@@ -35,6 +35,20 @@ alertApi.interceptors.response.use(
 );
 
 const alertService = {
+  /**
+   * Open the server-sent alert stream.
+   * EventSource cannot send headers, so the URL carries a short-lived
+   * single-use ticket instead of the token. A ticket cannot be reused by the
+   * browser's own reconnect: callers reopen the stream, passing the id of the
+   * last event they received to get the events they missed.
+   */
+  openStream: async (lastEventId = null) => {
+    const { ticket } = await alertApi.post('/alerts/stream-ticket');
+    const params = new URLSearchParams({ ticket });
+    if (lastEventId) params.append('last_event_id', lastEventId);
+    return new EventSource(`${AUTH_API_URL}/alerts/stream?${params}`);
+  },
+
   /**
    * List alerts with optional filters
    */
@@ -43,6 +57,7 @@ const alertService = {
     if (filters.status) params.append('status', filters.status);
     if (filters.severity) params.append('severity', filters.severity);
     if (filters.model_type) params.append('model_type', filters.model_type);
+    if (filters.cursor) params.append('cursor', filters.cursor);
     if (filters.skip) params.append('skip', filters.skip);
     if (filters.limit) params.append('limit', filters.limit);
 
@@ -50,6 +65,21 @@ const alertService = {
     return alertApi.get(`/alerts${queryString ? '?' + queryString : ''}`);
   },
 
+  /**
+   * Full-text search over alerts (sender, domain, IP, user or keyword)
+   */
+  searchAlerts: async (q, filters = {}) => {
+    const params = new URLSearchParams({ q });
+    if (filters.status) params.append('status', filters.status);
+    if (filters.severity) params.append('severity', filters.severity);
+    if (filters.model_type) params.append('model_type', filters.model_type);
+    if (filters.sort) params.append('sort', filters.sort);
+    if (filters.cursor) params.append('cursor', filters.cursor);
+    if (filters.limit) params.append('limit', filters.limit);
+
+    return alertApi.get(`/alerts/search?${params.toString()}`);
+  },
+
   /**
    * Get unread alert count
    */
@@ -59,6 +59,33 @@ const reportService = {
     return reportApi.get(`/reports/${reportId}`);
   },
 
+  /**
+   * Get a page of report results (keyset pagination)
+   */
+  getReportResults: async (reportId, { cursor = null, limit = 100, threatsOnly = false } = {}) => {
+    const params = { limit, threats_only: threatsOnly };
+    if (cursor) params.cursor = cursor;
+    return reportApi.get(`/reports/${reportId}/results`, { params });
+  },
+
+  /**
+   * Download report results joined with the input columns (csv, parquet or jsonl)
+   */
+  exportReport: async (reportId, format = 'csv') => {
+    const response = await reportApi.get(`/reports/${reportId}/export`, {
+      params: { format },
+      responseType: 'blob'
+    });
+    const url = window.URL.createObjectURL(response.data);
+    const link = document.createElement('a');
+    link.href = url;
+    link.download = `report_${reportId}.${format}`;
+    document.body.appendChild(link);
+    link.click();
+    link.remove();
+    window.URL.revokeObjectURL(url);
+  },
+
   /**
    * Delete a report
    */
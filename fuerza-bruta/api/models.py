@@ -201,6 +201,7 @@ class PredictionResponse(BaseModel):
     explanation: BruteForceExplanation = Field(..., description="Explanation of why this prediction was made")
     processing_time_ms: float = Field(..., description="Processing time in milliseconds")
     model_name: str = Field(..., description="Model used for prediction")
+    timings: Optional[Dict[str, float]] = Field(None, description="Milliseconds per processing stage (with ?timings=true)")
 
 
 class SingleBatchPrediction(BaseModel):
@@ -219,6 +220,7 @@ class BatchMetadata(BaseModel):
     processing_time_ms: float = Field(..., description="Total processing time")
     brute_force_count: int = Field(..., description="Number of brute force flows detected")
     benign_count: int = Field(..., description="Number of benign flows")
+    timings: Optional[Dict[str, float]] = Field(None, description="Milliseconds per processing stage (with ?timings=true)")
 
 
 class BatchPredictionResponse(BaseModel):
@@ -262,6 +264,7 @@ class ModelInfoResponse(BaseModel):
     """Model information response."""
     model_name: str
     model_version: str
+    registry_version: Optional[str] = Field(None, description="Model registry version served ('local' = MODEL_PATH)")
     training_date: str
     metrics: ModelMetrics
     features: ModelFeatures
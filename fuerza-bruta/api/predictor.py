@@ -2,14 +2,20 @@
 Brute Force Detection - Predictor Module
 Handles model loading and predictions.
 """
+import os
+import sys
 import time
 import json
-import joblib
 import logging
 import numpy as np
 import pandas as pd
 from typing import Dict, List, Tuple, Optional
 
+# Shared service modules (service_common/ at the repository root; /app in the Docker image)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from service_common.artifacts import load_artifacts
+from service_common.metrics import stage
+
 logger = logging.getLogger(__name__)
 
 # Singleton predictor instance
@@ -104,19 +110,26 @@ class BruteForcePredictor:
         'idle_std': 'Idle Std'
     }
 
-    def __init__(self, model_path: str, model_info_path: Optional[str] = None):
+    def __init__(
+        self,
+        model_path: str,
+        model_info_path: Optional[str] = None,
+        artifact_dir: Optional[str] = None
+    ):
         """
         Initialize predictor with trained model.
 
         Args:
             model_path: Path to trained model (.pkl)
             model_info_path: Path to model metadata (.json)
+            artifact_dir: Memory-mapped artifact bundle (built from model_path
+                on first use); None loads the pickle directly
         """
         logger.info(f"Loading model from: {model_path}")
 
-        # Load model
-        self.model = joblib.load(model_path)
-        self.model_name = type(self.model).__name__
+        # Load model (mapped arrays shared between workers when artifact_dir is set)
+        self.model = load_artifacts({"model": model_path}, artifact_dir)["model"]
+        self.model_name = getattr(self.model, "estimator_name", type(self.model).__name__)
 
         # Load model info if available
         self.model_info = {}
@@ -440,21 +453,25 @@ class BruteForcePredictor:
         start_time = time.time()
 
         # Prepare features
-        X = self._prepare_features(flow_data)
+        with stage("feature_engineering"):
+            X = self._prepare_features(flow_data)
 
         # Predict
-        prediction = self.model.predict(X)[0]
-        probabilities = self.model.predict_proba(X)[0]
+        with stage("model"):
+            prediction = self.model.predict(X)[0]
+            probabilities = self.model.predict_proba(X)[0]
 
         # Format response
         prediction_label = "Brute Force" if prediction == 1 else "Benign"
         confidence = float(probabilities[prediction])
 
         # Generate explanation
-        explanation = self._generate_explanation(flow_data, int(prediction), confidence)
+        with stage("explanation"):
+            explanation = self._generate_explanation(flow_data, int(prediction), confidence)
 
         # Generate metrics analysis
-        metrics_analysis = self._generate_metrics_analysis(flow_data)
+        with stage("metrics_analysis"):
+            metrics_analysis = self._generate_metrics_analysis(flow_data)
 
         # Calculate processing time
         processing_time_ms = (time.time() - start_time) * 1000
@@ -486,12 +503,14 @@ class BruteForcePredictor:
         start_time = time.time()
 
         # Prepare all features
-        X_list = [self._prepare_features(flow) for flow in flows_data]
-        X = pd.concat(X_list, ignore_index=True)
+        with stage("feature_engineering"):
+            X_list = [self._prepare_features(flow) for flow in flows_data]
+            X = pd.concat(X_list, ignore_index=True)
 
         # Batch predict
-        predictions = self.model.predict(X)
-        probabilities = self.model.predict_proba(X)
+        with stage("model"):
+            predictions = self.model.predict(X)
+            probabilities = self.model.predict_proba(X)
 
         # Calculate processing time
         processing_time_ms = (time.time() - start_time) * 1000
@@ -501,8 +520,10 @@ class BruteForcePredictor:
         for idx, (pred, probs, flow) in enumerate(zip(predictions, probabilities, flows_data)):
             prediction_label = "Brute Force" if pred == 1 else "Benign"
             confidence = float(probs[pred])
-            explanation = self._generate_explanation(flow, int(pred), confidence)
-            metrics_analysis = self._generate_metrics_analysis(flow)
+            with stage("explanation"):
+                explanation = self._generate_explanation(flow, int(pred), confidence)
+            with stage("metrics_analysis"):
+                metrics_analysis = self._generate_metrics_analysis(flow)
 
             results.append({
                 "index": idx,
@@ -557,7 +578,8 @@ class BruteForcePredictor:
 
 def get_predictor(
     model_path: Optional[str] = None,
-    model_info_path: Optional[str] = None
+    model_info_path: Optional[str] = None,
+    artifact_dir: Optional[str] = None
 ) -> BruteForcePredictor:
     """
     Get or create predictor instance (singleton pattern).
@@ -565,6 +587,7 @@ def get_predictor(
     Args:
         model_path: Path to model (only for first initialization)
         model_info_path: Path to model info (only for first initialization)
+        artifact_dir: Memory-mapped artifact bundle (only for first initialization)
 
     Returns:
         BruteForcePredictor instance
@@ -577,7 +600,26 @@ def get_predictor(
 
         _predictor_instance = BruteForcePredictor(
             model_path=model_path,
-            model_info_path=model_info_path
+            model_info_path=model_info_path,
+            artifact_dir=artifact_dir
         )
 
     return _predictor_instance
+
+
+def swap_predictor(new_instance: BruteForcePredictor) -> Optional[BruteForcePredictor]:
+    """
+    Replace the served predictor (model hot-swap, see service_common/registry.py).
+    Requests that already called get_predictor() finish on the instance they got.
+
+    Args:
+        new_instance: Loaded and warmed-up predictor
+
+    Returns:
+        The previously served predictor (None if there was none)
+    """
+    global _predictor_instance
+
+    previous = _predictor_instance
+    _predictor_instance = new_instance
+    return previous
@@ -0,0 +1,33 @@
+"""
+Gunicorn configuration for the Unified ML Inference Server.
+
+The master imports all mounted services and loads their models before forking
+(preload_app), so every uvicorn worker starts with the three models and their
+libraries already in memory and shares those pages copy-on-write. Any worker
+serves any model: capacity left idle by one model goes to the busy ones.
+
+The ATO API keeps per-user login history in its process: with more than one
+worker, serve ATO from its own single-worker API and leave it out of
+INFERENCE_MODELS here.
+
+Usage:
+    gunicorn -c gunicorn.conf.py server:app
+"""
+import gc
+import os
+
+bind = f"{os.getenv('HOST', '0.0.0.0')}:{os.getenv('PORT', '8004')}"
+workers = int(os.getenv("WEB_CONCURRENCY", "1"))
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+timeout = int(os.getenv("WORKER_TIMEOUT", "120"))
+
+
+def on_starting(server):
+    """Load every model in the master, then freeze them out of the cyclic GC"""
+    import server as inference_server
+
+    inference_server.load_predictors()
+    # Objects loaded so far are never collected; freezing them keeps the
+    # workers' garbage collector from writing to (and so copying) their pages
+    gc.freeze()
@@ -0,0 +1,175 @@
+"""
+Unified ML Inference Server - FastAPI Application
+Serves the phishing, ATO and brute force APIs from one process group.
+
+Each service's app.py is imported unchanged and mounted under its own prefix,
+so its routes keep their paths below it (POST /phishing/predict/batch,
+GET /ato/model/info, POST /brute-force/admin/models/{version}/load...). Point
+PredictionClient.API_URLS at the prefixes:
+
+    PHISHING_API_URL=http://ml-inference:8004/phishing
+    ATO_API_URL=http://ml-inference:8004/ato
+    BRUTE_FORCE_API_URL=http://ml-inference:8004/brute-force
+
+The services share the interpreter (pandas, numpy and sklearn are imported
+once), the event loop and the gunicorn workers, so a busy model can use the
+capacity the others leave idle. Their settings are the same variables as in
+the standalone APIs, prefixed with the service: PHISHING_MODEL_PATH,
+ATO_ENCODERS_PATH, BRUTE_FORCE_ARTIFACT_DIR... Unprefixed variables
+(ADMIN_TOKEN, WARMUP_REQUESTS, DEBUG...) apply to all of them.
+
+Usage:
+    gunicorn -c gunicorn.conf.py server:app
+    python server.py
+"""
+import os
+import sys
+import logging
+import importlib
+from contextlib import AsyncExitStack, asynccontextmanager
+from typing import Dict
+
+from fastapi import FastAPI
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# model type (as in PredictionClient.API_URLS) -> mount prefix, env prefix, api directory
+SERVICES = {
+    "phishing": {
+        "prefix": "/phishing",
+        "env_prefix": "PHISHING_",
+        "api_dir": os.path.join(ROOT, "Phishing", "modeling", "api"),
+    },
+    "ato": {
+        "prefix": "/ato",
+        "env_prefix": "ATO_",
+        "api_dir": os.path.join(ROOT, "Suspicious-Login-Activity", "modeling", "api"),
+    },
+    "brute_force": {
+        "prefix": "/brute-force",
+        "env_prefix": "BRUTE_FORCE_",
+        "api_dir": os.path.join(ROOT, "fuerza-bruta", "api"),
+    },
+}
+
+# Top-level modules every api directory defines; imported once per service.
+# The artifacts, registry, metrics, profiler, memory and tracing modules come from service_common.
+SERVICE_MODULES = ("app", "models", "predictor")
+
+# Comma-separated subset of SERVICES to serve (default: all)
+INFERENCE_MODELS = [
+    name.strip() for name in os.getenv("INFERENCE_MODELS", ",".join(SERVICES)).split(",") if name.strip()
+]
+
+
+def import_service(name: str):
+    """
+    Import a service's app module in isolation: its api directory first on
+    sys.path, its prefixed variables visible unprefixed, and none of the other
+    services' same-named modules in sys.modules. Its modules are then kept
+    as "<service>.<module>" so the next service imports its own.
+    """
+    spec = SERVICES[name]
+    api_dir = os.getenv(f"{spec['env_prefix']}API_DIR", spec["api_dir"])
+    saved_environ = dict(os.environ)
+    saved_path = list(sys.path)
+    saved_modules = {module: sys.modules.pop(module) for module in SERVICE_MODULES if module in sys.modules}
+
+    for key, value in saved_environ.items():
+        if key.startswith(spec["env_prefix"]):
+            os.environ[key[len(spec["env_prefix"]):]] = value
+    sys.path.insert(0, api_dir)
+    try:
+        return importlib.import_module("app")
+    finally:
+        for module in SERVICE_MODULES:
+            if module in sys.modules:
+                sys.modules[f"{name}.{module}"] = sys.modules.pop(module)
+        sys.modules.update(saved_modules)
+        # load_dotenv() and the prefixed overlay must not leak into the next service
+        os.environ.clear()
+        os.environ.update(saved_environ)
+        sys.path[:] = saved_path
+
+
+unknown = [name for name in INFERENCE_MODELS if name not in SERVICES]
+if unknown:
+    raise ValueError(f"Unknown INFERENCE_MODELS: {', '.join(unknown)} (expected: {', '.join(SERVICES)})")
+
+services = {name: import_service(name) for name in INFERENCE_MODELS}
+
+
+def load_predictors():
+    """
+    Load every service's predictor. Called by the lifespans, and by the
+    gunicorn master before forking (gunicorn.conf.py) so workers share them.
+    """
+    for name, module in services.items():
+        logger.info(f"📦 Loading {name} predictor...")
+        module.load_predictor()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Mounted apps do not get lifespan events of their own: run each service's
+    lifespan (model load, registry follower) inside this one.
+    """
+    logger.info(f"🚀 Starting Unified ML Inference Server ({', '.join(services)})...")
+    async with AsyncExitStack() as stack:
+        for module in services.values():
+            await stack.enter_async_context(module.app.router.lifespan_context(module.app))
+        logger.info("✅ Server ready to accept requests")
+
+        yield
+
+        logger.info("🛑 Shutting down Unified ML Inference Server...")
+
+
+app = FastAPI(
+    title="Unified ML Inference Server",
+    description="Phishing, account takeover and brute force detection APIs behind one process group",
+    version="1.0.0",
+    lifespan=lifespan
+)
+
+for name, module in services.items():
+    app.mount(SERVICES[name]["prefix"], module.app)
+
+
+@app.get("/", tags=["Health"])
+async def health_check() -> Dict:
+    """Health check: the model each mounted service is serving"""
+    return {
+        "status": "ok",
+        "message": "Unified ML Inference Server",
+        "services": {
+            name: {
+                "prefix": SERVICES[name]["prefix"],
+                "model": module.get_predictor().get_model_name(),
+                "registry_version": module.swapper.version,
+            }
+            for name, module in services.items()
+        }
+    }
+
+
+# ============================================================================
+# MAIN (for development only)
+# ============================================================================
+
+if __name__ == "__main__":
+    import uvicorn
+
+    host = os.getenv("HOST", "0.0.0.0")
+    port = int(os.getenv("PORT", 8004))
+
+    logger.info(f"🚀 Starting server on {host}:{port}")
+    uvicorn.run(app, host=host, port=port, log_level="info")
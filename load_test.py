@@ -0,0 +1,615 @@
+#!/usr/bin/env python3
+"""
+Prueba de carga local del stack completo (gateway + APIs ML), para
+dimensionar hardware y encontrar el primer endpoint que se satura.
+
+Subcomandos:
+
+  generate  Escribe archivos CSV sinteticos de cualquier tamano (millones de
+            filas, por bloques) con las mismas columnas y la misma mezcla de
+            ataques que las muestras de seed_data.py. Los generadores son
+            vectorizados (numpy/pandas): 1M filas se generan en 1-2 s; la
+            escritura del CSV es lo que mas tarda.
+
+  run       Usuarios virtuales concurrentes contra un gateway levantado
+            (docker compose up). Cada usuario inicia sesion y repite, con
+            una pausa aleatoria (--think), una de estas acciones segun
+            --mix:
+              report    sube un archivo, genera el reporte y abre la primera
+                        pagina de resultados
+              alerts    consulta el contador de no leidas y la lista de alertas
+              monthly   abre el reporte mensual del mes actual
+            La carga sube por etapas (--users 5 10 20 40): los usuarios de
+            una etapa siguen en la siguiente. Al final de cada etapa se
+            imprime por endpoint: peticiones, peticiones/s, p50/p95/p99,
+            maximo y porcentaje de errores. Un endpoint se considera saturado
+            cuando su tasa de errores supera --max-error-rate o su p95 crece
+            mas de --degradation veces respecto a la primera etapa (y pasa
+            de --min-p95-ms); el resumen indica cual se satura primero y con
+            cuantos usuarios.
+
+Los archivos subidos se generan para cada subida con una semilla nueva,
+para que la cache de predicciones del gateway no convierta la carga en
+aciertos de cache. El generador de carga corre en un solo hilo: si su CPU
+se acerca al 100% (se muestra por etapa) los resultados dejan de medir el
+stack; usar menos usuarios por proceso o varios procesos.
+
+Uso:
+  python load_test.py generate --model ato --rows 5000000 --output logins_5m.csv
+  python load_test.py run --users 5 10 20 40 --stage-seconds 60
+  python load_test.py run --users 20 --mix report=0 alerts=8 monthly=2 --output carga.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import resource
+import time
+from collections import defaultdict
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+BASE_URL = "http://localhost:8003"
+MODELS = ["phishing", "ato", "brute_force"]
+ACTIONS = ["report", "alerts", "monthly"]
+DEFAULT_MIX = {"report": 1, "alerts": 6, "monthly": 2}
+
+# Proporcion de ataques de las muestras de seed_data.py
+ATTACK_RATIO = {"phishing": 0.5, "ato": 0.16, "brute_force": 0.5}
+
+
+# ============================================================================
+# GENERADORES VECTORIZADOS (columnas de create_*_samples en seed_data.py)
+# ============================================================================
+
+PHISHING_SUBJECTS = np.array([
+    "Urgent: verify your account now", "Your password expires today", "Action required: account suspended",
+    "Invoice overdue - payment needed", "You have won a gift card", "Security alert for your bank account",
+    "Unusual sign-in activity", "Confirm your billing information",
+])
+LEGIT_SUBJECTS = np.array([
+    "Meeting notes", "Weekly report", "Lunch on friday?", "Project update", "Re: budget review",
+    "Agenda for tomorrow", "Vacation schedule", "Q1 planning",
+])
+PHISHING_WORDS = (
+    "urgent verify account password click here login suspended bank confirm immediately security "
+    "update billing winner free prize limited offer credentials unusual activity restore access"
+).split()
+COMMON_WORDS = (
+    "the team meeting report project please find attached schedule review thanks regards next week "
+    "document budget client update notes call office plan results data question time"
+).split()
+PHISHING_DOMAINS = np.array(["paypa1-secure.com", "bank-verify.net", "microsoft-support.info", "amazon.co-login.ru"])
+
+LOCATIONS = np.array([
+    ("BO", "La Paz", "La Paz"), ("BO", "Santa Cruz", "Santa Cruz de la Sierra"), ("BO", "Cochabamba", "Cochabamba"),
+    ("US", "California", "Los Angeles"), ("NO", "Oslo County", "Oslo"), ("BR", "Sao Paulo", "Sao Paulo"),
+    ("DE", "Berlin", "Berlin"), ("AR", "Buenos Aires", "Buenos Aires"),
+])
+ATTACK_LOCATIONS = np.array([("RU", "Moscow", "Moscow"), ("CN", "Beijing", "Beijing"), ("RO", "Bucharest", "Bucharest")])
+ASNS = np.array([6568, 27882, 26210, 7018, 2119, 28573, 3320, 7303])
+ATTACK_ASNS = np.array([12389, 4134, 8708])
+BROWSERS = np.array(["Chrome 120.0", "Firefox 121.0", "Safari 17.2", "Edge 120.0", "Chrome Mobile 119.0"])
+SYSTEMS = np.array(["Windows 10", "Mac OS X 14.2", "iOS 17.1", "Android 13", "Linux"])
+DEVICES = np.array(["desktop", "mobile", "tablet"])
+
+# Columnas de create_brute_force_samples (col_mapping sin timestamp ni label)
+BRUTE_FORCE_COLUMNS = [
+    "dst_port", "protocol", "flow_duration", "tot_fwd_pkts", "tot_bwd_pkts", "totlen_fwd_pkts",
+    "fwd_pkt_len_max", "fwd_pkt_len_min", "fwd_pkt_len_mean", "fwd_pkt_len_std", "bwd_pkt_len_max",
+    "bwd_pkt_len_min", "bwd_pkt_len_mean", "bwd_pkt_len_std", "flow_byts_s", "flow_pkts_s", "flow_iat_mean",
+    "flow_iat_std", "flow_iat_max", "fwd_iat_std", "bwd_iat_tot", "bwd_iat_mean", "bwd_iat_std", "bwd_iat_max",
+    "bwd_iat_min", "fwd_psh_flags", "bwd_psh_flags", "fwd_urg_flags", "bwd_urg_flags", "fwd_pkts_s",
+    "bwd_pkts_s", "pkt_len_min", "pkt_len_max", "pkt_len_mean", "pkt_len_std", "pkt_len_var", "fin_flag_cnt",
+    "rst_flag_cnt", "psh_flag_cnt", "ack_flag_cnt", "urg_flag_cnt", "cwe_flag_count", "down_up_ratio",
+    "fwd_byts_b_avg", "fwd_pkts_b_avg", "fwd_blk_rate_avg", "bwd_byts_b_avg", "bwd_pkts_b_avg",
+    "bwd_blk_rate_avg", "init_fwd_win_byts", "init_bwd_win_byts", "fwd_act_data_pkts", "fwd_seg_size_min",
+    "active_mean", "active_std", "active_max", "active_min", "idle_mean", "idle_std",
+]
+
+
+def body_pool(rng, words, size=2048):
+    """Cuerpos de correo de 30-300 palabras; las filas se eligen de este conjunto"""
+    lengths = rng.integers(30, 300, size)
+    indexes = rng.integers(0, len(words), lengths.sum())
+    vocabulary = np.array(words)[indexes]
+    bounds = np.concatenate([[0], np.cumsum(lengths)])
+    return np.array([" ".join(vocabulary[bounds[i]:bounds[i + 1]]) for i in range(size)], dtype=object)
+
+
+def phishing_frame(rng, rows, start_index=0):
+    attack = rng.random(rows) < ATTACK_RATIO["phishing"]
+    bodies = np.where(
+        attack,
+        rng.choice(body_pool(rng, PHISHING_WORDS + COMMON_WORDS), rows),
+        rng.choice(body_pool(rng, COMMON_WORDS), rows),
+    )
+    domains = rng.choice(PHISHING_DOMAINS, rows)
+    ids = pd.Series(np.arange(start_index, start_index + rows)).astype(str).to_numpy(dtype=object)
+    links = " http://" + domains.astype(object) + "/login?id=" + ids
+    senders = np.where(
+        attack,
+        "security@" + domains.astype(object),
+        "user" + rng.integers(1, 5000, rows).astype(str).astype(object) + "@company.com",
+    )
+    dates = pd.Timestamp("2026-01-01") + pd.to_timedelta(rng.integers(0, 90 * 86400, rows), unit="s")
+    return pd.DataFrame({
+        "sender": senders,
+        "receiver": "employee" + rng.integers(1, 20000, rows).astype(str).astype(object) + "@company.com",
+        "date": dates,
+        "subject": np.where(attack, rng.choice(PHISHING_SUBJECTS, rows), rng.choice(LEGIT_SUBJECTS, rows)),
+        "body": np.where(attack, bodies + links, bodies),
+        "label": attack.astype(int),
+        "urls": (attack | (rng.random(rows) < 0.2)).astype(int),
+    })
+
+
+def ato_frame(rng, rows, users=None):
+    """
+    Logins con usuarios de actividad desigual (zipf): cada usuario tiene un
+    lugar, navegador y sistema habituales y a veces viaja o cambia de equipo
+    """
+    users = users or max(rows // 20, 1)
+    user = (rng.zipf(1.2, rows) - 1) % users
+    attack = rng.random(rows) < ATTACK_RATIO["ato"]
+
+    home = (user * 7919) % len(LOCATIONS)
+    travels = rng.random(rows) < 0.05
+    place = np.where(travels, rng.integers(0, len(LOCATIONS), rows), home)
+    location = LOCATIONS[place]
+    attack_location = ATTACK_LOCATIONS[rng.integers(0, len(ATTACK_LOCATIONS), rows)]
+    location = np.where(attack[:, None], attack_location, location)
+
+    changes = rng.random(rows) < 0.1
+    browser = np.where(changes, rng.integers(0, len(BROWSERS), rows), user % len(BROWSERS))
+    system = np.where(changes, rng.integers(0, len(SYSTEMS), rows), (user // 5) % len(SYSTEMS))
+    device = np.where(changes, rng.integers(0, len(DEVICES), rows), (user // 25) % len(DEVICES))
+
+    octets = np.where(
+        attack[:, None],
+        rng.integers(1, 255, (rows, 4)),
+        np.stack([100 + home, user % 256, (user // 256) % 256, 1 + user % 250 + travels], axis=1),
+    ).astype(str).astype(object)
+    ip = octets[:, 0] + "." + octets[:, 1] + "." + octets[:, 2] + "." + octets[:, 3]
+
+    return pd.DataFrame({
+        "user_id": (1000 + user).astype(str),
+        "ip_address": ip,
+        "country": location[:, 0],
+        "region": location[:, 1],
+        "city": location[:, 2],
+        "browser": BROWSERS[browser],
+        "os": SYSTEMS[system],
+        "device": DEVICES[device],
+        "login_successful": (rng.random(rows) < np.where(attack, 0.4, 0.95)).astype(int),
+        "is_attack_ip": attack.astype(int),
+        "asn": np.where(attack, rng.choice(ATTACK_ASNS, rows), ASNS[home]),
+        "rtt": np.round(np.where(attack, rng.uniform(300, 1200, rows), rng.lognormal(3.8, 0.4, rows)), 1),
+    })
+
+
+def brute_force_frame(rng, rows):
+    """Flujos de red: ataques cortos a 21/22 con pocos paquetes pequenos, trafico normal variado"""
+    attack = rng.random(rows) < ATTACK_RATIO["brute_force"]
+    fwd_pkts = np.where(attack, rng.integers(2, 13, rows), rng.integers(1, 201, rows))
+    bwd_pkts = np.where(attack, rng.integers(1, 11, rows), rng.integers(0, 201, rows))
+    duration = np.where(attack, rng.uniform(1e3, 5e5, rows), rng.uniform(1e2, 1e8, rows))
+    max_len = np.where(attack, 120.0, 1460.0)
+    fwd_mean = rng.uniform(0.1, 0.6, rows) * max_len
+    bwd_mean = rng.uniform(0.1, 0.6, rows) * max_len
+    fwd_max = np.minimum(fwd_mean * rng.uniform(1, 2, rows), max_len)
+    bwd_max = np.minimum(bwd_mean * rng.uniform(1, 2, rows), max_len)
+    fwd_min = fwd_mean * rng.uniform(0, 1, rows)
+    bwd_min = bwd_mean * rng.uniform(0, 1, rows)
+    std = (fwd_max - fwd_min + bwd_max - bwd_min) / 4
+    packets = fwd_pkts + bwd_pkts
+    pkt_mean = (fwd_mean * fwd_pkts + bwd_mean * bwd_pkts) / packets
+    seconds = duration / 1e6
+    iat = duration / np.maximum(packets - 1, 1)
+    active = np.where(attack, 0.0, rng.uniform(0, 1e5, rows))
+    zeros = np.zeros(rows, dtype=int)
+
+    frame = pd.DataFrame({
+        "dst_port": np.where(attack, rng.choice([21, 22], rows), rng.choice([80, 443, 53, 3389, 8080], rows)),
+        "protocol": np.where(attack, 6, rng.choice([6, 6, 17], rows)),
+        "flow_duration": duration,
+        "tot_fwd_pkts": fwd_pkts,
+        "tot_bwd_pkts": bwd_pkts,
+        "totlen_fwd_pkts": fwd_mean * fwd_pkts,
+        "fwd_pkt_len_max": fwd_max,
+        "fwd_pkt_len_min": fwd_min,
+        "fwd_pkt_len_mean": fwd_mean,
+        "fwd_pkt_len_std": std,
+        "bwd_pkt_len_max": bwd_max,
+        "bwd_pkt_len_min": bwd_min,
+        "bwd_pkt_len_mean": bwd_mean,
+        "bwd_pkt_len_std": std,
+        "flow_byts_s": (fwd_mean * fwd_pkts + bwd_mean * bwd_pkts) / seconds,
+        "flow_pkts_s": packets / seconds,
+        "flow_iat_mean": iat,
+        "flow_iat_std": iat * rng.uniform(0.1, 2, rows),
+        "flow_iat_max": iat * rng.uniform(1, 5, rows),
+        "fwd_iat_std": iat * rng.uniform(0.1, 2, rows),
+        "bwd_iat_tot": duration * rng.uniform(0.3, 1, rows),
+        "bwd_iat_mean": iat,
+        "bwd_iat_std": iat * rng.uniform(0.1, 2, rows),
+        "bwd_iat_max": iat * rng.uniform(1, 5, rows),
+        "bwd_iat_min": iat * rng.uniform(0, 1, rows),
+        "fwd_pkts_s": fwd_pkts / seconds,
+        "bwd_pkts_s": bwd_pkts / seconds,
+        "pkt_len_min": np.minimum(fwd_min, bwd_min),
+        "pkt_len_max": np.maximum(fwd_max, bwd_max),
+        "pkt_len_mean": pkt_mean,
+        "pkt_len_std": std,
+        "pkt_len_var": std ** 2,
+        "fin_flag_cnt": (rng.random(rows) < 0.3).astype(int),
+        "rst_flag_cnt": (attack & (rng.random(rows) < 0.5)).astype(int),
+        "psh_flag_cnt": (rng.random(rows) < 0.5).astype(int),
+        "ack_flag_cnt": (rng.random(rows) < 0.7).astype(int),
+        "down_up_ratio": np.round(bwd_pkts / fwd_pkts),
+        "init_fwd_win_byts": rng.choice([26883, 29200, 64240, 8192, -1], rows),
+        "init_bwd_win_byts": rng.choice([227, 26847, 28960, -1], rows),
+        "fwd_act_data_pkts": (fwd_pkts * rng.random(rows)).astype(int),
+        "fwd_seg_size_min": rng.choice([20, 32], rows),
+        "active_mean": active,
+        "active_std": 0.0,
+        "active_max": active,
+        "active_min": active,
+        "idle_mean": np.where(attack, 0.0, rng.uniform(0, 1e7, rows)),
+        "idle_std": 0.0,
+    })
+    for column in BRUTE_FORCE_COLUMNS:
+        if column not in frame:
+            frame[column] = zeros
+    return frame[BRUTE_FORCE_COLUMNS]
+
+
+def generate_frame(model, rows, seed, start_index=0):
+    rng = np.random.default_rng(seed)
+    if model == "phishing":
+        return phishing_frame(rng, rows, start_index)
+    if model == "ato":
+        return ato_frame(rng, rows)
+    return brute_force_frame(rng, rows)
+
+
+def write_csv(model, rows, path, seed=42, chunk_rows=200000):
+    """Escribe `rows` filas por bloques (memoria acotada por chunk_rows)"""
+    written = 0
+    users = max(rows // 20, 1)
+    with open(path, "w", newline="") as f:
+        while written < rows:
+            count = min(chunk_rows, rows - written)
+            if model == "ato":
+                # Mismo universo de usuarios en todos los bloques
+                frame = ato_frame(np.random.default_rng(seed + written), count, users)
+            else:
+                frame = generate_frame(model, count, seed + written, start_index=written)
+            frame.to_csv(f, header=written == 0, index=False)
+            written += count
+    return written
+
+
+def csv_bytes(model, rows, seed):
+    return generate_frame(model, rows, seed).to_csv(index=False).encode("utf-8")
+
+
+# ============================================================================
+# ESTADISTICAS
+# ============================================================================
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class StageStats:
+    """Latencias y errores por endpoint ("GET /alerts/unread/count") de una etapa"""
+
+    def __init__(self, users):
+        self.users = users
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+        self.started = time.perf_counter()
+        self.ended = None
+        self.cpu_started = self._cpu()
+        self.cpu_seconds = 0.0
+
+    @staticmethod
+    def _cpu():
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        return usage.ru_utime + usage.ru_stime
+
+    def record(self, endpoint, seconds, status):
+        self.latencies[endpoint].append(seconds)
+        self.statuses[endpoint][str(status)] += 1
+        if not isinstance(status, int) or status >= 400:
+            self.errors[endpoint] += 1
+
+    def close(self):
+        self.ended = time.perf_counter()
+        self.cpu_seconds = self._cpu() - self.cpu_started
+
+    @property
+    def seconds(self):
+        return (self.ended or time.perf_counter()) - self.started
+
+    def summary(self):
+        rows = {}
+        for endpoint, values in sorted(self.latencies.items()):
+            ms = [value * 1000 for value in values]
+            rows[endpoint] = {
+                "requests": len(ms),
+                "rps": len(ms) / self.seconds if self.seconds else 0.0,
+                "p50_ms": percentile(ms, 50),
+                "p95_ms": percentile(ms, 95),
+                "p99_ms": percentile(ms, 99),
+                "max_ms": max(ms),
+                "error_rate": self.errors[endpoint] / len(ms),
+                "statuses": dict(self.statuses[endpoint]),
+            }
+        return rows
+
+
+def print_stage(stats):
+    total = sum(len(values) for values in stats.latencies.values())
+    cpu = stats.cpu_seconds / stats.seconds * 100 if stats.seconds else 0.0
+    print(f"\n[{stats.users} usuarios] {stats.seconds:.0f}s, {total} peticiones "
+          f"({total / stats.seconds:.1f}/s), CPU del generador {cpu:.0f}%")
+    if cpu > 80:
+        print("  Aviso: el generador de carga esta cerca del 100% de CPU; los resultados pueden medirlo a el")
+    print(f"  {'endpoint':<34} {'pet.':>6} {'pet./s':>8} {'p50':>9} {'p95':>9} {'p99':>9} {'max':>9} {'error':>7}")
+    for endpoint, row in stats.summary().items():
+        print(f"  {endpoint:<34} {row['requests']:>6} {row['rps']:>8.2f} {row['p50_ms']:>7.0f}ms "
+              f"{row['p95_ms']:>7.0f}ms {row['p99_ms']:>7.0f}ms {row['max_ms']:>7.0f}ms {row['error_rate']:>6.1%}")
+
+
+def find_saturation(stages, degradation, max_error_rate, min_p95_ms):
+    """
+    Primera etapa en la que se satura cada endpoint: (usuarios, endpoint,
+    motivo), por etapa y, dentro de una etapa, del mas degradado al menos
+    """
+    first_p95 = {}
+    saturated = {}
+    for stage in stages:
+        for endpoint, row in stage["endpoints"].items():
+            if endpoint in saturated:
+                continue
+            first_p95.setdefault(endpoint, row["p95_ms"])
+            growth = row["p95_ms"] / first_p95[endpoint] if first_p95[endpoint] > 0 else 1.0
+            if row["error_rate"] > max_error_rate:
+                saturated[endpoint] = (stage["users"], float("inf"), f"errores {row['error_rate']:.1%}")
+            elif growth > degradation and row["p95_ms"] > min_p95_ms:
+                saturated[endpoint] = (
+                    stage["users"], growth, f"p95 {first_p95[endpoint]:.0f} -> {row['p95_ms']:.0f} ms"
+                )
+    ordered = sorted(saturated.items(), key=lambda item: (item[1][0], -item[1][1]))
+    return [(users, endpoint, reason) for endpoint, (users, _, reason) in ordered]
+
+
+# ============================================================================
+# USUARIOS VIRTUALES
+# ============================================================================
+
+class VirtualUser:
+    """Un usuario con su propia sesion que repite acciones con pausas aleatorias"""
+
+    def __init__(self, number, client, args, stats_of):
+        self.number = number
+        self.client = client
+        self.args = args
+        self.stats_of = stats_of  # etapa en curso (cambia entre etapas)
+        self.rng = random.Random(args.seed * 1000 + number)
+        self.headers = {}
+        self.uploads = 0
+
+    async def request(self, method, url, endpoint, **kwargs):
+        started = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, headers=self.headers, **kwargs)
+        except Exception as e:
+            self.stats_of().record(endpoint, time.perf_counter() - started, type(e).__name__)
+            return None
+        self.stats_of().record(endpoint, time.perf_counter() - started, response.status_code)
+        return response if response.status_code < 400 else None
+
+    async def login(self):
+        response = await self.request(
+            "POST", "/auth/login", "POST /auth/login",
+            data={"username": self.args.username, "password": self.args.password}
+        )
+        if response is None:
+            return False
+        self.headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+        return True
+
+    async def report(self):
+        model = self.rng.choice(MODELS)
+        self.uploads += 1
+        seed = self.args.seed * 1_000_000 + self.number * 10_000 + self.uploads
+        content = await asyncio.to_thread(csv_bytes, model, self.args.file_rows, seed)
+        upload = await self.request(
+            "POST", "/files/upload", "POST /files/upload",
+            files={"file": (f"carga_{model}_{self.number}_{self.uploads}.csv", content, "text/csv")}
+        )
+        if upload is None:
+            return
+        report = await self.request(
+            "POST", "/reports/generate", "POST /reports/generate",
+            json={"title": f"Carga {model} {self.number}-{self.uploads}", "file_id": upload.json()["id"]}
+        )
+        if report is None:
+            return
+        await self.request("GET", f"/reports/{report.json()['id']}/results", "GET /reports/{id}/results",
+                           params={"limit": 50})
+
+    async def alerts(self):
+        await self.request("GET", "/alerts/unread/count", "GET /alerts/unread/count")
+        await self.request("GET", "/alerts", "GET /alerts", params={"limit": 50})
+
+    async def monthly(self):
+        today = datetime.now()
+        await self.request("GET", "/monthly-reports", "GET /monthly-reports",
+                           params={"year": today.year, "month": today.month})
+
+    async def run(self, stop):
+        if not await self.login():
+            return
+        actions = [action for action in ACTIONS if self.args.mix[action] > 0]
+        weights = [self.args.mix[action] for action in actions]
+        while not stop.is_set():
+            action = self.rng.choices(actions, weights)[0]
+            await getattr(self, action)()
+            think = self.rng.expovariate(1 / self.args.think) if self.args.think > 0 else 0
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=think)
+            except asyncio.TimeoutError:
+                pass
+
+
+async def run_load(args):
+    import httpx
+
+    limits = httpx.Limits(max_connections=max(args.users) + 10, max_keepalive_connections=max(args.users))
+    stages = []
+    current = {"stats": None}
+    stop = asyncio.Event()
+    tasks = []
+
+    async with httpx.AsyncClient(base_url=args.url, timeout=args.timeout, limits=limits) as client:
+        try:
+            for users in args.users:
+                stats = StageStats(users)
+                current["stats"] = stats
+                # Los usuarios de la etapa anterior siguen; se agregan los que faltan, repartidos en --ramp
+                new_users = range(len(tasks), users)
+                for number in new_users:
+                    user = VirtualUser(number, client, args, lambda: current["stats"])
+                    tasks.append(asyncio.create_task(user.run(stop)))
+                    if args.ramp > 0 and len(new_users) > 1:
+                        await asyncio.sleep(args.ramp / len(new_users))
+                await asyncio.sleep(max(args.stage_seconds - (time.perf_counter() - stats.started), 0))
+                stats.close()
+                print_stage(stats)
+                stages.append({"users": users, "seconds": stats.seconds, "cpu_seconds": stats.cpu_seconds,
+                               "endpoints": stats.summary()})
+        finally:
+            stop.set()
+            # Las peticiones en curso (reportes largos) terminan en una etapa descartada
+            current["stats"] = StageStats(0)
+            await asyncio.gather(*tasks, return_exceptions=True)
+    return stages
+
+
+# ============================================================================
+# LINEA DE COMANDOS
+# ============================================================================
+
+def parse_mix(items):
+    mix = dict(DEFAULT_MIX)
+    for item in items or []:
+        name, _, weight = item.partition("=")
+        if name not in ACTIONS or not weight:
+            raise argparse.ArgumentTypeError(f"--mix espera accion=peso con accion en {ACTIONS}: {item}")
+        mix[name] = float(weight)
+    if not any(mix.values()):
+        raise argparse.ArgumentTypeError("--mix: al menos una accion con peso mayor que 0")
+    return mix
+
+
+def command_generate(args):
+    started = time.perf_counter()
+    written = write_csv(args.model, args.rows, args.output, args.seed, args.chunk_rows)
+    seconds = time.perf_counter() - started
+    size_mb = os.path.getsize(args.output) / (1024 * 1024)
+    print(f"{written} filas de {args.model} en {args.output} ({size_mb:.1f} MB, {seconds:.1f}s, "
+          f"{written / seconds:,.0f} filas/s)")
+
+
+def command_run(args):
+    args.mix = parse_mix(args.mix)
+    args.users = sorted(set(args.users))
+    print("=" * 78)
+    print(f"PRUEBA DE CARGA - {args.url}")
+    print("=" * 78)
+    mix = ", ".join(f"{name}={weight:g}" for name, weight in args.mix.items())
+    print(f"Etapas: {', '.join(str(users) for users in args.users)} usuarios x {args.stage_seconds:.0f}s; "
+          f"mezcla {mix}; pausa media {args.think}s; archivos de {args.file_rows} filas")
+
+    stages = asyncio.run(run_load(args))
+
+    print("\n" + "=" * 78)
+    print("SATURACION")
+    print("=" * 78)
+    saturated = find_saturation(stages, args.degradation, args.max_error_rate, args.min_p95_ms)
+    if saturated:
+        users, endpoint, reason = saturated[0]
+        print(f"  Primer endpoint en saturarse: {endpoint} con {users} usuarios ({reason})")
+        for users, endpoint, reason in saturated[1:]:
+            print(f"  Despues: {endpoint} con {users} usuarios ({reason})")
+    else:
+        print(f"  Ningun endpoint se saturo hasta {args.users[-1]} usuarios "
+              f"(p95 < {args.degradation:g}x la primera etapa o < {args.min_p95_ms:g} ms, "
+              f"errores <= {args.max_error_rate:.0%})")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({
+                "url": args.url,
+                "created_at": datetime.now().isoformat(timespec="seconds"),
+                "config": {"users": args.users, "stage_seconds": args.stage_seconds, "think": args.think,
+                           "mix": args.mix, "file_rows": args.file_rows},
+                "stages": stages,
+                "saturation": [{"users": users, "endpoint": endpoint, "reason": reason}
+                               for users, endpoint, reason in saturated],
+            }, f, indent=2)
+        print(f"\nResultados guardados en {args.output}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prueba de carga del gateway y las APIs ML")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    generate = commands.add_parser("generate", help="Escribir un CSV sintetico")
+    generate.add_argument("--model", choices=MODELS, required=True)
+    generate.add_argument("--rows", type=int, required=True)
+    generate.add_argument("--output", required=True)
+    generate.add_argument("--seed", type=int, default=42)
+    generate.add_argument("--chunk-rows", type=int, default=200000, help="Filas por bloque escrito")
+
+    run = commands.add_parser("run", help="Usuarios virtuales contra un gateway levantado")
+    run.add_argument("--url", default=BASE_URL, help="URL del gateway")
+    run.add_argument("--users", nargs="+", type=int, default=[5, 10, 20, 40], help="Usuarios por etapa")
+    run.add_argument("--stage-seconds", type=float, default=60.0, help="Duracion de cada etapa")
+    run.add_argument("--ramp", type=float, default=5.0, help="Segundos para incorporar los usuarios nuevos")
+    run.add_argument("--think", type=float, default=1.0, help="Pausa media entre acciones (s, exponencial)")
+    run.add_argument("--mix", nargs="*", help="Pesos de las acciones: report=1 alerts=6 monthly=2")
+    run.add_argument("--file-rows", type=int, default=50, help="Filas por archivo subido (seed_data.py usa 50)")
+    run.add_argument("--username", default="admin")
+    run.add_argument("--password", default="admin123")
+    run.add_argument("--timeout", type=float, default=300.0, help="Timeout por peticion (s)")
+    run.add_argument("--degradation", type=float, default=3.0,
+                     help="Saturado si el p95 supera este multiplo del de la primera etapa")
+    run.add_argument("--min-p95-ms", type=float, default=100.0,
+                     help="Un p95 por debajo de esto no cuenta como saturacion aunque haya crecido")
+    run.add_argument("--max-error-rate", type=float, default=0.01, help="Saturado si los errores superan esta tasa")
+    run.add_argument("--seed", type=int, default=42)
+    run.add_argument("--output", help="Guardar los resultados en un archivo JSON")
+
+    args = parser.parse_args()
+    if args.command == "generate":
+        command_generate(args)
+    else:
+        command_run(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,516 @@
+#!/usr/bin/env python3
+"""
+Replay historico del servicio ATO con comprobacion de paridad online/offline.
+
+Reproduce el dataset RBA (rba_reduced.csv / rba_balanced.csv u otro CSV con
+las columnas originales) en orden de Login Timestamp contra
+AccountTakeoverPredictor, con el intercalado real de usuarios del dataset:
+
+  --mode in-process   predict_single en este proceso (sin HTTP)
+  --mode http         POST /predict a una API ATO levantada (--url), con
+                      --concurrency peticiones en vuelo; los logins de un
+                      mismo usuario se envian en orden, uno tras otro, porque
+                      el historial del usuario depende del orden
+
+--speedup N reproduce el dataset N veces mas rapido que el tiempo real (0 =
+lo mas rapido posible, para medir el maximo sostenido). Reporta logins/s
+(global y por ventana de --window segundos: la mediana de las ventanas es el
+ritmo sostenido), latencia del servicio p50/p95/p99 y latencia extremo a
+extremo desde el instante programado (incluye la cola cuando el servicio no
+da abasto) y el retraso respecto al programa.
+
+Paridad: para las mismas filas compara las features de comportamiento que
+calcula el servicio (_engineer_features_simple, login a login con el
+historial en memoria) con las del entrenamiento
+(calculate_user_behavioral_features sobre las filas reproducidas). En modo
+in-process se registran las features que vio el modelo; en modo http se
+recalculan localmente sobre el mismo flujo. Por feature se muestra el
+porcentaje de filas distintas, la diferencia maxima y un ejemplo. Las
+features agregadas por usuario se muestran aparte: el entrenamiento las
+calcula sobre todo el dataset y el servicio usa valores fijos. Con
+--fail-on-skew el script termina con error si alguna feature de
+comportamiento difiere en mas filas que --skew-tolerance.
+
+Sin --data (o si el CSV no existe) se usan logins sinteticos generados con
+load_test.py; los .pkl punteros de Git LFS se reemplazan por los artefactos
+sinteticos de benchmark_artifacts.py.
+
+Uso:
+  python replay_ato.py --data Suspicious-Login-Activity/processed_data/rba_reduced.csv --speedup 0
+  python replay_ato.py --data rba.csv --limit 200000 --speedup 3600 --fail-on-skew
+  python replay_ato.py --mode http --url http://localhost:8001 --concurrency 16 --speedup 0
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+import warnings
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+from benchmark_artifacts import ROOT, SERVICES, build_synthetic, is_lfs_pointer, load_app
+
+API_DIR = SERVICES["ato"]["api_dir"]
+DEFAULT_DATA = os.path.join(ROOT, "Suspicious-Login-Activity", "processed_data", "rba_reduced.csv")
+
+# Columnas originales del dataset RBA -> campos de LoginInput (como seed_data.py)
+RBA_TO_API = {
+    "User ID": "user_id",
+    "IP Address": "ip_address",
+    "Country": "country",
+    "Region": "region",
+    "City": "city",
+    "Browser Name and Version": "browser",
+    "OS Name and Version": "os",
+    "Device Type": "device",
+    "Login Successful": "login_successful",
+    "Is Attack IP": "is_attack_ip",
+    "ASN": "asn",
+    "Round-Trip Time [ms]": "rtt",
+    "Login Timestamp": "login_timestamp",
+}
+
+BEHAVIORAL_FEATURES = [
+    "ip_changed", "country_changed", "browser_changed", "device_changed", "os_changed",
+    "time_since_last_login_hours", "is_rapid_login", "is_long_gap",
+]
+AGGREGATED_FEATURES = [
+    "ip_count_per_user", "country_count_per_user", "browser_count_per_user", "device_count_per_user",
+    "total_logins_per_user", "success_rate_per_user",
+]
+
+# Diferencias conocidas entre _engineer_features_simple y el entrenamiento
+KNOWN_CAUSES = {
+    "time_since_last_login_hours": "primer login: el servicio usa 0, el entrenamiento -1",
+    "is_rapid_login": "umbral: el servicio usa < 0.5 h, el entrenamiento < 1 h (y marca el primer login, -1 h)",
+    "ip_count_per_user": "el servicio usa 1 fijo; el entrenamiento cuenta sobre todo el dataset",
+    "country_count_per_user": "el servicio usa 1 fijo; el entrenamiento cuenta sobre todo el dataset",
+    "browser_count_per_user": "el servicio usa 1 fijo; el entrenamiento cuenta sobre todo el dataset",
+    "device_count_per_user": "el servicio usa 1 fijo; el entrenamiento cuenta sobre todo el dataset",
+    "total_logins_per_user": "el servicio usa 1 fijo; el entrenamiento cuenta sobre todo el dataset",
+    "success_rate_per_user": "el servicio usa 1.0 fijo; el entrenamiento la calcula sobre todo el dataset",
+}
+
+
+# ============================================================================
+# DATOS
+# ============================================================================
+
+def load_dataset(path, limit, start):
+    """Filas del CSV RBA en orden de Login Timestamp (estable: los empates conservan el orden del archivo)"""
+    df = pd.read_csv(path, usecols=lambda column: column in RBA_TO_API or column == "Is Account Takeover")
+    missing = set(RBA_TO_API) - set(df.columns)
+    if missing:
+        sys.exit(f"Faltan columnas en {path}: {', '.join(sorted(missing))}")
+    df["timestamp"] = pd.to_datetime(df["Login Timestamp"], errors="coerce")
+    df = df.dropna(subset=["timestamp"]).sort_values("timestamp", kind="stable")
+    df = df.iloc[start:start + limit] if limit else df.iloc[start:]
+    return df.reset_index(drop=True)
+
+
+def synthetic_dataset(rows, seed):
+    """Logins sinteticos (load_test.ato_frame) con columnas RBA y timestamps crecientes"""
+    from load_test import ato_frame
+
+    rng = np.random.default_rng(seed)
+    frame = ato_frame(rng, rows)
+    offsets = np.sort(rng.uniform(0, rows * 30, rows))
+    timestamps = pd.Timestamp("2026-01-01") + pd.to_timedelta(offsets, unit="s")
+    df = frame.rename(columns={api: rba for rba, api in RBA_TO_API.items()})
+    df["User ID"] = df["User ID"].astype(int)
+    df["Login Timestamp"] = timestamps.strftime("%Y-%m-%d %H:%M:%S.%f").str[:-3]
+    df["timestamp"] = timestamps
+    df["Is Account Takeover"] = 0
+    return df
+
+
+def to_logins(df):
+    """Filas RBA -> dicts de LoginInput, con los mismos rellenos que seed_data.py"""
+    api = df[list(RBA_TO_API)].rename(columns=RBA_TO_API)
+    api["user_id"] = api["user_id"].astype(str)
+    api["region"] = api["region"].fillna("Unknown")
+    api["city"] = api["city"].fillna("Unknown")
+    api["device"] = api["device"].fillna("Desktop")
+    api["country"] = api["country"].fillna("--")
+    api["rtt"] = api["rtt"].fillna(50.0).astype(float)
+    api["asn"] = api["asn"].fillna(0).astype(int)
+    api["login_successful"] = api["login_successful"].astype(int)
+    api["is_attack_ip"] = api["is_attack_ip"].astype(int)
+    api["login_timestamp"] = api["login_timestamp"].astype(str)
+    return api.to_dict("records")
+
+
+def interleaving(df):
+    """Cuantos logins de otros usuarios hay, en mediana, entre dos logins seguidos del mismo usuario"""
+    positions = df.groupby("User ID").cumcount()
+    order = pd.Series(np.arange(len(df)), index=df.index)
+    gaps = order.groupby(df["User ID"]).diff().dropna() - 1
+    return {
+        "users": int(df["User ID"].nunique()),
+        "returning_users": int((positions == 1).sum()),
+        "median_logins_between": float(gaps.median()) if len(gaps) else 0.0,
+    }
+
+
+# ============================================================================
+# REPLAY
+# ============================================================================
+
+class ReplayStats:
+    def __init__(self):
+        self.service = []
+        self.end_to_end = []
+        self.completed_at = []
+        self.errors = Counter()
+
+    def record(self, scheduled, started, ended):
+        self.service.append(ended - started)
+        self.end_to_end.append(ended - scheduled)
+        self.completed_at.append(ended)
+
+
+def schedule(df, speedup):
+    """Segundos desde el inicio del replay en que se envia cada login (0 con speedup 0)"""
+    if not speedup:
+        return np.zeros(len(df))
+    return (df["timestamp"] - df["timestamp"].iloc[0]).dt.total_seconds().to_numpy() / speedup
+
+
+def replay_in_process(predictor, logins, offsets, paced, stats, record_features):
+    engineer = predictor._engineer_features_simple
+    online = []
+
+    def recording(df):
+        X = engineer(df)
+        online.append(X.iloc[0])
+        return X
+
+    if record_features:
+        predictor._engineer_features_simple = recording
+    try:
+        started = time.perf_counter()
+        for login, offset in zip(logins, offsets):
+            scheduled = started + offset if paced else time.perf_counter()
+            wait = scheduled - time.perf_counter()
+            if wait > 0:
+                time.sleep(wait)
+            begin = time.perf_counter()
+            try:
+                predictor.predict_single(login)
+            except Exception as e:
+                stats.errors[type(e).__name__] += 1
+                online.append(None)
+                continue
+            stats.record(min(scheduled, begin), begin, time.perf_counter())
+    finally:
+        predictor._engineer_features_simple = engineer
+    return started, online
+
+
+async def replay_http(url, logins, offsets, paced, stats, concurrency, timeout):
+    import httpx
+
+    in_flight = asyncio.Semaphore(concurrency)
+    window = asyncio.Semaphore(concurrency * 4)  # logins despachados sin terminar (acota la memoria)
+    previous_of_user = {}
+    tasks = []
+
+    async def send(client, login, previous, scheduled):
+        try:
+            if previous is not None:
+                await asyncio.shield(previous)  # el login anterior del usuario primero
+            async with in_flight:
+                begin = time.perf_counter()
+                try:
+                    response = await client.post("/predict", json=login)
+                except Exception as e:
+                    stats.errors[type(e).__name__] += 1
+                    return
+                if response.status_code >= 400:
+                    stats.errors[f"HTTP {response.status_code}"] += 1
+                    return
+                stats.record(min(scheduled, begin), begin, time.perf_counter())
+        finally:
+            window.release()
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url, timeout=timeout, limits=limits) as client:
+        started = time.perf_counter()
+        for login, offset in zip(logins, offsets):
+            scheduled = started + offset
+            wait = scheduled - time.perf_counter()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            await window.acquire()
+            if not paced:
+                scheduled = time.perf_counter()
+            previous = previous_of_user.get(login["user_id"])
+            if previous is not None and previous.done():
+                previous = None
+            task = asyncio.create_task(send(client, login, previous, scheduled))
+            previous_of_user[login["user_id"]] = task
+            tasks.append(task)
+        await asyncio.gather(*tasks, return_exceptions=True)
+    return started
+
+
+def percentile(values, pct):
+    if not len(values):
+        return 0.0
+    return float(np.percentile(values, pct))
+
+
+def summarize(stats, started, rows, window):
+    ended = max(stats.completed_at, default=started)
+    elapsed = max(ended - started, 1e-9)
+    completed = np.array(stats.completed_at) - started
+    windows = []
+    if len(completed):
+        counts = np.bincount((completed // window).astype(int))
+        # La ultima ventana esta incompleta
+        full = counts[:-1] if len(counts) > 1 else counts
+        windows = (full / window).tolist()
+    return {
+        "rows": rows,
+        "completed": len(stats.service),
+        "errors": dict(stats.errors),
+        "seconds": elapsed,
+        "logins_per_second": len(stats.service) / elapsed,
+        "sustained_logins_per_second": float(np.median(windows)) if windows else 0.0,
+        "min_window_logins_per_second": float(min(windows)) if windows else 0.0,
+        "service_ms": {f"p{p}": percentile(stats.service, p) * 1000 for p in (50, 95, 99)},
+        "end_to_end_ms": {f"p{p}": percentile(stats.end_to_end, p) * 1000 for p in (50, 95, 99)},
+        "max_lag_ms": max(stats.end_to_end, default=0.0) * 1000,
+    }
+
+
+# ============================================================================
+# PARIDAD ONLINE / OFFLINE
+# ============================================================================
+
+def feature_engine():
+    """
+    AccountTakeoverPredictor sin artefactos, solo para _engineer_features_simple
+    (las features de comportamiento no dependen del modelo ni de los encoders)
+    """
+    if API_DIR not in sys.path:
+        sys.path.insert(0, API_DIR)
+    from predictor import AccountTakeoverPredictor
+
+    engine = AccountTakeoverPredictor.__new__(AccountTakeoverPredictor)
+    engine.encoders = {}
+    engine.user_history = {}
+    return engine
+
+
+def online_features(df):
+    """Features del servicio recalculadas login a login sobre el mismo flujo (modo http)"""
+    engine = feature_engine()
+    rows = []
+    for login in to_logins(df):
+        rows.append(engine._engineer_features_simple(engine._prepare_dataframe(login)).iloc[0])
+    return rows
+
+
+def offline_features(df):
+    """Features del entrenamiento (calculate_user_behavioral_features) en el orden del replay"""
+    sys.path.insert(0, os.path.dirname(API_DIR))
+    from src.features.feature_engineering import calculate_user_behavioral_features
+
+    frame = df.copy()
+    frame["replay_row"] = np.arange(len(frame))
+    saved_stdout, sys.stdout = sys.stdout, open(os.devnull, "w")
+    try:
+        frame = calculate_user_behavioral_features(frame)
+    finally:
+        sys.stdout.close()
+        sys.stdout = saved_stdout
+    return frame.set_index("replay_row").sort_index()
+
+
+def compare_features(df, online_rows, features):
+    """Por feature: filas comparadas, distintas, diferencia maxima y un ejemplo"""
+    offline = offline_features(df)
+    kept = [i for i, row in enumerate(online_rows) if row is not None]
+    online = pd.DataFrame([online_rows[i] for i in kept], index=kept)
+    report = {}
+    for feature in features:
+        served = online[feature].astype(float).to_numpy()
+        trained = offline.loc[kept, feature].astype(float).to_numpy()
+        equal = np.isclose(served, trained, atol=1e-6, equal_nan=True)
+        different = np.flatnonzero(~equal)
+        entry = {
+            "compared": len(kept),
+            "mismatches": int(len(different)),
+            "mismatch_rate": float(len(different) / len(kept)) if kept else 0.0,
+            "max_abs_diff": float(np.nanmax(np.abs(served - trained))) if len(kept) else 0.0,
+        }
+        if len(different):
+            row = kept[different[0]]
+            entry["example"] = {
+                "row": row,
+                "user_id": str(df["User ID"].iloc[row]),
+                "login_timestamp": str(df["Login Timestamp"].iloc[row]),
+                "online": float(served[different[0]]),
+                "offline": float(trained[different[0]]),
+            }
+        report[feature] = entry
+    return report
+
+
+def print_parity(title, report):
+    print(f"\n  {title}")
+    print(f"  {'feature':<30} {'distintas':>10} {'%':>8} {'dif. max':>10}  ejemplo (online vs offline)")
+    for feature, entry in report.items():
+        example = entry.get("example")
+        detail = ""
+        if example:
+            detail = (f"fila {example['row']} usuario {example['user_id']}: "
+                      f"{example['online']:g} vs {example['offline']:g}")
+        print(f"  {feature:<30} {entry['mismatches']:>10} {entry['mismatch_rate']:>7.2%} "
+              f"{entry['max_abs_diff']:>10.3g}  {detail}")
+        if entry["mismatches"] and feature in KNOWN_CAUSES:
+            print(f"  {'':<30} causa conocida: {KNOWN_CAUSES[feature]}")
+
+
+# ============================================================================
+# LINEA DE COMANDOS
+# ============================================================================
+
+def load_predictor(synthetic):
+    """Predictor de la API ATO (MODEL_PATH/ENCODERS_PATH o artefactos sinteticos)"""
+    sources = SERVICES["ato"]["sources"]
+    if synthetic or any(not os.path.exists(path) or is_lfs_pointer(path) for path in sources.values()):
+        print("Artefactos sinteticos (los .pkl reales no estan disponibles)")
+        sources = build_synthetic("ato", tempfile.mkdtemp(prefix="replay-ato-"))
+    for name, variable in SERVICES["ato"]["env"].items():
+        os.environ[variable] = sources[name]
+    os.environ.pop("ARTIFACT_DIR", None)
+    cwd = os.getcwd()
+    saved_stdout, sys.stdout = sys.stdout, open(os.devnull, "w")
+    try:
+        return load_app(API_DIR).load_predictor()
+    finally:
+        sys.stdout.close()
+        sys.stdout = saved_stdout
+        os.chdir(cwd)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay del dataset RBA contra el servicio ATO con paridad de features")
+    parser.add_argument("--data", help=f"CSV con columnas RBA (por defecto {os.path.relpath(DEFAULT_DATA, ROOT)})")
+    parser.add_argument("--limit", type=int, default=50000, help="Filas a reproducir (0 = todas)")
+    parser.add_argument("--start", type=int, default=0, help="Saltar las primeras filas (en orden temporal)")
+    parser.add_argument("--synthetic-rows", type=int, default=20000, help="Filas sinteticas si no hay dataset")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--mode", choices=["in-process", "http"], default="in-process")
+    parser.add_argument("--url", default="http://localhost:8001", help="API ATO para --mode http")
+    parser.add_argument("--concurrency", type=int, default=8, help="Peticiones en vuelo en --mode http")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--speedup", type=float, default=0.0,
+                        help="Veces mas rapido que el tiempo real del dataset (0 = lo mas rapido posible)")
+    parser.add_argument("--window", type=float, default=5.0, help="Ventana (s) para el ritmo sostenido")
+    parser.add_argument("--synthetic", action="store_true", help="Usar siempre artefactos sinteticos (in-process)")
+    parser.add_argument("--no-parity", action="store_true", help="Solo rendimiento, sin comparar features")
+    parser.add_argument("--fail-on-skew", action="store_true",
+                        help="Terminar con error si una feature de comportamiento difiere mas que --skew-tolerance")
+    parser.add_argument("--skew-tolerance", type=float, default=0.0,
+                        help="Fraccion de filas distintas permitida por feature (0.01 = 1%%)")
+    parser.add_argument("--output", help="Guardar los resultados en un archivo JSON")
+    args = parser.parse_args()
+
+    data = args.data or DEFAULT_DATA
+    if os.path.exists(data) and not is_lfs_pointer(data):
+        df = load_dataset(data, args.limit, args.start)
+        source = data
+    else:
+        if args.data:
+            print(f"No se encontro {args.data} (o es un puntero de Git LFS); se usan logins sinteticos")
+        df = synthetic_dataset(args.synthetic_rows, args.seed)
+        source = "sintetico"
+    if df.empty:
+        sys.exit("No hay filas para reproducir")
+
+    span_hours = (df["timestamp"].iloc[-1] - df["timestamp"].iloc[0]).total_seconds() / 3600
+    mix = interleaving(df)
+    print("=" * 78)
+    print(f"REPLAY ATO - {args.mode}, speedup {args.speedup:g}" + (" (maximo)" if not args.speedup else "x"))
+    print("=" * 78)
+    print(f"Datos: {source}: {len(df)} logins, {span_hours:.1f} h de historia, {mix['users']} usuarios "
+          f"({mix['returning_users']} con mas de un login, mediana de {mix['median_logins_between']:.0f} "
+          f"logins ajenos entre dos del mismo usuario)")
+    if args.speedup:
+        print(f"Duracion programada: {span_hours * 3600 / args.speedup:.0f}s")
+
+    logins = to_logins(df)
+    offsets = schedule(df, args.speedup)
+    stats = ReplayStats()
+    online_rows = None
+    if args.mode == "in-process":
+        # Un aviso de sklearn por login taparia la salida (artefactos sinteticos)
+        warnings.filterwarnings("ignore", category=UserWarning, module="sklearn")
+        predictor = load_predictor(args.synthetic)
+        predictor.user_history = {}
+        saved_stdout, sys.stdout = sys.stdout, open(os.devnull, "w")
+        try:
+            started, online_rows = replay_in_process(predictor, logins, offsets, bool(args.speedup), stats,
+                                                      not args.no_parity)
+        finally:
+            sys.stdout.close()
+            sys.stdout = saved_stdout
+    else:
+        started = asyncio.run(replay_http(args.url, logins, offsets, bool(args.speedup), stats,
+                                          args.concurrency, args.timeout))
+
+    summary = summarize(stats, started, len(df), args.window)
+    print("\n" + "=" * 78)
+    print("RENDIMIENTO")
+    print("=" * 78)
+    print(f"  Completados: {summary['completed']}/{summary['rows']} en {summary['seconds']:.1f}s"
+          + (f", errores {summary['errors']}" if summary["errors"] else ""))
+    print(f"  Logins/s: {summary['logins_per_second']:.1f} global, {summary['sustained_logins_per_second']:.1f} "
+          f"sostenido (mediana por ventana de {args.window:g}s), {summary['min_window_logins_per_second']:.1f} "
+          f"minimo")
+    service, end_to_end = summary["service_ms"], summary["end_to_end_ms"]
+    print(f"  Servicio:          p50 {service['p50']:.2f} ms, p95 {service['p95']:.2f} ms, p99 {service['p99']:.2f} ms")
+    print(f"  Extremo a extremo: p50 {end_to_end['p50']:.2f} ms, p95 {end_to_end['p95']:.2f} ms, "
+          f"p99 {end_to_end['p99']:.2f} ms "
+          f"(desde el instante {'programado' if args.speedup else 'de envio'})")
+    if args.speedup:
+        keeps_up = summary["max_lag_ms"] < args.window * 1000
+        print(f"  Retraso maximo sobre el programa: {summary['max_lag_ms']:.0f} ms "
+              f"({'sigue el ritmo' if keeps_up else 'NO sigue el ritmo: bajar --speedup'})")
+
+    result = {"source": source, "mode": args.mode, "speedup": args.speedup, "interleaving": mix,
+              "performance": summary}
+    skewed = []
+    if not args.no_parity:
+        if online_rows is None:
+            online_rows = online_features(df)
+        print("\n" + "=" * 78)
+        print("PARIDAD ONLINE (_engineer_features_simple) vs OFFLINE (calculate_user_behavioral_features)")
+        print("=" * 78)
+        behavioral = compare_features(df, online_rows, BEHAVIORAL_FEATURES)
+        aggregated = compare_features(df, online_rows, AGGREGATED_FEATURES)
+        print_parity("Comportamiento (login a login)", behavioral)
+        print_parity("Agregados por usuario (informativo)", aggregated)
+        result["parity"] = {"behavioral": behavioral, "aggregated": aggregated}
+        skewed = [feature for feature, entry in behavioral.items() if entry["mismatch_rate"] > args.skew_tolerance]
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2, default=str)
+        print(f"\nResultados guardados en {args.output}")
+
+    if args.fail_on_skew and skewed:
+        sys.exit(f"Diferencias online/offline por encima de {args.skew_tolerance:.2%}: {', '.join(skewed)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,15 @@
+"""
+Modules shared by the ML APIs, the unified inference server and the auth gateway.
+
+- artifacts: memory-mapped model artifact bundles
+- registry: versioned model registry and zero-downtime hot-swap
+- metrics: histograms, counters, stage timings and the Prometheus format
+- profiler: on-demand sampling profiler
+- memory: memory diagnostics
+- tracing: request tracing across the gateway and the ML APIs
+
+Each service imports the submodules it needs (the gateway does not need
+artifacts' numpy/joblib). The Docker images COPY this directory to
+/app/service_common; run locally, the services add the repository root to
+sys.path.
+"""
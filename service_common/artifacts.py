@@ -0,0 +1,517 @@
+"""
+Memory-mappable model artifacts.
+Converts joblib artifacts into a bundle of flat .npy arrays plus a checksummed
+manifest, and loads them back with np.load(mmap_mode='r'). Every process that
+opens the bundle (or inherits it from a preloading master) shares the same
+read-only page-cache pages instead of holding a private unpickled copy.
+
+Supported layouts (anything else is kept as a pickle, loaded with mmap_mode):
+- tree_ensemble: GradientBoostingClassifier / RandomForestClassifier nodes
+- tfidf: TfidfVectorizer vocabulary (sorted terms) and idf_
+- label_encoders: dict of LabelEncoder classes_
+- json: small plain values (e.g. threshold info)
+"""
+import hashlib
+import json
+import logging
+import os
+import pickle
+import shutil
+import tempfile
+from typing import Any, Dict, Optional
+
+import joblib
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = "manifest.json"
+FORMAT_VERSION = 1
+
+# Rows of synthetic input used to check a converted artifact against the original
+PROBE_ROWS = 256
+
+
+# ============================================================================
+# MAPPED ARTIFACTS
+# ============================================================================
+
+class MappedTreeEnsemble:
+    """
+    Tree ensemble evaluated from flat node arrays, traversing all trees at once.
+    Matches scikit-learn: features are compared as float32 (x <= threshold)
+    and NaN follows missing_go_to_left.
+    """
+
+    def __init__(self, arrays: Dict[str, np.ndarray], meta: Dict[str, Any]):
+        self.feature = arrays["feature"]
+        self.threshold = arrays["threshold"]
+        self.left = arrays["left"]
+        self.right = arrays["right"]
+        self.missing_go_to_left = arrays["missing_go_to_left"]
+        self.value = arrays["value"]
+        self.roots = arrays["roots"]
+        self.classes_ = arrays["classes"]
+        self.estimator_name = meta["estimator_name"]
+        self.n_features_in_ = meta["n_features_in"]
+        self.kind = meta["ensemble"]
+        self.allow_nan = meta["allow_nan"]
+        if self.kind == "boosting":
+            self.tree_class = arrays["tree_class"]
+            self.baseline = arrays["baseline"]
+            self.learning_rate = meta["learning_rate"]
+
+    def _leaves(self, X) -> np.ndarray:
+        """Leaf node reached by every (sample, tree) pair"""
+        X = np.asarray(X, dtype=np.float32)
+        if not self.allow_nan and np.isnan(X).any():
+            raise ValueError(f"Input X contains NaN. {self.estimator_name} does not accept missing values.")
+        node = np.broadcast_to(self.roots, (X.shape[0], len(self.roots))).copy()
+        active = self.left[node] != -1
+        while active.any():
+            r, t = np.nonzero(active)
+            current = node[r, t]
+            x = X[r, self.feature[current]]
+            go_left = (x <= self.threshold[current]) | (np.isnan(x) & self.missing_go_to_left[current])
+            node[r, t] = np.where(go_left, self.left[current], self.right[current])
+            active[r, t] = self.left[node[r, t]] != -1
+        return node
+
+    def predict_proba(self, X) -> np.ndarray:
+        leaves = self._leaves(X)
+        if self.kind == "forest":
+            return self.value[leaves].mean(axis=1)
+
+        raw = np.zeros((leaves.shape[0], len(self.baseline)))
+        contributions = self.value[leaves, 0]
+        for k in range(len(self.baseline)):
+            raw[:, k] = contributions[:, self.tree_class == k].sum(axis=1)
+        raw = self.baseline + self.learning_rate * raw
+        if raw.shape[1] == 1:
+            positive = 1.0 / (1.0 + np.exp(-raw[:, 0]))
+            return np.column_stack([1.0 - positive, positive])
+        raw -= raw.max(axis=1, keepdims=True)
+        exp = np.exp(raw)
+        return exp / exp.sum(axis=1, keepdims=True)
+
+    def predict(self, X) -> np.ndarray:
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+
+class MappedTfidfVectorizer:
+    """
+    TfidfVectorizer.transform over a mapped vocabulary. The analyzer is rebuilt
+    from the original (unfitted) parameters; terms are looked up with a binary
+    search in the sorted terms array.
+    """
+
+    def __init__(self, arrays: Dict[str, np.ndarray], meta: Dict[str, Any], params: Any):
+        self.terms = arrays["terms"]
+        self.term_index = arrays["term_index"]
+        self.idf_ = arrays.get("idf")
+        self.params = params
+        self.binary = meta["binary"]
+        self.sublinear_tf = meta["sublinear_tf"]
+        self.norm = meta["norm"]
+        self._analyzer = params.build_analyzer()
+
+    def transform(self, raw_documents):
+        from scipy import sparse
+        from sklearn.preprocessing import normalize
+
+        if isinstance(raw_documents, str):
+            raise ValueError("Iterable over raw text documents expected, string object received.")
+        tokens, rows = [], []
+        n_docs = 0
+        for n_docs, document in enumerate(raw_documents, start=1):
+            analyzed = self._analyzer(document)
+            tokens.extend(analyzed)
+            rows.extend([n_docs - 1] * len(analyzed))
+
+        columns = np.empty(0, dtype=np.int64)
+        found_rows = np.empty(0, dtype=np.int64)
+        if tokens and len(self.terms):
+            tokens = np.asarray(tokens, dtype=str)
+            position = np.searchsorted(self.terms, tokens).clip(max=len(self.terms) - 1)
+            known = self.terms[position] == tokens
+            columns = self.term_index[position[known]].astype(np.int64)
+            found_rows = np.asarray(rows, dtype=np.int64)[known]
+
+        X = sparse.csr_matrix(
+            (np.ones(len(columns)), (found_rows, columns)), shape=(n_docs, len(self.terms))
+        )
+        X.sum_duplicates()
+        X.sort_indices()
+        if self.binary:
+            X.data.fill(1)
+        if self.sublinear_tf:
+            np.log(X.data, X.data)
+            X.data += 1
+        if self.idf_ is not None:
+            X.data *= self.idf_[X.indices]
+        if self.norm:
+            X = normalize(X, norm=self.norm, copy=False)
+        return X
+
+    def get_feature_names_out(self, input_features=None) -> np.ndarray:
+        names = np.empty(len(self.terms), dtype=object)
+        names[self.term_index] = self.terms
+        return names
+
+
+class MappedLabelEncoder:
+    """LabelEncoder over mapped (sorted) classes_; unseen labels raise ValueError"""
+
+    def __init__(self, classes: np.ndarray):
+        self.classes_ = classes
+
+    def transform(self, y) -> np.ndarray:
+        y = np.asarray(y)
+        if self.classes_.dtype.kind == "U":
+            y = y.astype(str)
+        if len(self.classes_) == 0:
+            if len(y):
+                raise ValueError("y contains previously unseen labels")
+            return np.empty(0, dtype=np.int64)
+        position = np.searchsorted(self.classes_, y).clip(max=len(self.classes_) - 1)
+        unseen = self.classes_[position] != y
+        if unseen.any():
+            raise ValueError(f"y contains previously unseen labels: {np.unique(y[unseen])[:5].tolist()}")
+        return position.astype(np.int64)
+
+    def inverse_transform(self, y) -> np.ndarray:
+        return self.classes_[np.asarray(y)]
+
+
+# ============================================================================
+# EXPORT
+# ============================================================================
+
+def _tree_ensemble_arrays(model) -> Optional[tuple]:
+    """Flatten a supported tree ensemble into node arrays; None if unsupported"""
+    from sklearn.ensemble import GradientBoostingClassifier, RandomForestClassifier
+
+    if isinstance(model, GradientBoostingClassifier):
+        estimators = [(tree, k) for stage in model.estimators_ for k, tree in enumerate(stage)]
+        ensemble = "boosting"
+    elif isinstance(model, RandomForestClassifier):
+        estimators = [(tree, 0) for tree in model.estimators_]
+        ensemble = "forest"
+    else:
+        return None
+    if getattr(model, "n_outputs_", 1) != 1:
+        return None
+
+    parts = {key: [] for key in ("feature", "threshold", "left", "right", "missing_go_to_left", "value")}
+    roots, tree_class, offset = [], [], 0
+    for estimator, k in estimators:
+        tree = estimator.tree_
+        leaf = tree.children_left == -1
+        parts["feature"].append(np.where(leaf, 0, tree.feature))
+        parts["threshold"].append(tree.threshold)
+        parts["left"].append(np.where(leaf, -1, tree.children_left + offset))
+        parts["right"].append(np.where(leaf, -1, tree.children_right + offset))
+        missing = getattr(tree, "missing_go_to_left", np.zeros(tree.node_count, dtype=np.uint8))
+        parts["missing_go_to_left"].append(np.asarray(missing, dtype=bool))
+        value = tree.value[:, 0, :]
+        if ensemble == "forest":
+            value = value / value.sum(axis=1, keepdims=True)
+        parts["value"].append(value)
+        roots.append(offset)
+        tree_class.append(k)
+        offset += tree.node_count
+
+    arrays = {
+        "feature": np.concatenate(parts["feature"]).astype(np.int32),
+        "threshold": np.concatenate(parts["threshold"]).astype(np.float64),
+        "left": np.concatenate(parts["left"]).astype(np.int32),
+        "right": np.concatenate(parts["right"]).astype(np.int32),
+        "missing_go_to_left": np.concatenate(parts["missing_go_to_left"]),
+        "value": np.concatenate(parts["value"]).astype(np.float64),
+        "roots": np.asarray(roots, dtype=np.int32),
+        "classes": np.asarray(model.classes_),
+    }
+    meta = {
+        "ensemble": ensemble,
+        "estimator_name": type(model).__name__,
+        "n_features_in": int(model.n_features_in_),
+        "allow_nan": _accepts_nan(model),
+    }
+    if ensemble == "boosting":
+        arrays["tree_class"] = np.asarray(tree_class, dtype=np.int32)
+        arrays["baseline"] = np.asarray(
+            model._raw_predict_init(np.zeros((1, model.n_features_in_), dtype=np.float32))[0],
+            dtype=np.float64
+        )
+        meta["learning_rate"] = float(model.learning_rate)
+    return arrays, meta
+
+
+def _accepts_nan(model) -> bool:
+    """Whether the estimator predicts on NaN input (rather than rejecting it)"""
+    try:
+        model.predict_proba(np.full((1, model.n_features_in_), np.nan))
+    except ValueError:
+        return False
+    return True
+
+
+def _tree_probe(arrays: Dict[str, np.ndarray], n_features: int) -> np.ndarray:
+    """Inputs around the split thresholds, so both branches of most nodes are taken"""
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(PROBE_ROWS, n_features))
+    split = (arrays["left"] != -1) & np.isfinite(arrays["threshold"])
+    for f in np.unique(arrays["feature"][split]):
+        thresholds = arrays["threshold"][split & (arrays["feature"] == f)]
+        X[:, f] = rng.choice(thresholds, PROBE_ROWS) + rng.choice([-1e-3, 1e-3], PROBE_ROWS)
+    return X
+
+
+def _convert(obj) -> tuple:
+    """(kind, arrays, meta, extra) for an artifact; kind 'pickle' when no mapped layout fits"""
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.preprocessing import LabelEncoder
+
+    flattened = _tree_ensemble_arrays(obj)
+    if flattened:
+        return ("tree_ensemble",) + flattened + (None,)
+
+    if isinstance(obj, TfidfVectorizer) and hasattr(obj, "vocabulary_"):
+        from sklearn.base import clone
+
+        ordered = sorted(obj.vocabulary_.items())
+        arrays = {
+            "terms": np.array([term for term, _ in ordered], dtype=str),
+            "term_index": np.array([index for _, index in ordered], dtype=np.int32),
+        }
+        if obj.use_idf:
+            arrays["idf"] = np.asarray(obj.idf_, dtype=np.float64)
+        meta = {"binary": bool(obj.binary), "sublinear_tf": bool(obj.sublinear_tf), "norm": obj.norm}
+        return "tfidf", arrays, meta, pickle.dumps(clone(obj))
+
+    if isinstance(obj, dict) and obj and all(isinstance(v, LabelEncoder) for v in obj.values()):
+        arrays, columns = {}, {}
+        for i, (column, encoder) in enumerate(obj.items()):
+            classes = np.asarray(encoder.classes_)
+            if classes.dtype == object:
+                if not all(isinstance(c, str) for c in classes):
+                    return "pickle", {}, {}, None
+                classes = classes.astype(str)
+            arrays[f"classes_{i}"] = classes
+            columns[column] = f"classes_{i}"
+        return "label_encoders", arrays, {"columns": columns}, None
+
+    try:
+        encoded = json.dumps(obj, default=lambda value: value.item())
+        if json.loads(encoded) == obj:
+            return "json", {}, {"value": json.loads(encoded)}, None
+    except (TypeError, ValueError, AttributeError):
+        pass
+    return "pickle", {}, {}, None
+
+
+def _build(kind: str, arrays: Dict[str, np.ndarray], meta: Dict[str, Any], extra: Optional[bytes]):
+    if kind == "tree_ensemble":
+        return MappedTreeEnsemble(arrays, meta)
+    if kind == "tfidf":
+        return MappedTfidfVectorizer(arrays, meta, pickle.loads(extra))
+    if kind == "label_encoders":
+        return {column: MappedLabelEncoder(arrays[key]) for column, key in meta["columns"].items()}
+    if kind == "json":
+        return meta["value"]
+    raise ValueError(f"Unknown artifact kind: {kind}")
+
+
+def _matches(original, mapped, kind: str, arrays: Dict[str, np.ndarray], meta: Dict[str, Any]) -> bool:
+    """Check the mapped artifact reproduces the original on probe inputs"""
+    if kind == "tree_ensemble":
+        X = _tree_probe(arrays, meta["n_features_in"])
+        probes = [X]
+        if meta["allow_nan"]:
+            with_missing = X.copy()
+            with_missing[np.random.default_rng(1).random(X.shape) < 0.1] = np.nan
+            probes.append(with_missing)
+        return all(
+            np.allclose(original.predict_proba(X), mapped.predict_proba(X), rtol=1e-9, atol=1e-12)
+            and np.array_equal(original.predict(X), mapped.predict(X))
+            for X in probes
+        )
+    if kind == "tfidf":
+        rng = np.random.default_rng(0)
+        terms = arrays["terms"]
+        documents = [
+            " ".join(rng.choice(terms, min(len(terms), 20))) + " Unknown-Token 123" if len(terms) else "x"
+            for _ in range(32)
+        ] + [""]
+        return np.allclose(original.transform(documents).toarray(), mapped.transform(documents).toarray())
+    if kind == "label_encoders":
+        for column, encoder in original.items():
+            if not np.array_equal(encoder.transform(encoder.classes_), mapped[column].transform(encoder.classes_)):
+                return False
+        return True
+    return True
+
+
+def _sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def export_bundle(sources: Dict[str, str], artifact_dir: str) -> Dict[str, Any]:
+    """
+    Convert joblib artifacts into a mapped bundle.
+
+    The bundle is assembled in a temporary directory next to artifact_dir and
+    swapped in with a rename, so readers never see a half-written bundle and
+    processes still mapping the previous files keep their (unlinked) pages.
+
+    Args:
+        sources: Artifact name -> joblib path
+        artifact_dir: Bundle directory
+
+    Returns:
+        The bundle manifest
+    """
+    parent = os.path.dirname(os.path.abspath(artifact_dir))
+    os.makedirs(parent, exist_ok=True)
+    staging = tempfile.mkdtemp(prefix=".artifacts-", dir=parent)
+    try:
+        manifest = {"format": FORMAT_VERSION, "sources": {}, "artifacts": {}, "checksums": {}}
+        for name, path in sources.items():
+            manifest["sources"][name] = {"path": os.path.abspath(path), "sha256": _sha256(path)}
+            original = joblib.load(path)
+            kind, arrays, meta, extra = _convert(original)
+            if kind not in ("pickle", "json"):
+                try:
+                    if not _matches(original, _build(kind, arrays, meta, extra), kind, arrays, meta):
+                        logger.warning(f"⚠️ Mapped {name} does not match the original, keeping it pickled")
+                        kind, arrays, meta, extra = "pickle", {}, {}, None
+                except Exception as e:
+                    logger.warning(f"⚠️ Could not verify mapped {name} ({e}), keeping it pickled")
+                    kind, arrays, meta, extra = "pickle", {}, {}, None
+
+            entry = {"kind": kind, "meta": meta, "files": {}}
+            for key, array in arrays.items():
+                filename = f"{name}.{key}.npy"
+                np.save(os.path.join(staging, filename), np.ascontiguousarray(array), allow_pickle=False)
+                entry["files"][key] = filename
+            if extra is not None:
+                entry["files"]["extra"] = f"{name}.extra.pkl"
+                with open(os.path.join(staging, entry["files"]["extra"]), "wb") as f:
+                    f.write(extra)
+            if kind == "pickle":
+                entry["files"]["pickle"] = f"{name}.pkl"
+                joblib.dump(original, os.path.join(staging, entry["files"]["pickle"]))
+            for filename in entry["files"].values():
+                manifest["checksums"][filename] = _sha256(os.path.join(staging, filename))
+            manifest["artifacts"][name] = entry
+            logger.info(f"✅ Exported {name} as {kind}")
+
+        with open(os.path.join(staging, MANIFEST_NAME), "w") as f:
+            json.dump(manifest, f, indent=2)
+
+        previous = None
+        if os.path.exists(artifact_dir):
+            previous = tempfile.mkdtemp(prefix=".artifacts-old-", dir=parent)
+            os.replace(artifact_dir, os.path.join(previous, "bundle"))
+        os.replace(staging, artifact_dir)
+        if previous:
+            shutil.rmtree(previous, ignore_errors=True)
+        return manifest
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+
+# ============================================================================
+# LOAD
+# ============================================================================
+
+def _read_manifest(artifact_dir: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(os.path.join(artifact_dir, MANIFEST_NAME)) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return manifest if manifest.get("format") == FORMAT_VERSION else None
+
+
+def _is_current(manifest: Optional[Dict[str, Any]], sources: Dict[str, str], artifact_dir: str) -> bool:
+    """Same sources as the bundle was built from, and every file matches its checksum"""
+    if manifest is None or set(manifest["sources"]) != set(sources):
+        return False
+    for name, path in sources.items():
+        if os.path.exists(path) and _sha256(path) != manifest["sources"][name]["sha256"]:
+            logger.info(f"Artifact {name} changed since the bundle was built")
+            return False
+    for filename, checksum in manifest["checksums"].items():
+        file_path = os.path.join(artifact_dir, filename)
+        if not os.path.exists(file_path) or _sha256(file_path) != checksum:
+            logger.warning(f"⚠️ Bundle file {filename} is missing or corrupt")
+            return False
+    return True
+
+
+def open_bundle(artifact_dir: str, manifest: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Load every artifact of a bundle; arrays are read-only memory maps"""
+    manifest = manifest or _read_manifest(artifact_dir)
+    if manifest is None:
+        raise FileNotFoundError(f"No artifact bundle at: {artifact_dir}")
+
+    loaded = {}
+    for name, entry in manifest["artifacts"].items():
+        files = {key: os.path.join(artifact_dir, filename) for key, filename in entry["files"].items()}
+        if entry["kind"] == "pickle":
+            loaded[name] = joblib.load(files["pickle"], mmap_mode="r")
+            continue
+        arrays = {
+            key: np.load(path, mmap_mode="r", allow_pickle=False)
+            for key, path in files.items() if key != "extra"
+        }
+        extra = None
+        if "extra" in files:
+            with open(files["extra"], "rb") as f:
+                extra = f.read()
+        loaded[name] = _build(entry["kind"], arrays, entry["meta"], extra)
+    return loaded
+
+
+def load_artifacts(sources: Dict[str, str], artifact_dir: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Load model artifacts, through a mapped bundle when artifact_dir is set.
+
+    The bundle is (re)built from the joblib sources when it is missing, was
+    built from different source files, or fails its checksums.
+
+    Args:
+        sources: Artifact name -> joblib path
+        artifact_dir: Bundle directory (None: plain joblib.load)
+
+    Returns:
+        Artifact name -> loaded object
+    """
+    if not artifact_dir:
+        return {name: joblib.load(path) for name, path in sources.items()}
+
+    manifest = _read_manifest(artifact_dir)
+    if not _is_current(manifest, sources, artifact_dir):
+        missing = [path for path in sources.values() if not os.path.exists(path)]
+        if missing:
+            raise FileNotFoundError(f"Cannot build artifact bundle, missing: {missing}")
+        logger.info(f"📦 Building mapped artifact bundle at: {artifact_dir}")
+        manifest = export_bundle(sources, artifact_dir)
+    return open_bundle(artifact_dir, manifest)
+
+
+if __name__ == "__main__":
+    # Build a bundle ahead of time (e.g. while building the Docker image):
+    #   python -m service_common.artifacts outputs/artifacts model=outputs/models/model.pkl ...
+    import sys
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    if len(sys.argv) < 3 or not all("=" in arg for arg in sys.argv[2:]):
+        sys.exit("usage: python -m service_common.artifacts ARTIFACT_DIR NAME=PATH [NAME=PATH ...]")
+    load_artifacts(dict(arg.split("=", 1) for arg in sys.argv[2:]), sys.argv[1])
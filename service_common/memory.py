@@ -0,0 +1,406 @@
+"""
+Memory diagnostics for a live service: process RSS, sizes of the known
+in-process structures (loaded artifacts, caches, per-user state), tracemalloc
+snapshots and diffs on demand, and sampled per-request peak allocation.
+
+- Structures are registered by the service with a callable returning
+  {"entries": n, "bytes": heap bytes, "mapped_bytes": ..., "disk_bytes": ...}
+  (deep_size and container_size estimate them); sizes are cached for
+  `sizes_ttl` seconds so scrapes stay cheap.
+- tracemalloc is off unless started through the admin endpoints (it slows
+  every allocation down); snapshots taken while it traces are kept (the last
+  `max_snapshots`) and diffed against the previous or a chosen one.
+- `sample_peak(name)` measures the peak traced allocation of one in
+  `peak_sample_rate` blocks, starting tracemalloc just for that block when
+  it is off. One measurement runs at a time; tracemalloc is process wide, so
+  work running concurrently (other threads, other coroutines of an awaiting
+  block) is included.
+
+Everything is exposed as JSON (GET /admin/memory) and, given a Metrics
+registry, as gauges and a peak allocation histogram on /metrics.
+"""
+import mmap
+import random
+import sys
+import time
+import tracemalloc
+import types
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+try:
+    import numpy as np
+except ImportError:  # the gateway does not need numpy for anything else
+    np = None
+
+# Bytes; powers of 4 from 64 KB to 4 GB
+PEAK_BYTES_BUCKETS = tuple(float(64 * 1024 * 4 ** i) for i in range(9))
+
+# Objects deep_size does not descend into (shared by everything that uses them)
+_OPAQUE = (type, types.ModuleType, types.FunctionType, types.BuiltinFunctionType, types.MethodType)
+_ATOMIC = (str, bytes, bytearray, int, float, complex, bool, type(None))
+
+# tracemalloc's own bookkeeping and the import machinery are noise in a snapshot
+_SNAPSHOT_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+GROUP_BY = ("lineno", "filename", "traceback")
+
+# Size fields a structure may report -> "kind" label of memory_structure_bytes
+_BYTE_KINDS = {"bytes": "heap", "mapped_bytes": "mapped", "disk_bytes": "disk"}
+
+
+def process_memory() -> Dict[str, Optional[int]]:
+    """Resident, peak resident and virtual size of this process in bytes (Linux /proc; peak only elsewhere)"""
+    fields = {"VmRSS": "rss_bytes", "VmHWM": "peak_rss_bytes", "VmSize": "virtual_bytes"}
+    result: Dict[str, Optional[int]] = dict.fromkeys(fields.values())
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                name, _, value = line.partition(":")
+                if name in fields:
+                    result[fields[name]] = int(value.split()[0]) * 1024
+    except OSError:
+        import resource
+
+        result["peak_rss_bytes"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    return result
+
+
+def deep_size(*objects, max_objects: int = 500000) -> Dict[str, Any]:
+    """
+    Approximate memory held by objects and everything they reference: heap
+    bytes (sys.getsizeof, numpy buffers) and mapped bytes (memory-mapped
+    files backing numpy arrays, counted once per mapping). Classes, modules
+    and functions are not followed. Stops after `max_objects` objects.
+    """
+    seen = set()
+    # __getstate__ results are new objects: keep them alive so their ids are not reused
+    states = []
+    heap = mapped = 0
+    stack = list(objects)
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen or isinstance(obj, _OPAQUE):
+            continue
+        seen.add(id(obj))
+        if len(seen) > max_objects:
+            return {"bytes": heap, "mapped_bytes": mapped, "truncated": True}
+
+        if isinstance(obj, mmap.mmap):
+            mapped += len(obj)
+            continue
+        if np is not None and isinstance(obj, np.ndarray) and obj.base is not None:
+            # A view: the owner (array, mapping or extension object) holds the buffer
+            owner = obj.base
+            if isinstance(owner, (np.ndarray, mmap.mmap, bytes, bytearray)):
+                stack.append(owner)
+            else:
+                heap += sys.getsizeof(obj) + obj.nbytes
+            continue
+
+        heap += sys.getsizeof(obj)
+        if isinstance(obj, _ATOMIC) or (np is not None and isinstance(obj, np.ndarray)):
+            continue
+        if isinstance(obj, dict):
+            stack.extend(obj.keys())
+            stack.extend(obj.values())
+        elif isinstance(obj, (list, tuple, set, frozenset, deque)):
+            stack.extend(obj)
+        else:
+            state = getattr(obj, "__dict__", None)
+            if state is None:
+                # Extension types (e.g. sklearn's Cython Tree) expose their buffers through __getstate__
+                try:
+                    state = obj.__getstate__()
+                except Exception:
+                    state = None
+                states.append(state)
+            if state is not None:
+                stack.append(state)
+            for slot in getattr(type(obj), "__slots__", ()):
+                if hasattr(obj, slot):
+                    stack.append(getattr(obj, slot))
+    return {"bytes": heap, "mapped_bytes": mapped}
+
+
+def container_size(container, sample: int = 1000) -> Dict[str, Any]:
+    """
+    Entries and deep heap size of a dict, list or deque. Above `sample`
+    entries the size is extrapolated from a random sample of them.
+    """
+    entries = len(container)
+    if entries <= sample:
+        return {"entries": entries, "bytes": deep_size(container)["bytes"]}
+    if isinstance(container, dict):
+        # Keys and values, not the (key, value) tuples items() creates
+        keys = random.sample(list(container), sample)
+        picked = keys + [container[key] for key in keys]
+    else:
+        picked = random.sample(list(container), sample)
+    per_entry = (deep_size(picked)["bytes"] - sys.getsizeof(picked)) / sample
+    return {"entries": entries, "bytes": int(sys.getsizeof(container) + per_entry * entries), "estimated": True}
+
+
+def _trace_stat(stat, group_by: str) -> Dict[str, Any]:
+    frames = stat.traceback if group_by == "traceback" else stat.traceback[:1]
+    return {
+        "location": " <- ".join(f"{frame.filename}:{frame.lineno}" for frame in frames),
+        "size_bytes": stat.size,
+        "count": stat.count,
+    }
+
+
+class MemoryTracker:
+    """Memory diagnostics of one service (see the module docstring)"""
+
+    def __init__(
+        self,
+        metrics=None,
+        peak_sample_rate: float = 0.0,
+        sizes_ttl: float = 15.0,
+        max_snapshots: int = 4
+    ):
+        self.peak_sample_rate = peak_sample_rate
+        self.sizes_ttl = sizes_ttl
+        self.max_snapshots = max_snapshots
+        self._structures: Dict[str, Callable[[], Dict[str, Any]]] = {}
+        self._sizes: Dict[str, Dict[str, Any]] = {}
+        self._sizes_at = 0.0
+        # id -> (taken at, snapshot), oldest first
+        self._snapshots: "OrderedDict[int, tuple]" = OrderedDict()
+        self._next_snapshot = 1
+        self._tracing = False
+        self._measuring = False
+        # name -> samples, last and largest peak
+        self.peaks: Dict[str, Dict[str, int]] = {}
+        self.peak_bytes = None
+        if metrics is not None:
+            self._register_metrics(metrics)
+
+    def register(self, name: str, collect: Callable[[], Dict[str, Any]]) -> None:
+        """Report a structure's size under `name`; `collect` returns entries and bytes"""
+        self._structures[name] = collect
+        self._sizes_at = 0.0
+
+    def structure_sizes(self, fresh: bool = False) -> Dict[str, Dict[str, Any]]:
+        now = time.monotonic()
+        if fresh or now - self._sizes_at >= self.sizes_ttl:
+            sizes = {}
+            for name, collect in self._structures.items():
+                try:
+                    sizes[name] = collect() or {}
+                except Exception as e:
+                    sizes[name] = {"error": str(e)}
+            self._sizes, self._sizes_at = sizes, now
+        return self._sizes
+
+    # ------------------------------------------------------------------------
+    # tracemalloc
+    # ------------------------------------------------------------------------
+
+    @property
+    def tracing(self) -> bool:
+        return self._tracing and tracemalloc.is_tracing()
+
+    def start_tracing(self, frames: int = 1) -> None:
+        """Start tracemalloc (keeping `frames` frames per allocation); RuntimeError during a peak measurement"""
+        if self._measuring:
+            raise RuntimeError("A peak allocation measurement is in progress; retry")
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+        self._tracing = True
+
+    def stop_tracing(self) -> None:
+        """Stop tracemalloc and drop the snapshots"""
+        if self._measuring:
+            raise RuntimeError("A peak allocation measurement is in progress; retry")
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+        self._tracing = False
+        self._snapshots.clear()
+
+    def take_snapshot(
+        self,
+        compare_to: Optional[int] = None,
+        group_by: str = "lineno",
+        limit: int = 20
+    ) -> Dict[str, Any]:
+        """
+        Snapshot the traced allocations: top `limit` locations and, against
+        snapshot `compare_to` (default: the previous one), the largest changes.
+        RuntimeError when not tracing, KeyError for an unknown snapshot id.
+        """
+        if group_by not in GROUP_BY:
+            raise ValueError(f"group_by must be one of: {', '.join(GROUP_BY)}")
+        if not self.tracing:
+            raise RuntimeError("tracemalloc is not tracing; start it first")
+        if compare_to is not None and compare_to not in self._snapshots:
+            raise KeyError(f"Snapshot not found: {compare_to} (kept: {list(self._snapshots)})")
+        base_id = compare_to if compare_to is not None else next(reversed(self._snapshots), None)
+
+        snapshot = tracemalloc.take_snapshot().filter_traces(_SNAPSHOT_FILTERS)
+        snapshot_id = self._next_snapshot
+        self._next_snapshot += 1
+        taken_at = datetime.now().isoformat(timespec="seconds")
+        stats = snapshot.statistics(group_by)
+        result: Dict[str, Any] = {
+            "id": snapshot_id,
+            "taken_at": taken_at,
+            "traced_bytes": sum(stat.size for stat in stats),
+            "top": [_trace_stat(stat, group_by) for stat in stats[:limit]],
+        }
+        if base_id is not None:
+            base_taken_at, base = self._snapshots[base_id]
+            diff = snapshot.compare_to(base, group_by)
+            result["compared_to"] = {"id": base_id, "taken_at": base_taken_at}
+            result["growth_bytes"] = sum(stat.size_diff for stat in diff)
+            result["diff"] = [
+                dict(_trace_stat(stat, group_by), size_diff_bytes=stat.size_diff, count_diff=stat.count_diff)
+                for stat in diff[:limit]
+            ]
+
+        self._snapshots[snapshot_id] = (taken_at, snapshot)
+        while len(self._snapshots) > self.max_snapshots:
+            self._snapshots.popitem(last=False)
+        return result
+
+    # ------------------------------------------------------------------------
+    # Per-request peak allocation
+    # ------------------------------------------------------------------------
+
+    @contextmanager
+    def sample_peak(self, name: str) -> Iterator[None]:
+        """Measure the block's peak traced allocation for one in peak_sample_rate calls"""
+        if self._measuring or self.peak_sample_rate <= 0 or random.random() >= self.peak_sample_rate:
+            yield
+            return
+        self._measuring = True
+        owned = not tracemalloc.is_tracing()
+        if owned:
+            tracemalloc.start(1)
+        baseline = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        try:
+            yield
+        finally:
+            peak = max(tracemalloc.get_traced_memory()[1] - baseline, 0)
+            if owned:
+                tracemalloc.stop()
+            self._measuring = False
+            self._record_peak(name, peak)
+
+    def _record_peak(self, name: str, peak: int) -> None:
+        entry = self.peaks.setdefault(name, {"samples": 0, "last_bytes": 0, "max_bytes": 0})
+        entry["samples"] += 1
+        entry["last_bytes"] = peak
+        entry["max_bytes"] = max(entry["max_bytes"], peak)
+        if self.peak_bytes is not None:
+            self.peak_bytes.observe(peak, endpoint=name)
+
+    # ------------------------------------------------------------------------
+    # Reporting
+    # ------------------------------------------------------------------------
+
+    def describe(self, fresh: bool = False) -> Dict[str, Any]:
+        traced, traced_peak = tracemalloc.get_traced_memory() if self.tracing else (0, 0)
+        return {
+            "process": process_memory(),
+            "structures": self.structure_sizes(fresh),
+            "tracemalloc": {
+                "tracing": self.tracing,
+                "traced_bytes": traced,
+                "traced_peak_bytes": traced_peak,
+                "overhead_bytes": tracemalloc.get_tracemalloc_memory() if self.tracing else 0,
+                "snapshots": [{"id": snapshot_id, "taken_at": taken_at} for snapshot_id, (taken_at, _) in self._snapshots.items()],
+            },
+            "request_peaks": {"sample_rate": self.peak_sample_rate, "endpoints": self.peaks},
+        }
+
+    def _register_metrics(self, metrics) -> None:
+        def process_value(field: str) -> Callable[[], Dict]:
+            def collect() -> Dict:
+                value = process_memory()[field]
+                return {(): value} if value is not None else {}
+            return collect
+
+        def structure_bytes() -> Dict:
+            values = {}
+            for name, size in self.structure_sizes().items():
+                for field, kind in _BYTE_KINDS.items():
+                    if size.get(field) is not None:
+                        values[(name, kind)] = size[field]
+            return values
+
+        metrics.callback("process_resident_memory_bytes", "Resident set size", "gauge", process_value("rss_bytes"))
+        metrics.callback(
+            "process_peak_resident_memory_bytes", "Peak resident set size", "gauge", process_value("peak_rss_bytes")
+        )
+        metrics.callback(
+            "memory_structure_entries", "Entries in known in-process structures", "gauge",
+            lambda: {(name,): size["entries"] for name, size in self.structure_sizes().items() if "entries" in size},
+            ("structure",)
+        )
+        metrics.callback(
+            "memory_structure_bytes", "Estimated size of known in-process structures", "gauge",
+            structure_bytes, ("structure", "kind")
+        )
+        metrics.callback(
+            "tracemalloc_traced_bytes", "Python allocations traced by tracemalloc (0 when off)", "gauge",
+            lambda: {(): tracemalloc.get_traced_memory()[0] if self.tracing else 0}
+        )
+        self.peak_bytes = metrics.histogram(
+            "request_peak_allocation_bytes", "Peak Python allocation of sampled requests", ("endpoint",),
+            buckets=PEAK_BYTES_BUCKETS
+        )
+
+
+def create_memory_router(tracker: MemoryTracker, dependencies: list):
+    """Admin endpoints for memory diagnostics; `dependencies` guard every route"""
+    from fastapi import APIRouter, HTTPException, status
+    from starlette.concurrency import run_in_threadpool
+
+    router = APIRouter(prefix="/admin/memory", tags=["Admin"], dependencies=dependencies)
+
+    @router.get("")
+    async def get_memory(fresh: bool = False):
+        """Process memory, structure sizes, tracemalloc status and sampled request peaks"""
+        return tracker.describe(fresh)
+
+    @router.post("/tracing/start")
+    async def start_tracing(frames: int = 1):
+        """Start tracemalloc (slows allocations down until stopped); frames > 1 for group_by=traceback"""
+        try:
+            tracker.start_tracing(frames)
+        except RuntimeError as e:
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+        return {"tracing": True, "frames": tracemalloc.get_traceback_limit()}
+
+    @router.post("/tracing/stop")
+    async def stop_tracing():
+        """Stop tracemalloc and drop its snapshots"""
+        try:
+            tracker.stop_tracing()
+        except RuntimeError as e:
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+        return {"tracing": False}
+
+    @router.post("/snapshots")
+    async def take_snapshot(compare_to: Optional[int] = None, group_by: str = "lineno", limit: int = 20):
+        """Snapshot traced allocations; diffed against `compare_to` (default: the previous snapshot)"""
+        try:
+            return await run_in_threadpool(tracker.take_snapshot, compare_to, group_by, limit)
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+        except RuntimeError as e:
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+        except KeyError as e:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=e.args[0])
+
+    return router
@@ -0,0 +1,303 @@
+"""
+In-process metrics: fixed-bucket histograms and counters, per-request stage
+timings, and the Prometheus text format for a /metrics endpoint.
+
+A request opens a timing scope (`timed_request`); code on its path wraps
+its steps in `stage(name)`. At the end of the request each stage's total
+is observed once in the `stage_seconds` histogram, and the endpoint can echo
+the breakdown (`current_timings`). Outside a scope (warm-up, scripts, the
+benchmarks) `stage` only records a trace span, if a trace is active
+(tracing.py); named laps are recorded as spans too.
+
+Metrics live in the process: with several gunicorn workers, each scrape
+reports the worker that served it.
+
+Usage:
+    metrics = Metrics(namespace="brute_force")
+    with metrics.timed_request():
+        with stage("model"):
+            ...
+    text = metrics.render()
+"""
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from .tracing import record_span, span as trace_span
+
+# Seconds; roughly 1-2.5-5 per decade from 100 µs to 30 s
+LATENCY_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0,
+)
+
+# Rows per batch request
+BATCH_SIZE_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, 50000)
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    """Monotonic counter, one series per label values"""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            series = sorted(self._values.items())
+        for key, value in series:
+            lines.append(f"{self.name}{_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    """
+    Fixed-bucket histogram (Prometheus semantics: cumulative `le` buckets,
+    _sum and _count), one series per label values. Quantiles come from the
+    buckets on the Prometheus side (histogram_quantile).
+    """
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts (last = +Inf), sum]
+        self._series: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels) -> None:
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = sorted((key, (list(counts), total)) for key, (counts, total) in self._series.items())
+        for key, (counts, total) in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+class CallbackMetric:
+    """
+    Counter or gauge read at scrape time from state kept elsewhere (e.g. a
+    cache's own hit counters): `collect` returns {label values: value}
+    """
+
+    def __init__(self, name: str, documentation: str, kind: str, collect: Callable, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.kind = kind
+        self.collect = collect
+        self.labelnames = tuple(labelnames)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for key, value in sorted(self.collect().items()):
+            lines.append(f"{self.name}{_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+
+# ============================================================================
+# STAGE TIMINGS
+# ============================================================================
+
+class StageTimings:
+    """
+    Stage durations of one request, in seconds. Nested stages are exclusive:
+    time spent in an inner stage is not counted in the outer one.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages: Dict[str, float] = {}
+        self._lap = self.started
+        self._nested: List[float] = []
+
+    def add(self, name: str, seconds: float) -> None:
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def lap(self, name: Optional[str] = None) -> None:
+        """
+        Add the time since the previous lap (or the request start) to `name`;
+        without a name only restart the lap clock. For steps that are not a
+        single block of code, such as parsing (before the endpoint runs) and
+        serialization (after it returns).
+        """
+        now = time.perf_counter()
+        if name:
+            self.add(name, now - self._lap)
+            record_span(name, self._lap, now)
+        self._lap = now
+
+    def as_ms(self) -> Dict[str, float]:
+        return {name: round(seconds * 1000, 3) for name, seconds in self.stages.items()}
+
+
+_current: ContextVar[Optional[StageTimings]] = ContextVar("stage_timings", default=None)
+
+
+def current_timings() -> Optional[StageTimings]:
+    """Timings of the request being served (None outside a timing scope)"""
+    return _current.get()
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Add the block's duration to stage `name` of the current request, and trace it as a span"""
+    with trace_span(name):
+        timings = _current.get()
+        if timings is None:
+            yield
+            return
+        started = time.perf_counter()
+        timings._nested.append(0.0)
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            inner = timings._nested.pop()
+            timings.add(name, elapsed - inner)
+            if timings._nested:
+                timings._nested[-1] += elapsed
+
+
+def lap(name: Optional[str] = None) -> None:
+    """StageTimings.lap on the current request (no-op outside a timing scope)"""
+    timings = _current.get()
+    if timings is not None:
+        timings.lap(name)
+
+
+# ============================================================================
+# REGISTRY
+# ============================================================================
+
+class Metrics:
+    """
+    The metrics of one service. Built in: request latency by route and
+    status, and per-stage latency. Services add their own metrics with
+    `counter`, `histogram` and `callback`.
+    """
+
+    def __init__(self, namespace: str):
+        self.namespace = namespace
+        self._metrics: Dict[str, object] = {}
+        self.request_seconds = self.histogram(
+            "http_request_duration_seconds", "Request latency by route and status", ("method", "route", "status")
+        )
+        self.stage_seconds = self.histogram(
+            "stage_duration_seconds", "Time per request spent in each processing stage", ("stage",)
+        )
+
+    def _name(self, name: str) -> str:
+        return f"{self.namespace}_{name}" if self.namespace else name
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        full_name = self._name(name)
+        if full_name not in self._metrics:
+            self._metrics[full_name] = Counter(full_name, documentation, labelnames)
+        return self._metrics[full_name]
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS
+    ) -> Histogram:
+        full_name = self._name(name)
+        if full_name not in self._metrics:
+            self._metrics[full_name] = Histogram(full_name, documentation, labelnames, buckets)
+        return self._metrics[full_name]
+
+    def callback(
+        self,
+        name: str,
+        documentation: str,
+        kind: str,
+        collect: Callable,
+        labelnames: Sequence[str] = ()
+    ) -> CallbackMetric:
+        full_name = self._name(name)
+        self._metrics[full_name] = CallbackMetric(full_name, documentation, kind, collect, labelnames)
+        return self._metrics[full_name]
+
+    @contextmanager
+    def timed_request(self) -> Iterator[StageTimings]:
+        """Open a timing scope; its stages are observed in stage_seconds when it closes"""
+        timings = StageTimings()
+        token = _current.set(timings)
+        try:
+            yield timings
+        finally:
+            _current.reset(token)
+            for name, seconds in timings.stages.items():
+                self.stage_seconds.observe(seconds, stage=name)
+
+    def observe_request(self, method: str, route: str, status: int, seconds: float) -> None:
+        self.request_seconds.observe(seconds, method=method, route=route, status=status)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+def route_of(request) -> str:
+    """Route template of a served request ("/reports/{report_id}"), so paths with ids share a series"""
+    route = request.scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
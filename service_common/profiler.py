@@ -0,0 +1,406 @@
+"""
+On-demand statistical sampling profiler for a live service.
+
+A background thread snapshots every thread's Python stack
+(sys._current_frames) at a fixed interval and counts identical stacks. A
+session runs for a bounded number of seconds, either over all traffic or only
+while requests carrying the PROFILE_HEADER are in flight, and is written to a
+local directory as collapsed stacks (flamegraph.pl, speedscope, inferno) or a
+speedscope JSON file.
+
+Safe under load:
+- Overhead budget: after each sample the sampler sleeps long enough that the
+  time it holds the GIL stays below `overhead_budget` of wall time, however
+  slow sampling gets (many threads, deep stacks).
+- Automatic shutoff: sessions end after their duration (capped at
+  `max_seconds`), when the number of distinct stacks reaches `max_stacks`, or
+  on stop(); the profile collected so far is written in every case.
+- One session per process at a time. With several gunicorn workers a session
+  covers the worker that received the start request.
+
+Usage:
+    profiler = SamplingProfiler("profiles", service="brute_force")
+    profiler.start(seconds=30)                  # everything for 30 s
+    profiler.start(seconds=300, mode="header")  # requests with X-Debug-Profile
+    with profiler.profile_request():            # done by the middleware
+        ...
+"""
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Requests carrying this header are sampled while a "header" session runs
+PROFILE_HEADER = "X-Debug-Profile"
+
+MODES = ("all", "header")
+FORMATS = ("collapsed", "speedscope")
+
+# Leaf frames of threads blocked waiting for work (thread pools, the event
+# loop's select); their samples are dropped unless include_idle is set
+_IDLE_LEAVES = {
+    ("threading.py", "wait"),
+    ("queue.py", "get"),
+    ("selectors.py", "select"),
+    ("socket.py", "accept"),
+}
+
+# Profile files served by the admin endpoints
+_PROFILE_NAME = re.compile(r"^profile-[\w.-]+\.(collapsed|speedscope\.json)$")
+
+
+class ProfileSession:
+    """Samples of one profiling session"""
+
+    def __init__(self, mode: str, output_format: str, seconds: float, interval: float, include_idle: bool):
+        self.mode = mode
+        self.format = output_format
+        self.seconds = seconds
+        self.interval = interval
+        self.include_idle = include_idle
+        self.started_at = datetime.now()
+        self.started = time.perf_counter()
+        self.finished: Optional[float] = None
+        # (thread name, code objects root first) -> samples
+        self.stacks: Dict[Tuple[str, tuple], int] = {}
+        self.samples = 0
+        self.sampling_seconds = 0.0
+        self.stop_reason: Optional[str] = None
+        self.path: Optional[str] = None
+        self.stop_event = threading.Event()
+
+    @property
+    def elapsed(self) -> float:
+        return (self.finished or time.perf_counter()) - self.started
+
+    def describe(self) -> Dict:
+        elapsed = self.elapsed
+        return {
+            "mode": self.mode,
+            "format": self.format,
+            "seconds": self.seconds,
+            "interval_ms": round(self.interval * 1000, 3),
+            "include_idle": self.include_idle,
+            "started_at": self.started_at.isoformat(timespec="seconds"),
+            "elapsed_seconds": round(elapsed, 3),
+            "samples": self.samples,
+            "distinct_stacks": len(self.stacks),
+            "overhead": round(self.sampling_seconds / elapsed, 5) if elapsed else 0.0,
+            "stop_reason": self.stop_reason,
+            "file": os.path.basename(self.path) if self.path else None,
+        }
+
+
+def _frame_label(code) -> str:
+    """function (dir/file.py:first line), short enough to read in a flame graph"""
+    parts = code.co_filename.replace("\\", "/").rsplit("/", 2)
+    return f"{code.co_name} ({'/'.join(parts[-2:])}:{code.co_firstlineno})"
+
+
+def _is_idle(code) -> bool:
+    return (os.path.basename(code.co_filename), code.co_name) in _IDLE_LEAVES
+
+
+class SamplingProfiler:
+    """
+    Sampling profiler with a bounded overhead and duration. Start, stop and
+    inspect sessions from any thread; sampling runs in its own daemon thread.
+    """
+
+    def __init__(
+        self,
+        output_dir: str,
+        service: str,
+        interval: float = 0.01,
+        overhead_budget: float = 0.02,
+        max_seconds: float = 300.0,
+        max_stacks: int = 50000,
+        max_depth: int = 128
+    ):
+        self.output_dir = output_dir
+        self.service = service
+        self.interval = interval
+        self.overhead_budget = overhead_budget
+        self.max_seconds = max_seconds
+        self.max_stacks = max_stacks
+        self.max_depth = max_depth
+        self.session: Optional[ProfileSession] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        # Flagged requests in flight ("header" sessions sample only while > 0)
+        self._flagged = 0
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    @property
+    def watching_header(self) -> bool:
+        session = self.session
+        return self.running and session is not None and session.mode == "header"
+
+    def start(
+        self,
+        seconds: float,
+        mode: str = "all",
+        output_format: str = "collapsed",
+        interval: Optional[float] = None,
+        include_idle: bool = False
+    ) -> ProfileSession:
+        """Start a session; ValueError for bad arguments, RuntimeError if one is running"""
+        if mode not in MODES:
+            raise ValueError(f"mode must be one of: {', '.join(MODES)}")
+        if output_format not in FORMATS:
+            raise ValueError(f"format must be one of: {', '.join(FORMATS)}")
+        if seconds <= 0:
+            raise ValueError("seconds must be positive")
+        interval = self.interval if interval is None else interval
+        if interval <= 0:
+            raise ValueError("interval must be positive")
+
+        with self._lock:
+            if self.running:
+                raise RuntimeError("A profiling session is already running")
+            session = ProfileSession(mode, output_format, min(seconds, self.max_seconds), interval, include_idle)
+            self.session = session
+            self._thread = threading.Thread(target=self._run, args=(session,), name="sampling-profiler", daemon=True)
+            self._thread.start()
+        logger.info(f"🔬 Profiling started: {mode} for {session.seconds:g}s every {interval * 1000:g}ms")
+        return session
+
+    def stop(self, timeout: float = 10.0) -> Optional[ProfileSession]:
+        """Stop the running session (if any) and wait until its profile is written"""
+        with self._lock:
+            session, thread = self.session, self._thread
+        if session is None or thread is None:
+            return session
+        if session.stop_reason is None:
+            session.stop_reason = "stopped"
+        session.stop_event.set()
+        thread.join(timeout)
+        return session
+
+    @contextmanager
+    def profile_request(self) -> Iterator[None]:
+        """Mark a flagged request as in flight for "header" sessions"""
+        with self._lock:
+            self._flagged += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._flagged -= 1
+
+    def describe(self) -> Dict:
+        return {
+            "running": self.running,
+            "session": self.session.describe() if self.session else None,
+            "overhead_budget": self.overhead_budget,
+            "max_seconds": self.max_seconds,
+            "profiles": self.list_profiles(),
+        }
+
+    # ------------------------------------------------------------------------
+    # Sampling
+    # ------------------------------------------------------------------------
+
+    def _run(self, session: ProfileSession):
+        own_thread = threading.get_ident()
+        deadline = session.started + session.seconds
+        # Keeps sampling cost / wall time <= budget: cost c is followed by c * (1 - b) / b of sleep
+        pace = (1 - self.overhead_budget) / self.overhead_budget
+        try:
+            while not session.stop_event.is_set():
+                if time.perf_counter() >= deadline:
+                    session.stop_reason = session.stop_reason or "duration"
+                    break
+                if session.mode == "header" and not self._flagged:
+                    session.stop_event.wait(session.interval)
+                    continue
+
+                sample_started = time.perf_counter()
+                self._sample(session, own_thread)
+                cost = time.perf_counter() - sample_started
+                session.sampling_seconds += cost
+                session.samples += 1
+
+                if len(session.stacks) >= self.max_stacks:
+                    session.stop_reason = "max_stacks"
+                    break
+                session.stop_event.wait(max(session.interval, cost * pace))
+        except Exception:
+            logger.exception("Sampling profiler failed")
+            session.stop_reason = "error"
+        finally:
+            session.finished = time.perf_counter()
+            try:
+                session.path = self._write(session)
+                logger.info(
+                    f"🔬 Profiling stopped ({session.stop_reason}): {session.samples} samples, "
+                    f"overhead {session.describe()['overhead']:.2%} -> {session.path}"
+                )
+            except OSError:
+                logger.exception("Could not write the profile")
+
+    def _sample(self, session: ProfileSession, own_thread: int):
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_thread:
+                continue
+            if not session.include_idle and _is_idle(frame.f_code):
+                continue
+            codes = []
+            while frame is not None and len(codes) < self.max_depth:
+                codes.append(frame.f_code)
+                frame = frame.f_back
+            codes.reverse()
+            key = (names.get(thread_id, str(thread_id)), tuple(codes))
+            session.stacks[key] = session.stacks.get(key, 0) + 1
+
+    # ------------------------------------------------------------------------
+    # Output
+    # ------------------------------------------------------------------------
+
+    def _write(self, session: ProfileSession) -> str:
+        os.makedirs(self.output_dir, exist_ok=True)
+        stamp = session.started_at.strftime("%Y%m%d_%H%M%S")
+        name = f"profile-{self.service}-{stamp}-{os.getpid()}"
+        labels: Dict[object, str] = {}
+
+        def label(code) -> str:
+            if code not in labels:
+                labels[code] = _frame_label(code)
+            return labels[code]
+
+        if session.format == "speedscope":
+            path = os.path.join(self.output_dir, f"{name}.speedscope.json")
+            document = self._speedscope(session, name, label)
+            with open(path, "w") as f:
+                json.dump(document, f)
+            return path
+
+        path = os.path.join(self.output_dir, f"{name}.collapsed")
+        with open(path, "w") as f:
+            for (thread_name, codes), count in sorted(session.stacks.items(), key=lambda item: -item[1]):
+                frames = [thread_name.replace(";", ":")] + [label(code).replace(";", ":") for code in codes]
+                f.write(f"{';'.join(frames)} {count}\n")
+        return path
+
+    def _speedscope(self, session: ProfileSession, name: str, label) -> Dict:
+        """speedscope file format: one sampled profile per thread, weights in samples"""
+        frames: List[Dict] = []
+        index: Dict[object, int] = {}
+        threads: Dict[str, Dict] = {}
+        for (thread_name, codes), count in session.stacks.items():
+            stack = []
+            for code in codes:
+                if code not in index:
+                    index[code] = len(frames)
+                    frames.append({"name": label(code), "file": code.co_filename, "line": code.co_firstlineno})
+                stack.append(index[code])
+            profile = threads.setdefault(thread_name, {
+                "type": "sampled",
+                "name": thread_name,
+                "unit": "none",
+                "startValue": 0,
+                "endValue": 0,
+                "samples": [],
+                "weights": [],
+            })
+            profile["samples"].append(stack)
+            profile["weights"].append(count)
+            profile["endValue"] += count
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": name,
+            "exporter": f"{self.service} sampling profiler",
+            "shared": {"frames": frames},
+            "profiles": list(threads.values()),
+        }
+
+    def list_profiles(self) -> List[Dict]:
+        """Profiles in output_dir, newest first"""
+        if not os.path.isdir(self.output_dir):
+            return []
+        profiles = []
+        for entry in os.scandir(self.output_dir):
+            if entry.is_file() and _PROFILE_NAME.match(entry.name):
+                stat = entry.stat()
+                profiles.append({"name": entry.name, "size_bytes": stat.st_size, "modified": stat.st_mtime})
+        profiles.sort(key=lambda profile: profile["modified"], reverse=True)
+        return profiles
+
+    def profile_path(self, name: str) -> Optional[str]:
+        """Path of a written profile, None for unknown names (no traversal)"""
+        if not _PROFILE_NAME.match(name):
+            return None
+        path = os.path.join(self.output_dir, name)
+        return path if os.path.isfile(path) else None
+
+
+def create_profiler_router(profiler: SamplingProfiler, dependencies: list):
+    """Admin endpoints for the profiler; `dependencies` guard every route"""
+    from fastapi import APIRouter, HTTPException, status
+    from fastapi.responses import FileResponse
+    from starlette.concurrency import run_in_threadpool
+
+    router = APIRouter(prefix="/admin/profiler", tags=["Admin"], dependencies=dependencies)
+
+    @router.get("")
+    async def get_profiler_status():
+        """Current or last session (samples, overhead, stop reason) and the written profiles"""
+        return profiler.describe()
+
+    @router.post("/start", status_code=status.HTTP_202_ACCEPTED)
+    async def start_profiler(
+        seconds: float = 30.0,
+        mode: str = "all",
+        format: str = "collapsed",
+        interval_ms: Optional[float] = None,
+        include_idle: bool = False
+    ):
+        """
+        Sample this process for `seconds` (capped by the server). mode=header
+        samples only while requests with the X-Debug-Profile header are in
+        flight; format=speedscope writes a speedscope JSON file; include_idle
+        keeps threads blocked waiting for work.
+        """
+        try:
+            session = profiler.start(
+                seconds,
+                mode=mode,
+                output_format=format,
+                interval=interval_ms / 1000 if interval_ms is not None else None,
+                include_idle=include_idle
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+        except RuntimeError as e:
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+        return {"status": "running", "session": session.describe()}
+
+    @router.post("/stop")
+    async def stop_profiler():
+        """Stop the running session and write its profile"""
+        if not profiler.running:
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="No profiling session is running")
+        session = await run_in_threadpool(profiler.stop)
+        return {"status": "stopped", "session": session.describe()}
+
+    @router.get("/profiles/{name}")
+    async def download_profile(name: str):
+        """Download a written profile"""
+        path = profiler.profile_path(name)
+        if path is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Profile not found: {name}")
+        return FileResponse(path, filename=name)
+
+    return router
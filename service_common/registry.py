@@ -0,0 +1,472 @@
+"""
+Versioned model registry and zero-downtime model hot-swap.
+
+Registry layout (MODEL_REGISTRY_DIR):
+    <version>/
+        <name>.<ext>    artifact files (model.pkl, vectorizer.pkl, ...)
+        version.json    file names, checksums, publish time and notes
+        artifacts/      memory-mapped bundle (artifacts.py), built on first load
+    active.json         version every worker should serve, and the one before it
+
+A new version is built and warmed up off the event loop, swapped in behind
+get_predictor() and the previous one is drained (requests that started
+before the swap finish on it) and kept in memory for instant rollback. Each
+worker process follows active.json, so a swap or rollback received by one
+worker (or written with the CLI below) reaches every worker.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import secrets
+import shutil
+import tempfile
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_NAME = "active.json"
+VERSION_NAME = "version.json"
+
+# Version served when the predictor was loaded from MODEL_PATH (no registry version)
+LOCAL_VERSION = "local"
+
+VERSION_PATTERN = re.compile(r"^[A-Za-z0-9][A-Za-z0-9._-]{0,63}$")
+
+
+class VersionIntegrityError(ValueError):
+    """A version's files do not match the checksums recorded when it was published"""
+
+
+def _sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _write_json(path: str, data: Dict[str, Any]) -> None:
+    """Write a JSON file atomically (readers see the old or the new content)"""
+    fd, tmp_path = tempfile.mkstemp(prefix=".tmp-", dir=os.path.dirname(path))
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+class ModelRegistry:
+    """Directory of immutable model versions plus the active version pointer"""
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def version_dir(self, version: str) -> str:
+        if not VERSION_PATTERN.match(version or "") or version == LOCAL_VERSION:
+            raise ValueError(f"Invalid model version: {version!r}")
+        return os.path.join(self.root, version)
+
+    def exists(self, version: str) -> bool:
+        try:
+            return os.path.exists(os.path.join(self.version_dir(version), VERSION_NAME))
+        except ValueError:
+            return False
+
+    def describe(self, version: str) -> Dict[str, Any]:
+        with open(os.path.join(self.version_dir(version), VERSION_NAME)) as f:
+            return json.load(f)
+
+    def versions(self) -> List[Dict[str, Any]]:
+        """Published versions, oldest first"""
+        if not os.path.isdir(self.root):
+            return []
+        found = [self.describe(name) for name in os.listdir(self.root) if self.exists(name)]
+        return sorted(found, key=lambda info: info["published_at"])
+
+    def files(self, version: str) -> Dict[str, str]:
+        """Artifact name -> absolute path of a version's files"""
+        directory = self.version_dir(version)
+        return {name: os.path.join(directory, filename) for name, filename in self.describe(version)["files"].items()}
+
+    def verify(self, version: str) -> Dict[str, str]:
+        """
+        A version's files (as files()) after checking each one against the
+        checksum publish() recorded. Raises VersionIntegrityError when a file
+        is missing, has no checksum or does not match (truncated copy, edited
+        in place).
+        """
+        info = self.describe(version)
+        checksums = info.get("checksums") or {}
+        files = self.files(version)
+        for name, path in files.items():
+            filename = info["files"][name]
+            if filename not in checksums:
+                raise VersionIntegrityError(f"No checksum recorded for {filename} in model version {version}")
+            if not os.path.exists(path):
+                raise VersionIntegrityError(f"Missing {filename} in model version {version}")
+            if _sha256(path) != checksums[filename]:
+                raise VersionIntegrityError(f"Checksum mismatch for {filename} in model version {version}")
+        return files
+
+    def publish(self, sources: Dict[str, str], version: Optional[str] = None, notes: Optional[str] = None) -> str:
+        """
+        Copy artifact files into a new, immutable version.
+
+        Args:
+            sources: Artifact name -> file path (e.g. {"model": ".../best_model.pkl"})
+            version: Version name (default: UTC timestamp)
+            notes: Free text stored with the version
+
+        Returns:
+            The version name
+        """
+        version = version or datetime.now(timezone.utc).strftime("%Y%m%d-%H%M%S")
+        target = self.version_dir(version)
+        if os.path.exists(target):
+            raise ValueError(f"Model version already exists: {version}")
+        os.makedirs(self.root, exist_ok=True)
+
+        staging = tempfile.mkdtemp(prefix=".publish-", dir=self.root)
+        try:
+            files, checksums = {}, {}
+            for name, path in sources.items():
+                filename = name + os.path.splitext(path)[1]
+                shutil.copyfile(path, os.path.join(staging, filename))
+                files[name] = filename
+                checksums[filename] = _sha256(os.path.join(staging, filename))
+            _write_json(os.path.join(staging, VERSION_NAME), {
+                "version": version,
+                "published_at": datetime.now(timezone.utc).isoformat(),
+                "files": files,
+                "checksums": checksums,
+                "sources": {name: os.path.abspath(path) for name, path in sources.items()},
+                "notes": notes,
+            })
+            os.rename(staging, target)
+        except BaseException:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+        logger.info(f"✅ Published model version {version}")
+        return version
+
+    def read_active(self) -> Dict[str, Optional[str]]:
+        try:
+            with open(os.path.join(self.root, ACTIVE_NAME)) as f:
+                active = json.load(f)
+        except (OSError, ValueError):
+            active = {}
+        return {"active": active.get("active"), "previous": active.get("previous")}
+
+    def set_active(self, version: Optional[str], previous: Optional[str]) -> None:
+        """Point every worker at a version (None: the MODEL_PATH artifacts)"""
+        os.makedirs(self.root, exist_ok=True)
+        _write_json(os.path.join(self.root, ACTIVE_NAME), {
+            "active": version,
+            "previous": previous,
+            "updated_at": datetime.now(timezone.utc).isoformat(),
+        })
+
+
+class ModelSwapper:
+    """
+    Per-process owner of the served model version.
+
+    Args:
+        registry: Model registry
+        build: (files, artifact_dir) -> predictor, for a registry version
+        warm_up: Runs synthetic predictions on a freshly built predictor
+        get: The predictor module's get_predictor (current instance)
+        swap: Replaces the served predictor and returns the previous one
+        mapped: Load registry versions through memory-mapped bundles
+        drain_timeout: Seconds to wait for requests still on the old version
+    """
+
+    def __init__(
+        self,
+        registry: ModelRegistry,
+        build: Callable[[Dict[str, str], Optional[str]], Any],
+        warm_up: Callable[[Any], None],
+        get: Callable[[], Any],
+        swap: Callable[[Any], Any],
+        mapped: bool = False,
+        drain_timeout: float = 30.0
+    ):
+        self.registry = registry
+        self.build = build
+        self.warm_up = warm_up
+        self.get = get
+        self.swap = swap
+        self.mapped = mapped
+        self.drain_timeout = drain_timeout
+
+        self.version: Optional[str] = None
+        self.previous: Optional[tuple] = None  # (version, predictor) kept for rollback
+        self.status: Dict[str, Any] = {"state": "idle"}
+        self._local_loader: Optional[Callable[[], Any]] = None
+        self._failed_version: Optional[str] = None
+        self._generation = 0
+        self._in_flight: Counter = Counter()
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._drain_task: Optional[asyncio.Task] = None
+
+    # ------------------------------------------------------------------
+    # Loading
+    # ------------------------------------------------------------------
+
+    def load_initial(self, load_local: Callable[[], Any]) -> Any:
+        """
+        Startup load: the registry's active version if there is one, else
+        load_local() (a new predictor for the MODEL_PATH artifacts). A no-op once loaded, e.g. in
+        workers forked from a master that preloaded the model.
+        """
+        self._local_loader = load_local
+        if self.version is not None:
+            return self.get()
+
+        active = self.registry.read_active()["active"]
+        if active and not self.registry.exists(active):
+            logger.warning(f"⚠️ Active model version {active} not found, using MODEL_PATH")
+            active = None
+        version = active or LOCAL_VERSION
+        try:
+            predictor = self._build(version)
+        except VersionIntegrityError as e:
+            # A corrupted version must not keep the service from starting
+            logger.error(f"❌ Active model version {version} failed verification, using MODEL_PATH: {e}")
+            self._failed_version = version
+            version = LOCAL_VERSION
+            predictor = self._build(version)
+        self.swap(predictor)
+        self.version = version
+        logger.info(f"✅ Serving model version: {self.version}")
+        return predictor
+
+    def _build(self, version: str) -> Any:
+        """Build and warm up a version (blocking); registry files are verified first"""
+        started = time.perf_counter()
+        if version == LOCAL_VERSION:
+            predictor = self._local_loader()
+        else:
+            files = self.registry.verify(version)
+            directory = self.registry.version_dir(version)
+            artifact_dir = os.path.join(directory, "artifacts") if self.mapped else None
+            predictor = self.build(files, artifact_dir)
+        self._warm_up(predictor)
+        logger.info(f"✅ Model version {version} ready in {time.perf_counter() - started:.2f}s")
+        return predictor
+
+    def _warm_up(self, predictor: Any) -> None:
+        started = time.perf_counter()
+        self.warm_up(predictor)
+        logger.info(f"✅ Warm-up done in {(time.perf_counter() - started) * 1000:.0f}ms")
+
+    @property
+    def busy(self) -> bool:
+        return self._lock.locked() or (self._task is not None and not self._task.done())
+
+    def start_load(self, version: str) -> None:
+        """Load a version in the background (admin endpoint)"""
+        if self.busy:
+            raise RuntimeError("A model swap is already in progress")
+        self.status = {"state": "loading", "version": version, "started_at": time.time()}
+        self._task = asyncio.get_running_loop().create_task(self.load(version))
+
+    async def load(self, version: str, activate: bool = True) -> bool:
+        """Build and warm up a version off the event loop, then swap it in"""
+        async with self._lock:
+            self.status = {"state": "loading", "version": version, "started_at": time.time()}
+            try:
+                predictor = await asyncio.get_running_loop().run_in_executor(None, self._build, version)
+            except Exception as e:
+                logger.error(f"❌ Failed to load model version {version}: {e}", exc_info=True)
+                self._failed_version = version
+                self.status = {"state": "failed", "version": version, "error": str(e), "finished_at": time.time()}
+                return False
+            await self._swap_in(version, predictor, activate)
+            return True
+
+    async def rollback(self, activate: bool = True) -> str:
+        """Swap back to the previous version, which is still in memory"""
+        async with self._lock:
+            if not self.previous:
+                raise ValueError("No previous model version to roll back to")
+            version, predictor = self.previous
+            await self._swap_in(version, predictor, activate)
+            return version
+
+    async def _swap_in(self, version: str, predictor: Any, activate: bool) -> None:
+        old_version = self.version
+        old_predictor = self.swap(predictor)
+        self._generation += 1
+        self.version = version
+        self.previous = (old_version, old_predictor) if old_predictor is not None else None
+        self._failed_version = None
+        if activate:
+            self.registry.set_active(
+                None if version == LOCAL_VERSION else version,
+                None if old_version == LOCAL_VERSION else old_version
+            )
+        logger.info(f"🔄 Swapped model version {old_version} -> {version}")
+
+        # Drain in the background: the request asking for the swap is itself in flight
+        self.status = {"state": "draining", "version": version, "previous": old_version}
+        self._drain_task = asyncio.get_running_loop().create_task(
+            self._drain(self._generation, version, old_version)
+        )
+
+    async def _drain(self, generation: int, version: str, old_version: Optional[str]) -> None:
+        """Wait until every request that started before the swap has finished"""
+        deadline = time.monotonic() + self.drain_timeout
+        drained = True
+        while any(count for started_in, count in self._in_flight.items() if started_in < generation):
+            if time.monotonic() > deadline:
+                drained = False
+                logger.warning(f"⚠️ Requests on model version {old_version} still running after {self.drain_timeout}s")
+                break
+            await asyncio.sleep(0.05)
+        if self._generation == generation:
+            self.status = {
+                "state": "idle", "version": version, "previous": old_version,
+                "drained": drained, "finished_at": time.time()
+            }
+
+    # ------------------------------------------------------------------
+    # Requests and workers
+    # ------------------------------------------------------------------
+
+    @contextmanager
+    def track(self) -> Iterator[Optional[str]]:
+        """Count a request against the version serving it; yields that version"""
+        generation = self._generation
+        self._in_flight[generation] += 1
+        try:
+            yield self.version
+        finally:
+            self._in_flight[generation] -= 1
+            if not self._in_flight[generation]:
+                del self._in_flight[generation]
+
+    async def follow_registry(self, interval: float) -> None:
+        """Background task: converge on the registry's active version"""
+        while True:
+            await asyncio.sleep(interval)
+            if self.busy:
+                continue
+            try:
+                active = self.registry.read_active()["active"] or LOCAL_VERSION
+            except Exception:
+                continue
+            if active in (self.version, self._failed_version):
+                continue
+            if active != LOCAL_VERSION and not self.registry.exists(active):
+                continue
+            logger.info(f"🔄 Registry active version changed to {active}")
+            if self.previous and self.previous[0] == active:
+                await self.rollback(activate=False)
+            else:
+                await self.load(active, activate=False)
+
+    def describe(self) -> Dict[str, Any]:
+        active = self.registry.read_active()
+        return {
+            "serving": self.version,
+            "previous": self.previous[0] if self.previous else None,
+            "active": active["active"] or LOCAL_VERSION,
+            "status": self.status,
+            "versions": self.registry.versions(),
+        }
+
+
+def admin_token_guard():
+    """
+    Dependency for admin endpoints: the X-Admin-Token header must match the
+    ADMIN_TOKEN environment variable; admin endpoints are disabled when it is unset.
+    """
+    from fastapi import Header, HTTPException, status
+
+    def require_admin_token(x_admin_token: Optional[str] = Header(None)):
+        expected = os.getenv("ADMIN_TOKEN")
+        if not expected:
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin endpoints disabled (ADMIN_TOKEN not set)")
+        if not x_admin_token or not secrets.compare_digest(x_admin_token, expected):
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid admin token")
+
+    return require_admin_token
+
+
+def create_admin_router(swapper: ModelSwapper):
+    """Admin endpoints for the model registry (guarded by admin_token_guard)"""
+    from fastapi import APIRouter, Depends, HTTPException, status
+
+    router = APIRouter(prefix="/admin/models", tags=["Admin"], dependencies=[Depends(admin_token_guard())])
+
+    @router.get("")
+    async def list_model_versions():
+        """Published versions, the version served by this worker and the swap status"""
+        return swapper.describe()
+
+    @router.post("/{version}/load", status_code=status.HTTP_202_ACCEPTED)
+    async def load_model_version(version: str):
+        """Load, warm up and swap in a version in the background; poll GET /admin/models"""
+        if not swapper.registry.exists(version):
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Model version not found: {version}")
+        try:
+            swapper.start_load(version)
+        except RuntimeError as e:
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+        return {"status": "loading", "version": version}
+
+    @router.post("/rollback")
+    async def rollback_model_version():
+        """Swap back to the previous version (kept in memory, no reload)"""
+        if swapper.busy:
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="A model swap is already in progress")
+        try:
+            version = await swapper.rollback()
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+        return {"status": "rolled_back", "version": version}
+
+    return router
+
+
+if __name__ == "__main__":
+    # Publish retrained models and switch versions without the API:
+    #   python -m service_common.registry REGISTRY_DIR publish model=outputs/models/best_model.pkl [--version V]
+    #   python -m service_common.registry REGISTRY_DIR activate VERSION
+    #   python -m service_common.registry REGISTRY_DIR list
+    import argparse
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    parser = argparse.ArgumentParser(description="Model registry")
+    parser.add_argument("registry_dir")
+    commands = parser.add_subparsers(dest="command", required=True)
+    publish = commands.add_parser("publish", help="Publish artifact files as a new version")
+    publish.add_argument("files", nargs="+", metavar="NAME=PATH")
+    publish.add_argument("--version")
+    publish.add_argument("--notes")
+    activate = commands.add_parser("activate", help="Make workers load a version (they follow active.json)")
+    activate.add_argument("version")
+    commands.add_parser("list", help="List versions")
+    args = parser.parse_args()
+
+    registry = ModelRegistry(args.registry_dir)
+    if args.command == "publish":
+        print(registry.publish(dict(item.split("=", 1) for item in args.files), args.version, args.notes))
+    elif args.command == "activate":
+        if not registry.exists(args.version):
+            parser.error(f"unknown version: {args.version}")
+        registry.set_active(args.version, registry.read_active()["active"])
+    else:
+        print(json.dumps({"active": registry.read_active(), "versions": registry.versions()}, indent=2))
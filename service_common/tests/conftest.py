@@ -0,0 +1,11 @@
+"""
+Tests for the shared service modules.
+
+Usage:
+    python -m pytest service_common/tests
+"""
+import os
+import sys
+
+# The repository root, so service_common imports as a package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
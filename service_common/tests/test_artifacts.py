@@ -0,0 +1,144 @@
+"""
+Mapped artifacts: a bundle reproduces the scikit-learn originals it was built from.
+
+Checked on inputs other than the probes export_bundle verifies with, and on
+bundles where the artifact really was mapped (a mismatch on the probes would
+silently keep it pickled).
+"""
+import joblib
+import numpy as np
+import pytest
+from sklearn.ensemble import GradientBoostingClassifier, RandomForestClassifier
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.preprocessing import LabelEncoder
+
+from service_common.artifacts import (
+    MappedLabelEncoder, MappedTfidfVectorizer, MappedTreeEnsemble, export_bundle, open_bundle
+)
+
+
+def roundtrip(tmp_path, artifact):
+    """Export an artifact to a bundle and load it back: (manifest entry, mapped artifact)"""
+    source = tmp_path / "artifact.pkl"
+    joblib.dump(artifact, source)
+    manifest = export_bundle({"artifact": str(source)}, str(tmp_path / "bundle"))
+    return manifest["artifacts"]["artifact"], open_bundle(str(tmp_path / "bundle"))["artifact"]
+
+
+def training_data(n_classes, missing=False):
+    rng = np.random.default_rng(42)
+    X = rng.normal(size=(400, 6))
+    y = (X[:, 0] + X[:, 1] * X[:, 2] > 0).astype(int)
+    if n_classes == 3:
+        y = y + (X[:, 3] > 0.8)
+    if missing:
+        X[rng.random(X.shape) < 0.1] = np.nan
+    return X, y
+
+
+def held_out(missing=False):
+    rng = np.random.default_rng(7)
+    X = rng.normal(scale=1.5, size=(1000, 6))
+    if missing:
+        X[rng.random(X.shape) < 0.1] = np.nan
+    return X
+
+
+@pytest.mark.parametrize("model, n_classes", [
+    (GradientBoostingClassifier(n_estimators=30, max_depth=3, random_state=0), 2),
+    (GradientBoostingClassifier(n_estimators=20, max_depth=3, random_state=0), 3),
+    (RandomForestClassifier(n_estimators=25, max_depth=6, random_state=0), 2),
+    (RandomForestClassifier(n_estimators=25, random_state=0), 3),
+])
+def test_tree_ensemble_matches_sklearn(tmp_path, model, n_classes):
+    model.fit(*training_data(n_classes))
+
+    entry, mapped = roundtrip(tmp_path, model)
+
+    assert entry["kind"] == "tree_ensemble"
+    assert isinstance(mapped, MappedTreeEnsemble)
+    X = held_out()
+    np.testing.assert_allclose(mapped.predict_proba(X), model.predict_proba(X), rtol=1e-9, atol=1e-12)
+    np.testing.assert_array_equal(mapped.predict(X), model.predict(X))
+
+
+def test_tree_ensemble_routes_missing_values_like_sklearn(tmp_path):
+    model = RandomForestClassifier(n_estimators=25, random_state=0).fit(*training_data(2, missing=True))
+
+    entry, mapped = roundtrip(tmp_path, model)
+
+    assert entry["kind"] == "tree_ensemble"
+    X = held_out(missing=True)
+    np.testing.assert_allclose(mapped.predict_proba(X), model.predict_proba(X), rtol=1e-9, atol=1e-12)
+    np.testing.assert_array_equal(mapped.predict(X), model.predict(X))
+
+
+def test_tree_ensemble_rejects_nan_when_sklearn_does(tmp_path):
+    model = GradientBoostingClassifier(n_estimators=5, random_state=0).fit(*training_data(2))
+
+    _, mapped = roundtrip(tmp_path, model)
+
+    with pytest.raises(ValueError):
+        model.predict_proba(held_out(missing=True))
+    with pytest.raises(ValueError):
+        mapped.predict_proba(held_out(missing=True))
+
+
+@pytest.mark.parametrize("params", [
+    {},
+    {"ngram_range": (1, 2), "sublinear_tf": True, "min_df": 2},
+    {"binary": True, "use_idf": False, "norm": "l1"},
+    {"lowercase": False, "max_features": 50, "norm": None},
+])
+def test_tfidf_vectorizer_matches_sklearn(tmp_path, params):
+    corpus = [
+        "Verify your account now at http://secure-login.example.com",
+        "Your invoice for March is attached",
+        "URGENT: your password expires today, click here",
+        "Meeting moved to Thursday at 10am",
+        "Click here to claim your prize account",
+        "Quarterly report attached, please review",
+    ] * 3
+    vectorizer = TfidfVectorizer(**params).fit(corpus)
+
+    entry, mapped = roundtrip(tmp_path, vectorizer)
+
+    assert entry["kind"] == "tfidf"
+    assert isinstance(mapped, MappedTfidfVectorizer)
+    documents = [
+        "Click here to verify your ACCOUNT password",
+        "unrelated words only: zebra quantum",
+        "",
+        "invoice attached invoice attached",
+    ]
+    np.testing.assert_allclose(mapped.transform(documents).toarray(), vectorizer.transform(documents).toarray())
+    np.testing.assert_array_equal(mapped.get_feature_names_out(), vectorizer.get_feature_names_out())
+
+
+def test_label_encoders_match_sklearn(tmp_path):
+    encoders = {
+        "country": LabelEncoder().fit(["BO", "AR", "US", "BR", "CL"]),
+        "device": LabelEncoder().fit(["mobile", "desktop", "tablet", "bot"]),
+        "asn": LabelEncoder().fit([64512, 3356, 174, 6762]),
+    }
+
+    entry, mapped = roundtrip(tmp_path, encoders)
+
+    assert entry["kind"] == "label_encoders"
+    assert all(isinstance(encoder, MappedLabelEncoder) for encoder in mapped.values())
+    samples = {"country": ["US", "BO", "BO", "CL"], "device": ["bot", "mobile"], "asn": [174, 64512, 3356]}
+    for column, values in samples.items():
+        codes = encoders[column].transform(values)
+        np.testing.assert_array_equal(mapped[column].transform(values), codes)
+        np.testing.assert_array_equal(mapped[column].inverse_transform(codes), encoders[column].inverse_transform(codes))
+
+
+def test_label_encoders_reject_unseen_labels_like_sklearn(tmp_path):
+    encoders = {"country": LabelEncoder().fit(["BO", "AR", "US"])}
+
+    _, mapped = roundtrip(tmp_path, encoders)
+
+    with pytest.raises(ValueError):
+        encoders["country"].transform(["BO", "ZZ"])
+    with pytest.raises(ValueError):
+        mapped["country"].transform(["BO", "ZZ"])
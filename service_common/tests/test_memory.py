@@ -0,0 +1,113 @@
+"""
+Memory diagnostics: tracemalloc snapshots and diffs, peak sampling, structure sizes.
+"""
+import tracemalloc
+
+import numpy as np
+import pytest
+
+from service_common.memory import MemoryTracker, container_size, deep_size
+
+
+@pytest.fixture
+def tracker():
+    tracker = MemoryTracker()
+    yield tracker
+    if tracemalloc.is_tracing():
+        tracker.stop_tracing()
+
+
+def allocate_blocks(count, size):
+    return [bytearray(size) for _ in range(count)]
+
+
+def test_snapshot_diff_reports_growth_since_the_previous_snapshot(tracker):
+    tracker.start_tracing()
+    first = tracker.take_snapshot()
+    retained = allocate_blocks(200, 10_000)
+
+    second = tracker.take_snapshot(limit=5)
+
+    assert "diff" not in first
+    assert second["compared_to"]["id"] == first["id"]
+    assert second["growth_bytes"] >= 2_000_000
+    top = second["diff"][0]
+    assert top["location"].endswith(f"test_memory.py:{allocate_blocks.__code__.co_firstlineno + 1}")
+    assert top["size_diff_bytes"] >= 2_000_000
+    assert top["count_diff"] >= 200
+    assert len(retained) == 200
+
+
+def test_snapshot_diff_against_a_chosen_snapshot(tracker):
+    tracker.start_tracing()
+    base = tracker.take_snapshot()
+    retained = allocate_blocks(100, 10_000)
+    tracker.take_snapshot()
+    retained += allocate_blocks(100, 10_000)
+
+    result = tracker.take_snapshot(compare_to=base["id"])
+
+    assert result["compared_to"]["id"] == base["id"]
+    assert result["growth_bytes"] >= 2_000_000
+    assert len(retained) == 200
+
+
+def test_snapshots_are_bounded_and_dropped_when_tracing_stops(tracker):
+    tracker.max_snapshots = 2
+    tracker.start_tracing()
+    ids = [tracker.take_snapshot()["id"] for _ in range(3)]
+
+    with pytest.raises(KeyError):
+        tracker.take_snapshot(compare_to=ids[0])
+    tracker.stop_tracing()
+
+    assert not tracemalloc.is_tracing()
+    assert tracker.describe()["tracemalloc"]["snapshots"] == []
+    with pytest.raises(RuntimeError):
+        tracker.take_snapshot()
+
+
+def test_sample_peak_measures_the_block_and_restores_tracemalloc(tracker):
+    tracker.peak_sample_rate = 1.0
+
+    with tracker.sample_peak("/predict/batch"):
+        scratch = bytearray(5_000_000)
+        del scratch
+
+    assert not tracemalloc.is_tracing()
+    peak = tracker.peaks["/predict/batch"]
+    assert peak["samples"] == 1
+    assert peak["max_bytes"] >= 5_000_000
+
+
+def test_structure_sizes_are_cached_until_fresh(tracker):
+    calls = []
+    tracker.register("cache", lambda: calls.append(1) or {"entries": len(calls), "bytes": 10})
+
+    assert tracker.structure_sizes()["cache"]["entries"] == 1
+    assert tracker.structure_sizes()["cache"]["entries"] == 1
+    assert tracker.structure_sizes(fresh=True)["cache"]["entries"] == 2
+
+
+def test_deep_size_counts_numpy_buffers_and_memory_maps(tmp_path):
+    heap = np.zeros(100_000)
+    path = tmp_path / "array.npy"
+    np.save(path, np.zeros(200_000))
+    mapped = np.load(path, mmap_mode="r")
+
+    assert deep_size({"weights": heap})["bytes"] >= heap.nbytes
+    size = deep_size(mapped)
+    assert size["mapped_bytes"] >= mapped.nbytes
+    assert size["bytes"] < mapped.nbytes
+
+
+@pytest.mark.parametrize("container", [
+    {i: f"{i:0100d}" for i in range(5000)},
+    [f"{i:0100d}" for i in range(5000)],
+])
+def test_container_size_extrapolates_large_containers(container):
+    size = container_size(container, sample=500)
+
+    assert size["entries"] == 5000
+    assert size["estimated"] is True
+    assert size["bytes"] == pytest.approx(deep_size(container)["bytes"], rel=0.05)
@@ -0,0 +1,159 @@
+"""
+Metrics: histogram buckets and the quantiles Prometheus derives from them, stage timings.
+"""
+import time
+
+import pytest
+
+from service_common.metrics import Histogram, Metrics, current_timings, lap, stage
+
+
+def samples(lines, metric):
+    """{label string: value} of the rendered lines of one metric"""
+    values = {}
+    for line in lines:
+        if line.startswith(metric + "{") or line.startswith(metric + " "):
+            series, value = line.rsplit(" ", 1)
+            values[series[len(metric):]] = float(value)
+    return values
+
+
+def histogram_quantile(q, buckets):
+    """Prometheus histogram_quantile over cumulative (upper bound, count) buckets"""
+    total = buckets[-1][1]
+    rank = q * total
+    lower, below = 0.0, 0
+    for bound, cumulative in buckets:
+        if cumulative >= rank:
+            if bound == float("inf"):
+                return lower
+            return lower + (bound - lower) * (rank - below) / (cumulative - below)
+        lower, below = bound, cumulative
+
+
+def rendered_buckets(histogram, labels=""):
+    buckets = []
+    for series, count in samples(histogram.render(), histogram.name + "_bucket").items():
+        le = series.split('le="')[1].split('"')[0]
+        if labels in series:
+            buckets.append((float(le.replace("+Inf", "inf")), int(count)))
+    return sorted(buckets)
+
+
+def test_histogram_buckets_are_cumulative_and_upper_bound_inclusive():
+    histogram = Histogram("latency_seconds", "Latency", buckets=(0.1, 0.5, 1.0))
+    for value in (0.05, 0.1, 0.3, 0.5, 0.7, 2.0):
+        histogram.observe(value)
+
+    lines = histogram.render()
+
+    assert lines[:2] == ["# HELP latency_seconds Latency", "# TYPE latency_seconds histogram"]
+    assert samples(lines, "latency_seconds_bucket") == {
+        '{le="0.1"}': 2,
+        '{le="0.5"}': 4,
+        '{le="1"}': 5,
+        '{le="+Inf"}': 6,
+    }
+    assert samples(lines, "latency_seconds_count") == {"": 6}
+    assert samples(lines, "latency_seconds_sum") == {"": pytest.approx(3.65)}
+
+
+def test_histogram_keeps_one_series_per_label_values():
+    histogram = Histogram("stage_seconds", "Stages", ("stage",), buckets=(1.0,))
+    histogram.observe(0.5, stage="model")
+    histogram.observe(2.0, stage="model")
+    histogram.observe(0.5, stage='quote"d')
+
+    counts = samples(histogram.render(), "stage_seconds_count")
+
+    assert counts == {'{stage="model"}': 2, '{stage="quote\\"d"}': 1}
+    assert samples(histogram.render(), "stage_seconds_bucket")['{stage="model",le="1"}'] == 1
+
+
+def test_quantiles_from_the_rendered_buckets():
+    histogram = Histogram("latency_seconds", "Latency", buckets=(0.01, 0.025, 0.05, 0.1, 0.25))
+    # 90 fast requests between 10 and 25 ms, 10 slow ones between 100 and 250 ms
+    for i in range(90):
+        histogram.observe(0.011 + i * 0.0001)
+    for i in range(10):
+        histogram.observe(0.15 + i * 0.01)
+
+    buckets = rendered_buckets(histogram)
+
+    assert buckets[-1] == (float("inf"), 100)
+    assert 0.01 < histogram_quantile(0.5, buckets) <= 0.025
+    assert 0.01 < histogram_quantile(0.9, buckets) <= 0.025
+    assert 0.1 < histogram_quantile(0.95, buckets) <= 0.25
+    assert 0.1 < histogram_quantile(0.99, buckets) <= 0.25
+
+
+def test_quantile_above_the_last_bucket_is_its_upper_bound():
+    histogram = Histogram("latency_seconds", "Latency", buckets=(0.1, 1.0))
+    for _ in range(10):
+        histogram.observe(5.0)
+
+    assert histogram_quantile(0.99, rendered_buckets(histogram)) == 1.0
+
+
+def test_stage_timings_are_exclusive_and_observed_when_the_request_ends():
+    metrics = Metrics(namespace="test")
+
+    with metrics.timed_request() as timings:
+        with stage("outer"):
+            time.sleep(0.02)
+            with stage("inner"):
+                time.sleep(0.05)
+        with stage("inner"):
+            time.sleep(0.01)
+        assert current_timings() is timings
+    assert current_timings() is None
+
+    assert timings.stages["outer"] == pytest.approx(0.02, abs=0.015)
+    assert timings.stages["inner"] == pytest.approx(0.06, abs=0.015)
+    assert samples(metrics.stage_seconds.render(), "test_stage_duration_seconds_count") == {
+        '{stage="outer"}': 1,
+        '{stage="inner"}': 1,
+    }
+
+
+def test_laps_and_stages_are_no_ops_outside_a_request():
+    metrics = Metrics(namespace="test")
+
+    with stage("warm_up"):
+        lap("parse")
+
+    assert current_timings() is None
+    assert samples(metrics.render().splitlines(), "test_stage_duration_seconds_count") == {}
+
+
+def test_laps_split_the_request_between_named_steps():
+    metrics = Metrics(namespace="test")
+
+    with metrics.timed_request() as timings:
+        time.sleep(0.02)
+        lap("parse")
+        time.sleep(0.01)
+        lap()
+        time.sleep(0.03)
+        lap("serialize")
+
+    assert timings.stages["parse"] == pytest.approx(0.02, abs=0.015)
+    assert timings.stages["serialize"] == pytest.approx(0.03, abs=0.015)
+
+
+def test_render_includes_every_registered_metric():
+    metrics = Metrics(namespace="svc")
+    rows = metrics.counter("rows_total", "Rows predicted", ("model",))
+    rows.inc(3, model="rf")
+    rows.inc(model="rf")
+    metrics.callback("cache_entries", "Cache entries", "gauge", lambda: {(): 7})
+    metrics.observe_request("POST", "/predict", 200, 0.004)
+
+    text = metrics.render()
+
+    assert text.endswith("\n")
+    assert 'svc_rows_total{model="rf"} 4' in text
+    assert "# TYPE svc_cache_entries gauge" in text
+    assert "svc_cache_entries 7" in text
+    assert 'svc_http_request_duration_seconds_count{method="POST",route="/predict",status="200"} 1' in text
+    assert metrics.counter("rows_total", "Rows predicted", ("model",)) is rows
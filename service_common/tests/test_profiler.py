@@ -0,0 +1,121 @@
+"""
+Sampling profiler: sessions shut themselves off and always write what they collected.
+"""
+import threading
+import time
+
+import pytest
+
+from service_common.profiler import SamplingProfiler
+
+
+@pytest.fixture
+def busy_thread():
+    """A thread burning CPU in a recognizable function while the test runs"""
+    done = threading.Event()
+
+    def busy_work():
+        while not done.is_set():
+            sum(range(1000))
+
+    thread = threading.Thread(target=busy_work, name="busy", daemon=True)
+    thread.start()
+    yield thread
+    done.set()
+    thread.join()
+
+
+def wait_until_stopped(profiler, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while profiler.running and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert not profiler.running
+
+
+def test_session_stops_after_its_duration_and_writes_the_profile(tmp_path, busy_thread):
+    profiler = SamplingProfiler(str(tmp_path), service="test", interval=0.005)
+
+    session = profiler.start(seconds=0.2)
+    wait_until_stopped(profiler)
+
+    assert session.stop_reason == "duration"
+    assert 0.2 <= session.elapsed < 2.0
+    assert session.samples > 0
+    with open(session.path) as f:
+        lines = f.read().splitlines()
+    assert any(line.startswith("busy;") and "busy_work" in line for line in lines)
+    assert all(int(line.rsplit(" ", 1)[1]) > 0 for line in lines)
+    assert [profile["name"] for profile in profiler.list_profiles()] == [session.describe()["file"]]
+
+
+def test_duration_is_capped_at_max_seconds(tmp_path):
+    profiler = SamplingProfiler(str(tmp_path), service="test", interval=0.005, max_seconds=0.2)
+
+    session = profiler.start(seconds=3600)
+    wait_until_stopped(profiler)
+
+    assert session.seconds == 0.2
+    assert session.stop_reason == "duration"
+
+
+def test_session_stops_when_distinct_stacks_reach_max_stacks(tmp_path, busy_thread):
+    profiler = SamplingProfiler(str(tmp_path), service="test", interval=0.001, max_stacks=1)
+
+    session = profiler.start(seconds=60)
+    wait_until_stopped(profiler)
+
+    assert session.stop_reason == "max_stacks"
+    assert len(session.stacks) >= 1
+    assert session.elapsed < 5.0
+    assert session.path is not None
+
+
+def test_stop_ends_the_session_early_and_writes_speedscope(tmp_path, busy_thread):
+    profiler = SamplingProfiler(str(tmp_path), service="test", interval=0.005)
+
+    profiler.start(seconds=60, output_format="speedscope")
+    time.sleep(0.1)
+    session = profiler.stop()
+
+    assert not profiler.running
+    assert session.stop_reason == "stopped"
+    assert session.path.endswith(".speedscope.json")
+    assert profiler.profile_path(session.describe()["file"]) == session.path
+
+
+def test_one_session_at_a_time(tmp_path):
+    profiler = SamplingProfiler(str(tmp_path), service="test")
+    profiler.start(seconds=60)
+    try:
+        with pytest.raises(RuntimeError):
+            profiler.start(seconds=1)
+    finally:
+        profiler.stop()
+
+    with pytest.raises(ValueError):
+        profiler.start(seconds=0)
+    with pytest.raises(ValueError):
+        profiler.start(seconds=1, mode="everything")
+
+
+def test_header_sessions_sample_only_flagged_requests(tmp_path, busy_thread):
+    profiler = SamplingProfiler(str(tmp_path), service="test", interval=0.005)
+
+    session = profiler.start(seconds=60, mode="header")
+    time.sleep(0.1)
+    unflagged = session.samples
+    with profiler.profile_request():
+        time.sleep(0.1)
+    profiler.stop()
+
+    assert unflagged == 0
+    assert session.samples > 0
+
+
+def test_profile_path_rejects_other_files(tmp_path):
+    profiler = SamplingProfiler(str(tmp_path), service="test")
+    (tmp_path / "notes.txt").write_text("not a profile")
+
+    assert profiler.profile_path("notes.txt") is None
+    assert profiler.profile_path("../profile-x.collapsed") is None
+    assert profiler.profile_path("profile-missing.collapsed") is None
@@ -0,0 +1,223 @@
+"""
+Model registry: publish, verify, swap, rollback and drain of model versions.
+"""
+import asyncio
+import os
+
+import pytest
+
+from service_common.registry import LOCAL_VERSION, ModelRegistry, ModelSwapper, VersionIntegrityError
+
+
+class Recorder:
+    """build / warm_up / get / swap callables for a ModelSwapper, recording their calls"""
+
+    def __init__(self):
+        self.built = []
+        self.warmed = []
+        self.current = None
+
+    def build(self, files, artifact_dir):
+        self.built.append(files)
+        return {"files": files}
+
+    def warm_up(self, predictor):
+        self.warmed.append(predictor)
+
+    def get(self):
+        return self.current
+
+    def swap(self, predictor):
+        previous, self.current = self.current, predictor
+        return previous
+
+
+@pytest.fixture
+def registry(tmp_path):
+    return ModelRegistry(str(tmp_path / "registry"))
+
+
+def publish(registry, tmp_path, version):
+    model = tmp_path / f"model-{version}.pkl"
+    model.write_bytes(f"model {version} bytes".encode() * 1000)
+    return registry.publish({"model": str(model)}, version=version)
+
+
+@pytest.fixture
+def version(registry, tmp_path):
+    return publish(registry, tmp_path, "v1")
+
+
+def make_swapper(registry, recorder):
+    return ModelSwapper(registry, recorder.build, recorder.warm_up, recorder.get, recorder.swap)
+
+
+def truncate(registry, version):
+    path = registry.files(version)["model"]
+    with open(path, "r+b") as f:
+        f.truncate(os.path.getsize(path) // 2)
+
+
+def test_verify_returns_files_of_an_intact_version(registry, version):
+    assert registry.verify(version) == registry.files(version)
+
+
+def test_load_rejects_a_tampered_version_before_warm_up(registry, version):
+    recorder = Recorder()
+    swapper = make_swapper(registry, recorder)
+    swapper.load_initial(lambda: "local predictor")
+    truncate(registry, version)
+
+    loaded = asyncio.run(swapper.load(version))
+
+    assert loaded is False
+    assert swapper.status["state"] == "failed"
+    assert "Checksum mismatch for model.pkl" in swapper.status["error"]
+    assert recorder.built == []
+    assert recorder.warmed == ["local predictor"]
+    assert swapper.version == LOCAL_VERSION
+    assert recorder.current == "local predictor"
+    assert registry.read_active()["active"] is None
+
+
+def test_startup_falls_back_to_model_path_when_the_active_version_is_tampered(registry, version):
+    registry.set_active(version, None)
+    truncate(registry, version)
+    recorder = Recorder()
+    swapper = make_swapper(registry, recorder)
+
+    predictor = swapper.load_initial(lambda: "local predictor")
+
+    assert predictor == "local predictor"
+    assert swapper.version == LOCAL_VERSION
+    assert recorder.built == []
+    with pytest.raises(VersionIntegrityError):
+        registry.verify(version)
+
+
+def test_publish_copies_files_into_an_immutable_version(registry, version, tmp_path):
+    info = registry.describe(version)
+
+    assert info["files"] == {"model": "model.pkl"}
+    assert set(info["checksums"]) == {"model.pkl"}
+    assert [described["version"] for described in registry.versions()] == [version]
+    with pytest.raises(ValueError):
+        publish(registry, tmp_path, version)
+    for invalid in (LOCAL_VERSION, "../v2", ""):
+        with pytest.raises(ValueError):
+            registry.version_dir(invalid)
+
+
+def test_swap_and_rollback_follow_the_active_pointer(registry, tmp_path):
+    publish(registry, tmp_path, "v1")
+    publish(registry, tmp_path, "v2")
+    recorder = Recorder()
+    swapper = make_swapper(registry, recorder)
+    swapper.load_initial(lambda: "local predictor")
+
+    async def scenario():
+        assert await swapper.load("v1")
+        assert await swapper.load("v2")
+        served_v2 = recorder.current
+        active_after_load = registry.read_active()
+        rolled_back_to = await swapper.rollback()
+        return served_v2, active_after_load, rolled_back_to
+
+    served_v2, active_after_load, rolled_back_to = asyncio.run(scenario())
+
+    assert served_v2 == {"files": registry.files("v2")}
+    assert active_after_load == {"active": "v2", "previous": "v1"}
+    assert rolled_back_to == "v1"
+    assert swapper.version == "v1"
+    assert swapper.previous == ("v2", served_v2)
+    assert recorder.current == {"files": registry.files("v1")}
+    assert registry.read_active() == {"active": "v1", "previous": "v2"}
+    # The rollback reused the predictor still in memory
+    assert recorder.built == [registry.files("v1"), registry.files("v2")]
+    assert len(recorder.warmed) == 3
+
+
+def test_rollback_without_a_previous_version_fails(registry, version):
+    swapper = make_swapper(registry, Recorder())
+    swapper.load_initial(lambda: "local predictor")
+
+    with pytest.raises(ValueError):
+        asyncio.run(swapper.rollback())
+
+
+def test_swap_drains_requests_started_on_the_old_version(registry, version):
+    recorder = Recorder()
+    swapper = make_swapper(registry, recorder)
+    swapper.load_initial(lambda: "local predictor")
+
+    async def scenario():
+        states = []
+        with swapper.track() as serving:
+            assert serving == LOCAL_VERSION
+            assert await swapper.load(version)
+            with swapper.track() as new_serving:
+                assert new_serving == version
+            await asyncio.sleep(0.2)
+            states.append(dict(swapper.status))
+        await swapper._drain_task
+        states.append(dict(swapper.status))
+        return states
+
+    while_in_flight, after = asyncio.run(scenario())
+
+    assert while_in_flight["state"] == "draining"
+    assert after["state"] == "idle"
+    assert after["drained"] is True
+    assert after["version"] == version
+    assert after["previous"] == LOCAL_VERSION
+
+
+def test_drain_gives_up_after_the_timeout(registry, version):
+    swapper = make_swapper(registry, Recorder())
+    swapper.drain_timeout = 0.1
+    swapper.load_initial(lambda: "local predictor")
+
+    async def scenario():
+        with swapper.track():
+            assert await swapper.load(version)
+            await swapper._drain_task
+            return dict(swapper.status)
+
+    status = asyncio.run(scenario())
+
+    assert status["state"] == "idle"
+    assert status["drained"] is False
+
+
+def test_workers_follow_a_version_activated_elsewhere(registry, tmp_path):
+    publish(registry, tmp_path, "v1")
+    publish(registry, tmp_path, "v2")
+    recorder = Recorder()
+    swapper = make_swapper(registry, recorder)
+    swapper.load_initial(lambda: "local predictor")
+
+    async def follow_until(version):
+        task = asyncio.get_running_loop().create_task(swapper.follow_registry(0.01))
+        try:
+            for _ in range(200):
+                if swapper.version == version:
+                    break
+                await asyncio.sleep(0.01)
+        finally:
+            task.cancel()
+
+    async def scenario():
+        registry.set_active("v1", None)
+        await follow_until("v1")
+        registry.set_active("v2", "v1")
+        await follow_until("v2")
+        # Another worker rolled back: the previous version is reused, not rebuilt
+        registry.set_active("v1", "v2")
+        await follow_until("v1")
+
+    asyncio.run(scenario())
+
+    assert swapper.version == "v1"
+    assert recorder.built == [registry.files("v1"), registry.files("v2")]
+    # Following the registry never rewrites active.json
+    assert registry.read_active() == {"active": "v1", "previous": "v2"}
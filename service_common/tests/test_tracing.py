@@ -0,0 +1,126 @@
+"""
+Tracing: traceparent parsing and propagation, merged spans, span files.
+"""
+import json
+import re
+import time
+
+import pytest
+
+from service_common.tracing import Tracer, annotate, current_traceparent, record_span, span
+
+TRACE_ID = "4bf92f3577b34da6a3ce929d0e0e4736"
+PARENT_ID = "00f067aa0ba902b7"
+
+
+def written_spans(tracer):
+    with open(tracer.path) as f:
+        return [json.loads(line) for line in f]
+
+
+@pytest.fixture
+def tracer(tmp_path):
+    return Tracer("test", str(tmp_path))
+
+
+def test_sampled_traceparent_continues_the_callers_trace(tracer):
+    with tracer.start_trace("POST /predict", traceparent=f"00-{TRACE_ID}-{PARENT_ID}-01") as root:
+        outgoing = current_traceparent()
+
+    assert root.trace_id == TRACE_ID
+    assert root.parent_id == PARENT_ID
+    assert outgoing == f"00-{TRACE_ID}-{root.span_id}-01"
+    assert re.match(r"^00-[0-9a-f]{32}-[0-9a-f]{16}-01$", outgoing)
+    assert current_traceparent() is None
+
+
+def test_traceparent_is_parsed_case_and_whitespace_insensitively(tracer):
+    header = f"  00-{TRACE_ID.upper()}-{PARENT_ID.upper()}-01 "
+
+    with tracer.start_trace("request", traceparent=header) as root:
+        pass
+
+    assert (root.trace_id, root.parent_id) == (TRACE_ID, PARENT_ID)
+
+
+@pytest.mark.parametrize("header", [
+    f"00-{TRACE_ID}-{PARENT_ID}-00",    # not sampled
+    f"01-{TRACE_ID}-{PARENT_ID}-01",    # unknown version
+    f"00-{TRACE_ID[:-1]}-{PARENT_ID}-01",
+    "garbage",
+    None,
+])
+def test_unsampled_or_invalid_traceparent_is_not_traced(tracer, header):
+    with tracer.start_trace("request", traceparent=header) as root:
+        assert current_traceparent() is None
+        with span("model") as child:
+            pass
+
+    assert root is None
+    assert child is None
+
+
+def test_sample_rate_starts_new_traces(tmp_path):
+    tracer = Tracer("test", str(tmp_path), sample_rate=1.0)
+
+    with tracer.start_trace("job") as root:
+        pass
+
+    assert root is not None
+    assert root.parent_id is None
+    assert len(root.trace_id) == 32
+
+
+def test_spans_nest_and_the_outgoing_call_is_a_child(tracer):
+    with tracer.start_trace("report", traceparent=f"00-{TRACE_ID}-{PARENT_ID}-01", report_id=7) as root:
+        with span("ml_api", model="phishing") as call:
+            outgoing = current_traceparent()
+            annotate(rows=500)
+
+    assert outgoing == call.traceparent
+    spans = {item["name"]: item for item in written_spans(tracer)}
+    assert spans["report"]["parent_id"] == PARENT_ID
+    assert spans["report"]["attributes"] == {"report_id": 7}
+    assert spans["ml_api"]["parent_id"] == root.span_id
+    assert spans["ml_api"]["attributes"] == {"model": "phishing", "rows": 500}
+    assert {item["trace_id"] for item in spans.values()} == {TRACE_ID}
+
+
+def test_repeated_spans_under_one_parent_are_merged(tracer):
+    with tracer.start_trace("batch", traceparent=f"00-{TRACE_ID}-{PARENT_ID}-01"):
+        for _ in range(5):
+            with span("explain"):
+                time.sleep(0.01)
+            time.sleep(0.01)
+        started = time.perf_counter()
+        record_span("explain", started, started + 0.02)
+
+    spans = [item for item in written_spans(tracer) if item["name"] == "explain"]
+    assert len(spans) == 1
+    merged = spans[0]
+    assert merged["count"] == 6
+    # Busy time adds up the runs; the duration spans the first start to the last end
+    assert merged["busy_ms"] == pytest.approx(70, abs=15)
+    assert merged["duration_ms"] >= merged["busy_ms"] - 20
+    assert merged["duration_ms"] >= 90
+
+
+def test_root_span_records_the_error(tracer):
+    with pytest.raises(KeyError):
+        with tracer.start_trace("request", traceparent=f"00-{TRACE_ID}-{PARENT_ID}-01"):
+            raise KeyError("boom")
+
+    (root,) = written_spans(tracer)
+    assert root["attributes"] == {"error": "KeyError"}
+
+
+def test_span_file_rotates_at_max_size(tmp_path):
+    tracer = Tracer("test", str(tmp_path), max_file_mb=0.0001)
+
+    for _ in range(3):
+        with tracer.start_trace("request", traceparent=f"00-{TRACE_ID}-{PARENT_ID}-01"):
+            annotate(padding="x" * 200)
+
+    assert len(written_spans(tracer)) == 1
+    with open(tracer.path + ".1") as f:
+        assert len(f.read().splitlines()) == 1
@@ -0,0 +1,196 @@
+"""
+Request tracing across the gateway and the ML APIs.
+
+The trace context travels in the W3C `traceparent` header
+("00-<trace id>-<parent span id>-<flags>"): the gateway starts a trace for a
+sampled request and PredictionClient passes it on, so the ML API's request
+becomes a child of the gateway's ML call. A request carrying a sampled
+traceparent is always traced; one without is traced with probability
+`sample_rate` (0 = only when asked to).
+
+Spans are opened with `span(name)` (metrics.stage opens one for every
+stage). Repeated spans with the same name under the same parent, like the
+per-row explanation stage, are merged into one with a count and the busy
+time. When the trace's root span ends its spans are appended, one JSON line
+each, to `<trace_dir>/spans-<service>-<pid>.jsonl`; trace_viewer.py (repo
+root) rebuilds the waterfall of a trace or report from those files.
+
+With no active trace, span() is a context variable lookup.
+"""
+import json
+import logging
+import os
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+TRACEPARENT_HEADER = "traceparent"
+
+_TRACEPARENT = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+
+
+class Span:
+    """A timed operation; times are perf_counter seconds, converted to epoch when written"""
+
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "start", "end", "busy", "count", "attributes", "children")
+
+    def __init__(self, trace_id: str, parent_id: Optional[str], name: str, attributes: Dict[str, Any]):
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.name = name
+        self.start = time.perf_counter()
+        self.end: Optional[float] = None
+        self.busy = 0.0
+        self.count = 0
+        self.attributes = attributes
+        # name -> child span (same-named children are merged)
+        self.children: Dict[str, "Span"] = {}
+
+    def child(self, name: str) -> "Span":
+        span = self.children.get(name)
+        if span is None:
+            span = self.children[name] = Span(self.trace_id, self.span_id, name, {})
+        return span
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    def walk(self) -> Iterator["Span"]:
+        yield self
+        for child in self.children.values():
+            yield from child.walk()
+
+
+_current: ContextVar[Optional[Span]] = ContextVar("trace_span", default=None)
+
+
+def current_traceparent() -> Optional[str]:
+    """traceparent header for an outgoing call made inside the current span (None when not tracing)"""
+    span = _current.get()
+    return span.traceparent if span is not None else None
+
+
+def annotate(**attributes) -> None:
+    """Add attributes (e.g. report_id) to the current span"""
+    span = _current.get()
+    if span is not None:
+        span.attributes.update(attributes)
+
+
+@contextmanager
+def span(name: str, **attributes) -> Iterator[Optional[Span]]:
+    """Time the block as a child of the current span (no-op outside a trace)"""
+    parent = _current.get()
+    if parent is None:
+        yield None
+        return
+    child = parent.child(name)
+    child.attributes.update(attributes)
+    started = time.perf_counter()
+    if child.count == 0:
+        child.start = started
+    token = _current.set(child)
+    try:
+        yield child
+    finally:
+        _current.reset(token)
+        child.end = time.perf_counter()
+        child.busy += child.end - started
+        child.count += 1
+
+
+def record_span(name: str, started: float, ended: float) -> None:
+    """Add an already measured interval (perf_counter seconds) as a child of the current span"""
+    parent = _current.get()
+    if parent is None:
+        return
+    child = parent.child(name)
+    if child.count == 0:
+        child.start = started
+    child.end = ended
+    child.busy += ended - started
+    child.count += 1
+
+
+class Tracer:
+    """Starts traces for one service and appends their spans to its trace file"""
+
+    def __init__(self, service: str, trace_dir: str, sample_rate: float = 0.0, max_file_mb: float = 50.0):
+        self.service = service
+        self.trace_dir = trace_dir
+        self.sample_rate = sample_rate
+        self.max_file_bytes = int(max_file_mb * 1024 * 1024)
+        self._lock = threading.Lock()
+
+    @property
+    def path(self) -> str:
+        return os.path.join(self.trace_dir, f"spans-{self.service}-{os.getpid()}.jsonl")
+
+    @contextmanager
+    def start_trace(self, name: str, traceparent: Optional[str] = None, **attributes) -> Iterator[Optional[Span]]:
+        """
+        Root span of this service for a request or job: a child of the
+        caller's span when `traceparent` is given (and sampled), else a new
+        trace with probability sample_rate. Yields None when not traced.
+        """
+        parent = _TRACEPARENT.match(traceparent.strip().lower()) if traceparent else None
+        if parent is not None:
+            if not int(parent.group(3), 16) & 1:
+                yield None
+                return
+            trace_id, parent_id = parent.group(1), parent.group(2)
+        elif self.sample_rate > 0 and random.random() < self.sample_rate:
+            trace_id, parent_id = os.urandom(16).hex(), None
+        else:
+            yield None
+            return
+
+        root = Span(trace_id, parent_id, name, attributes)
+        wall_start = time.time()
+        token = _current.set(root)
+        try:
+            yield root
+        except BaseException as e:
+            root.attributes["error"] = type(e).__name__
+            raise
+        finally:
+            _current.reset(token)
+            root.end = time.perf_counter()
+            root.busy = root.end - root.start
+            root.count = 1
+            self._write(root, wall_start)
+
+    def _write(self, root: Span, wall_start: float) -> None:
+        lines: List[str] = []
+        for item in root.walk():
+            lines.append(json.dumps({
+                "trace_id": item.trace_id,
+                "span_id": item.span_id,
+                "parent_id": item.parent_id,
+                "service": self.service,
+                "name": item.name,
+                "start": round(wall_start + (item.start - root.start), 6),
+                "duration_ms": round(((item.end or item.start) - item.start) * 1000, 3),
+                "busy_ms": round(item.busy * 1000, 3),
+                "count": item.count,
+                "attributes": item.attributes,
+            }, default=str))
+        try:
+            with self._lock:
+                os.makedirs(self.trace_dir, exist_ok=True)
+                path = self.path
+                if os.path.exists(path) and os.path.getsize(path) >= self.max_file_bytes:
+                    # Keep one previous file: spans-<service>-<pid>.jsonl.1
+                    os.replace(path, path + ".1")
+                with open(path, "a") as f:
+                    f.write("\n".join(lines) + "\n")
+        except OSError:
+            logger.exception("Could not write trace spans")
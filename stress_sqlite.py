@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Prueba de estres de SQLite para el Auth Gateway.
+Lanza escritores que insertan alertas y predicciones en lotes grandes
+(como un reporte de 100k filas) mientras varios lectores consultan
+contadores y listados por las conexiones de solo lectura.
+
+Reporta la latencia de lectura (p50/p95/p99), el throughput de escritura
+y cuantos errores "database is locked" se produjeron.
+
+Uso:
+  python stress_sqlite.py                       # WAL (configuracion por defecto)
+  python stress_sqlite.py --journal-mode DELETE # comparar con el modo clasico
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(label, latencies):
+    ms = [value * 1000 for value in latencies]
+    print(f"  {label:<22} n={len(ms):<6} "
+          f"p50={percentile(ms, 50):7.1f}ms  p95={percentile(ms, 95):7.1f}ms  "
+          f"p99={percentile(ms, 99):7.1f}ms  max={max(ms, default=0):7.1f}ms  "
+          f"media={statistics.fmean(ms) if ms else 0:7.1f}ms")
+
+
+def setup_database(journal_mode):
+    """BD temporal; debe configurarse antes de importar la app"""
+    workdir = tempfile.mkdtemp(prefix="gateway-stress-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{workdir}/stress.db"
+    os.environ["SQLITE_JOURNAL_MODE"] = journal_mode
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "auth-gateway"))
+    return workdir
+
+
+def writer(worker_id, batches, batch_size, stats, stop):
+    from app.database import SessionLocal
+    from app.models.alert import Alert
+    from app.models.prediction import Prediction
+
+    for batch in range(batches):
+        if stop.is_set():
+            return
+        db = SessionLocal()
+        try:
+            now = datetime.now(timezone.utc)
+            alerts = [
+                {
+                    "title": f"Alerta estres {worker_id}-{batch}-{i}",
+                    "severity": ("critical", "high", "medium")[i % 3],
+                    "status": "unread",
+                    "model_type": ("phishing", "ato", "brute_force")[i % 3],
+                    "prediction_index": i,
+                    "confidence": 70.0 + (i % 30),
+                    "prediction_label": "Amenaza",
+                    "risk_level": "high",
+                    "created_at": now,
+                }
+                for i in range(batch_size)
+            ]
+            predictions = [
+                {
+                    "model_type": ("phishing", "ato", "brute_force")[i % 3],
+                    "prediction": i % 2,
+                    "prediction_label": "Amenaza" if i % 2 else "Normal",
+                    "confidence": 0.5 + (i % 50) / 100,
+                    "created_at": now,
+                }
+                for i in range(batch_size // 10)
+            ]
+            started = time.perf_counter()
+            db.bulk_insert_mappings(Alert, alerts)
+            db.bulk_insert_mappings(Prediction, predictions)
+            db.commit()
+            stats["write_seconds"].append(time.perf_counter() - started)
+            stats["rows"] += len(alerts) + len(predictions)
+        except Exception as exc:
+            db.rollback()
+            key = "locked" if "locked" in str(exc) else "write_errors"
+            stats[key] += 1
+        finally:
+            db.close()
+
+
+def reader(stats, stop, interval):
+    from sqlalchemy import func, select
+    from app.database import ReadSessionLocal
+    from app.models.alert import Alert
+    from app.models.prediction import Prediction
+
+    queries = [
+        select(func.count(Alert.id)).where(Alert.status == "unread"),
+        select(Alert.id, Alert.title).order_by(Alert.created_at.desc()).limit(50),
+        select(Prediction.model_type, func.count(Prediction.id)).group_by(Prediction.model_type),
+    ]
+    turn = 0
+    while not stop.is_set():
+        db = ReadSessionLocal()
+        try:
+            started = time.perf_counter()
+            db.execute(queries[turn % len(queries)]).all()
+            stats["read_latencies"].append(time.perf_counter() - started)
+        except Exception as exc:
+            key = "locked" if "locked" in str(exc) else "read_errors"
+            stats[key] += 1
+        finally:
+            db.close()
+        turn += 1
+        time.sleep(interval)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Lecturas concurrentes durante escrituras masivas en SQLite")
+    parser.add_argument("--journal-mode", default="WAL", help="Modo de journal (WAL, DELETE, ...)")
+    parser.add_argument("--writers", type=int, default=2, help="Hilos escritores")
+    parser.add_argument("--readers", type=int, default=4, help="Hilos lectores")
+    parser.add_argument("--batches", type=int, default=10, help="Lotes por escritor")
+    parser.add_argument("--batch-size", type=int, default=10000, help="Alertas por lote")
+    parser.add_argument("--interval", type=float, default=0.005, help="Pausa entre lecturas (s)")
+    args = parser.parse_args()
+
+    workdir = setup_database(args.journal_mode)
+
+    from sqlalchemy import text
+    from app.database import engine, init_db
+
+    init_db()
+    with engine.connect() as conn:
+        mode = conn.execute(text("PRAGMA journal_mode")).scalar()
+
+    print("=" * 60)
+    print("PRUEBA DE ESTRES SQLITE - Auth Gateway")
+    print("=" * 60)
+    print(f"BD temporal: {workdir}")
+    print(f"journal_mode={mode}  escritores={args.writers}  lectores={args.readers}  "
+          f"lotes={args.batches}x{args.batch_size}")
+
+    stats = {"read_latencies": [], "write_seconds": [], "rows": 0,
+             "locked": 0, "read_errors": 0, "write_errors": 0}
+    stop = threading.Event()
+
+    readers = [threading.Thread(target=reader, args=(stats, stop, args.interval), daemon=True)
+               for _ in range(args.readers)]
+    writers = [threading.Thread(target=writer, args=(i, args.batches, args.batch_size, stats, stop), daemon=True)
+               for i in range(args.writers)]
+
+    for thread in readers:
+        thread.start()
+    time.sleep(0.5)
+
+    started = time.perf_counter()
+    for thread in writers:
+        thread.start()
+    for thread in writers:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    stop.set()
+    for thread in readers:
+        thread.join(timeout=10)
+
+    print("\n" + "=" * 60)
+    print("RESULTADOS")
+    print("=" * 60)
+    summarize("Lecturas", stats["read_latencies"])
+    summarize("Commits de escritura", stats["write_seconds"])
+    print(f"\n  Filas escritas:   {stats['rows']} en {elapsed:.2f}s "
+          f"({stats['rows'] / elapsed if elapsed else 0:,.0f} filas/s)")
+    print(f"  'database is locked': {stats['locked']}")
+    print(f"  Otros errores:      lectura={stats['read_errors']}  escritura={stats['write_errors']}")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
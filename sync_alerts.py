@@ -1,104 +1,174 @@
 #!/usr/bin/env python3
 """
 Script para sincronizar alertas con los reportes existentes.
-Recorre todos los reportes completados y genera alertas retroactivas
-para las predicciones que superen los umbrales configurados.
+Genera alertas retroactivas para las predicciones que superen los umbrales
+configurados, de forma incremental:
+
+- Cada reporte guarda una marca de agua (alert_sync_state): solo se procesan
+  reportes nuevos, interrumpidos o generados con otros umbrales.
+- Las alertas se insertan en transacciones por bloques junto con la marca de
+  agua; si el proceso se corta, la siguiente ejecucion continua donde quedo.
+- Los reportes se procesan en paralelo en procesos separados.
+- Nunca se vacia la tabla de alertas: es seguro ejecutarlo con el gateway en
+  marcha (un lease por reporte evita que ambos generen el mismo reporte).
+
+Uso:
+  python sync_alerts.py
+  python sync_alerts.py --workers 8
+  python sync_alerts.py --full            # regenera todos los reportes
+  python sync_alerts.py --report-id 12 15
 """
 
-import sys
+import argparse
+import multiprocessing
 import os
-import json
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
 # Add auth-gateway to path
-sys.path.insert(0, os.path.join(os.path.dirname(__file__), "auth-gateway"))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "auth-gateway"))
+
+from sqlalchemy.orm import defer
 
-from app.database import SessionLocal, engine, Base
-from app.models.alert import Alert
+from app.database import SessionLocal, init_db
+from app.models.incident import Incident
 from app.models.report import Report
-from app.services.alert_service import AlertService
+from app.models.stat_counter import StatCounter
+from app.services.alert_service import AlertService, ALERT_INSERT_CHUNK
+from app.services.alert_sync_service import AlertSyncService
+from app.services.counter_service import CounterService
+from app.services.report_service import ReportService
+
+
+def sync_report(report_id, regenerate, chunk_size):
+    """Procesa un reporte (se ejecuta en un proceso worker con su propia conexion)"""
+    db = SessionLocal()
+    try:
+        report = db.query(Report).options(defer(Report.results_json)).filter(Report.id == report_id).first()
+        if not report:
+            return {"report_id": report_id, "skipped": "missing"}
+        title, model_type = report.title, report.model_type
+
+        # Move legacy results_json blobs into report_results first (streamed)
+        ReportService.ensure_results_table(report, db)
+
+        started = time.perf_counter()
+        summary = AlertService.generate_alerts_for_report(
+            report_id, db, chunk_size=chunk_size, regenerate=regenerate
+        )
+        return {
+            "report_id": report_id,
+            "title": title,
+            "model_type": model_type,
+            "created": summary["created"],
+            "removed": summary["removed"],
+            "by_severity": summary["by_severity"],
+            "skipped": summary.get("skipped"),
+            "seconds": time.perf_counter() - started,
+        }
+    finally:
+        db.close()
+
+
+def print_result(result):
+    label = f"Reporte #{result['report_id']} '{result.get('title', '?')}' ({result.get('model_type', '?')})"
+    skipped = result.get("skipped")
+    if skipped == "locked":
+        print(f"    = {label}: en proceso por otro worker o por el gateway, se omite")
+    elif skipped == "up_to_date":
+        print(f"    = {label}: ya sincronizado")
+    elif skipped == "missing":
+        print(f"    = Reporte #{result['report_id']}: eliminado durante la sincronizacion")
+    elif result["created"]:
+        sev_str = ", ".join(f"{k}: {v}" for k, v in sorted(result["by_severity"].items()) if v)
+        removed = f", {result['removed']} reemplazadas" if result["removed"] else ""
+        print(f"    + {label}")
+        print(f"      {result['created']} alertas generadas [{sev_str}]{removed} en {result['seconds']:.1f}s")
+    else:
+        print(f"    - {label}")
+        print(f"      0 alertas nuevas (bajo umbral o ya generadas)")
 
 
 def main():
+    parser = argparse.ArgumentParser(description="Sincronizacion incremental de alertas desde reportes")
+    parser.add_argument("--workers", type=int, default=min(4, os.cpu_count() or 1),
+                        help="Procesos en paralelo (1 = sin procesos adicionales)")
+    parser.add_argument("--full", action="store_true",
+                        help="Regenerar las alertas de todos los reportes (reporte por reporte)")
+    parser.add_argument("--report-id", type=int, nargs="+", help="Procesar solo estos reportes")
+    parser.add_argument("--chunk-size", type=int, default=ALERT_INSERT_CHUNK,
+                        help="Alertas por transaccion")
+    args = parser.parse_args()
+
     print("=" * 60)
     print("SYNC ALERTS - Generar alertas desde reportes existentes")
     print("=" * 60)
 
-    # Create alerts table if it doesn't exist
-    print("\n[1/3] Creando tabla de alertas si no existe...")
-    Base.metadata.create_all(bind=engine)
+    # Create missing tables and apply pending migrations
+    print("\n[1/3] Creando tablas y aplicando migraciones pendientes...")
+    init_db()
     print("    OK")
 
     db = SessionLocal()
-
     try:
-        # Check existing alerts
-        existing_alerts = db.query(Alert).count()
-        print(f"\n[2/3] Estado actual: {existing_alerts} alertas en la base de datos")
-
-        if existing_alerts > 0:
-            print("    Limpiando alertas existentes para regenerar...")
-            db.query(Alert).delete()
-            db.commit()
-            print("    OK")
-
-        # Get all completed reports
-        reports = db.query(Report).filter(Report.status == "completed").all()
-        print(f"\n[3/3] Procesando {len(reports)} reportes completados...")
-
-        total_alerts = 0
-
-        for report in reports:
-            if not report.results_json:
-                print(f"    - Reporte #{report.id} '{report.title}': sin resultados, saltando")
-                continue
-
-            try:
-                predictions = json.loads(report.results_json)
-            except json.JSONDecodeError:
-                print(f"    - Reporte #{report.id} '{report.title}': JSON invalido, saltando")
-                continue
-
-            # Count threats in this report
-            threats = [p for p in predictions if p.get("is_threat", False)]
-
-            # Generate alerts
-            alerts = AlertService.generate_alerts_from_predictions(
-                model_type=report.model_type,
-                report_id=report.id,
-                predictions=predictions,
-                db=db
-            )
-
-            total_alerts += len(alerts)
-
-            # Summary per report
-            if alerts:
-                severities = {}
-                for a in alerts:
-                    severities[a.severity] = severities.get(a.severity, 0) + 1
-                sev_str = ", ".join(f"{k}: {v}" for k, v in sorted(severities.items()))
-                print(f"    + Reporte #{report.id} '{report.title}' ({report.model_type})")
-                print(f"      {len(threats)} amenazas -> {len(alerts)} alertas generadas [{sev_str}]")
-            else:
-                print(f"    - Reporte #{report.id} '{report.title}' ({report.model_type})")
-                print(f"      {len(threats)} amenazas -> 0 alertas (bajo umbral)")
-
-        # Final stats
-        stats = AlertService.get_alert_stats(db)
-        print("\n" + "=" * 60)
-        print("RESUMEN")
-        print("=" * 60)
-        print(f"  Total alertas generadas: {total_alerts}")
-        print(f"  Sin leer: {stats['unread']}")
-        print(f"  Por severidad:")
-        print(f"    Criticas: {stats['by_severity']['critical']}")
-        print(f"    Altas:    {stats['by_severity']['high']}")
-        print(f"    Medias:   {stats['by_severity']['medium']}")
-        print("=" * 60)
-
+        total_reports = db.query(Report.id).filter(Report.status == "completed").count()
+        pending = AlertSyncService.pending_reports(db, full=args.full)
+    finally:
+        db.close()
+    if args.report_id:
+        wanted = set(args.report_id)
+        pending = [report_id for report_id in pending if report_id in wanted]
+
+    print(f"\n[2/3] {total_reports} reportes completados, {len(pending)} por sincronizar"
+          f"{' (regeneracion completa)' if args.full else ''}")
+
+    print(f"\n[3/3] Procesando con {args.workers} worker(s)...")
+    started = time.perf_counter()
+    results = []
+    if args.workers <= 1 or len(pending) <= 1:
+        for report_id in pending:
+            results.append(sync_report(report_id, args.full, args.chunk_size))
+            print_result(results[-1])
+    else:
+        # spawn: every worker opens its own engine instead of inheriting the parent's connections
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=args.workers, mp_context=context) as pool:
+            futures = {
+                pool.submit(sync_report, report_id, args.full, args.chunk_size): report_id
+                for report_id in pending
+            }
+            for future in as_completed(futures):
+                try:
+                    results.append(future.result())
+                except Exception as e:
+                    print(f"    ! Reporte #{futures[future]}: error: {e}")
+                    continue
+                print_result(results[-1])
+    elapsed = time.perf_counter() - started
+
+    # Counters are maintained incrementally by every chunk; read them as they are
+    db = SessionLocal()
+    try:
+        stats = CounterService.alert_stats_from(dict(db.query(StatCounter.name, StatCounter.value).all()))
+        incidents = db.query(Incident.id).count()
     finally:
         db.close()
 
+    print("\n" + "=" * 60)
+    print("RESUMEN")
+    print("=" * 60)
+    print(f"  Reportes procesados: {sum(1 for r in results if not r.get('skipped'))} en {elapsed:.1f}s")
+    print(f"  Alertas generadas: {sum(r.get('created', 0) for r in results)}")
+    print(f"  Alertas reemplazadas: {sum(r.get('removed', 0) for r in results)}")
+    print(f"  Incidentes: {incidents}")
+    print(f"  Sin leer: {stats['unread']}")
+    print(f"  Por severidad:")
+    print(f"    Criticas: {stats['by_severity']['critical']}")
+    print(f"    Altas:    {stats['by_severity']['high']}")
+    print(f"    Medias:   {stats['by_severity']['medium']}")
+    print("=" * 60)
+
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Visor de trazas: reconstruye la cascada (waterfall) de una traza a partir de
+los archivos de spans que escriben el gateway y las APIs ML (service_common/tracing.py,
+spans-<servicio>-<pid>.jsonl en TRACE_DIR de cada servicio).
+
+Sin filtros lista las trazas mas recientes; con --report-id o --trace-id
+dibuja la cascada: por cada span su servicio, inicio relativo, duracion y,
+si se repitio (p. ej. la explicacion por fila), cuantas veces y el tiempo
+ocupado. En las llamadas HTTP del gateway a las APIs ML se indica el tiempo
+fuera de la API (red, cola y serializacion JSON).
+
+Los relojes de los servicios deben estar sincronizados (mismo host o NTP).
+
+Uso:
+  python trace_viewer.py auth-gateway/traces fuerza-bruta/api/traces
+  python trace_viewer.py auth-gateway/traces */api/traces --report-id 12
+  python trace_viewer.py traces/ --trace-id 4bf92f3577b34da6a3ce929d0e0e4736
+"""
+
+import argparse
+import glob
+import json
+import os
+import sys
+from collections import defaultdict
+from datetime import datetime
+
+BAR_WIDTH = 40
+
+
+def span_files(paths):
+    """Archivos de spans: los indicados y los spans-*.jsonl(.1) de los directorios"""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(sorted(glob.glob(os.path.join(path, "spans-*.jsonl*"))))
+        elif os.path.exists(path):
+            files.append(path)
+    return files
+
+
+def load_traces(paths):
+    """trace_id -> lista de spans"""
+    traces = defaultdict(list)
+    for path in span_files(paths):
+        with open(path) as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    item = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # linea cortada por una escritura interrumpida
+                item["end"] = item["start"] + item["duration_ms"] / 1000
+                traces[item["trace_id"]].append(item)
+    return traces
+
+
+def report_ids(spans):
+    return {str(item["attributes"]["report_id"]) for item in spans if "report_id" in item.get("attributes", {})}
+
+
+def summarize(trace_id, spans):
+    start = min(item["start"] for item in spans)
+    end = max(item["end"] for item in spans)
+    roots = [item for item in spans if item["parent_id"] not in {s["span_id"] for s in spans}]
+    first = min(roots or spans, key=lambda item: item["start"])
+    return {
+        "trace_id": trace_id,
+        "start": start,
+        "duration_ms": (end - start) * 1000,
+        "root": f"{first['service']} {first['name']}",
+        "services": sorted({item["service"] for item in spans}),
+        "report_ids": sorted(report_ids(spans)),
+    }
+
+
+def print_list(traces, limit):
+    rows = sorted((summarize(trace_id, spans) for trace_id, spans in traces.items()), key=lambda row: -row["start"])
+    print(f"{'inicio':<20} {'duracion':>10}  {'trace_id':<32}  {'reporte':<8} raiz / servicios")
+    for row in rows[:limit]:
+        started = datetime.fromtimestamp(row["start"]).strftime("%Y-%m-%d %H:%M:%S")
+        reports = ",".join(row["report_ids"]) or "-"
+        print(f"{started:<20} {row['duration_ms']:>8.1f}ms  {row['trace_id']}  {reports:<8} "
+              f"{row['root']} [{', '.join(row['services'])}]")
+    if len(rows) > limit:
+        print(f"... {len(rows) - limit} trazas mas (--limit)")
+
+
+def bar(start, end, origin, total):
+    if total <= 0:
+        return " " * BAR_WIDTH
+    left = int((start - origin) / total * BAR_WIDTH)
+    right = max(int((end - origin) / total * BAR_WIDTH), left + 1)
+    return " " * left + "█" * (min(right, BAR_WIDTH) - left) + " " * (BAR_WIDTH - min(right, BAR_WIDTH))
+
+
+def print_waterfall(trace_id, spans):
+    by_id = {item["span_id"]: item for item in spans}
+    children = defaultdict(list)
+    roots = []
+    for item in spans:
+        if item["parent_id"] in by_id:
+            children[item["parent_id"]].append(item)
+        else:
+            roots.append(item)
+
+    origin = min(item["start"] for item in spans)
+    total = max(item["end"] for item in spans) - origin
+    summary = summarize(trace_id, spans)
+    reports = f"  reporte {', '.join(summary['report_ids'])}" if summary["report_ids"] else ""
+    print(f"\nTraza {trace_id}{reports}  total {total * 1000:.1f} ms  servicios: {', '.join(summary['services'])}")
+    print(f"  {'servicio':<12} {'span':<44} {'inicio':>9} {'duracion':>10}  {'':<{BAR_WIDTH}}  detalle")
+
+    def show(item, depth):
+        name = ("  " * depth + item["name"])[:44]
+        details = []
+        if item["count"] > 1:
+            details.append(f"x{item['count']}, ocupado {item['busy_ms']:.1f} ms")
+        remote = [child for child in children[item["span_id"]] if child["service"] != item["service"]]
+        if remote:
+            inside = sum(child["duration_ms"] for child in remote)
+            details.append(f"fuera de la API {item['duration_ms'] - inside:.1f} ms")
+        attributes = {key: value for key, value in item.get("attributes", {}).items() if value is not None}
+        if attributes:
+            details.append(" ".join(f"{key}={value}" for key, value in attributes.items()))
+        print(f"  {item['service']:<12} {name:<44} {(item['start'] - origin) * 1000:>7.1f}ms "
+              f"{item['duration_ms']:>8.1f}ms  {bar(item['start'], item['end'], origin, total)}  {'; '.join(details)}")
+        for child in sorted(children[item["span_id"]], key=lambda child: child["start"]):
+            show(child, depth + 1)
+
+    for root in sorted(roots, key=lambda item: item["start"]):
+        show(root, 0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cascada de trazas del gateway y las APIs ML")
+    parser.add_argument("paths", nargs="+", help="Directorios TRACE_DIR o archivos spans-*.jsonl")
+    parser.add_argument("--report-id", help="Trazas que tocaron este reporte (generacion y alertas)")
+    parser.add_argument("--trace-id", help="Una traza concreta")
+    parser.add_argument("--limit", type=int, default=20, help="Trazas listadas sin filtro")
+    args = parser.parse_args()
+
+    traces = load_traces(args.paths)
+    if not traces:
+        sys.exit("No se encontraron spans (TRACE_SAMPLE_RATE en 0 y sin cabecera traceparent?)")
+
+    if args.trace_id:
+        selected = {args.trace_id: traces[args.trace_id]} if args.trace_id in traces else {}
+    elif args.report_id:
+        selected = {trace_id: spans for trace_id, spans in traces.items() if args.report_id in report_ids(spans)}
+    else:
+        print_list(traces, args.limit)
+        return
+
+    if not selected:
+        sys.exit("Ninguna traza coincide")
+    for trace_id, spans in sorted(selected.items(), key=lambda item: min(span["start"] for span in item[1])):
+        print_waterfall(trace_id, spans)
+
+
+if __name__ == "__main__":
+    main()